@@ -1,17 +1,49 @@
 import requests
 import os
-import json
+import itertools
+import threading
+import base64
+from collections import OrderedDict
 import time
 import speech_recognition as sr
-import pyaudio
 from pydub import AudioSegment
 from dotenv import load_dotenv
 
-# Load environment variables from .env file
+# Load environment variables from .env file before importing the local modules below:
+# they read their settings with os.getenv when they are imported
 load_dotenv()
 
+from audio_retention import RetentionManager
+from clip_history import ClipHistory
+from clip_archive import ClipArchive
+from clip_transcoder import ClipTranscoder, CODECS as TRANSCODE_CODECS, TRANSCODE_CODEC
+from audio_dedup import DedupStore, DEDUP_ENABLED
+from overlay_output import (CoalescingWriter, OverlayRenderer, load_overlay_outputs,
+                            OVERLAY_OUTPUTS_CONFIG)
+from overlay_server import OverlayServer
+from overlay_archive import OverlayArchive
+from captions import CaptionTrack, CaptionPlayer, CAPTIONS_ENABLED
+from obs_websocket import ObsClient, ObsIntegration, OBS_WEBSOCKET_ENABLED
+from favorites_store import FavoritesStore
+from favorites_cache import FavoritesCache
+from phrase_search import PhraseIndex, SEARCH_LIMIT, normalize
+from phrase_ranking import PhraseRanking
+from phrase_warmer import PhraseWarmer, PHRASE_WARM_COUNT
+from favorite_audio import FavoriteAudio, audio_filename, read_bytes
+import favorites_transfer
+from background_io import live_activity
+from mic_capture import MicCapture, SAMPLE_RATE as MIC_SAMPLE_RATE
+from audio_devices import DeviceOutput, DeviceRegistry, AUDIO_DEVICE_WATCH, AUDIO_OUTPUT_DEVICE
+from whisper_worker import WhisperWorker, SAMPLE_RATE as WHISPER_SAMPLE_RATE
+from streaming_dictation import StreamingDictation
+from clone_pipeline import ClonePipeline
+from speech_to_speech import VoiceChanger, convert_stream, STS_OUTPUT_RATE
+from multi_mic import MicChannel, MultiMicTranscriber, MULTI_MIC_DEVICES, parse_mic_assignments
+
 # --- Configuration ---
 ELEVENLABS_API_KEY = os.getenv("ELEVENLABS_API_KEY") # Get API key from .env
+# Point at the local stand-in (elevenlabs_standin.py) for offline testing
+ELEVENLABS_API_BASE = os.getenv("ELEVENLABS_API_BASE", "https://api.elevenlabs.io").rstrip("/")
 USE_VOICE_SPECIFIC_SETTINGS = os.getenv("USE_VOICE_SPECIFIC_SETTINGS", "false").lower() == "true"
 VOICE_ID = "21m00Tcm4TlvDq8ikWAM" # Rachel voice from ElevenLabs
 OUTPUT_AUDIO_DIR = "generated_audio"
@@ -19,12 +51,112 @@ SAVED_OVERLAYS_DIR = "saved_overlays"
 FAVORITES_DIR = "tts_favorites"
 OVERLAY_HTML_PATH = "overlay.html" # This is the file OBS will read
 FAVORITES_JSON_PATH = "tts_favorites.json" # Store favorites data
+TTS_MODEL_ID = "eleven_monolingual_v1"  # FIXED: Back to v1 model that works
 
 # Create directories if they don't exist
 os.makedirs(OUTPUT_AUDIO_DIR, exist_ok=True)
 os.makedirs(SAVED_OVERLAYS_DIR, exist_ok=True)
 os.makedirs(FAVORITES_DIR, exist_ok=True)
 
+# Identical clips are stored once and hard-linked (AUDIO_DEDUP=false to disable)
+dedup_store = DedupStore(OUTPUT_AUDIO_DIR) if DEDUP_ENABLED else None
+
+
+def _release_clip_content(name):
+    """Tell the dedup store a clip's loose file was removed or moved away."""
+    if dedup_store is not None:
+        dedup_store.release(name)
+
+
+# "files" keeps one file per clip; "segments" packs finished clips into large segment files
+AUDIO_ARCHIVE_MODE = os.getenv("AUDIO_ARCHIVE_MODE", "files").lower()
+clip_archive = None
+if AUDIO_ARCHIVE_MODE == "segments":
+    # Clips from before segment mode was switched on are packed too, oldest first
+    clip_archive = ClipArchive(os.path.join(OUTPUT_AUDIO_DIR, "segments"), source_dir=OUTPUT_AUDIO_DIR,
+                               candidates=lambda: retention_manager.snapshot())
+if clip_archive is not None:
+    clip_archive.on_packed = lambda path: _release_clip_content(os.path.basename(path))
+
+
+def _remove_loose_clip(name):
+    path = os.path.join(OUTPUT_AUDIO_DIR, name)
+    if dedup_store is not None and dedup_store.is_tracked(name):
+        dedup_store.remove(name)  # Drops the shared blob once nothing links to it
+    else:
+        os.remove(path)
+
+
+def _remove_generated_clip(name):
+    """Delete a generated clip whether it is still a loose file or already archived."""
+    if clip_archive is not None and clip_archive.delete(name):
+        if os.path.exists(os.path.join(OUTPUT_AUDIO_DIR, name)):
+            _remove_loose_clip(name)
+        return
+    _remove_loose_clip(name)
+
+
+# Keeps generated_audio bounded (caps configured via AUDIO_RETENTION_* env vars)
+retention_manager = RetentionManager(OUTPUT_AUDIO_DIR, remover=_remove_generated_clip)
+
+
+def _on_clip_transcoded(old_name, new_name, new_size, created):
+    """Keep the retention and dedup indexes in step with a clip that changed format."""
+    _release_clip_content(old_name)
+    retention_manager.untrack(old_name)
+    retention_manager.track(new_name, size=new_size, created=created)
+
+
+# Re-encodes older loose clips to a compact codec (AUDIO_TRANSCODE=opus to enable).
+# Segment archive mode already packs old clips, so the two are not combined.
+clip_transcoder = None
+if TRANSCODE_CODEC in TRANSCODE_CODECS and clip_archive is None:
+    clip_transcoder = ClipTranscoder(
+        OUTPUT_AUDIO_DIR,
+        codec=TRANSCODE_CODEC,
+        candidates=retention_manager.snapshot,
+        # Shared (deduplicated) clips stay as they are; transcoding each link would cost space
+        skip=lambda: retention_manager.pinned_names() | (
+            dedup_store.shared_names() if dedup_store is not None else set()),
+        on_transcoded=_on_clip_transcoded
+    )
+
+# Searchable record of every generated clip (written asynchronously)
+clip_history = ClipHistory()
+
+# Overlay markup is compiled once; writes are coalesced and atomic.
+# Named outputs (overlay_outputs.json) are rendered together from one shared state;
+# the first one is the primary overlay that gets archived and restored.
+overlay_writer = CoalescingWriter()
+overlay_outputs = load_overlay_outputs(OVERLAY_OUTPUTS_CONFIG, OVERLAY_HTML_PATH)
+overlay_renderer = OverlayRenderer(overlay_outputs, overlay_writer)
+OVERLAY_TEMPLATE = overlay_outputs[0].template
+
+# Optional local server that pushes overlay updates to OBS over Server-Sent Events.
+# overlay.html keeps being written as a fallback unless OVERLAY_FILE_OUTPUT=false.
+OVERLAY_SERVER_ENABLED = os.getenv("OVERLAY_SERVER", "false").lower() == "true"
+OVERLAY_FILE_OUTPUT = os.getenv("OVERLAY_FILE_OUTPUT", "true").lower() == "true"
+overlay_server = (OverlayServer(template=OVERLAY_TEMPLATE, outputs=overlay_outputs)
+                  if OVERLAY_SERVER_ENABLED else None)
+
+# Optional direct control of OBS (text source, "on air" source, media source) over obs-websocket v5
+obs_integration = ObsIntegration(ObsClient()) if OBS_WEBSOCKET_ENABLED else None
+
+# Overlay history: an append-only event log instead of one HTML file per update
+overlay_archive = OverlayArchive(SAVED_OVERLAYS_DIR)
+# Old overlay_<timestamp>.html files are imported on first start: in the background (see
+# start_background_maintenance), or before the first overlay is archived if that comes first
+if not len(overlay_archive):
+    overlay_archive.defer_legacy_import(SAVED_OVERLAYS_DIR, OVERLAY_TEMPLATE.source)
+
+
+def import_legacy_overlays():
+    """Import the overlay_<timestamp>.html archives of older versions, once."""
+    imported = overlay_archive.import_pending()
+    if imported:
+        print(f"Imported {imported} overlay archives from older versions")
+    return imported
+
 # --- Eleven Labs API Functions ---
 
 def get_available_voices():
@@ -37,7 +169,7 @@ def get_available_voices():
         "xi-api-key": ELEVENLABS_API_KEY,
         "Accept": "application/json"
     }
-    url = "https://api.elevenlabs.io/v1/voices"
+    url = f"{ELEVENLABS_API_BASE}/v1/voices"
 
     try:
         response = requests.get(url, headers=headers)
@@ -80,7 +212,7 @@ def get_available_models():
         "xi-api-key": ELEVENLABS_API_KEY,
         "Accept": "application/json"
     }
-    url = "https://api.elevenlabs.io/v1/models"
+    url = f"{ELEVENLABS_API_BASE}/v1/models"
 
     try:
         response = requests.get(url, headers=headers)
@@ -120,7 +252,7 @@ def get_voice_settings(voice_id):
         "xi-api-key": ELEVENLABS_API_KEY,
         "Accept": "application/json"
     }
-    url = f"https://api.elevenlabs.io/v1/voices/{voice_id}/settings"
+    url = f"{ELEVENLABS_API_BASE}/v1/voices/{voice_id}/settings"
 
     try:
         response = requests.get(url, headers=headers)
@@ -138,7 +270,8 @@ def get_voice_settings(voice_id):
         return None
 
 def text_to_speech(text, voice_id=VOICE_ID, filename="output.mp3", 
-                   stability=None, similarity_boost=None, style=None, speed=None):
+                   stability=None, similarity_boost=None, style=None, speed=None,
+                   voice_name=None, with_timestamps=None, output_dir=None):
     """
     Converts text to speech using Eleven Labs API and saves it to a file.
     Returns the path to the saved audio file.
@@ -151,6 +284,11 @@ def text_to_speech(text, voice_id=VOICE_ID, filename="output.mp3",
         similarity_boost: Voice similarity boost (0.0 to 1.0, None for default)
         style: Style exaggeration (0.0 to 1.0, None for default)
         speed: Speech speed (0.25 to 4.0, None for default)
+        voice_name: Display name of the voice, recorded in the clip history
+        with_timestamps: Also fetch word timings for overlay captions
+                         (None = when OVERLAY_CAPTIONS and the overlay server are on)
+        output_dir: Save somewhere other than generated_audio/. Such renders (favorite
+                    audio) are not treated as clips: no history, retention or OBS update.
     """
     if not ELEVENLABS_API_KEY:
         print("Error: ELEVENLABS_API_KEY not set.")
@@ -165,7 +303,7 @@ def text_to_speech(text, voice_id=VOICE_ID, filename="output.mp3",
     # Prepare the request data
     data = {
         "text": text,
-        "model_id": "eleven_monolingual_v1"  # FIXED: Back to v1 model that works
+        "model_id": TTS_MODEL_ID
     }
     
     # Build voice settings - use provided parameters or defaults
@@ -187,24 +325,72 @@ def text_to_speech(text, voice_id=VOICE_ID, filename="output.mp3",
     print(f"Using custom voice settings: {voice_settings}")
     print(f"Request data: {data}")  # Debug: show full request
     
-    url = f"https://api.elevenlabs.io/v1/text-to-speech/{voice_id}"
-    output_path = os.path.join(OUTPUT_AUDIO_DIR, filename)
+    url = f"{ELEVENLABS_API_BASE}/v1/text-to-speech/{voice_id}"
+    output_path = os.path.join(output_dir or OUTPUT_AUDIO_DIR, filename)
+    
+    if with_timestamps is None:
+        with_timestamps = CAPTIONS_ENABLED and overlay_server is not None
+    if with_timestamps:
+        url += "/with-timestamps"
+        headers["Accept"] = "application/json"
+
+    # Pre-synthesized audio for exactly this phrase is copied instead of calling the API
+    # (not when captions need word timings, which are only returned by a live request)
+    presynthesized = None
+    if output_dir is None and not with_timestamps:
+        presynthesized = _presynthesized_audio(text, voice_id, voice_settings)
 
     try:
-        print(f"Making request to: {url}")  # Debug: show URL
-        response = requests.post(url, json=data, headers=headers)
-        print(f"Response status: {response.status_code}")  # Debug: show status
-        
-        if response.status_code != 200:
-            print(f"API Error Response: {response.text}")  # Debug: show error details
-        
-        response.raise_for_status()
+        # Background workers (transcoding, compaction) pause while this runs
+        with live_activity:
+            request_started = time.perf_counter()
+            if presynthesized:
+                print(f"Using pre-synthesized audio: {presynthesized}")
+                chunks = [read_bytes(presynthesized)]
+            else:
+                print(f"Making request to: {url}")  # Debug: show URL
+                response = requests.post(url, json=data, headers=headers)
+                print(f"Response status: {response.status_code}")  # Debug: show status
+
+                if response.status_code != 200:
+                    print(f"API Error Response: {response.text}")  # Debug: show error details
 
-        with open(output_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=1024):
-                if chunk:
-                    f.write(chunk)
+                response.raise_for_status()
+
+                if with_timestamps:
+                    result = response.json()
+                    chunks = [base64.b64decode(result['audio_base64'])]
+                    _remember_captions(output_path, result.get('alignment') or result.get('normalized_alignment'))
+                else:
+                    chunks = response.iter_content(chunk_size=1024)
+
+            if dedup_store is not None and output_dir is None:
+                dedup_store.write_clip(output_path, chunks)
+            else:
+                with open(output_path, 'wb') as f:
+                    for chunk in chunks:
+                        if chunk:
+                            f.write(chunk)
         print(f"Audio saved to {output_path}")
+        if output_dir is not None:
+            return output_path
+        retention_manager.track(output_path)
+        if clip_archive is not None:
+            clip_archive.queue_clip(output_path)
+        clip_history.record(
+            text,
+            voice_id=voice_id,
+            voice_name=voice_name,
+            model_id=data["model_id"],
+            settings=voice_settings,
+            file_path=output_path,
+            latency_ms=(time.perf_counter() - request_started) * 1000
+        )
+        phrase_index.add_generation(text, voice_id, voice_name, time.time())
+        phrase_ranking.record(text, voice_id, voice_name, voice_settings,
+                              model_id=data["model_id"], clip_path=output_path)
+        if obs_integration is not None:
+            obs_integration.on_generation(text, voice_name)
         return output_path
     except requests.exceptions.RequestException as e:
         print(f"Error during text-to-speech: {e}")
@@ -212,208 +398,579 @@ def text_to_speech(text, voice_id=VOICE_ID, filename="output.mp3",
             print(f"Response content: {e.response.text}")  # Debug: show error response
         return None
 
-def generate_overlay_html(main_text, sub_text="", save_archive=True):
-    """
-    Generates or updates the HTML file for the OBS overlay.
-    Optionally saves numbered archive copies.
-    """
-    html_content = f"""
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>VoiceMaster Overlay</title>
-    <style>
-        body {{
-            margin: 0;
-            padding: 0;
-            overflow: hidden; /* Hide scrollbars if content overflows */
-            background-color: rgba(0, 0, 0, 0); /* Transparent background */
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            color: #ffffff;
-            text-shadow: 2px 2px 4px rgba(0, 0, 0, 0.7); /* Subtle shadow for readability */
-        }}
-        .overlay-container {{
-            position: absolute;
-            bottom: 20px; /* Adjust as needed */
-            left: 20px; /* Adjust as needed */
-            background-color: rgba(44, 62, 80, 0.7); /* Semi-transparent dark blue */
-            padding: 10px 20px;
-            border-radius: 8px;
-            display: flex;
-            flex-direction: column;
-            gap: 5px;
-            align-items: flex-start;
-            box-shadow: 0 4px 8px rgba(0, 0, 0, 0.3);
-        }}
-        .main-text {{
-            font-size: 2em; /* Larger for main title */
-            font-weight: bold;
-            line-height: 1.2;
-        }}
-        .sub-text {{
-            font-size: 1.2em; /* Smaller for additional info */
-            opacity: 0.8;
-        }}
-    </style>
-</head>
-<body>
-    <div class="overlay-container">
-        <div class="main-text">{main_text}</div>
-        {'<div class="sub-text">' + sub_text + '</div>' if sub_text else ''}
-    </div>
-</body>
-</html>
+def generate_overlay_html(main_text, sub_text="", save_archive=True, **extra):
     """
-    try:
-        # Write the current overlay file
-        with open(OVERLAY_HTML_PATH, "w", encoding="utf-8") as f:
-            f.write(html_content)
-        print(f"Overlay HTML updated: {OVERLAY_HTML_PATH}")
-        
-        # Save numbered archive copy if requested
-        if save_archive:
-            timestamp = int(time.time())
-            archive_filename = f"overlay_{timestamp:010d}.html"
-            archive_path = os.path.join(SAVED_OVERLAYS_DIR, archive_filename)
-            
-            with open(archive_path, "w", encoding="utf-8") as f:
-                f.write(html_content)
-            print(f"Overlay archived: {archive_path}")
-            
-    except IOError as e:
-        print(f"Error writing overlay HTML: {e}")
+    Generates or updates the HTML files for the OBS overlays.
+    Extra keyword values (e.g. voice_name, spoken_text) fill the slots of
+    additional named outputs; only outputs whose content changed are written.
+    Optionally records the update in the overlay archive.
+    Returns immediately; files are written atomically in the background and
+    bursts of updates within OVERLAY_COALESCE_MS collapse into one write.
+    With the overlay server enabled, connected OBS sources get the change pushed.
+    """
+    values = dict(extra, main_text=main_text, sub_text=sub_text)
+    if overlay_server is not None:
+        overlay_server.publish(**values)
+    
+    if overlay_server is None or OVERLAY_FILE_OUTPUT:
+        written = overlay_renderer.update(**values)
+        if written:
+            print(f"Overlay update queued: {', '.join(written)}")
+    
+    # Record the state in the archive log; HTML is rendered again only on restore
+    if save_archive:
+        try:
+            seq = overlay_archive.record(main_text, sub_text, OVERLAY_TEMPLATE.source, time.time())
+            print(f"Overlay archived: #{seq}")
+        except IOError as e:
+            print(f"Error archiving overlay: {e}")
+
+
+# --- Karaoke captions ---
+
+# Word timings of recently generated clips (only needed while they are replayed live)
+_clip_captions = OrderedDict()
+_CLIP_CAPTIONS_MAX = 50
+_caption_player = None
+
+
+def _remember_captions(audio_path, alignment):
+    if not alignment:
+        return
+    _clip_captions[os.path.abspath(audio_path)] = CaptionTrack.from_alignment(alignment)
+    _clip_captions.move_to_end(os.path.abspath(audio_path))
+    while len(_clip_captions) > _CLIP_CAPTIONS_MAX:
+        _clip_captions.popitem(last=False)
+
+
+def get_clip_captions(audio_path):
+    """Return the CaptionTrack of a generated clip, or None if it has no word timings."""
+    return _clip_captions.get(os.path.abspath(audio_path)) if audio_path else None
+
+
+def start_captions(audio_path, clock):
+    """
+    Show word-highlighted captions for a clip that just started playing.
+    clock() must return seconds since playback started, or None once it stopped.
+    Returns the CaptionPlayer, or None if captions are off or the clip has no timings.
+    """
+    global _caption_player
+    track = get_clip_captions(audio_path)
+    if overlay_server is None or not CAPTIONS_ENABLED or not track:
+        return None
+    stop_captions()
+    overlay_server.publish(caption_words=[word for word, _, _ in track.words], caption_index=-1)
+    player = CaptionPlayer(track, clock, publish=lambda index: overlay_server.publish(caption_index=index))
+    player.on_finish = lambda: _clear_captions(player)
+    _caption_player = player.start()
+    return player
+
+
+def _clear_captions(player):
+    # A replaced player must not clear the captions of the one that superseded it
+    if _caption_player is None or _caption_player is player:
+        overlay_server.publish(caption_words=[], caption_index=-1)
+
+
+def stop_captions():
+    """Stop the running caption player (the overlay caption is cleared)."""
+    global _caption_player
+    if _caption_player is not None:
+        _caption_player.stop()
+        _caption_player = None
+
+
+def start_overlay_services():
+    """Start the local overlay server and the OBS connection if enabled. Returns the overlay URL or None."""
+    if obs_integration is not None:
+        obs_integration.client.start()
+    if overlay_server is not None and overlay_server.start():
+        return overlay_server.url
+    return None
+
+
+def notify_playback(playing):
+    """Tell OBS that playback started or stopped (toggles the on-air source, restarts media)."""
+    if obs_integration is not None:
+        obs_integration.on_playback(playing)
+
+
+# Favorites live in SQLite; the old JSON file is imported once on first start
+favorites_store = FavoritesStore()
+favorites_store.migrate_json(FAVORITES_JSON_PATH)
+# Reads come from an in-memory snapshot that follows the database on disk
+favorites_cache = FavoritesCache(favorites_store).start()
 
 
 def load_favorites():
-    """Load TTS favorites from JSON file."""
+    """Load all TTS favorites (newest first)."""
     try:
-        if os.path.exists(FAVORITES_JSON_PATH):
-            with open(FAVORITES_JSON_PATH, 'r', encoding='utf-8') as f:
-                return json.load(f)
+        return list(favorites_cache.snapshot())
     except Exception as e:
         print(f"Error loading favorites: {e}")
     return []
 
 
-def save_favorites(favorites):
-    """Save TTS favorites to JSON file."""
-    try:
-        with open(FAVORITES_JSON_PATH, 'w', encoding='utf-8') as f:
-            json.dump(favorites, f, indent=2, ensure_ascii=False)
-        print(f"Favorites saved to {FAVORITES_JSON_PATH}")
-    except Exception as e:
-        print(f"Error saving favorites: {e}")
+def favorite_settings(stability=None, similarity_boost=None, style=None):
+    """Voice settings a favorite is rendered with (same defaults as text_to_speech)."""
+    settings = {
+        "stability": stability if stability is not None else 0.5,
+        "similarity_boost": similarity_boost if similarity_boost is not None else 0.75,
+    }
+    if style is not None:
+        settings["style"] = style
+    return settings
 
 
-def add_favorite(text, voice_id, voice_name, audio_filename=None):
-    """Add a TTS comment to favorites."""
-    favorites = load_favorites()
-    
-    # Generate unique ID for this favorite
-    favorite_id = int(time.time())
-    
-    favorite = {
-        "id": favorite_id,
-        "text": text,
-        "voice_id": voice_id,
-        "voice_name": voice_name,
-        "audio_filename": audio_filename,
-        "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
-        "timestamp": favorite_id
-    }
-    
-    favorites.append(favorite)
-    save_favorites(favorites)
-    
+def _render_to(path, text, voice_id, voice_name, settings):
+    """Synthesize text into path outside generated_audio/ (favorite and warm audio)."""
+    settings = settings or favorite_settings()
+    return text_to_speech(
+        text,
+        voice_id or VOICE_ID,
+        os.path.basename(path),
+        stability=settings.get('stability'),
+        similarity_boost=settings.get('similarity_boost'),
+        style=settings.get('style'),
+        voice_name=voice_name,
+        with_timestamps=False,
+        output_dir=os.path.dirname(path)
+    )
+
+
+def _render_favorite(favorite, path):
+    """Synthesize a favorite's audio into tts_favorites/ (runs on the favorite audio thread)."""
+    return _render_to(path, favorite['text'], favorite.get('voice_id'), favorite.get('voice_name'),
+                      favorite.get('settings'))
+
+
+# Favorites own rendered audio in tts_favorites/, decoded into memory for playback
+favorite_audio = FavoriteAudio(favorites_cache, FAVORITES_DIR, _render_favorite, model_id=TTS_MODEL_ID)
+
+
+def add_favorite(text, voice_id, voice_name, audio_filename=None, settings=None, clip_path=None):
+    """
+    Add a TTS comment to favorites.
+
+    Args:
+        settings: Voice settings to render it with (see favorite_settings)
+        clip_path: A clip just generated from the same text, voice and settings;
+                   it becomes the favorite's audio, otherwise the audio is rendered
+                   in the background
+    """
+    favorite = favorites_cache.add(text, voice_id, voice_name, audio_filename,
+                                   settings=settings or favorite_settings())
+    if clip_path and os.path.exists(clip_path):
+        favorite_audio.adopt(favorite, clip_path)
+    else:
+        favorite_audio.ensure(favorite)
     print(f"Added favorite: '{text[:50]}...' with voice '{voice_name}'")
-    return favorite_id
+    return favorite['id']
 
 
-def get_favorite_phrases():
-    """Get all favorite phrases for quick access."""
-    favorites = load_favorites()
-    # Sort by timestamp (newest first)
-    favorites.sort(key=lambda x: x.get('timestamp', 0), reverse=True)
-    return favorites
+def get_favorite_audio(favorite_id, on_ready=None):
+    """
+    Playable audio for a favorite without calling the API: decoded audio from
+    memory, or decoded from tts_favorites/ on first use. Returns None while the
+    audio is still being rendered; on_ready(favorite) is called once it is.
+    """
+    audio = favorite_audio.get(favorite_id)
+    favorite = favorites_cache.get(favorite_id)
+    if audio is None and on_ready is not None and favorite is not None:
+        favorite_audio.ensure(favorite, on_ready)
+    elif audio is not None and favorite is not None:
+        # Playing a favorite counts as using the phrase
+        phrase_ranking.record(favorite['text'], favorite.get('voice_id'), favorite.get('voice_name'),
+                              favorite.get('settings'), model_id=TTS_MODEL_ID,
+                              clip_path=favorite_audio.path(favorite['audio_filename']))
+    return audio
+
+
+def set_favorite_audio_decoder(decode, decoded_size):
+    """Decode favorite audio with the player's own loader (e.g. pygame.mixer.Sound)."""
+    favorite_audio.decode = decode
+    favorite_audio.decoded_size = decoded_size
+    phrase_warmer.decode = decode
+
+
+def update_favorite_settings(favorite_id, settings):
+    """Change a favorite's voice settings; its audio is re-rendered in the background."""
+    return favorite_audio.set_settings(favorite_id, settings)
+
+
+def get_favorite_phrases(limit=None):
+    """
+    Get favorite phrases for quick access, newest first. Returns the shared
+    cached tuple (no database read); treat it as read-only.
+    """
+    return favorites_cache.snapshot(limit)
+
+
+def watch_favorites(callback):
+    """Call callback() whenever favorites change, including edits made outside this process."""
+    favorites_cache.add_listener(callback)
 
 
 def delete_favorite(favorite_id):
     """Delete a favorite by ID."""
-    favorites = load_favorites()
-    favorites = [f for f in favorites if f.get('id') != favorite_id]
-    save_favorites(favorites)
+    favorite = favorites_cache.get(favorite_id)
+    favorites_cache.delete(favorite_id)
+    if favorite is not None:
+        favorite_audio.discard(favorite)
     print(f"Deleted favorite with ID: {favorite_id}")
 
 
-def get_overlay_archive_list():
-    """Get list of archived overlay files, sorted by number (newest first)."""
+def export_favorites(path, include_audio=True, progress=None):
+    """
+    Write every favorite (and its audio) to a streaming archive for another
+    PC; see favorites_transfer. progress(done, total) reports as it goes.
+    """
+    return favorites_transfer.export_favorites(favorites_store, path, FAVORITES_DIR if include_audio else None,
+                                               progress)
+
+
+def import_favorites(path, progress=None):
+    """Add favorites from an exported archive, skipping ones already saved. Returns import stats."""
+    stats = favorites_transfer.import_favorites(favorites_store, path, FAVORITES_DIR, progress)
+    favorites_cache.refresh()
+    print(f"Imported {stats['imported']} favorites from {path} ({stats['duplicates']} duplicates skipped)")
+    return stats
+
+
+# Type-ahead search over favorites and past generations. Filled from the
+# clip history in the background; kept current as clips and favorites change.
+phrase_index = PhraseIndex()
+favorites_cache.add_listener(lambda: phrase_index.sync_favorites(favorites_cache.snapshot()))
+
+
+def _load_phrase_index():
+    started = time.perf_counter()
+    phrase_index.load(clip_history.phrases(), favorites_cache.snapshot())
+    print(f"Indexed {len(phrase_index)} phrases for search in {time.perf_counter() - started:.1f}s")
+
+
+def search_phrases(query, limit=SEARCH_LIMIT):
+    """
+    Favorites and past generations matching query as you type (word
+    prefixes, with typo tolerance), favorites first, then most recent.
+    Returns PhraseEntry objects with text, voice_id, voice_name and is_favorite.
+    """
+    return phrase_index.search(query, limit)
+
+
+# Quick phrase bar: phrases ranked by decayed use count (per part of the stream
+# when PHRASE_RANK_SEGMENTS is set), with their audio pre-synthesized
+DEFAULT_QUICK_PHRASES = (
+    "Hello everyone, welcome to the stream!",
+    "Thanks for following!",
+    "Let's get started with today's content.",
+    "Don't forget to like and subscribe!"
+)
+QUICK_PHRASE_COUNT = 8
+
+phrase_ranking = PhraseRanking()
+
+
+def _existing_phrase_audio(phrase):
+    """A favorite's audio or the phrase's last clip, if it is exactly this phrase's audio."""
+    favorite_path = favorite_audio.path(audio_filename(
+        {'text': phrase.text, 'voice_id': phrase.voice_id, 'settings': phrase.settings}, TTS_MODEL_ID))
+    if os.path.exists(favorite_path):
+        return favorite_path
+    if phrase.clip_path and phrase.model_id == TTS_MODEL_ID and os.path.exists(phrase.clip_path):
+        return phrase.clip_path
+    return None
+
+
+def _render_warm_phrase(phrase, path):
+    return _render_to(path, phrase.text, phrase.voice_id, phrase.voice_name, phrase.settings)
+
+
+phrase_warmer = PhraseWarmer(os.path.join(FAVORITES_DIR, "warm"), _render_warm_phrase,
+                             model_id=TTS_MODEL_ID, find_audio=_existing_phrase_audio)
+phrase_ranking.add_listener(lambda: phrase_warmer.warm(phrase_ranking.candidates(PHRASE_WARM_COUNT)))
+
+
+def _presynthesized_audio(text, voice_id, settings):
+    """Warm or favorite audio rendered from exactly this text, voice and settings, or None."""
+    path = phrase_warmer.lookup(text, voice_id, settings)
+    if path is None:
+        path = favorite_audio.path(audio_filename(
+            {'text': text, 'voice_id': voice_id, 'settings': settings}, TTS_MODEL_ID))
+    return path if os.path.exists(path) else None
+
+
+def _load_phrase_ranking():
+    started = time.perf_counter()
+    phrase_ranking.load(clip_history.uses())
+    print(f"Ranked {len(phrase_ranking)} phrases in {time.perf_counter() - started:.1f}s")
+
+
+_favorites_by_text = (None, {})
+
+
+def _favorite_for(text):
+    """The newest favorite with this text (ignoring case and spacing), or None."""
+    global _favorites_by_text
+    version, by_text = _favorites_by_text
+    if version != favorites_cache.version:
+        by_text = {normalize(f['text']): f for f in reversed(favorites_cache.snapshot())}
+        _favorites_by_text = (favorites_cache.version, by_text)
+    return by_text.get(normalize(text))
+
+
+def get_quick_phrases(limit=QUICK_PHRASE_COUNT):
+    """
+    Phrases for the quick phrase bar, most likely first: the most used
+    phrases lately (for the current part of the stream), then the newest
+    favorites, then the built-in defaults. Favorites are returned as their
+    favorite dicts; other phrases as dicts with text, voice_id, voice_name
+    and settings (voice_id is None for the defaults).
+    """
+    phrases = []
+    seen = set()
+
+    def add(phrase):
+        key = normalize(phrase['text'])
+        if key not in seen and len(phrases) < limit:
+            seen.add(key)
+            phrases.append(phrase)
+
+    for ranked in phrase_ranking.top(limit):
+        add(_favorite_for(ranked.text) or {'text': ranked.text, 'voice_id': ranked.voice_id,
+                                           'voice_name': ranked.voice_name, 'settings': ranked.settings})
+    for favorite in favorites_cache.snapshot(limit):
+        add(favorite)
+    for text in DEFAULT_QUICK_PHRASES:
+        add({'text': text, 'voice_id': None, 'voice_name': None, 'settings': None})
+    return phrases
+
+
+def get_quick_phrase_audio(phrase):
+    """
+    Decoded audio for a quick phrase bar entry without calling the API, or
+    None if it is not warm yet. Favorites play their own audio.
+    """
+    if phrase.get('id') is not None:
+        return get_favorite_audio(phrase['id'])
+    audio = phrase_warmer.get(phrase['text'], phrase['voice_id'], phrase['settings'])
+    if audio is not None:
+        phrase_ranking.record(phrase['text'], phrase['voice_id'], phrase['voice_name'], phrase['settings'],
+                              model_id=TTS_MODEL_ID,
+                              clip_path=phrase_warmer.lookup(phrase['text'], phrase['voice_id'], phrase['settings']))
+    return audio
+
+
+def watch_quick_phrases(callback):
+    """Call callback() whenever the quick phrase bar may need redrawing (ranking or favorites changed)."""
+    phrase_ranking.add_listener(callback)
+    favorites_cache.add_listener(callback)
+
+
+# Favorites keep their own copy of their audio in tts_favorites/, outside retention's reach.
+# The clips warm phrases are copied from are kept so re-warming them needs no API call.
+retention_manager.add_pin_source(phrase_warmer.source_clips)
+
+
+def start_background_maintenance():
+    """Start background housekeeping threads (audio retention, segment packing, phrase search and ranking, favorite audio, legacy overlay import)."""
+    retention_manager.start()
+    threading.Thread(target=import_legacy_overlays, name="overlay-import", daemon=True).start()
+    threading.Thread(target=_load_phrase_index, name="phrase-index", daemon=True).start()
+    threading.Thread(target=_load_phrase_ranking, name="phrase-ranking", daemon=True).start()
+    threading.Thread(target=_prepare_favorite_audio, name="favorite-audio-sync", daemon=True).start()
+    if STT_ENGINE == "whisper":
+        whisper_worker.start()  # Load the model now, not on the first dictation
+
+
+def _prepare_favorite_audio():
+    """Re-render stale favorite audio, drop orphaned files and decode the quick phrase bar's favorites."""
+    queued, removed = favorite_audio.sync()
+    if queued or removed:
+        print(f"Favorite audio: {queued} to re-render, {removed} unused files removed")
+    favorite_audio.preload(favorites_cache.snapshot(4))
+    if clip_archive is not None:
+        clip_archive.start()
+    if clip_transcoder is not None:
+        clip_transcoder.start()
+
+
+def open_generated_clip(path):
+    """
+    Get something a decoder can load for a generated clip: the file path if the
+    clip is still a loose file, otherwise a file object over its archived bytes.
+    Returns None if the clip no longer exists.
+    """
+    if path and os.path.exists(path):
+        return path
+    if path and clip_transcoder is not None:
+        return clip_transcoder.playback_path(os.path.basename(path))
+    if path and clip_archive is not None:
+        return clip_archive.open(os.path.basename(path))
+    return None
+
+
+def search_clip_history(text=None, voice_id=None, since=None, until=None, limit=100, before_id=None):
+    """Search generated clips by text, voice and time range (newest first)."""
+    return clip_history.search(text=text, voice_id=voice_id, since=since, until=until,
+                               limit=limit, before_id=before_id)
+
+
+def get_storage_stats():
+    """Get storage statistics for generated audio."""
+    stats = retention_manager.stats()
+    if clip_archive is not None:
+        stats['archive'] = clip_archive.stats()
+    if clip_transcoder is not None:
+        stats['transcoding'] = clip_transcoder.stats()
+    if dedup_store is not None:
+        stats['dedup'] = dedup_store.stats()
+    return stats
+
+
+def iter_overlay_archives(since=None, until=None, before=None, search=None, newest_first=True):
+    """
+    Stream archived overlay entries (newest first by default).
+    since/until are Unix timestamps; search matches main or sub text, case-insensitive.
+    Entries load their text and display fields only when accessed.
+    """
+    needle = search.lower() if search else None
+    for entry in overlay_archive.entries(since=since, until=until, before=before, newest_first=newest_first):
+        if needle and needle not in entry.main_text.lower() and needle not in entry.sub_text.lower():
+            continue
+        yield entry
+
+
+def get_overlay_archive_list(limit=20, before=None, since=None, until=None, search=None):
+    """
+    Get one page of archived overlays, newest first.
+    Pass the last entry's seq as before= to get the next page.
+    """
     try:
-        files = []
-        for filename in os.listdir(SAVED_OVERLAYS_DIR):
-            if filename.startswith('overlay_') and filename.endswith('.html'):
-                timestamp = filename.replace('overlay_', '').replace('.html', '')
-                try:
-                    timestamp_int = int(timestamp)
-                    files.append({
-                        'filename': filename,
-                        'timestamp': timestamp_int,
-                        'path': os.path.join(SAVED_OVERLAYS_DIR, filename),
-                        'created': time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(timestamp_int))
-                    })
-                except ValueError:
-                    continue
-        
-        # Sort by timestamp (newest first)
-        files.sort(key=lambda x: x['timestamp'], reverse=True)
-        return files
+        return list(itertools.islice(
+            iter_overlay_archives(since=since, until=until, before=before, search=search), limit))
     except Exception as e:
         print(f"Error getting overlay archive list: {e}")
         return []
 
 
+def restore_overlay_archive(seq):
+    """Render an archived overlay state and make it the current overlay."""
+    try:
+        state = overlay_archive.state(seq)
+        html_content = overlay_archive.render(seq)
+    except (IndexError, KeyError, ValueError) as e:
+        print(f"Error restoring overlay #{seq}: {e}")
+        return False
+    if overlay_server is not None:
+        overlay_server.publish(main_text=state['main_text'], sub_text=state['sub_text'])
+    primary = overlay_outputs[0]
+    overlay_writer.submit(primary.path or OVERLAY_HTML_PATH, html_content)
+    overlay_writer.flush()
+    overlay_renderer.invalidate(primary.name)
+    print(f"Overlay #{seq} restored to {primary.path or OVERLAY_HTML_PATH}")
+    return True
+
+
+def get_overlay_stats():
+    """Render time and write/push counts of the overlay outputs."""
+    stats = overlay_renderer.stats()
+    stats['file_writes'] = overlay_writer.writes
+    stats['file_updates_submitted'] = overlay_writer.submitted
+    if overlay_server is not None:
+        stats['server'] = {
+            'clients': overlay_server.client_count(),
+            'events_published': overlay_server.events_published,
+            'events_delivered': overlay_server.events_delivered,
+        }
+    return stats
+
+
 # --- Speech Recognition Functions ---
 
+# One PortAudio instance for the whole app; device lists are cached until a
+# refresh (automatic on Linux when sound cards come and go)
+audio_devices = DeviceRegistry()
+if AUDIO_DEVICE_WATCH:
+    audio_devices.watch()
+
+
 def get_microphone_list():
     """Get list of available microphones."""
     try:
-        mics = []
-        for i in range(pyaudio.PyAudio().get_device_count()):
-            device_info = pyaudio.PyAudio().get_device_info_by_index(i)
-            if device_info['maxInputChannels'] > 0:
-                mics.append({
-                    'index': i,
-                    'name': device_info['name'],
-                    'channels': device_info['maxInputChannels']
-                })
-        return mics
+        return [device.as_dict() for device in audio_devices.inputs()]
     except Exception as e:
         print(f"Error getting microphone list: {e}")
         return []
 
 
+def get_speaker_list():
+    """Get list of available playback devices."""
+    try:
+        return [device.as_dict() for device in audio_devices.outputs()]
+    except Exception as e:
+        print(f"Error getting speaker list: {e}")
+        return []
+
+
+def refresh_audio_devices():
+    """Re-scan audio devices (after plugging in a headset); the open microphone is reopened."""
+    try:
+        audio_devices.refresh()
+    except Exception as e:
+        print(f"Error refreshing audio devices: {e}")
+    return get_microphone_list()
+
+
+def get_output_device_name(device_names):
+    """
+    The playback device among device_names matching AUDIO_OUTPUT_DEVICE (exact
+    name first, then part of the name, ignoring case), or None for the system
+    default. device_names are the player's own names: pygame plays through SDL,
+    whose device names differ from PortAudio's.
+    """
+    if not AUDIO_OUTPUT_DEVICE:
+        return None
+    if AUDIO_OUTPUT_DEVICE in device_names:
+        return AUDIO_OUTPUT_DEVICE
+    wanted = AUDIO_OUTPUT_DEVICE.lower()
+    for name in device_names:
+        if wanted in name.lower():
+            return name
+    print(f"Output device '{AUDIO_OUTPUT_DEVICE}' not found among {', '.join(device_names) or 'no devices'}; "
+          "using the default")
+    return None
+
+
+# The microphone stays open once used (see mic_capture): no per-dictation
+# device open or ambient-noise calibration, and speech just before the
+# button press is kept as pre-roll.
+MIC_CAPTURE_ON_START = os.getenv("MIC_CAPTURE_ON_START", "false").lower() == "true"
+mic_capture = MicCapture(registry=audio_devices)
+
+
+def _open_microphone(mic_index=None):
+    """The running capture, switched to mic_index if a different microphone is asked for."""
+    mic_capture.set_device(mic_index)
+    return mic_capture.start()
+
+
+def _listen(mic_index, timeout, max_duration, end_silence=None):
+    utterance = _open_microphone(mic_index).listen(timeout=timeout, max_duration=max_duration,
+                                                   end_silence=end_silence)
+    if utterance is None:
+        return None
+    return sr.AudioData(utterance.pcm_bytes(), MIC_SAMPLE_RATE, 2)
+
+
 def record_audio_from_microphone(duration=5, mic_index=None):
-    """Record audio from microphone for specified duration."""
+    """Record one utterance from the microphone, at most duration seconds long."""
     try:
-        r = sr.Recognizer()
-        
-        # Use specific microphone or default
-        if mic_index is not None:
-            mic = sr.Microphone(device_index=mic_index)
-        else:
-            mic = sr.Microphone()
-        
-        print(f"Recording for {duration} seconds...")
-        
-        with mic as source:
-            # Adjust for ambient noise
-            r.adjust_for_ambient_noise(source, duration=0.5)
-            print("🎤 Recording started...")
-            
-            # Record audio
-            audio = r.listen(source, timeout=duration, phrase_time_limit=duration)
-            
+        print(f"🎤 Recording (up to {duration} seconds)...")
+        audio = _listen(mic_index, timeout=duration, max_duration=duration)
+        if audio is None:
+            print("⏰ Recording timed out")
+            return None
         print("✅ Recording completed!")
         return audio
         
@@ -422,51 +979,102 @@ def record_audio_from_microphone(duration=5, mic_index=None):
         return None
 
 
-def record_until_silence(mic_index=None, silence_threshold=1.0):
-    """Record audio until silence is detected."""
+def record_until_silence(mic_index=None, silence_threshold=None, max_duration=30, timeout=10):
+    """Record audio until silence_threshold seconds of silence (default MIC_END_SILENCE_MS) after speech."""
     try:
-        r = sr.Recognizer()
-        
-        # Use specific microphone or default
-        if mic_index is not None:
-            mic = sr.Microphone(device_index=mic_index)
-        else:
-            mic = sr.Microphone()
-        
         print("🎤 Recording... (speak now, will stop automatically)")
-        
-        with mic as source:
-            # Adjust for ambient noise
-            r.adjust_for_ambient_noise(source, duration=0.5)
-            
-            # Record with automatic silence detection
-            audio = r.listen(source, timeout=10, phrase_time_limit=10)
-            
+        audio = _listen(mic_index, timeout=timeout, max_duration=max_duration, end_silence=silence_threshold)
+        if audio is None:
+            print("⏰ Recording timed out")
+            return None
         print("✅ Recording completed!")
         return audio
         
-    except sr.WaitTimeoutError:
-        print("⏰ Recording timed out")
-        return None
     except Exception as e:
         print(f"Error recording audio: {e}")
         return None
 
 
-def speech_to_text(audio_data, engine="google"):
+if MIC_CAPTURE_ON_START:
+    threading.Thread(target=lambda: _open_microphone(None), name="mic-open", daemon=True).start()
+
+
+# "google" (free, needs internet) or "whisper" (offline, model preloaded in a worker process)
+STT_ENGINE = os.getenv("STT_ENGINE", "google").lower()
+whisper_worker = WhisperWorker()
+
+
+def _local_whisper(audio_data):
+    """Transcribe with the preloaded worker; None if local Whisper is not available."""
+    try:
+        pcm = audio_data.get_raw_data(convert_rate=WHISPER_SAMPLE_RATE, convert_width=2)
+        result = whisper_worker.transcribe(pcm)
+    except RuntimeError as e:
+        print(f"❌ Local Whisper failed ({e}); falling back to Google")
+        return None
+    print(f"⚡ Whisper: {result['audio_seconds']:.1f}s of speech in {result['seconds']:.2f}s "
+          f"({result['rtf']:.2f}x real time)")
+    return result
+
+
+def streaming_dictation_available():
+    """Partial transcripts need the local recognizer; Google only returns whole results."""
+    return STT_ENGINE == "whisper" and not whisper_worker.error
+
+
+_dictation = None
+
+
+def dictate(on_update, mic_index=None):
+    """
+    Streaming dictation from the always-open microphone with the local
+    Whisper worker. on_update(committed, tentative, done) is called from
+    this thread as text arrives. Returns the final text.
+    """
+    global _dictation
+    session = StreamingDictation(_open_microphone(mic_index),
+                                 lambda samples: whisper_worker.transcribe(samples)['text'], on_update)
+    _dictation = session
+    try:
+        return session.run()
+    finally:
+        _dictation = None
+
+
+def stop_dictation():
+    """End the running dictation; what has been said so far is kept."""
+    session = _dictation
+    if session is not None:
+        session.stop()
+
+
+def get_speech_engine_stats():
+    """Load time and real-time factor of the local Whisper worker."""
+    return whisper_worker.stats()
+
+
+def speech_to_text(audio_data, engine=None):
     """Convert recorded audio to text using speech recognition."""
     if audio_data is None:
         return None
         
     try:
         r = sr.Recognizer()
+        engine = engine or STT_ENGINE
         
-        if engine == "google":
+        if engine == "whisper":
+            # Local Whisper, already loaded in the worker process (offline)
+            result = _local_whisper(audio_data)
+            if result is not None:
+                if not result['text']:
+                    print("❌ Could not understand audio")
+                    return None
+                print(f"🎯 Recognized text: '{result['text']}'")
+                return result['text']
+            text = r.recognize_google(audio_data)
+        elif engine == "google":
             # Use Google Speech Recognition (free, but requires internet)
             text = r.recognize_google(audio_data)
-        elif engine == "whisper":
-            # Use OpenAI Whisper (more accurate, works offline if installed)
-            text = r.recognize_whisper(audio_data)
         else:
             # Default to Google
             text = r.recognize_google(audio_data)
@@ -517,6 +1125,169 @@ def speech_to_cloned_voice(duration=5, voice_id=None, mic_index=None, filename=N
         return None, None
 
 
+def _recognize_phrase(samples):
+    """Text of one phrase of 16 kHz PCM: local Whisper when it is running, otherwise Google."""
+    if streaming_dictation_available():
+        return whisper_worker.transcribe(samples)['text']
+    return speech_to_text(sr.AudioData(samples.tobytes(), MIC_SAMPLE_RATE, 2), engine="google") or ""
+
+
+_live_clone = None
+
+
+def live_clone(play, voice_id=None, voice_name=None, settings=None, mic_index=None, on_phrase=None):
+    """
+    Live speech-to-cloned-voice: every phrase is recognized, synthesized and
+    played (play(path), blocking until done) while the next one is being
+    spoken, in the order spoken. Runs until stop_live_clone() or a few
+    seconds of silence. Returns the phrases (text, audio path, latency).
+    """
+    global _live_clone
+    settings = settings or {}
+    session_id = int(time.time())
+
+    def synthesize(text, seq):
+        return text_to_speech(text, voice_id or VOICE_ID, f"live_clone_{session_id}_{seq:03d}.mp3",
+                              voice_name=voice_name, **settings)
+
+    print("🎤 Live voice clone started (speak in phrases)...")
+    session = ClonePipeline(_open_microphone(mic_index), _recognize_phrase, synthesize, play, on_phrase)
+    _live_clone = session
+    try:
+        phrases = session.run()
+    finally:
+        _live_clone = None
+    latencies = session.latencies()
+    if latencies:
+        print(f"✅ Live voice clone: {len(latencies)} phrases, mouth to speaker "
+              f"{sum(latencies) / len(latencies):.2f}s average, {max(latencies):.2f}s worst")
+    return phrases
+
+
+def stop_live_clone():
+    """Stop listening; phrases already spoken still play."""
+    session = _live_clone
+    if session is not None:
+        session.stop()
+
+
+_voice_changer = None
+
+
+def voice_changer(voice_id=None, settings=None, mic_index=None, on_chunk=None):
+    """
+    Voice changer: speech is converted straight into the voice with
+    ElevenLabs speech-to-speech (no text in between, so your timing and
+    intonation are kept) and played on the output device while you talk.
+    Runs until stop_voice_changer() or a stretch of silence. Returns the
+    chunks (latency, skipped) of the session.
+    """
+    global _voice_changer
+    if not ELEVENLABS_API_KEY:
+        print("Error: ELEVENLABS_API_KEY not set.")
+        return []
+    # Reopened by name if the devices are re-scanned (hotplug) during the session
+    output = DeviceOutput(audio_devices, STS_OUTPUT_RATE, device_name=AUDIO_OUTPUT_DEVICE).open()
+
+    def convert(samples):
+        return convert_stream(ELEVENLABS_API_BASE, ELEVENLABS_API_KEY, voice_id or VOICE_ID, samples,
+                              voice_settings=settings)
+
+    print("🎛️ Voice changer started (speak normally)...")
+    session = VoiceChanger(_open_microphone(mic_index), convert, output.write, on_chunk)
+    _voice_changer = session
+    try:
+        chunks = session.run()
+    finally:
+        _voice_changer = None
+        output.close()
+    latencies = session.latencies()
+    if latencies:
+        skipped = sum(1 for chunk in chunks if chunk.skipped)
+        print(f"✅ Voice changer: {len(latencies)} chunks, mouth to speaker "
+              f"{sum(latencies) / len(latencies):.2f}s average, {max(latencies):.2f}s worst"
+              + (f", {skipped} skipped to keep up" if skipped else ""))
+    return chunks
+
+
+def stop_voice_changer():
+    """Stop listening; speech already captured still plays."""
+    session = _voice_changer
+    if session is not None:
+        session.stop()
+
+
+_multi_mic = None
+
+
+def get_mic_assignments():
+    """Co-host microphones from MULTI_MIC_DEVICES: [{'speaker', 'device', 'index'}] (index None if not plugged in)."""
+    assignments = []
+    for speaker, name in parse_mic_assignments(MULTI_MIC_DEVICES):
+        device = audio_devices.find(name)
+        assignments.append({'speaker': speaker, 'device': device.name if device else name,
+                            'index': device.index if device else None})
+    return assignments
+
+
+def _channel_recognizer(position):
+    """Each microphone gets its own recognizer: a Whisper worker process per mic, or Google."""
+    if STT_ENGINE == "whisper":
+        worker = whisper_worker if position == 0 else WhisperWorker()
+        return worker, lambda samples: worker.transcribe(samples)['text']
+    return None, lambda samples: speech_to_text(sr.AudioData(samples.tobytes(), MIC_SAMPLE_RATE, 2),
+                                                engine="google") or ""
+
+
+def start_multi_mic(on_entry, assignments=None, on_utterance=None):
+    """
+    Capture and transcribe several microphones at once (co-hosts). Each mic
+    has its own capture, voice activity detection and recognizer; on_entry(entry)
+    gets a merged transcript in speaking order, with entry.speaker and
+    entry.text (per-speaker captions). on_utterance(speaker, utterance) gets
+    each utterance's audio as it is cut (per-speaker voice conversion).
+    Returns the speakers being captured.
+    """
+    global _multi_mic
+    stop_multi_mic()
+    channels, workers = [], []
+    for assignment in assignments if assignments is not None else get_mic_assignments():
+        if assignment['index'] is None:
+            print(f"Microphone '{assignment['device']}' for {assignment['speaker']} not found; skipping")
+            continue
+        capture = MicCapture(device_index=assignment['index'], registry=audio_devices).start()
+        worker, recognize = _channel_recognizer(len(channels))
+        if worker is not None and worker is not whisper_worker:
+            workers.append(worker)
+        channels.append(MicChannel(assignment['speaker'], capture, recognize))
+    if not channels:
+        print("No co-host microphones available (set MULTI_MIC_DEVICES)")
+        return []
+    for worker in workers:
+        worker.start()  # Load every model now, not on each mic's first utterance
+    _multi_mic = (MultiMicTranscriber(channels, on_entry, on_utterance).start(), workers)
+    print(f"🎙️ Multi-mic transcript started: {', '.join(channel.speaker for channel in channels)}")
+    return [channel.speaker for channel in channels]
+
+
+def stop_multi_mic():
+    """Stop co-host capture; returns the transcript as dicts (seconds from the start)."""
+    global _multi_mic
+    session, _multi_mic = _multi_mic, None
+    if session is None:
+        return []
+    transcriber, workers = session
+    transcript = transcriber.stop()
+    for channel in transcriber.channels:
+        channel.capture.stop()
+    for worker in workers:
+        worker.stop()
+    for stats in transcriber.stats():
+        print(f"   {stats['speaker']}: {stats['utterances']} utterances, {stats['audio_seconds']}s of speech, "
+              f"{stats['recognize_seconds']}s recognizing")
+    return [entry.as_dict(transcriber.started_at) for entry in transcript]
+
+
 # --- Example Usage (How you'd integrate this in your app's main loop/GUI actions) ---
 if __name__ == "__main__":
     print("--- VoiceMaster App Logic Example ---")
@@ -560,5 +1331,6 @@ if __name__ == "__main__":
             main_text=f"VOICEMASTER PRO: {selected_voice_name}",
             sub_text="Custom AI Voice Active"
         )
+        overlay_writer.flush()
     else:
         print("\nSkipping TTS and overlay generation due to missing API key or voice ID.")
\ No newline at end of file
@@ -0,0 +1,201 @@
+"""
+Content-hash deduplication for generated audio.
+
+Clips are hashed while they are written. The first copy of any content
+becomes a blob under generated_audio/.blobs/; every clip with the same
+bytes is a hard link to that blob. A reference count per blob (persisted
+in an append-only log) makes sure a blob is deleted only when its last
+clip goes away. On filesystems without hard links clips are written
+normally and simply not deduplicated.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+BLOBS_DIRNAME = ".blobs"
+REFS_FILENAME = "refs.jsonl"
+
+DEDUP_ENABLED = os.getenv("AUDIO_DEDUP", "true").lower() == "true"
+
+
+class DedupStore:
+    """Hard-link based blob store with reference counting."""
+
+    def __init__(self, audio_dir):
+        self.audio_dir = audio_dir
+        self.blobs_dir = os.path.join(audio_dir, BLOBS_DIRNAME)
+        self.refs_path = os.path.join(self.blobs_dir, REFS_FILENAME)
+        os.makedirs(self.blobs_dir, exist_ok=True)
+
+        self._name_to_hash = {}
+        self._refs = {}       # hash -> set of clip names
+        self._blob_sizes = {}  # hash -> bytes
+        self._log_lines = 0
+        self._lock = threading.RLock()
+        self.duplicates_written = 0
+        self._load()
+
+    # --- Reference log ---
+
+    def _load(self):
+        if not os.path.exists(self.refs_path):
+            return
+        try:
+            with open(self.refs_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    self._log_lines += 1
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    if record.get('op') == 'ref':
+                        self._add_ref(record['name'], record['hash'], record.get('size', 0))
+                    elif record.get('op') == 'unref':
+                        self._drop_ref(record['name'])
+        except Exception as e:
+            print(f"Error loading dedup references: {e}")
+
+    def _add_ref(self, name, digest, size):
+        self._drop_ref(name)
+        self._name_to_hash[name] = digest
+        self._refs.setdefault(digest, set()).add(name)
+        self._blob_sizes[digest] = size
+
+    def _drop_ref(self, name):
+        """Forget a clip's reference. Returns the blob hash if it is now unreferenced."""
+        digest = self._name_to_hash.pop(name, None)
+        if digest is None:
+            return None
+        names = self._refs.get(digest)
+        if names is not None:
+            names.discard(name)
+            if not names:
+                del self._refs[digest]
+                self._blob_sizes.pop(digest, None)
+                return digest
+        return None
+
+    def _append_log(self, record):
+        try:
+            with open(self.refs_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record) + "\n")
+            self._log_lines += 1
+        except IOError as e:
+            print(f"Error updating dedup references: {e}")
+        if self._log_lines > 2 * len(self._name_to_hash) + 1000:
+            self._rewrite_log()
+
+    def _rewrite_log(self):
+        tmp_path = self.refs_path + ".tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for name, digest in self._name_to_hash.items():
+                    f.write(json.dumps({'op': 'ref', 'name': name, 'hash': digest,
+                                        'size': self._blob_sizes.get(digest, 0)}) + "\n")
+            os.replace(tmp_path, self.refs_path)
+            self._log_lines = len(self._name_to_hash)
+        except IOError as e:
+            print(f"Error compacting dedup references: {e}")
+
+    def blob_path(self, digest):
+        return os.path.join(self.blobs_dir, digest[:2], digest)
+
+    # --- Writing ---
+
+    def write_clip(self, output_path, chunks):
+        """
+        Write a clip from an iterable of byte chunks, hashing as it streams.
+        Identical content already on disk is hard-linked instead of stored again.
+        Returns (size_in_bytes, was_duplicate).
+        """
+        name = os.path.basename(output_path)
+        hasher = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.blobs_dir, suffix=".part")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    if chunk:
+                        hasher.update(chunk)
+                        f.write(chunk)
+                        size += len(chunk)
+            digest = hasher.hexdigest()
+            blob = self.blob_path(digest)
+
+            with self._lock:
+                duplicate = digest in self._refs and os.path.exists(blob)
+                if not duplicate:
+                    os.makedirs(os.path.dirname(blob), exist_ok=True)
+                    os.replace(tmp_path, blob)
+                if os.path.exists(output_path):
+                    self.remove(name)
+                try:
+                    os.link(blob, output_path)
+                except OSError:
+                    # No hard links here (e.g. FAT32 / exFAT): keep a plain copy
+                    if duplicate:
+                        os.replace(tmp_path, output_path)
+                    else:
+                        os.replace(blob, output_path)
+                    return size, False
+                self._add_ref(name, digest, size)
+                self._append_log({'op': 'ref', 'name': name, 'hash': digest, 'size': size})
+                if duplicate:
+                    self.duplicates_written += 1
+                return size, duplicate
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    # --- Releasing ---
+
+    def release(self, name):
+        """
+        Drop a clip's reference after its link was removed or moved elsewhere.
+        Deletes the blob once nothing references it.
+        """
+        with self._lock:
+            if name not in self._name_to_hash:
+                return
+            orphan = self._drop_ref(name)
+            self._append_log({'op': 'unref', 'name': name})
+        if orphan is not None:
+            try:
+                os.remove(self.blob_path(orphan))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"Could not remove unreferenced blob {orphan}: {e}")
+
+    def remove(self, name):
+        """Delete a clip's link and release its blob reference."""
+        path = os.path.join(self.audio_dir, name)
+        try:
+            os.remove(path)
+        finally:
+            self.release(name)
+
+    def is_tracked(self, name):
+        return name in self._name_to_hash
+
+    def shared_names(self):
+        """Clips whose content is shared with at least one other clip."""
+        with self._lock:
+            return {name for names in self._refs.values() if len(names) > 1 for name in names}
+
+    def stats(self):
+        """Deduplication savings: logical bytes referenced vs physical blob bytes."""
+        with self._lock:
+            logical = sum(self._blob_sizes[d] * len(n) for d, n in self._refs.items())
+            physical = sum(self._blob_sizes.values())
+            return {
+                'clips': len(self._name_to_hash),
+                'blobs': len(self._refs),
+                'logical_bytes': logical,
+                'physical_bytes': physical,
+                'bytes_saved': logical - physical,
+                'duplicates_written': self.duplicates_written,
+            }
@@ -0,0 +1,309 @@
+"""
+One shared PortAudio instance and a cached list of audio devices.
+
+Creating a PyAudio object initializes PortAudio, which re-scans every host
+API and device; listing microphones used to do that twice per device and
+never terminated the instances. The registry owns a single instance,
+caches each device's name, channels, default rate and latencies, and is
+used for both capture (mic_capture) and picking the playback device.
+
+PortAudio only sees new devices when it is initialized again, so refresh()
+terminates and re-creates the instance. Streams opened through the registry
+are closed first and reopened afterwards by their owners (see add_listener
+and DeviceOutput), matching devices by name because indexes can change. On Linux, devices
+appearing in /dev/snd trigger a refresh automatically; elsewhere refresh()
+is called on demand.
+"""
+
+import os
+import sys
+import threading
+
+from file_watch import FileWatcher
+
+AUDIO_DEVICE_WATCH = os.getenv("AUDIO_DEVICE_WATCH", "true").lower() == "true"
+AUDIO_OUTPUT_DEVICE = os.getenv("AUDIO_OUTPUT_DEVICE", "")
+SOUND_DEVICE_DIR = "/dev/snd"
+MAX_SOUND_CARDS = 16
+
+
+class AudioDevice:
+    """Cached metadata for one PortAudio device."""
+
+    __slots__ = ('index', 'name', 'host_api', 'max_input_channels', 'max_output_channels',
+                 'default_sample_rate', 'input_latency', 'output_latency')
+
+    def __init__(self, info):
+        self.index = info['index']
+        self.name = info['name']
+        self.host_api = info.get('hostApi', 0)
+        self.max_input_channels = info.get('maxInputChannels', 0)
+        self.max_output_channels = info.get('maxOutputChannels', 0)
+        self.default_sample_rate = info.get('defaultSampleRate', 0.0)
+        self.input_latency = info.get('defaultLowInputLatency', 0.0)
+        self.output_latency = info.get('defaultLowOutputLatency', 0.0)
+
+    @property
+    def is_input(self):
+        return self.max_input_channels > 0
+
+    @property
+    def is_output(self):
+        return self.max_output_channels > 0
+
+    def as_dict(self):
+        return {
+            'index': self.index,
+            'name': self.name,
+            'channels': self.max_input_channels if self.is_input else self.max_output_channels,
+            'input_channels': self.max_input_channels,
+            'output_channels': self.max_output_channels,
+            'default_sample_rate': self.default_sample_rate,
+            'input_latency': self.input_latency,
+            'output_latency': self.output_latency,
+        }
+
+
+class DeviceOutput:
+    """
+    A blocking output stream (write PCM to play it) that follows its device
+    across refresh(): it is released with the old PortAudio instance and
+    reopened on the device with the same name, or the default output if
+    that device is gone. Audio written while it is being reopened is dropped.
+    """
+
+    def __init__(self, registry, rate, channels=1, frames_per_buffer=1024, device_name=None):
+        self.registry = registry
+        self.rate = rate
+        self.channels = channels
+        self.frames_per_buffer = frames_per_buffer
+        self.device_name = device_name or None
+        self._stream = None
+        self._open = False
+        self._lock = threading.Lock()
+
+    def open(self):
+        with self._lock:
+            if not self._open:
+                self._open = True
+                self.registry.add_listener(self._release, self._restore)
+                self._open_stream()
+        return self
+
+    def _open_stream(self):
+        device = self.registry.find(self.device_name, kind="output") if self.device_name else None
+        if self.device_name and device is None:
+            print(f"Output device '{self.device_name}' not found; using the default output")
+        self._stream = self.registry.open_output(self.rate, self.channels, self.frames_per_buffer,
+                                                 device.index if device else None)
+
+    def write(self, data):
+        with self._lock:
+            if self._stream is not None:
+                self._stream.write(data)
+
+    def _release(self):
+        with self._lock:
+            stream, self._stream = self._stream, None
+            if stream is not None:
+                self.registry.close(stream)
+
+    def _restore(self):
+        with self._lock:
+            if self._open and self._stream is None:
+                self._open_stream()
+
+    def close(self):
+        with self._lock:
+            if not self._open:
+                return
+            self._open = False
+        self.registry.remove_listener(self._release, self._restore)
+        self._release()
+
+
+class DeviceRegistry:
+    """Owns the PortAudio instance; device lists are scanned once and cached until refresh()."""
+
+    def __init__(self, backend=None):
+        """
+        Args:
+            backend: A module with PyAudio and paInt16 (default: pyaudio, imported on first use)
+        """
+        self._backend = backend
+        self._audio = None
+        self._devices = None
+        self._default_input = None
+        self._default_output = None
+        self._streams = set()
+        self._listeners = []
+        self._lock = threading.RLock()
+        self._refreshing = threading.Lock()   # One refresh at a time; never held by stream owners
+        self._watcher = None
+        self.scans = 0
+
+    # --- Device lists ---
+
+    def devices(self):
+        with self._lock:
+            if self._devices is None:
+                self._scan()
+            return self._devices
+
+    def inputs(self):
+        return [d for d in self.devices() if d.is_input]
+
+    def outputs(self):
+        return [d for d in self.devices() if d.is_output]
+
+    def default_input(self):
+        self.devices()
+        return self._default_input
+
+    def default_output(self):
+        self.devices()
+        return self._default_output
+
+    def get(self, index):
+        for device in self.devices():
+            if device.index == index:
+                return device
+        return None
+
+    def find(self, name, kind="input"):
+        """The device called name (exact, then case-insensitive substring match), or None."""
+        if not name:
+            return None
+        candidates = self.inputs() if kind == "input" else self.outputs()
+        for device in candidates:
+            if device.name == name:
+                return device
+        lowered = name.lower()
+        for device in candidates:
+            if lowered in device.name.lower():
+                return device
+        return None
+
+    def _instance(self):
+        if self._backend is None:
+            import pyaudio
+            self._backend = pyaudio
+        if self._audio is None:
+            self._audio = self._backend.PyAudio()
+        return self._audio
+
+    def _scan(self):
+        audio = self._instance()
+        devices = []
+        for i in range(audio.get_device_count()):
+            try:
+                info = dict(audio.get_device_info_by_index(i))
+            except Exception as e:
+                print(f"Skipping audio device {i}: {e}")
+                continue
+            info['index'] = i
+            devices.append(AudioDevice(info))
+        self._devices = tuple(devices)
+        self._default_input = self._default_device(audio.get_default_input_device_info)
+        self._default_output = self._default_device(audio.get_default_output_device_info)
+        self.scans += 1
+
+    def _default_device(self, lookup):
+        try:
+            return self.get(lookup()['index'])
+        except (IOError, OSError, KeyError):
+            return None  # No default device of this kind
+
+    # --- Streams ---
+
+    def open_input(self, callback, rate, channels=1, frames_per_buffer=1024, device_index=None):
+        """Open and start a 16-bit callback input stream on the shared instance."""
+        with self._lock:
+            audio = self._instance()
+            stream = audio.open(format=self._backend.paInt16, channels=channels, rate=rate, input=True,
+                                input_device_index=device_index, frames_per_buffer=frames_per_buffer,
+                                stream_callback=callback)
+            self._streams.add(stream)
+        stream.start_stream()
+        return stream
+
+    def open_output(self, rate, channels=1, frames_per_buffer=1024, device_index=None):
+        """Open a 16-bit blocking output stream (play with stream.write) on the shared instance."""
+        with self._lock:
+            audio = self._instance()
+            stream = audio.open(format=self._backend.paInt16, channels=channels, rate=rate, output=True,
+                                output_device_index=device_index, frames_per_buffer=frames_per_buffer)
+            self._streams.add(stream)
+        return stream
+
+    def close(self, stream):
+        with self._lock:
+            if stream not in self._streams:
+                return  # Already closed (by a refresh, for an owner that reopens it)
+            self._streams.discard(stream)
+        try:
+            stream.stop_stream()
+            stream.close()
+        except Exception as e:
+            print(f"Error closing audio stream: {e}")
+
+    # --- Refresh ---
+
+    def add_listener(self, release, restore):
+        """
+        release() must close the owner's streams before PortAudio is re-created;
+        restore() reopens them afterwards (both are called from refresh(), without
+        the registry lock held, so they may take their own locks and call back in).
+        """
+        with self._lock:
+            self._listeners.append((release, restore))
+
+    def remove_listener(self, release, restore):
+        with self._lock:
+            if (release, restore) in self._listeners:
+                self._listeners.remove((release, restore))
+
+    def refresh(self):
+        """Re-scan devices. Open streams are released and restored by their owners."""
+        # Owners hold their own lock while opening streams through the registry, so their
+        # callbacks must run without the registry lock or the two lock orders deadlock
+        with self._refreshing:
+            with self._lock:
+                listeners = list(self._listeners)
+            for release, _ in listeners:
+                self._call(release)
+            with self._lock:
+                for stream in list(self._streams):
+                    self.close(stream)  # No listener, or opened again since release()
+                if self._audio is not None:
+                    self._audio.terminate()
+                    self._audio = None
+                self._scan()
+                devices = self._devices
+            for _, restore in listeners:
+                self._call(restore)
+        return devices
+
+    def _call(self, callback):
+        try:
+            callback()
+        except Exception as e:
+            print(f"Audio device listener failed: {e}")
+
+    def watch(self):
+        """Refresh when sound cards come and go (Linux; other platforms refresh on demand)."""
+        if self._watcher is None and sys.platform.startswith('linux') and os.path.isdir(SOUND_DEVICE_DIR):
+            paths = [os.path.join(SOUND_DEVICE_DIR, f"controlC{n}") for n in range(MAX_SOUND_CARDS)]
+            self._watcher = FileWatcher(paths, self.refresh).start()
+        return self
+
+    def terminate(self):
+        with self._lock:
+            if self._watcher is not None:
+                self._watcher.stop()
+                self._watcher = None
+            for stream in list(self._streams):
+                self.close(stream)
+            if self._audio is not None:
+                self._audio.terminate()
+                self._audio = None
@@ -0,0 +1,350 @@
+"""
+Bounded retention for the generated_audio directory.
+
+Every generated clip is registered in a small append-only index as it is
+written, so sweeps never have to stat the whole directory. A background
+thread periodically evicts the oldest unpinned clips until the size, age
+and count caps are satisfied, a limited batch at a time.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from background_io import live_activity, lower_thread_priority
+
+INDEX_FILENAME = ".retention_index.jsonl"
+
+# Caps (0 disables a cap; all are off unless configured, so nothing is deleted by default)
+DEFAULT_MAX_MB = float(os.getenv("AUDIO_RETENTION_MAX_MB", "0"))
+DEFAULT_MAX_AGE_DAYS = float(os.getenv("AUDIO_RETENTION_MAX_AGE_DAYS", "0"))
+DEFAULT_MAX_FILES = int(os.getenv("AUDIO_RETENTION_MAX_FILES", "0"))
+DEFAULT_SWEEP_INTERVAL = float(os.getenv("AUDIO_RETENTION_SWEEP_SECONDS", "300"))
+DEFAULT_SWEEP_BATCH = 200
+
+AUDIO_EXTENSIONS = ('.mp3', '.wav', '.ogg', '.opus')
+
+
+class RetentionManager:
+    """Tracks generated clips and evicts the oldest ones beyond the configured caps."""
+
+    def __init__(self, audio_dir, max_bytes=None, max_age_seconds=None, max_files=None,
+                 sweep_interval=DEFAULT_SWEEP_INTERVAL, sweep_batch=DEFAULT_SWEEP_BATCH,
+                 remover=None):
+        self.audio_dir = audio_dir
+        # Called with a clip filename to delete it; defaults to removing the file
+        self.remover = remover or self._remove_file
+        self.index_path = os.path.join(audio_dir, INDEX_FILENAME)
+        self.max_bytes = int(DEFAULT_MAX_MB * 1024 * 1024) if max_bytes is None else max_bytes
+        self.max_age_seconds = DEFAULT_MAX_AGE_DAYS * 86400 if max_age_seconds is None else max_age_seconds
+        self.max_files = DEFAULT_MAX_FILES if max_files is None else max_files
+        self.sweep_interval = sweep_interval
+        self.sweep_batch = sweep_batch
+
+        # filename -> (size_bytes, created_timestamp), oldest first
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        # Deduplicated clips are hard links to one blob: bytes are counted once per inode
+        self._blob_keys = {}    # filename -> inode (or the filename if unknown)
+        self._blob_links = {}   # inode -> number of tracked clips linking to it
+        self._pinned = set()
+        self._pin_sources = []
+        self._loaded = False
+        self._log_lines = 0
+        self._lock = threading.RLock()
+
+        self._thread = None
+        self._stop_event = threading.Event()
+
+        self.evicted_files = 0
+        self.evicted_bytes = 0
+        self.last_sweep = None
+
+    # --- Index maintenance ---
+
+    def _ensure_loaded(self):
+        """Load the index on first use, bootstrapping it from one directory scan if missing."""
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            if os.path.exists(self.index_path):
+                self._load_index()
+            else:
+                self._bootstrap_index()
+            self._loaded = True
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    self._log_lines += 1
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # Torn final line after a crash
+                    name = record.get('name')
+                    if record.get('op') == 'add':
+                        self._add_entry(name, record.get('size', 0), record.get('ts', 0), record.get('ino'))
+                    elif record.get('op') == 'del':
+                        self._remove_entry(name)
+        except Exception as e:
+            print(f"Error loading retention index: {e}")
+
+    def _bootstrap_index(self):
+        """One-time scan of an existing directory, ordered by modification time."""
+        found = []
+        try:
+            with os.scandir(self.audio_dir) as it:
+                for entry in it:
+                    if entry.is_file() and entry.name.lower().endswith(AUDIO_EXTENSIONS):
+                        st = entry.stat()
+                        found.append((st.st_mtime, entry.name, st.st_size, st.st_ino))
+        except OSError as e:
+            print(f"Error scanning {self.audio_dir} for retention index: {e}")
+        found.sort()
+        for mtime, name, size, ino in found:
+            self._add_entry(name, size, mtime, ino)
+        self._rewrite_index()
+        if found:
+            print(f"Retention index built for {len(found)} existing clips")
+
+    def _add_entry(self, name, size, ts, ino=None):
+        self._remove_entry(name)
+        self._entries[name] = (size, ts)
+        key = self._blob_keys[name] = ino or name
+        self._blob_links[key] = self._blob_links.get(key, 0) + 1
+        if self._blob_links[key] == 1:
+            self._total_bytes += size
+        # Keep the dict in created order: a clip re-added under a new name (e.g. transcoded to
+        # .opus) keeps its age, and sweeps stop at the first clip young enough to keep
+        newer = []
+        for other in reversed(self._entries):
+            if other != name:
+                if self._entries[other][1] <= ts:
+                    break
+                newer.append(other)
+        for other in reversed(newer):
+            self._entries.move_to_end(other)
+
+    def _remove_entry(self, name):
+        """Forget a clip. Returns the bytes this frees (0 while other links remain), or None if untracked."""
+        entry = self._entries.pop(name, None)
+        if entry is None:
+            return None
+        key = self._blob_keys.pop(name)
+        self._blob_links[key] -= 1
+        if self._blob_links[key]:
+            return 0
+        del self._blob_links[key]
+        self._total_bytes -= entry[0]
+        return entry[0]
+
+    def _entry_record(self, name):
+        size, ts = self._entries[name]
+        record = {'op': 'add', 'name': name, 'size': size, 'ts': ts}
+        if self._blob_keys[name] != name:
+            record['ino'] = self._blob_keys[name]
+        return record
+
+    def _append_log(self, records):
+        try:
+            with open(self.index_path, 'a', encoding='utf-8') as f:
+                for record in records:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._log_lines += len(records)
+        except IOError as e:
+            print(f"Error updating retention index: {e}")
+        # Compact once the log is mostly superseded records
+        if self._log_lines > 2 * len(self._entries) + 1000:
+            self._rewrite_index()
+
+    def _rewrite_index(self):
+        """Atomically replace the log with one 'add' record per live clip."""
+        tmp_path = self.index_path + ".tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for name in self._entries:
+                    f.write(json.dumps(self._entry_record(name), ensure_ascii=False) + "\n")
+            os.replace(tmp_path, self.index_path)
+            self._log_lines = len(self._entries)
+        except IOError as e:
+            print(f"Error compacting retention index: {e}")
+
+    # --- Public API ---
+
+    def track(self, path, size=None, created=None):
+        """Register a newly written clip. Call right after the file is closed."""
+        self._ensure_loaded()
+        name = os.path.basename(path)
+        try:
+            st = os.stat(os.path.join(self.audio_dir, name))
+        except OSError:
+            if size is None:
+                return
+            ino = None
+        else:
+            size = st.st_size if size is None else size
+            ino = st.st_ino
+        created = time.time() if created is None else created
+        with self._lock:
+            self._add_entry(name, size, created, ino)
+            self._append_log([self._entry_record(name)])
+
+    def untrack(self, path):
+        """Forget a clip that was moved or deleted by someone else."""
+        self._ensure_loaded()
+        name = os.path.basename(path)
+        with self._lock:
+            if self._remove_entry(name) is not None:
+                self._append_log([{'op': 'del', 'name': name}])
+
+    def pin(self, path):
+        """Protect a clip from eviction (e.g. it belongs to a favorite)."""
+        with self._lock:
+            self._pinned.add(os.path.basename(path))
+
+    def unpin(self, path):
+        with self._lock:
+            self._pinned.discard(os.path.basename(path))
+
+    def add_pin_source(self, source):
+        """
+        Register a callable returning filenames that must never be evicted.
+        Sources are consulted once per sweep.
+        """
+        self._pin_sources.append(source)
+
+    def pinned_names(self):
+        """Filenames currently protected by pins or pin sources."""
+        return self._collect_pins()
+
+    def snapshot(self):
+        """List of (filename, size, created) for every tracked clip, oldest first."""
+        self._ensure_loaded()
+        with self._lock:
+            return [(name, size, ts) for name, (size, ts) in self._entries.items()]
+
+    def _remove_file(self, name):
+        os.remove(os.path.join(self.audio_dir, name))
+
+    def _collect_pins(self):
+        pinned = set(self._pinned)
+        for source in self._pin_sources:
+            try:
+                pinned.update(os.path.basename(p) for p in source() if p)
+            except Exception as e:
+                print(f"Error collecting pinned clips: {e}")
+        return pinned
+
+    def _over_caps(self, now, oldest_ts, count, total_bytes):
+        if self.max_files and count > self.max_files:
+            return True
+        if self.max_bytes and total_bytes > self.max_bytes:
+            return True
+        if self.max_age_seconds and now - oldest_ts > self.max_age_seconds:
+            return True
+        return False
+
+    def sweep_once(self, max_deletions=None):
+        """
+        Evict the oldest unpinned clips until all caps hold or the batch limit is hit.
+        Returns the number of clips evicted in this pass.
+        """
+        self._ensure_loaded()
+        max_deletions = self.sweep_batch if max_deletions is None else max_deletions
+        pinned = self._collect_pins()
+        now = time.time()
+
+        with self._lock:
+            # Caps apply to evictable clips only; pinned clips are kept unconditionally
+            pinned_blobs = {self._blob_keys[name]: self._entries[name][0]
+                            for name in pinned if name in self._entries}
+            count = len(self._entries) - len(pinned.intersection(self._entries))
+            total_bytes = self._total_bytes - sum(pinned_blobs.values())
+            links = dict(self._blob_links)
+            victims = []
+            for name, (size, ts) in self._entries.items():
+                if len(victims) >= max_deletions:
+                    break
+                if name in pinned:
+                    continue
+                if not self._over_caps(now, ts, count, total_bytes):
+                    break
+                victims.append(name)
+                count -= 1
+                # A deduplicated blob is freed with its last link (never while a pinned clip uses it)
+                key = self._blob_keys[name]
+                links[key] -= 1
+                if not links[key] and key not in pinned_blobs:
+                    total_bytes -= size
+
+        removed = []
+        for name in victims:
+            try:
+                self.remover(name)
+            except FileNotFoundError:
+                pass  # Already gone, just drop it from the index
+            except OSError as e:
+                print(f"Could not evict {name}: {e}")
+                continue
+            removed.append(name)
+
+        if removed:
+            with self._lock:
+                for name in removed:
+                    freed = self._remove_entry(name)
+                    if freed is not None:
+                        self.evicted_files += 1
+                        self.evicted_bytes += freed
+                self._append_log([{'op': 'del', 'name': name} for name in removed])
+            print(f"Retention sweep evicted {len(removed)} clips")
+
+        self.last_sweep = now
+        return len(removed)
+
+    def stats(self):
+        """Current storage statistics for the audio directory."""
+        self._ensure_loaded()
+        pinned = self._collect_pins()  # Pin sources are called outside the lock
+        with self._lock:
+            return {
+                'files': len(self._entries),
+                'bytes': self._total_bytes,
+                'pinned': len(pinned.intersection(self._entries)),
+                'evicted_files': self.evicted_files,
+                'evicted_bytes': self.evicted_bytes,
+                'last_sweep': self.last_sweep,
+            }
+
+    # --- Background sweeping ---
+
+    def start(self):
+        """Start incremental background sweeps at idle priority."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._sweep_loop, name="retention-sweeper", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _sweep_loop(self):
+        lower_thread_priority()
+        while not self._stop_event.is_set():
+            live_activity.wait_idle()
+            try:
+                evicted = self.sweep_once()
+            except Exception as e:
+                print(f"Error during retention sweep: {e}")
+                evicted = 0
+            # A full batch means more work is pending; pause briefly instead of a full interval
+            wait = 1.0 if evicted >= self.sweep_batch else self.sweep_interval
+            self._stop_event.wait(wait)
@@ -0,0 +1,119 @@
+"""
+Helpers shared by VoiceMaster's background maintenance threads
+(retention sweeps, compaction, transcoding): idle priority and a gate
+that lets them yield to live generation.
+"""
+
+import ctypes
+import os
+import sys
+import threading
+import time
+
+# Linux ioprio_set syscall numbers per architecture
+_IOPRIO_SET_SYSCALLS = {
+    "x86_64": 251,
+    "i386": 289,
+    "i686": 289,
+    "aarch64": 30,
+    "armv7l": 314,
+}
+_IOPRIO_WHO_PROCESS = 1
+_IOPRIO_CLASS_IDLE = 3
+_IOPRIO_CLASS_SHIFT = 13
+
+_WINDOWS_THREAD_MODE_BACKGROUND_BEGIN = 0x00010000
+
+
+def lower_thread_priority():
+    """
+    Drop the calling thread to idle CPU and I/O priority where the OS allows it.
+    Returns True if at least one priority was lowered.
+    """
+    lowered = False
+
+    if os.name == 'nt':
+        try:
+            kernel32 = ctypes.windll.kernel32
+            # Background mode lowers both CPU and I/O priority for this thread only
+            lowered = bool(kernel32.SetThreadPriority(kernel32.GetCurrentThread(),
+                                                      _WINDOWS_THREAD_MODE_BACKGROUND_BEGIN))
+        except Exception as e:
+            print(f"Could not lower background thread priority: {e}")
+        return lowered
+
+    # On Linux the nice value and I/O class are per thread, keyed by native thread id
+    thread_id = threading.get_native_id() if sys.platform.startswith('linux') else 0
+    try:
+        os.setpriority(os.PRIO_PROCESS, thread_id, 19)
+        lowered = True
+    except (AttributeError, OSError):
+        pass
+
+    if sys.platform.startswith('linux'):
+        syscall_nr = _IOPRIO_SET_SYSCALLS.get(os.uname().machine)
+        if syscall_nr is not None:
+            try:
+                libc = ctypes.CDLL(None, use_errno=True)
+                ioprio = _IOPRIO_CLASS_IDLE << _IOPRIO_CLASS_SHIFT
+                if libc.syscall(syscall_nr, _IOPRIO_WHO_PROCESS, thread_id, ioprio) == 0:
+                    lowered = True
+            except Exception:
+                pass
+
+    return lowered
+
+
+class LiveActivityGate:
+    """
+    Tracks live work (TTS generation) so background jobs can stay out of its way.
+
+    The live path wraps its work in ``with live_activity:``; background workers
+    call ``wait_idle()`` before each unit of work and ``is_busy()`` between steps.
+    """
+
+    def __init__(self, settle_seconds=2.0):
+        self.settle_seconds = settle_seconds
+        self._active = 0
+        self._last_activity = float('-inf')
+        self._condition = threading.Condition()
+
+    def __enter__(self):
+        with self._condition:
+            self._active += 1
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        with self._condition:
+            self._active -= 1
+            self._last_activity = time.monotonic()
+            self._condition.notify_all()
+        return False
+
+    def is_busy(self):
+        """True while live work runs or finished less than settle_seconds ago."""
+        with self._condition:
+            return self._active > 0 or time.monotonic() - self._last_activity < self.settle_seconds
+
+    def wait_idle(self, timeout=None):
+        """Block until no live work has run for settle_seconds. Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while True:
+                if self._active == 0:
+                    quiet_for = time.monotonic() - self._last_activity
+                    if quiet_for >= self.settle_seconds:
+                        return True
+                    wait = self.settle_seconds - quiet_for
+                else:
+                    wait = None
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    wait = remaining if wait is None else min(wait, remaining)
+                self._condition.wait(wait)
+
+
+# Shared by the generation path and every background worker
+live_activity = LiveActivityGate()
@@ -0,0 +1,191 @@
+"""
+Word-timed karaoke captions.
+
+ElevenLabs' with-timestamps endpoint returns a start/end time for every
+character. Those are grouped into words, and a small player thread follows
+the playback clock and pushes the index of the word being spoken to the
+overlay exactly when it starts. The thread sleeps until just before each
+word boundary and then spins on the clock for the last couple of
+milliseconds, because OS sleep granularity (about 15 ms on Windows) alone
+would already use up a 60 fps frame.
+"""
+
+import bisect
+import os
+import threading
+import time
+
+CAPTIONS_ENABLED = os.getenv("OVERLAY_CAPTIONS", "false").lower() == "true"
+CAPTION_HOLD_SECONDS = float(os.getenv("OVERLAY_CAPTION_HOLD_SECONDS", "1.5"))
+SPIN_SECONDS = 0.003
+FRAME_BUDGET_MS = 1000.0 / 60
+
+
+def words_from_alignment(alignment):
+    """Group character timings into [(word, start_seconds, end_seconds), ...]."""
+    words = []
+    chars = alignment.get('characters') or []
+    starts = alignment.get('character_start_times_seconds') or []
+    ends = alignment.get('character_end_times_seconds') or []
+    current, start, end = [], None, None
+    for char, char_start, char_end in zip(chars, starts, ends):
+        if char.isspace():
+            if current:
+                words.append((''.join(current), start, end))
+            current, start = [], None
+            continue
+        if start is None:
+            start = char_start
+        current.append(char)
+        end = char_end
+    if current:
+        words.append((''.join(current), start, end))
+    return words
+
+
+class CaptionTrack:
+    """Words with their timings and a binary-search lookup by playback time."""
+
+    def __init__(self, words):
+        self.words = words
+        self.starts = [start for _, start, _ in words]
+
+    @classmethod
+    def from_alignment(cls, alignment):
+        return cls(words_from_alignment(alignment))
+
+    def __len__(self):
+        return len(self.words)
+
+    @property
+    def duration(self):
+        return self.words[-1][2] if self.words else 0.0
+
+    def index_at(self, t):
+        """Index of the word being spoken at time t (-1 before the first word)."""
+        return bisect.bisect_right(self.starts, t) - 1
+
+
+class CaptionPlayer:
+    """
+    Follows a playback clock and calls publish(index) as each word starts.
+
+    clock() returns seconds since playback started, or None once playback
+    has stopped. Drift (clock time at publish minus the word's start) is
+    recorded for every word.
+    """
+
+    def __init__(self, track, clock, publish, on_finish=None, hold_seconds=CAPTION_HOLD_SECONDS):
+        self.track = track
+        self.clock = clock
+        self.publish = publish
+        self.on_finish = on_finish
+        self.hold_seconds = hold_seconds
+        self.drift_ms = []
+        self.skipped = 0
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="caption-player", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+
+    def join(self, timeout=None):
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _wait_until(self, target):
+        """Sleep, then spin, until the clock reaches target. Returns the clock or None if stopped."""
+        while not self._stop_event.is_set():
+            now = self.clock()
+            if now is None:
+                return None
+            remaining = target - now
+            if remaining <= 0:
+                return now
+            if remaining > SPIN_SECONDS:
+                self._stop_event.wait(remaining - SPIN_SECONDS)
+        return None
+
+    def _run(self):
+        last = -1
+        try:
+            while last + 1 < len(self.track):
+                now = self._wait_until(self.track.starts[last + 1])
+                if now is None:
+                    return
+                # After a stall or seek, jump to the word actually playing now
+                index = max(self.track.index_at(now), last + 1)
+                self.skipped += index - last - 1
+                self.publish(index)
+                published_at = self.clock()
+                if published_at is not None:
+                    self.drift_ms.append((published_at - self.track.starts[index]) * 1000)
+                last = index
+            self._wait_until(self.track.duration + self.hold_seconds)
+        finally:
+            if self.on_finish:
+                self.on_finish()
+
+    def drift_stats(self):
+        """p50 / p99 / max absolute drift in milliseconds."""
+        if not self.drift_ms:
+            return {'words': 0, 'p50_ms': 0.0, 'p99_ms': 0.0, 'max_ms': 0.0}
+        drifts = sorted(abs(d) for d in self.drift_ms)
+        return {
+            'words': len(drifts),
+            'p50_ms': drifts[len(drifts) // 2],
+            'p99_ms': drifts[min(len(drifts) - 1, int(len(drifts) * 0.99))],
+            'max_ms': drifts[-1],
+        }
+
+
+class MixerClock:
+    """
+    Playback position as reported by the mixer (pygame.mixer.music.get_pos),
+    so captions wait when the audio starts late or stalls instead of running
+    ahead on wall time. The mixer's position only advances once per audio
+    buffer, so between updates the clock runs on wall time, kept between the
+    last reported position and one buffer (the smallest step seen) past it:
+    a late reading pulls it forward, and a stalled mixer stops it.
+    """
+
+    def __init__(self, get_pos):
+        self.get_pos = get_pos      # Milliseconds played, negative once playback stopped
+        self._pos = None
+        self._step = None
+        self._offset = None         # perf_counter() minus the position
+
+    def __call__(self):
+        pos = self.get_pos()
+        now = time.perf_counter()
+        if pos is None or pos < 0:
+            return None
+        pos /= 1000.0
+        if self._pos is not None and pos > self._pos:
+            step = pos - self._pos
+            self._step = step if self._step is None else min(self._step, step)
+        self._pos = pos
+        if self._step is None or self._offset is None:
+            value = pos  # No update seen yet: the audio may not have started
+        else:
+            value = min(max(now - self._offset, pos), pos + self._step)
+        self._offset = now - value
+        return value
+
+
+class PlaybackClock:
+    """Playback position from a start time on the monotonic clock (wall time; see MixerClock)."""
+
+    def __init__(self, is_playing=None):
+        self.started = time.perf_counter()
+        self.is_playing = is_playing
+
+    def __call__(self):
+        if self.is_playing is not None and not self.is_playing():
+            return None
+        return time.perf_counter() - self.started
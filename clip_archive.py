@@ -0,0 +1,410 @@
+"""
+Segment-file archive for generated clips.
+
+Instead of keeping one small file per clip, finished clips are appended to
+large segment files and located through a fixed-record index file. Both are
+memory-mapped, so replaying an archived clip is a dictionary lookup plus a
+zero-copy slice of the segment mapping. Deleted clips only flip a flag in
+the index; a background pass compacts segments once most of their bytes
+are dead.
+"""
+
+import io
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import deque
+
+from background_io import live_activity, lower_thread_priority
+
+INDEX_FILENAME = "index.bin"
+SEGMENT_TEMPLATE = "segment_{:06d}.dat"
+
+SEGMENT_MAX_BYTES = int(float(os.getenv("CLIP_ARCHIVE_SEGMENT_MB", "256")) * 1024 * 1024)
+ARCHIVE_AFTER_SECONDS = float(os.getenv("CLIP_ARCHIVE_AFTER_SECONDS", "600"))
+COMPACT_DEAD_RATIO = 0.5
+
+_HEADER = struct.Struct('<4sI8x')
+_MAGIC = b'VMCA'
+_VERSION = 1
+# name, segment id, offset, length, flags
+_RECORD = struct.Struct('<108sIQIB3x')
+_FLAG_DELETED = 1
+MAX_NAME_BYTES = 108
+AUDIO_EXTENSIONS = ('.mp3', '.wav', '.ogg', '.opus')
+
+
+class ClipReader(io.RawIOBase):
+    """Read-only file object over an archived clip's memoryview (no copy of the clip)."""
+
+    def __init__(self, view):
+        super().__init__()
+        self._view = view
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, buffer):
+        n = min(len(buffer), len(self._view) - self._pos)
+        if n <= 0:
+            return 0
+        buffer[:n] = self._view[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def readall(self):
+        data = bytes(self._view[self._pos:])
+        self._pos = len(self._view)
+        return data
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            self._pos = offset
+        elif whence == io.SEEK_CUR:
+            self._pos += offset
+        else:
+            self._pos = len(self._view) + offset
+        self._pos = max(0, self._pos)
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+    def close(self):
+        self._view = memoryview(b'')
+        super().close()
+
+
+class ClipArchive:
+    """Append-only segment store for finished clips."""
+
+    def __init__(self, archive_dir, segment_max_bytes=SEGMENT_MAX_BYTES,
+                 archive_after_seconds=ARCHIVE_AFTER_SECONDS, source_dir=None, candidates=None):
+        self.archive_dir = archive_dir
+        # Loose clips left from earlier sessions are packed too: candidates() -> [(filename, size,
+        # created)], oldest first, or a scan of source_dir (no startup pass without either)
+        self.source_dir = source_dir
+        self.candidates = candidates or (self._scan_candidates if source_dir else None)
+        self.index_path = os.path.join(archive_dir, INDEX_FILENAME)
+        self.segment_max_bytes = segment_max_bytes
+        self.archive_after_seconds = archive_after_seconds
+        os.makedirs(archive_dir, exist_ok=True)
+
+        # name -> (record slot, segment id, offset, length)
+        self._clips = {}
+        self._segment_live = {}
+        self._segment_dead = {}
+        self._index_records = 0
+        self._index_map = None
+        self._segment_maps = {}
+        self._pending_removal = []
+        self._lock = threading.RLock()
+
+        self._active_segment = None
+        self._active_size = 0
+
+        self._pack_queue = deque()        # (created, path), oldest first
+        self._queue_lock = threading.Lock()
+        self._thread = None
+        self._stop_event = threading.Event()
+        self.on_packed = None
+
+        self._open_index()
+
+    # --- Index ---
+
+    def _segment_path(self, segment_id):
+        return os.path.join(self.archive_dir, SEGMENT_TEMPLATE.format(segment_id))
+
+    def _open_index(self):
+        if not os.path.exists(self.index_path):
+            with open(self.index_path, 'wb') as f:
+                f.write(_HEADER.pack(_MAGIC, _VERSION))
+        self._index_file = open(self.index_path, 'r+b')
+        self._remap_index()
+
+        magic, version = _HEADER.unpack_from(self._index_map, 0)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f"{self.index_path} is not a VoiceMaster clip archive index")
+
+        self._index_records = (len(self._index_map) - _HEADER.size) // _RECORD.size
+        for slot in range(self._index_records):
+            raw_name, segment_id, offset, length, flags = _RECORD.unpack_from(
+                self._index_map, _HEADER.size + slot * _RECORD.size)
+            if flags & _FLAG_DELETED:
+                self._segment_dead[segment_id] = self._segment_dead.get(segment_id, 0) + length
+                continue
+            name = raw_name.rstrip(b'\0').decode('utf-8')
+            previous = self._clips.get(name)
+            if previous is not None:
+                self._mark_dead(previous)
+            self._clips[name] = (slot, segment_id, offset, length)
+            self._segment_live[segment_id] = self._segment_live.get(segment_id, 0) + length
+
+        segments = [int(n[8:14]) for n in os.listdir(self.archive_dir)
+                    if n.startswith("segment_") and n.endswith(".dat")]
+        self._active_segment = max(segments) if segments else 1
+        path = self._segment_path(self._active_segment)
+        self._active_size = os.path.getsize(path) if os.path.exists(path) else 0
+
+    def _remap_index(self):
+        # Older maps may still be referenced by readers; they are released by refcount
+        self._index_file.flush()
+        self._index_map = mmap.mmap(self._index_file.fileno(), 0)
+
+    def _append_record(self, name, segment_id, offset, length):
+        slot = self._index_records
+        self._index_file.seek(0, os.SEEK_END)
+        self._index_file.write(_RECORD.pack(name.encode('utf-8'), segment_id, offset, length, 0))
+        self._index_records += 1
+        self._remap_index()
+        return slot
+
+    def _mark_dead(self, entry):
+        slot, segment_id, _, length = entry
+        flags_offset = _HEADER.size + slot * _RECORD.size + _RECORD.size - 4
+        self._index_map[flags_offset] = self._index_map[flags_offset] | _FLAG_DELETED
+        self._segment_live[segment_id] = self._segment_live.get(segment_id, 0) - length
+        self._segment_dead[segment_id] = self._segment_dead.get(segment_id, 0) + length
+
+    # --- Writing ---
+
+    def _append_bytes(self, data):
+        if self._active_size and self._active_size + len(data) > self.segment_max_bytes:
+            self._active_segment += 1
+            self._active_size = 0
+        offset = self._active_size
+        with open(self._segment_path(self._active_segment), 'ab') as f:
+            f.write(data)
+        self._active_size += len(data)
+        return self._active_segment, offset
+
+    def add(self, name, data):
+        """Append a clip's bytes to the active segment and index it under name."""
+        if len(name.encode('utf-8')) > MAX_NAME_BYTES:
+            raise ValueError(f"Clip name too long for archive index: {name}")
+        with self._lock:
+            segment_id, offset = self._append_bytes(data)
+            previous = self._clips.get(name)
+            if previous is not None:
+                self._mark_dead(previous)
+            slot = self._append_record(name, segment_id, offset, len(data))
+            self._clips[name] = (slot, segment_id, offset, len(data))
+            self._segment_live[segment_id] = self._segment_live.get(segment_id, 0) + len(data)
+
+    def add_file(self, path, remove_original=True):
+        """Move a finished clip file into the archive."""
+        with open(path, 'rb') as f:
+            data = f.read()
+        self.add(os.path.basename(path), data)
+        if remove_original:
+            os.remove(path)
+
+    def delete(self, name):
+        """Drop a clip. Returns False if it was not archived."""
+        with self._lock:
+            entry = self._clips.pop(name, None)
+            if entry is None:
+                return False
+            self._mark_dead(entry)
+            return True
+
+    # --- Reading ---
+
+    def __contains__(self, name):
+        return name in self._clips
+
+    def __len__(self):
+        return len(self._clips)
+
+    def _segment_map(self, segment_id, needed_end):
+        segment_map = self._segment_maps.get(segment_id)
+        if segment_map is None or len(segment_map) < needed_end:
+            # The active segment grows, so remap it when a read goes past the old mapping
+            with open(self._segment_path(segment_id), 'rb') as f:
+                segment_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._segment_maps[segment_id] = segment_map
+        return segment_map
+
+    def read(self, name):
+        """Return a zero-copy memoryview of an archived clip, or None."""
+        with self._lock:
+            entry = self._clips.get(name)
+            if entry is None:
+                return None
+            _, segment_id, offset, length = entry
+            segment_map = self._segment_map(segment_id, offset + length)
+        return memoryview(segment_map)[offset:offset + length]
+
+    def open(self, name):
+        """Open an archived clip as a file object for decoders such as pygame.mixer."""
+        view = self.read(name)
+        return ClipReader(view) if view is not None else None
+
+    def stats(self):
+        with self._lock:
+            segments = sorted(set(self._segment_live) | set(self._segment_dead))
+            return {
+                'clips': len(self._clips),
+                'segments': len(segments),
+                'live_bytes': sum(self._segment_live.values()),
+                'dead_bytes': sum(self._segment_dead.values()),
+                'pending_pack': len(self._pack_queue),
+            }
+
+    # --- Packing and compaction ---
+
+    def queue_clip(self, path, created=None):
+        """Schedule a freshly generated clip to be packed once it is no longer hot."""
+        with self._queue_lock:
+            self._pack_queue.append((time.time() if created is None else created, path))
+
+    def _scan_candidates(self):
+        clips = []
+        with os.scandir(self.source_dir) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.lower().endswith(AUDIO_EXTENSIONS):
+                    st = entry.stat()
+                    clips.append((entry.name, st.st_size, st.st_mtime))
+        clips.sort(key=lambda c: c[2])
+        return clips
+
+    def queue_existing(self):
+        """Queue loose clips from earlier sessions that are not archived yet. Returns the number queued."""
+        if self.candidates is None:
+            return 0
+        with self._queue_lock:
+            queued = {path for _, path in self._pack_queue}
+        found = []
+        for name, _, created in self.candidates():
+            path = os.path.join(self.source_dir, name)
+            if name not in self._clips and path not in queued and os.path.exists(path):
+                found.append((created, path))
+        if found:
+            with self._queue_lock:
+                self._pack_queue = deque(sorted(found + list(self._pack_queue), key=lambda c: c[0]))
+        return len(found)
+
+    def pack_ready(self, now=None, limit=100):
+        """Pack queued clips older than archive_after_seconds. Returns the number packed."""
+        now = time.time() if now is None else now
+        packed = 0
+        while packed < limit:
+            with self._queue_lock:
+                if not self._pack_queue or now - self._pack_queue[0][0] < self.archive_after_seconds:
+                    break
+                _, path = self._pack_queue.popleft()
+            try:
+                self.add_file(path)
+            except FileNotFoundError:
+                continue  # Already removed (retention or the user)
+            except (OSError, ValueError) as e:
+                print(f"Could not archive {path}: {e}")
+                continue
+            packed += 1
+            if self.on_packed:
+                self.on_packed(path)
+        return packed
+
+    def compact(self, dead_ratio=COMPACT_DEAD_RATIO):
+        """Rewrite mostly-dead sealed segments into the active one. Returns segments removed."""
+        removed = 0
+        with self._lock:
+            candidates = [
+                segment_id for segment_id in sorted(set(self._segment_live) | set(self._segment_dead))
+                if segment_id != self._active_segment
+                and self._segment_dead.get(segment_id, 0) >= dead_ratio * (
+                    self._segment_dead.get(segment_id, 0) + self._segment_live.get(segment_id, 0))
+            ]
+        for segment_id in candidates:
+            with self._lock:
+                survivors = [(name, entry) for name, entry in self._clips.items() if entry[1] == segment_id]
+                segment_map = self._segment_map(segment_id, 0) if survivors else None
+            # Copy without the lock (reads stay responsive); a sealed segment no longer changes
+            for name, entry in survivors:
+                _, _, offset, length = entry
+                data = bytes(segment_map[offset:offset + length])
+                with self._lock:
+                    if self._clips.get(name) == entry:  # Not deleted or replaced meanwhile
+                        self.add(name, data)
+            with self._lock:
+                self._segment_maps.pop(segment_id, None)
+                self._segment_live.pop(segment_id, None)
+                self._segment_dead.pop(segment_id, None)
+                self._pending_removal.append(self._segment_path(segment_id))
+            removed += 1
+        self._remove_pending_segments()
+        if removed:
+            self._rewrite_index()
+            print(f"Clip archive compacted {removed} segment(s)")
+        return removed
+
+    def _remove_pending_segments(self):
+        still_pending = []
+        for path in self._pending_removal:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError:
+                still_pending.append(path)  # Still mapped by a reader (Windows)
+        self._pending_removal = still_pending
+
+    def _rewrite_index(self):
+        """Drop deleted records from the index file once they dominate it."""
+        with self._lock:
+            if self._index_records <= 2 * len(self._clips) + 1024:
+                return
+            tmp_path = self.index_path + ".tmp"
+            clips = {}
+            with open(tmp_path, 'wb') as f:
+                f.write(_HEADER.pack(_MAGIC, _VERSION))
+                for slot, (name, (_, segment_id, offset, length)) in enumerate(self._clips.items()):
+                    f.write(_RECORD.pack(name.encode('utf-8'), segment_id, offset, length, 0))
+                    clips[name] = (slot, segment_id, offset, length)
+            self._index_map = None
+            self._index_file.close()
+            os.replace(tmp_path, self.index_path)
+            self._index_file = open(self.index_path, 'r+b')
+            self._remap_index()
+            self._clips = clips
+            self._index_records = len(clips)
+
+    # --- Background work ---
+
+    def start(self, interval=30):
+        """Pack aged clips and compact segments periodically at idle priority."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+
+        def loop():
+            lower_thread_priority()
+            try:
+                queued = self.queue_existing()
+                if queued:
+                    print(f"Clip archive queued {queued} clip(s) from earlier sessions")
+            except Exception as e:
+                print(f"Error scanning for clips to archive: {e}")
+            while not self._stop_event.wait(interval):
+                live_activity.wait_idle()
+                try:
+                    self.pack_ready()
+                    self.compact()
+                except Exception as e:
+                    print(f"Error during clip archive maintenance: {e}")
+
+        self._thread = threading.Thread(target=loop, name="clip-archive", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
@@ -0,0 +1,271 @@
+"""
+SQLite history of every generated clip.
+
+Generations are queued from the TTS path and written in batches by a
+background thread, so recording never blocks generation. Text is indexed
+with FTS5 for search; voice and time lookups use ordinary indexes and
+keyset pagination so queries stay fast with hundreds of thousands of rows.
+"""
+
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+HISTORY_DB_PATH = os.getenv("CLIP_HISTORY_DB", "voicemaster_history.db")
+
+# ElevenLabs' default MP3 output is 128 kbps CBR
+DEFAULT_MP3_BITRATE_KBPS = 128
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS clips (
+    id INTEGER PRIMARY KEY,
+    created_at REAL NOT NULL,
+    text TEXT NOT NULL,
+    voice_id TEXT,
+    voice_name TEXT,
+    model_id TEXT,
+    settings TEXT,
+    duration REAL,
+    byte_size INTEGER,
+    file_path TEXT,
+    latency_ms REAL
+);
+CREATE INDEX IF NOT EXISTS idx_clips_created ON clips(created_at);
+CREATE INDEX IF NOT EXISTS idx_clips_voice ON clips(voice_id, id);
+CREATE INDEX IF NOT EXISTS idx_clips_file ON clips(file_path);
+CREATE VIRTUAL TABLE IF NOT EXISTS clips_fts USING fts5(
+    text, content='clips', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS clips_ai AFTER INSERT ON clips BEGIN
+    INSERT INTO clips_fts(rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS clips_ad AFTER DELETE ON clips BEGIN
+    INSERT INTO clips_fts(clips_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+"""
+
+_COLUMNS = ("id", "created_at", "text", "voice_id", "voice_name", "model_id",
+            "settings", "duration", "byte_size", "file_path", "latency_ms")
+
+
+def estimate_mp3_duration(byte_size, bitrate_kbps=DEFAULT_MP3_BITRATE_KBPS):
+    """Estimate the duration in seconds of a constant-bitrate MP3 from its size."""
+    if not byte_size:
+        return 0.0
+    return byte_size * 8 / (bitrate_kbps * 1000)
+
+
+def fts_query(text):
+    """Turn free text into an FTS5 query matching every word as a prefix."""
+    words = [w.replace('"', '') for w in text.split()]
+    return " ".join(f'"{w}"*' for w in words if w)
+
+
+def _row_to_dict(row):
+    clip = dict(zip(_COLUMNS, row))
+    if clip.get('settings'):
+        try:
+            clip['settings'] = json.loads(clip['settings'])
+        except ValueError:
+            pass
+    return clip
+
+
+class ClipHistory:
+    """Indexed store of generated clips with an asynchronous writer."""
+
+    def __init__(self, db_path=HISTORY_DB_PATH, batch_size=256):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self._queue = queue.Queue()
+        self._local = threading.local()
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        self._schema_ready = False
+
+    # --- Connections ---
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        if not self._schema_ready:
+            conn.executescript(_SCHEMA)
+            self._schema_ready = True
+        return conn
+
+    def _reader(self):
+        """Per-thread read connection (WAL lets readers run alongside the writer)."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+        return conn
+
+    # --- Writing ---
+
+    def record(self, text, voice_id=None, voice_name=None, model_id=None, settings=None,
+               file_path=None, byte_size=None, duration=None, latency_ms=None, created_at=None):
+        """Queue a generated clip for recording. Returns immediately."""
+        if byte_size is None and file_path:
+            try:
+                byte_size = os.path.getsize(file_path)
+            except OSError:
+                byte_size = None
+        if duration is None:
+            duration = estimate_mp3_duration(byte_size)
+        self._queue.put((
+            time.time() if created_at is None else created_at,
+            text, voice_id, voice_name, model_id,
+            json.dumps(settings) if settings is not None else None,
+            duration, byte_size, file_path, latency_ms,
+        ))
+        self._ensure_writer()
+
+    def _ensure_writer(self):
+        if self._writer and self._writer.is_alive():
+            return
+        with self._writer_lock:
+            if self._writer and self._writer.is_alive():
+                return
+            self._writer = threading.Thread(target=self._write_loop, name="clip-history-writer", daemon=True)
+            self._writer.start()
+
+    def _write_loop(self):
+        conn = self._connect()
+        while True:
+            item = self._queue.get()
+            batch = [item]
+            # Drain whatever else is pending into the same transaction
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            rows = [b for b in batch if b is not None]
+            try:
+                if rows:
+                    with conn:
+                        conn.executemany(
+                            "INSERT INTO clips (created_at, text, voice_id, voice_name, model_id, "
+                            "settings, duration, byte_size, file_path, latency_ms) "
+                            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            except sqlite3.Error as e:
+                print(f"Error recording clip history: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if len(rows) < len(batch):
+                conn.close()
+                return
+
+    def flush(self):
+        """Block until every queued clip has been written."""
+        self._queue.join()
+
+    def close(self):
+        """Write any pending clips, stop the writer and close this thread's connection."""
+        if self._writer and self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join(timeout=10)
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    # --- Queries ---
+
+    def get(self, clip_id):
+        """Look up one clip by ID."""
+        row = self._reader().execute(
+            f"SELECT {', '.join(_COLUMNS)} FROM clips WHERE id = ?", (clip_id,)).fetchone()
+        return _row_to_dict(row) if row else None
+
+    def get_by_file(self, file_path):
+        """Look up the newest clip recorded for a file path."""
+        row = self._reader().execute(
+            f"SELECT {', '.join(_COLUMNS)} FROM clips WHERE file_path = ? ORDER BY id DESC LIMIT 1",
+            (file_path,)).fetchone()
+        return _row_to_dict(row) if row else None
+
+    def search(self, text=None, voice_id=None, since=None, until=None, limit=100, before_id=None):
+        """
+        Find clips newest first.
+
+        Args:
+            text: Free text; every word must match as a prefix (FTS5)
+            voice_id: Only clips generated with this voice
+            since / until: Unix timestamps bounding created_at
+            limit: Page size
+            before_id: Keyset cursor - pass the last ID of the previous page
+        """
+        where = []
+        params = []
+        if text and fts_query(text):
+            where.append("id IN (SELECT rowid FROM clips_fts WHERE clips_fts MATCH ?)")
+            params.append(fts_query(text))
+        if voice_id:
+            where.append("voice_id = ?")
+            params.append(voice_id)
+        if since is not None:
+            where.append("created_at >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("created_at < ?")
+            params.append(until)
+        if before_id is not None:
+            where.append("id < ?")
+            params.append(before_id)
+
+        sql = f"SELECT {', '.join(_COLUMNS)} FROM clips"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+        try:
+            return [_row_to_dict(row) for row in self._reader().execute(sql, params)]
+        except sqlite3.Error as e:
+            print(f"Error searching clip history: {e}")
+            return []
+
+    def phrases(self):
+        """
+        Yield (text, voice_id, voice_name, last_used, uses) for every distinct
+        text, least recently used first. The voice is the one used last.
+        """
+        try:
+            yield from self._reader().execute(
+                "SELECT text, voice_id, voice_name, MAX(created_at), COUNT(*) FROM clips "
+                "GROUP BY text ORDER BY MAX(created_at)")
+        except sqlite3.Error as e:
+            print(f"Error reading clip history phrases: {e}")
+
+    def uses(self):
+        """
+        Yield (text, voice_id, voice_name, settings, created_at, model_id, file_path)
+        for every clip, oldest first.
+        """
+        try:
+            for text, voice_id, voice_name, settings, created_at, model_id, file_path in self._reader().execute(
+                    "SELECT text, voice_id, voice_name, settings, created_at, model_id, file_path "
+                    "FROM clips ORDER BY id"):
+                if settings:
+                    try:
+                        settings = json.loads(settings)
+                    except ValueError:
+                        settings = None
+                yield text, voice_id, voice_name, settings, created_at, model_id, file_path
+        except sqlite3.Error as e:
+            print(f"Error reading clip history uses: {e}")
+
+    def count(self):
+        return self._reader().execute("SELECT COUNT(*) FROM clips").fetchone()[0]
+
+    def delete(self, clip_id):
+        """Remove a clip's history entry."""
+        conn = self._reader()
+        with conn:
+            conn.execute("DELETE FROM clips WHERE id = ?", (clip_id,))
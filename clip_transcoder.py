@@ -0,0 +1,234 @@
+"""
+Background transcoding of older generated clips to a compact codec (Opus).
+
+Clips older than a configurable age are re-encoded at idle priority, and
+the worker steps aside whenever live generation is running. Playback of a
+transcoded clip goes through a small cache of decoded playback-format
+copies, regenerated on demand and kept only for recently played clips.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from background_io import live_activity, lower_thread_priority
+
+TRANSCODE_CODEC = os.getenv("AUDIO_TRANSCODE", "off").lower()
+TRANSCODE_AFTER_MINUTES = float(os.getenv("AUDIO_TRANSCODE_AFTER_MINUTES", "30"))
+TRANSCODE_BITRATE = os.getenv("AUDIO_TRANSCODE_BITRATE", "32k")
+PLAYBACK_CACHE_CLIPS = int(os.getenv("AUDIO_PLAYBACK_CACHE_CLIPS", "50"))
+
+PLAYBACK_CACHE_DIRNAME = ".playback"
+STATS_FILENAME = ".transcode_stats.json"
+
+# codec name -> (file extension, ffmpeg encoder)
+CODECS = {
+    "opus": (".opus", "libopus"),
+    "ogg": (".ogg", "libvorbis"),
+}
+
+
+def pydub_transcode(src_path, dst_path, fmt, codec=None, bitrate=None):
+    """Re-encode an audio file with pydub/ffmpeg."""
+    from pydub import AudioSegment  # Imported lazily; needs ffmpeg on PATH
+    audio = AudioSegment.from_file(src_path)
+    audio.export(dst_path, format=fmt, codec=codec, bitrate=bitrate)
+
+
+class ClipTranscoder:
+    """Idle-priority worker that shrinks old clips and serves hot playback copies."""
+
+    def __init__(self, audio_dir, codec="opus", min_age_seconds=TRANSCODE_AFTER_MINUTES * 60,
+                 bitrate=TRANSCODE_BITRATE, playback_cache_clips=PLAYBACK_CACHE_CLIPS,
+                 candidates=None, skip=None, on_transcoded=None, transcode=pydub_transcode,
+                 gate=live_activity):
+        if codec not in CODECS:
+            raise ValueError(f"Unsupported transcode codec: {codec}")
+        self.audio_dir = audio_dir
+        self.codec = codec
+        self.extension, self.encoder = CODECS[codec]
+        self.min_age_seconds = min_age_seconds
+        self.bitrate = bitrate
+        self.playback_cache_clips = playback_cache_clips
+        self.playback_dir = os.path.join(audio_dir, PLAYBACK_CACHE_DIRNAME)
+        os.makedirs(self.playback_dir, exist_ok=True)
+
+        # candidates() -> [(filename, size, created)], oldest first
+        self.candidates = candidates or self._scan_candidates
+        # skip() -> set of filenames that must stay in their original format
+        self.skip = skip or (lambda: set())
+        # on_transcoded(old_name, new_name, new_size, created)
+        self.on_transcoded = on_transcoded
+        self.transcode = transcode
+        self.gate = gate
+
+        # Playback copies left over from a previous session, least recently used first
+        self._hot = OrderedDict(
+            (name, True) for _, name in sorted(
+                (os.path.getmtime(os.path.join(self.playback_dir, n)), n)
+                for n in os.listdir(self.playback_dir) if not n.endswith('.part')))
+        # Clips that did not shrink when transcoded; left as they are
+        self._not_worth = set()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop_event = threading.Event()
+
+        self.stats_path = os.path.join(audio_dir, STATS_FILENAME)
+        self._stats = {'clips_transcoded': 0, 'bytes_before': 0, 'bytes_after': 0}
+        try:
+            with open(self.stats_path, 'r', encoding='utf-8') as f:
+                self._stats.update(json.load(f))
+        except (OSError, ValueError):
+            pass
+
+    def _scan_candidates(self):
+        clips = []
+        with os.scandir(self.audio_dir) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.lower().endswith('.mp3'):
+                    st = entry.stat()
+                    clips.append((entry.name, st.st_size, st.st_mtime))
+        clips.sort(key=lambda c: c[2])
+        return clips
+
+    # --- Transcoding ---
+
+    def transcoded_name(self, name):
+        return os.path.splitext(name)[0] + self.extension
+
+    def run_once(self, limit=20, now=None):
+        """Transcode up to limit eligible clips, pausing for live generation. Returns count."""
+        now = time.time() if now is None else now
+        skip = self.skip()
+        done = 0
+        for name, size, created in self.candidates():
+            if done >= limit or self._stop_event.is_set():
+                break
+            if now - created < self.min_age_seconds:
+                break  # Candidates are oldest first
+            if not name.lower().endswith('.mp3') or name in skip or name in self._not_worth:
+                continue
+            # Never compete with the streaming hot path
+            while not self.gate.wait_idle(timeout=1.0):
+                if self._stop_event.is_set():
+                    return done
+            if self._transcode_clip(name, size, created):
+                done += 1
+        if done:
+            self._save_stats()
+        return done
+
+    def _transcode_clip(self, name, size, created):
+        src = os.path.join(self.audio_dir, name)
+        new_name = self.transcoded_name(name)
+        dst = os.path.join(self.audio_dir, new_name)
+        tmp = dst + ".part"
+        try:
+            self.transcode(src, tmp, self.codec, codec=self.encoder, bitrate=self.bitrate)
+            new_size = os.path.getsize(tmp)
+            if new_size >= size:
+                os.remove(tmp)  # Not worth it; keep the original
+                self._not_worth.add(name)
+                return False
+            os.replace(tmp, dst)
+            os.remove(src)
+        except FileNotFoundError:
+            return False  # Clip removed meanwhile
+        except Exception as e:
+            print(f"Could not transcode {name}: {e}")
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            return False
+
+        with self._lock:
+            self._stats['clips_transcoded'] += 1
+            self._stats['bytes_before'] += size
+            self._stats['bytes_after'] += new_size
+        if self.on_transcoded:
+            self.on_transcoded(name, new_name, new_size, created)
+        return True
+
+    def _save_stats(self):
+        tmp = self.stats_path + ".tmp"
+        try:
+            with self._lock:
+                data = dict(self._stats)
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp, self.stats_path)
+        except OSError as e:
+            print(f"Error saving transcode stats: {e}")
+
+    # --- Playback ---
+
+    def playback_path(self, name):
+        """
+        Get a playable copy of a clip that may have been transcoded.
+        Returns the original path if it still exists, a cached playback copy
+        (decoded on first use) for transcoded clips, or None.
+        """
+        original = os.path.join(self.audio_dir, name)
+        if os.path.exists(original):
+            return original
+        compact = os.path.join(self.audio_dir, self.transcoded_name(name))
+        if not os.path.exists(compact):
+            return None
+
+        cached = os.path.join(self.playback_dir, name)
+        with self._lock:
+            if name in self._hot and os.path.exists(cached):
+                self._hot.move_to_end(name)
+                return cached
+        try:
+            fmt = os.path.splitext(name)[1].lstrip('.') or 'mp3'
+            self.transcode(compact, cached + ".part", fmt)
+            os.replace(cached + ".part", cached)
+        except Exception as e:
+            print(f"Could not restore playback copy of {name}: {e}")
+            return None
+
+        with self._lock:
+            self._hot[name] = True
+            self._hot.move_to_end(name)
+            while len(self._hot) > self.playback_cache_clips:
+                cold, _ = self._hot.popitem(last=False)
+                try:
+                    os.remove(os.path.join(self.playback_dir, cold))
+                except OSError:
+                    pass
+        return cached
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['hot_copies'] = len(self._hot)
+        stats['bytes_saved'] = stats['bytes_before'] - stats['bytes_after']
+        return stats
+
+    # --- Background work ---
+
+    def start(self, interval=60):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+
+        def loop():
+            lower_thread_priority()
+            while not self._stop_event.is_set():
+                try:
+                    done = self.run_once()
+                except Exception as e:
+                    print(f"Error during transcoding pass: {e}")
+                    done = 0
+                self._stop_event.wait(1.0 if done else interval)
+
+        self._thread = threading.Thread(target=loop, name="clip-transcoder", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
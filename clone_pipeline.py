@@ -0,0 +1,187 @@
+"""
+Live speech-to-cloned-voice: speak, and hear each phrase back in the cloned
+voice while you carry on talking.
+
+The serial pipeline records for a fixed time, then transcribes, then
+synthesizes the whole text, so the wait grows with everything that was
+said. Here every phrase moves through its own stages as soon as the
+capture cuts it (a short pause, CLONE_PHRASE_SILENCE_MS, or at most
+CLONE_MAX_PHRASE_SECONDS of speech):
+
+    capture ──> recognize (one thread) ──> synthesize (CLONE_SYNTH_WORKERS
+    threads) ──> play (one thread, strictly in the order spoken)
+
+All stages run at once on different phrases, so the delay from the end of
+a phrase to hearing it (mouth to speaker) depends on the phrase, not on how
+long the session has been going.
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+CLONE_PHRASE_SILENCE_MS = int(os.getenv("CLONE_PHRASE_SILENCE_MS", "350"))
+CLONE_MAX_PHRASE_SECONDS = float(os.getenv("CLONE_MAX_PHRASE_SECONDS", "8"))
+CLONE_SYNTH_WORKERS = int(os.getenv("CLONE_SYNTH_WORKERS", "2"))
+CLONE_IDLE_SECONDS = float(os.getenv("CLONE_IDLE_SECONDS", "6"))
+
+
+class Phrase:
+    """One phrase on its way through the pipeline, with when it passed each stage."""
+
+    __slots__ = ('seq', 'text', 'audio', 'spoken_at', 'recognized_at', 'synthesized_at', 'played_at')
+
+    def __init__(self, seq, spoken_at):
+        self.seq = seq
+        self.text = None
+        self.audio = None
+        self.spoken_at = spoken_at        # time.monotonic() when the phrase's speech ended
+        self.recognized_at = None
+        self.synthesized_at = None
+        self.played_at = None
+
+    @property
+    def latency(self):
+        """Mouth to speaker: end of speech to start of playback (None if not played)."""
+        return None if self.played_at is None else self.played_at - self.spoken_at
+
+
+class ClonePipeline:
+    """Runs one live-clone session over a started MicCapture."""
+
+    def __init__(self, capture, recognize, synthesize, play=None, on_phrase=None,
+                 phrase_silence_ms=CLONE_PHRASE_SILENCE_MS, max_phrase_seconds=CLONE_MAX_PHRASE_SECONDS,
+                 synth_workers=CLONE_SYNTH_WORKERS, idle_seconds=CLONE_IDLE_SECONDS, start_timeout=10.0):
+        """
+        Args:
+            capture: A started MicCapture
+            recognize: recognize(int16 samples at 16 kHz) -> text
+            synthesize: synthesize(text, seq) -> audio file path, or None on failure
+            play: play(path) plays a file and returns when it has finished (None: files only)
+            on_phrase: on_phrase(phrase, stage) as a phrase is recognized, synthesized and played
+        """
+        self.capture = capture
+        self.recognize = recognize
+        self.synthesize = synthesize
+        self.play = play
+        self.on_phrase = on_phrase
+        self.phrase_silence = phrase_silence_ms / 1000.0
+        self.max_phrase_seconds = max_phrase_seconds
+        self.synth_workers = synth_workers
+        self.idle_seconds = idle_seconds
+        self.start_timeout = start_timeout
+        self.phrases = []
+        self._recognize_queue = queue.Queue()
+        self._ready = {}                  # seq -> Phrase whose audio is done (or failed)
+        self._ready_changed = threading.Condition()
+        self._captured = None             # Number of phrases, once capture has ended
+        self._stop = threading.Event()
+
+    def stop(self):
+        """Stop listening; phrases already spoken are still synthesized and played."""
+        self._stop.set()
+
+    def run(self):
+        """Run the session (blocking). Returns the phrases in the order spoken."""
+        saved = self.capture.override_segmenting(self.phrase_silence, self.max_phrase_seconds)
+        synth_pool = ThreadPoolExecutor(max_workers=self.synth_workers, thread_name_prefix="clone-synth")
+        recognizer = threading.Thread(target=self._recognize_loop, args=(synth_pool,),
+                                      name="clone-recognize", daemon=True)
+        player = threading.Thread(target=self._play_loop, name="clone-play", daemon=True)
+        recognizer.start()
+        player.start()
+        try:
+            self._capture_loop()
+        finally:
+            self.capture.restore_segmenting(saved)
+            self._recognize_queue.put(None)
+        recognizer.join()
+        synth_pool.shutdown(wait=True)
+        with self._ready_changed:
+            self._captured = len(self.phrases)
+            self._ready_changed.notify_all()
+        player.join()
+        return self.phrases
+
+    def latencies(self):
+        return [p.latency for p in self.phrases if p.latency is not None]
+
+    # --- Stages ---
+
+    def _capture_loop(self):
+        self.capture.drain()
+        started = last_phrase = time.monotonic()
+        while not self._stop.is_set():
+            try:
+                utterance = self.capture.utterances.get(timeout=0.1)
+            except queue.Empty:
+                quiet_since = last_phrase if self.phrases else started
+                limit = self.idle_seconds if self.phrases else self.start_timeout
+                if self.capture.current_speech() is None and time.monotonic() - quiet_since > limit:
+                    break
+                continue
+            phrase = Phrase(len(self.phrases), utterance.speech_ended_at)
+            self.phrases.append(phrase)
+            self._recognize_queue.put((phrase, utterance.samples))
+            last_phrase = time.monotonic()
+
+    def _recognize_loop(self, synth_pool):
+        while True:
+            item = self._recognize_queue.get()
+            if item is None:
+                return
+            phrase, samples = item
+            try:
+                phrase.text = (self.recognize(samples) or "").strip()
+            except Exception as e:
+                print(f"Error recognizing phrase {phrase.seq}: {e}")
+                phrase.text = ""
+            phrase.recognized_at = time.monotonic()
+            self._notify(phrase, "recognized")
+            if phrase.text:
+                synth_pool.submit(self._synthesize, phrase)
+            else:
+                self._finish(phrase)  # Nothing understood: the player skips it
+
+    def _synthesize(self, phrase):
+        try:
+            phrase.audio = self.synthesize(phrase.text, phrase.seq)
+        except Exception as e:
+            print(f"Error synthesizing phrase {phrase.seq}: {e}")
+        phrase.synthesized_at = time.monotonic()
+        self._notify(phrase, "synthesized")
+        self._finish(phrase)
+
+    def _finish(self, phrase):
+        with self._ready_changed:
+            self._ready[phrase.seq] = phrase
+            self._ready_changed.notify_all()
+
+    def _play_loop(self):
+        seq = 0
+        while True:
+            with self._ready_changed:
+                while seq not in self._ready and not (self._captured is not None and seq >= self._captured):
+                    self._ready_changed.wait()
+                if seq not in self._ready:
+                    return  # Every phrase has been played
+                phrase = self._ready.pop(seq)
+            seq += 1
+            if not phrase.audio:
+                continue
+            phrase.played_at = time.monotonic()
+            self._notify(phrase, "playing")
+            if self.play is not None:
+                try:
+                    self.play(phrase.audio)
+                except Exception as e:
+                    print(f"Error playing phrase {phrase.seq}: {e}")
+
+    def _notify(self, phrase, stage):
+        if self.on_phrase is not None:
+            try:
+                self.on_phrase(phrase, stage)
+            except Exception as e:
+                print(f"Clone pipeline callback failed: {e}")
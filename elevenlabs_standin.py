@@ -0,0 +1,289 @@
+"""
+Local stand-in for the subset of the ElevenLabs API that VoiceMaster uses.
+
+Returns silent but valid MP3 audio whose length matches the text, plus
+synthetic character alignments for the with-timestamps endpoint, so the app,
+tests and benchmarks can run offline without spending credits. The
+speech-to-speech endpoints "convert" a voice by scaling the input PCM and
+stream it back after a simulated first-byte delay, faster than real time.
+
+Run it and point the app at it:
+
+    python elevenlabs_standin.py --port 8790
+    set ELEVENLABS_API_BASE=http://127.0.0.1:8790   (any ELEVENLABS_API_KEY works)
+"""
+
+import argparse
+import array
+import base64
+import io
+import json
+import re
+import threading
+import time
+import wave
+from email import policy
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SAMPLE_RATE = 44100
+SAMPLES_PER_FRAME = 1152
+FRAME_SECONDS = SAMPLES_PER_FRAME / SAMPLE_RATE
+# MPEG-1 Layer III, 128 kbps, 44.1 kHz, mono; all-zero side info decodes to silence
+_SILENT_FRAME = bytes([0xFF, 0xFB, 0x90, 0xC4]) + bytes(417 - 4)
+
+CHAR_SECONDS = 0.055
+PAUSE_SECONDS = {',': 0.15, '.': 0.3, '!': 0.3, '?': 0.3, ';': 0.2, ':': 0.2}
+
+STS_FIRST_BYTE_SECONDS = 0.25   # Simulated time to the first converted audio
+STS_REALTIME_FACTOR = 0.25      # Then audio is produced at 4x real time
+STS_PIECE_SECONDS = 0.1         # Streamed in pieces of this much audio
+STS_GAIN = 0.5                  # The "conversion": the input, quieter
+PCM_RATES = (16000, 22050, 24000, 44100)
+
+STANDIN_VOICES = [
+    {"voice_id": "standin-voice-1", "name": "Stand-in Narrator", "category": "cloned",
+     "sharing": None, "settings": None},
+    {"voice_id": "standin-voice-2", "name": "Stand-in Host", "category": "generated",
+     "sharing": None, "settings": None},
+]
+STANDIN_MODELS = [
+    {"model_id": "eleven_monolingual_v1", "name": "Stand-in Monolingual v1",
+     "can_do_text_to_speech": True, "languages": [{"language_id": "en", "name": "English"}]},
+]
+
+
+def synthetic_alignment(text, speed=1.0):
+    """Character timings as the with-timestamps endpoint returns them."""
+    starts, ends = [], []
+    t = 0.0
+    for char in text:
+        duration = (CHAR_SECONDS + PAUSE_SECONDS.get(char, 0.0)) / speed
+        starts.append(round(t, 4))
+        t += duration
+        ends.append(round(t, 4))
+    return {
+        'characters': list(text),
+        'character_start_times_seconds': starts,
+        'character_end_times_seconds': ends,
+    }
+
+
+def silent_mp3(seconds):
+    """Silent MP3 of at least the given length."""
+    frames = max(1, int(seconds / FRAME_SECONDS + 0.999))
+    return _SILENT_FRAME * frames
+
+
+def multipart_fields(content_type, body):
+    """Form fields of a multipart/form-data body as {name: bytes}."""
+    message = BytesParser(policy=policy.HTTP).parsebytes(
+        b'Content-Type: ' + content_type.encode('latin-1') + b'\r\n\r\n' + body)
+    if not message.is_multipart():
+        raise ValueError("expected multipart/form-data")
+    return {part.get_param('name', header='content-disposition'): part.get_payload(decode=True)
+            for part in message.iter_parts()}
+
+
+def fake_conversion(samples, rate, output_rate):
+    """The stand-in's voice conversion of 16-bit mono samples: scaled and resampled (nearest sample)."""
+    count = len(samples) * output_rate // rate
+    return array.array('h', (int(samples[i * rate // output_rate] * STS_GAIN) for i in range(count)))
+
+
+class StandInServer:
+    """Threaded HTTP server answering VoiceMaster's ElevenLabs requests."""
+
+    def __init__(self, host="127.0.0.1", port=8790):
+        self.host = host
+        self.port = port
+        self.requests_served = 0
+        self._httpd = None
+        self._thread = None
+        self.routes = [
+            ('GET', re.compile(r'^/v1/voices$'), self._voices),
+            ('GET', re.compile(r'^/v1/models$'), self._models),
+            ('GET', re.compile(r'^/v1/voices/([^/]+)/settings$'), self._voice_settings),
+            ('POST', re.compile(r'^/v1/text-to-speech/([^/]+)/with-timestamps$'), self._tts_with_timestamps),
+            ('POST', re.compile(r'^/v1/text-to-speech/([^/]+)$'), self._tts),
+            ('POST', re.compile(r'^/v1/speech-to-speech/([^/]+)/stream$'), self._sts_stream),
+            ('POST', re.compile(r'^/v1/speech-to-speech/([^/]+)$'), self._sts),
+        ]
+        self.sts_first_byte_seconds = STS_FIRST_BYTE_SECONDS
+        self.sts_realtime_factor = STS_REALTIME_FACTOR
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}"
+
+    # --- Endpoints: return (status, content_type, body_bytes) ---
+
+    def _voices(self, handler, match, body):
+        return 200, 'application/json', json.dumps({'voices': STANDIN_VOICES}).encode()
+
+    def _models(self, handler, match, body):
+        return 200, 'application/json', json.dumps(STANDIN_MODELS).encode()
+
+    def _voice_settings(self, handler, match, body):
+        settings = {'stability': 0.5, 'similarity_boost': 0.75, 'style': 0.0, 'use_speaker_boost': True}
+        return 200, 'application/json', json.dumps(settings).encode()
+
+    @staticmethod
+    def _request_text(body):
+        request = json.loads(body or b'{}')
+        speed = (request.get('voice_settings') or {}).get('speed') or 1.0
+        return request.get('text', ''), speed
+
+    def _tts(self, handler, match, body):
+        text, speed = self._request_text(body)
+        alignment = synthetic_alignment(text, speed)
+        length = alignment['character_end_times_seconds'][-1] if text else 0.0
+        return 200, 'audio/mpeg', silent_mp3(length)
+
+    def _tts_with_timestamps(self, handler, match, body):
+        text, speed = self._request_text(body)
+        alignment = synthetic_alignment(text, speed)
+        length = alignment['character_end_times_seconds'][-1] if text else 0.0
+        payload = {
+            'audio_base64': base64.b64encode(silent_mp3(length)).decode('ascii'),
+            'alignment': alignment,
+            'normalized_alignment': alignment,
+        }
+        return 200, 'application/json', json.dumps(payload).encode()
+
+    def _sts_request(self, handler, body):
+        """Decode a speech-to-speech upload: (input samples, input rate, output format)."""
+        fields = multipart_fields(handler.headers.get('Content-Type', ''), body)
+        audio = fields['audio']
+        if (fields.get('file_format') or b'').decode() == 'pcm_s16le_16':
+            rate = 16000
+        else:
+            with wave.open(io.BytesIO(audio)) as wav:
+                if wav.getsampwidth() != 2 or wav.getnchannels() != 1:
+                    raise ValueError("stand-in only converts 16-bit mono audio")
+                rate = wav.getframerate()
+                audio = wav.readframes(wav.getnframes())
+        samples = array.array('h')
+        samples.frombytes(audio[:len(audio) // 2 * 2])
+        query = handler.path.partition('?')[2]
+        output_format = dict(p.partition('=')[::2] for p in query.split('&') if p).get('output_format',
+                                                                                        'mp3_44100_128')
+        return samples, rate, output_format
+
+    def _sts_audio(self, samples, rate, output_format):
+        """Converted audio in the requested format and the number of bytes per second of it."""
+        if output_format.startswith('pcm_'):
+            output_rate = int(output_format[4:])
+            if output_rate not in PCM_RATES:
+                raise ValueError(f"unsupported output_format {output_format}")
+            return fake_conversion(samples, rate, output_rate).tobytes(), output_rate * 2, 'audio/pcm'
+        data = silent_mp3(len(samples) / rate)
+        return data, len(data) / max(len(samples) / rate, FRAME_SECONDS), 'audio/mpeg'
+
+    def _sts(self, handler, match, body):
+        data, per_second, content_type = self._sts_audio(*self._sts_request(handler, body))
+        time.sleep(self.sts_first_byte_seconds + self.sts_realtime_factor * len(data) / per_second)
+        return 200, content_type, data
+
+    def _sts_stream(self, handler, match, body):
+        data, per_second, content_type = self._sts_audio(*self._sts_request(handler, body))
+        piece = max(2, int(per_second * STS_PIECE_SECONDS) // 2 * 2)
+
+        def pieces():
+            time.sleep(self.sts_first_byte_seconds)
+            for offset in range(0, len(data), piece):
+                chunk = data[offset:offset + piece]
+                time.sleep(self.sts_realtime_factor * len(chunk) / per_second)
+                yield chunk
+
+        return 200, content_type, pieces()
+
+    # --- Server lifecycle ---
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _dispatch(self, method):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else b''
+                path = self.path.split('?', 1)[0]
+                if not self.headers.get('xi-api-key'):
+                    return self._reply(401, 'application/json', b'{"detail": "missing api key"}')
+                for route_method, pattern, endpoint in server.routes:
+                    match = pattern.match(path)
+                    if route_method == method and match:
+                        server.requests_served += 1
+                        try:
+                            return self._reply(*endpoint(self, match, body))
+                        except (ValueError, KeyError) as e:
+                            return self._reply(400, 'application/json',
+                                               json.dumps({'detail': str(e)}).encode())
+                self._reply(404, 'application/json', b'{"detail": "not found"}')
+
+            def _reply(self, status, content_type, data):
+                if not isinstance(data, bytes):
+                    return self._stream(status, content_type, data)
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _stream(self, status, content_type, pieces):
+                # No length up front: pieces are sent as they are produced, the end is the connection closing
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Connection', 'close')
+                self.end_headers()
+                self.close_connection = True
+                try:
+                    for piece in pieces:
+                        self.wfile.write(piece)
+                        self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # The client stopped reading
+
+            def do_GET(self):
+                self._dispatch('GET')
+
+            def do_POST(self):
+                self._dispatch('POST')
+
+        return Handler
+
+    def start(self):
+        self._httpd = ThreadingHTTPServer((self.host, self.port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="elevenlabs-standin", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline stand-in for the ElevenLabs API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8790)
+    args = parser.parse_args()
+
+    server = StandInServer(args.host, args.port).start()
+    print(f"ElevenLabs stand-in listening on {server.base_url}")
+    print(f"Set ELEVENLABS_API_BASE={server.base_url} to use it. Ctrl+C to stop.")
+    try:
+        server._thread.join()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+"""
+Rendered audio owned by favorites.
+
+Each favorite keeps one MP3 in tts_favorites/, named after a hash of
+everything that shapes the sound (text, voice, voice settings and the TTS
+model), so a favorite's audio is current exactly when its file name
+matches. The clip just generated is adopted when it matches; otherwise the
+audio is rendered once in a background thread. After that, playing a
+favorite makes no API calls, and decoded audio for recently played
+favorites stays in memory (an LRU bounded by FAVORITE_AUDIO_CACHE_MB) so
+playback starts instantly.
+
+When a favorite's settings change, the new audio is rendered in the
+background while the previous file keeps playing until it is replaced.
+"""
+
+import hashlib
+import json
+import os
+import queue
+import shutil
+import threading
+from collections import OrderedDict
+
+from background_io import live_activity
+
+FAVORITE_AUDIO_CACHE_MB = float(os.getenv("FAVORITE_AUDIO_CACHE_MB", "64"))
+FILE_PREFIX = "fav_"
+
+
+def audio_key(text, voice_id, settings, model_id=None):
+    payload = json.dumps([text, voice_id, settings or {}, model_id], sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:20]
+
+
+def audio_filename(favorite, model_id=None):
+    """The file name a favorite's audio should have for its text, voice, settings and the model."""
+    key = audio_key(favorite['text'], favorite.get('voice_id'), favorite.get('settings'), model_id)
+    return f"{FILE_PREFIX}{key}.mp3"
+
+
+def read_bytes(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+class FavoriteAudio:
+    """Keeps each favorite's audio rendered on disk and decoded in memory."""
+
+    def __init__(self, favorites, directory, render, model_id=None, decode=read_bytes, decoded_size=len,
+                 cache_bytes=int(FAVORITE_AUDIO_CACHE_MB * 1024 * 1024), gate=live_activity):
+        """
+        Args:
+            favorites: FavoritesCache the favorites are read from and updated through
+            directory: Where the audio files live (tts_favorites/)
+            render: render(favorite, path) synthesizes the favorite to path, returns truthy on success
+            model_id: The TTS model renders use; changing it makes every favorite's audio stale
+            decode / decoded_size: Turn a file into something playable, and its size in memory
+            gate: Background renders wait until live generation has been idle for a moment
+        """
+        self.favorites = favorites
+        self.directory = directory
+        self.render = render
+        self.model_id = model_id
+        self.decode = decode
+        self.decoded_size = decoded_size
+        self.cache_bytes = cache_bytes
+        self.gate = gate
+        self.renders = 0
+        self.render_failures = 0
+        self.adopted = 0
+        self.hits = 0
+        self.misses = 0
+        self._decoded = OrderedDict()  # favorite id -> (file name, decoded audio, size)
+        self._decoded_bytes = 0
+        self._pending = set()
+        self._callbacks = {}
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, filename):
+        return os.path.join(self.directory, filename)
+
+    def filename_for(self, favorite):
+        return audio_filename(favorite, self.model_id)
+
+    def is_current(self, favorite):
+        name = favorite.get('audio_filename')
+        return name == self.filename_for(favorite) and os.path.exists(self.path(name))
+
+    # --- Attaching audio ---
+
+    def adopt(self, favorite, clip_path):
+        """Use an already generated clip as the favorite's audio (no API call). Returns the updated favorite."""
+        name = self.filename_for(favorite)
+        temp_path = self.path(name + ".part")
+        shutil.copyfile(clip_path, temp_path)
+        os.replace(temp_path, self.path(name))
+        self.adopted += 1
+        return self._attach(favorite, name)
+
+    def _attach(self, favorite, name):
+        old = favorite.get('audio_filename')
+        updated = self.favorites.update(favorite['id'], audio_filename=name)
+        if old and old != name:
+            self._remove_if_unused(old)
+        return updated
+
+    def set_settings(self, favorite_id, settings):
+        """Save new voice settings for a favorite and re-render its audio in the background."""
+        updated = self.favorites.update(favorite_id, settings=settings)
+        if updated is not None:
+            self.ensure(updated)
+        return updated
+
+    def ensure(self, favorite, callback=None):
+        """
+        Queue a background render unless the favorite's audio is current.
+        callback(favorite) runs (on the render thread) once it is. Returns True if already current.
+        """
+        if self.is_current(favorite):
+            if callback:
+                callback(favorite)
+            return True
+        with self._lock:
+            if callback:
+                self._callbacks.setdefault(favorite['id'], []).append(callback)
+            if favorite['id'] in self._pending:
+                return False
+            self._pending.add(favorite['id'])
+        self._queue.put(favorite['id'])
+        self._ensure_worker()
+        return False
+
+    def sync(self):
+        """
+        Re-render favorites whose audio no longer matches their settings and
+        delete files no favorite uses. Favorites that never had audio are left
+        alone; they are rendered the first time they are played.
+        Returns (renders queued, files removed).
+        """
+        favorites = self.favorites.snapshot()
+        queued = 0
+        for favorite in favorites:
+            if favorite.get('audio_filename') and not self.is_current(favorite):
+                self.ensure(favorite)
+                queued += 1
+        in_use = {f.get('audio_filename') for f in favorites} | {self.filename_for(f) for f in favorites}
+        removed = 0
+        for name in os.listdir(self.directory):
+            if name.startswith(FILE_PREFIX) and name not in in_use:
+                try:
+                    os.remove(self.path(name))
+                    removed += 1
+                except OSError:
+                    pass
+        return queued, removed
+
+    def discard(self, favorite):
+        """Forget a deleted favorite's audio."""
+        with self._lock:
+            self._forget(favorite['id'])
+        if favorite.get('audio_filename'):
+            self._remove_if_unused(favorite['audio_filename'])
+
+    def _remove_if_unused(self, name):
+        if any(f.get('audio_filename') == name for f in self.favorites.snapshot()):
+            return
+        try:
+            os.remove(self.path(name))
+        except OSError:
+            pass
+
+    # --- Playback ---
+
+    def get(self, favorite_id):
+        """
+        Decoded audio for a favorite, from memory when possible. Audio from
+        before a settings change is still returned while the new one renders.
+        None if the favorite has no audio yet (a render is queued).
+        """
+        favorite = self.favorites.get(favorite_id)
+        if favorite is None:
+            return None
+        if not self.is_current(favorite):
+            self.ensure(favorite)
+        name = favorite.get('audio_filename')
+        with self._lock:
+            cached = self._decoded.get(favorite_id)
+            if cached is not None and cached[0] == name:
+                self._decoded.move_to_end(favorite_id)
+                self.hits += 1
+                return cached[1]
+        if not name or not os.path.exists(self.path(name)):
+            return None
+        decoded = self.decode(self.path(name))
+        with self._lock:
+            self.misses += 1
+            self._forget(favorite_id)
+            size = self.decoded_size(decoded)
+            self._decoded[favorite_id] = (name, decoded, size)
+            self._decoded_bytes += size
+            while self._decoded_bytes > self.cache_bytes and len(self._decoded) > 1:
+                self._forget(next(iter(self._decoded)))
+        return decoded
+
+    def preload(self, favorites):
+        """Decode favorites' audio into memory ahead of time (e.g. the quick phrase bar)."""
+        for favorite in favorites:
+            if favorite.get('audio_filename'):
+                self.get(favorite['id'])
+
+    def _forget(self, favorite_id):
+        cached = self._decoded.pop(favorite_id, None)
+        if cached is not None:
+            self._decoded_bytes -= cached[2]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'decoded_in_memory': len(self._decoded),
+                'decoded_bytes': self._decoded_bytes,
+                'memory_hits': self.hits,
+                'decodes': self.misses,
+                'renders': self.renders,
+                'render_failures': self.render_failures,
+                'adopted_clips': self.adopted,
+                'pending_renders': len(self._pending),
+            }
+
+    # --- Background rendering ---
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._worker and self._worker.is_alive():
+                return
+            self._worker = threading.Thread(target=self._render_loop, name="favorite-audio", daemon=True)
+            self._worker.start()
+
+    def _render_loop(self):
+        while True:
+            favorite_id = self._queue.get()
+            try:
+                self._render_one(favorite_id)
+            except Exception as e:
+                print(f"Error rendering favorite {favorite_id}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _render_one(self, favorite_id):
+        favorite = self.favorites.get(favorite_id)
+        failed = False
+        if favorite is not None and not self.is_current(favorite):
+            if self.gate is not None:
+                self.gate.wait_idle()
+            name = self.filename_for(favorite)
+            temp_path = self.path(name + ".part")
+            if self.render(favorite, temp_path) and os.path.exists(temp_path):
+                os.replace(temp_path, self.path(name))
+                self.renders += 1
+                favorite = self._attach(favorite, name)
+            else:
+                failed = True
+                self.render_failures += 1
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                print(f"Could not render audio for favorite {favorite_id}")
+
+        with self._lock:
+            self._pending.discard(favorite_id)
+            callbacks = self._callbacks.pop(favorite_id, [])
+        if favorite is None or failed:
+            return
+        if not self.is_current(favorite):
+            # Settings changed again while rendering; render once more and report then
+            for callback in callbacks:
+                self.ensure(favorite, callback)
+            self.ensure(favorite)
+            return
+        for callback in callbacks:
+            try:
+                callback(favorite)
+            except Exception as e:
+                print(f"Favorite audio callback failed: {e}")
+
+    def wait(self):
+        """Block until every queued render has finished."""
+        self._queue.join()
@@ -0,0 +1,187 @@
+"""
+Process-wide in-memory cache of the favorites list.
+
+The sorted favorites are held as an immutable tuple, so the UI can ask for
+them on every refresh without touching SQLite: repeated reads return the
+very same tuple object (and the same cached head slices for a given limit)
+until something changes. Our own adds, updates and deletes patch the snapshot
+directly. Changes made by another VoiceMaster instance or by hand with the
+sqlite3 shell are picked up by watching the database files (inotify on
+Linux, mtime polling elsewhere) and reloading, but only when SQLite's
+data_version says another connection really committed something.
+"""
+
+import os
+import sqlite3
+import threading
+
+from file_watch import FileWatcher, FILE_WATCH_POLL_SECONDS
+
+FAVORITES_WATCH = os.getenv("FAVORITES_WATCH", "true").lower() == "true"
+
+
+def _sort_key(favorite):
+    return (favorite['timestamp'], favorite['id'])
+
+
+class FavoritesCache:
+    """Snapshot cache over a FavoritesStore, reloaded when the database changes on disk."""
+
+    def __init__(self, store, watch=FAVORITES_WATCH, use_inotify=True, poll_interval=FILE_WATCH_POLL_SECONDS):
+        self.store = store
+        self.watch = watch
+        self.reloads = 0
+        self.version = 0          # Bumped on every change to the snapshot
+        self._state = None        # (favorites tuple, {limit: head tuple}, audio filenames tuple)
+        self._lock = threading.RLock()
+        self._listeners = []
+        self._data_version_conn = None
+        self._known_data_version = None
+        self._watcher = FileWatcher([store.db_path, store.db_path + "-wal"], self.refresh,
+                                    poll_interval=poll_interval, use_inotify=use_inotify)
+
+    def start(self):
+        self._load()
+        if self.watch:
+            self._watcher.start()
+        return self
+
+    def stop(self):
+        if self._watcher.mode is not None:
+            self._watcher.stop()
+        with self._lock:
+            if self._data_version_conn is not None:
+                self._data_version_conn.close()
+                self._data_version_conn = None
+
+    @property
+    def watch_mode(self):
+        return self._watcher.mode
+
+    def add_listener(self, callback):
+        """callback() is called (from a background thread for external changes) after every change."""
+        self._listeners.append(callback)
+
+    # --- Reading (hot path) ---
+
+    def snapshot(self, limit=None):
+        """
+        Favorites newest first, as a tuple shared by every caller until the
+        next change. The favorite dicts are shared too and must not be modified.
+        """
+        state = self._state
+        if state is None:
+            state = self._load()
+        favorites, heads, _ = state
+        if limit is None or limit >= len(favorites):
+            return favorites
+        head = heads.get(limit)
+        if head is None:
+            head = heads[limit] = favorites[:limit]
+        return head
+
+    def audio_filenames(self):
+        state = self._state
+        if state is None:
+            state = self._load()
+        return state[2]
+
+    # --- Writing through the cache ---
+
+    def get(self, favorite_id):
+        for favorite in self.snapshot():
+            if favorite['id'] == favorite_id:
+                return favorite
+        return None
+
+    def add(self, text, voice_id=None, voice_name=None, audio_filename=None, timestamp=None, settings=None):
+        with self._lock:
+            favorites = self.snapshot()
+            before = self._versions()
+            favorite = self.store.add(text, voice_id, voice_name, audio_filename, timestamp, settings)
+            if not favorites or _sort_key(favorite) >= _sort_key(favorites[0]):
+                favorites = (favorite,) + favorites
+            else:
+                favorites = tuple(sorted(favorites + (favorite,), key=_sort_key, reverse=True))
+            self._publish_write(favorites, before)
+        return favorite
+
+    def update(self, favorite_id, **fields):
+        """Change a favorite's audio_filename / settings; returns the updated favorite or None."""
+        with self._lock:
+            favorites = list(self.snapshot())
+            before = self._versions()
+            if not self.store.update(favorite_id, **fields):
+                return None
+            updated = None
+            for i, favorite in enumerate(favorites):
+                if favorite['id'] == favorite_id:
+                    updated = favorites[i] = {**favorite, **fields}  # Snapshot dicts are shared, never mutated
+            self._publish_write(tuple(favorites), before)
+        return updated
+
+    def delete(self, favorite_id):
+        with self._lock:
+            favorites = self.snapshot()
+            before = self._versions()
+            deleted = self.store.delete(favorite_id)
+            if deleted:
+                self._publish_write(tuple(f for f in favorites if f['id'] != favorite_id), before)
+        return deleted
+
+    # --- Invalidation ---
+
+    def refresh(self):
+        """Reload if another connection has committed since we last looked. Returns True if reloaded."""
+        with self._lock:
+            if self._state is not None and self._data_version() == self._known_data_version:
+                return False
+            self._load()
+        return True
+
+    def _data_version(self):
+        # data_version on a connection changes only when *other* connections
+        # commit, which includes our store's own connections, other processes
+        # and the sqlite3 shell. WAL checkpoints and reads leave it alone.
+        if self._data_version_conn is None:
+            self._data_version_conn = sqlite3.connect(self.store.db_path, timeout=10, check_same_thread=False)
+        return self._data_version_conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _load(self):
+        with self._lock:
+            version = self._data_version()
+            favorites = tuple(self.store.list())
+            self.reloads += 1
+            return self._publish(favorites, data_version=version)
+
+    def _versions(self):
+        """Taken before one of our writes, for _publish_write(). The store's is read first so no gap is left."""
+        store_version = self.store.data_version()
+        return self._data_version(), store_version
+
+    def _publish_write(self, favorites, before):
+        """
+        Publish the snapshot patched with our own write, unless another
+        connection committed since the snapshot was loaded or around the
+        write. data_version counts several commits between two reads as one
+        change, so ours cannot be told apart by how far it moved; instead the
+        store's writing connection, which never counts its own commits, is
+        asked whether anyone else committed meanwhile.
+        """
+        known, store_version = before
+        version = self._data_version()
+        if known != self._known_data_version or self.store.data_version() != store_version:
+            return self._load()
+        return self._publish(favorites, data_version=version)
+
+    def _publish(self, favorites, data_version):
+        audio = tuple(f['audio_filename'] for f in favorites if f.get('audio_filename'))
+        self._state = state = (favorites, {}, audio)
+        self._known_data_version = data_version
+        self.version += 1
+        for callback in list(self._listeners):
+            try:
+                callback()
+            except Exception as e:
+                print(f"Favorites listener failed: {e}")
+        return state
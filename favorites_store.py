@@ -0,0 +1,238 @@
+"""
+SQLite store for TTS favorites.
+
+Each add or delete is one small transaction on an indexed table instead of
+parsing and rewriting the whole favorites JSON file, and listing the newest
+favorites walks the timestamp index. The old tts_favorites.json is imported
+once, on first use, and then renamed so it is not imported again.
+
+Each row also carries a hash of its content (text, voice and settings),
+indexed, so imports can skip favorites that already exist without loading
+the table.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+FAVORITES_DB_PATH = os.getenv("FAVORITES_DB", "tts_favorites.db")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS favorites (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    text TEXT NOT NULL,
+    voice_id TEXT,
+    voice_name TEXT,
+    audio_filename TEXT,
+    created_at TEXT,
+    timestamp REAL NOT NULL,
+    settings TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_favorites_timestamp ON favorites(timestamp, id);
+"""
+
+_COLUMNS = ("id", "text", "voice_id", "voice_name", "audio_filename", "created_at", "timestamp", "settings")
+_SELECT = "SELECT " + ", ".join(_COLUMNS) + " FROM favorites"
+_UPDATABLE = ("audio_filename", "settings")
+_INSERT = ("INSERT INTO favorites (text, voice_id, voice_name, audio_filename, created_at, timestamp, "
+           "settings, content_hash) VALUES (?, ?, ?, ?, ?, ?, ?, ?)")
+
+
+def content_hash(text, voice_id=None, settings=None):
+    """Identifies what a favorite says and how (whitespace in the text is ignored)."""
+    payload = json.dumps([" ".join(text.split()), voice_id, settings or {}], sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def _row_to_dict(row):
+    favorite = dict(zip(_COLUMNS, row))
+    if favorite['settings']:
+        try:
+            favorite['settings'] = json.loads(favorite['settings'])
+        except ValueError:
+            favorite['settings'] = None
+    return favorite
+
+
+class FavoritesStore:
+    """Transactional favorites table with a timestamp index."""
+
+    def __init__(self, db_path=FAVORITES_DB_PATH):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._schema_ready = False
+
+    def _conn(self):
+        """Per-thread connection (WAL lets readers run alongside a writer)."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            if not self._schema_ready:
+                conn.executescript(_SCHEMA)
+                columns = {row[1] for row in conn.execute("PRAGMA table_info(favorites)")}
+                if "settings" not in columns:
+                    # Databases created before favorites kept their voice settings
+                    with conn:
+                        conn.execute("ALTER TABLE favorites ADD COLUMN settings TEXT")
+                if "content_hash" not in columns:
+                    with conn:
+                        conn.execute("ALTER TABLE favorites ADD COLUMN content_hash TEXT")
+                        rows = conn.execute("SELECT id, text, voice_id, settings FROM favorites").fetchall()
+                        conn.executemany("UPDATE favorites SET content_hash = ? WHERE id = ?", [
+                            (content_hash(text, voice_id, json.loads(settings) if settings else None), fav_id)
+                            for fav_id, text, voice_id, settings in rows])
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_favorites_content ON favorites(content_hash)")
+                self._schema_ready = True
+            self._local.conn = conn
+        return conn
+
+    # --- Migration ---
+
+    def migrate_json(self, json_path):
+        """
+        Import favorites from the old JSON file if this store is empty.
+        The file is renamed to <name>.migrated afterwards. Returns the number imported.
+        """
+        if not os.path.exists(json_path) or self.count():
+            return 0
+        try:
+            with open(json_path, 'r', encoding='utf-8') as f:
+                favorites = json.load(f)
+        except (IOError, ValueError) as e:
+            print(f"Could not migrate favorites from {json_path}: {e}")
+            return 0
+
+        rows = []
+        seen_ids = set()
+        for fav in favorites:
+            if not isinstance(fav, dict) or not fav.get('text'):
+                continue
+            fav_id = fav.get('id')
+            if not isinstance(fav_id, int) or fav_id in seen_ids:
+                fav_id = None  # Old ids came from int(time.time()) and could collide
+            seen_ids.add(fav_id)
+            timestamp = fav.get('timestamp') or fav_id or time.time()
+            rows.append((fav_id, fav['text'], fav.get('voice_id'), fav.get('voice_name'),
+                         fav.get('audio_filename'), fav.get('created_at'), float(timestamp),
+                         content_hash(fav['text'], fav.get('voice_id'))))
+        conn = self._conn()
+        with self._write_lock, conn:
+            conn.executemany("INSERT INTO favorites (id, text, voice_id, voice_name, audio_filename, "
+                             "created_at, timestamp, content_hash) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        os.replace(json_path, json_path + ".migrated")
+        print(f"Migrated {len(rows)} favorites from {json_path} to {self.db_path}")
+        return len(rows)
+
+    # --- Writing ---
+
+    def add(self, text, voice_id=None, voice_name=None, audio_filename=None, timestamp=None, settings=None):
+        """Insert a favorite and return it (with its new id)."""
+        timestamp = time.time() if timestamp is None else timestamp
+        created_at = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(timestamp))
+        conn = self._conn()
+        with self._write_lock, conn:
+            cursor = conn.execute(_INSERT, (text, voice_id, voice_name, audio_filename, created_at, timestamp,
+                                            json.dumps(settings) if settings is not None else None,
+                                            content_hash(text, voice_id, settings)))
+        return dict(zip(_COLUMNS, (cursor.lastrowid, text, voice_id, voice_name,
+                                   audio_filename, created_at, timestamp, settings)))
+
+    def add_many(self, favorites):
+        """
+        Insert favorite dicts (text, voice_id, voice_name, audio_filename,
+        created_at, timestamp, settings and optionally content_hash) in one
+        transaction. Returns the count.
+        """
+        rows = []
+        for fav in favorites:
+            timestamp = fav.get('timestamp') or time.time()
+            created_at = fav.get('created_at') or time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(timestamp))
+            settings = fav.get('settings')
+            rows.append((fav['text'], fav.get('voice_id'), fav.get('voice_name'), fav.get('audio_filename'),
+                         created_at, float(timestamp), json.dumps(settings) if settings is not None else None,
+                         fav.get('content_hash') or content_hash(fav['text'], fav.get('voice_id'), settings)))
+        conn = self._conn()
+        with self._write_lock, conn:
+            conn.executemany(_INSERT, rows)
+        return len(rows)
+
+    def update(self, favorite_id, **fields):
+        """Change a favorite's audio_filename and/or settings. Returns True if it exists."""
+        unknown = set(fields) - set(_UPDATABLE)
+        if unknown:
+            raise ValueError(f"Cannot update favorite fields: {', '.join(sorted(unknown))}")
+        if not fields:
+            return self.get(favorite_id) is not None
+        if 'settings' in fields:
+            favorite = self.get(favorite_id)
+            if favorite is None:
+                return False
+            fields['content_hash'] = content_hash(favorite['text'], favorite['voice_id'], fields['settings'])
+            if fields['settings'] is not None:
+                fields['settings'] = json.dumps(fields['settings'])
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        conn = self._conn()
+        with self._write_lock, conn:
+            return conn.execute(f"UPDATE favorites SET {assignments} WHERE id = ?",
+                                (*fields.values(), favorite_id)).rowcount > 0
+
+    def delete(self, favorite_id):
+        """Delete a favorite by id. Returns True if it existed."""
+        conn = self._conn()
+        with self._write_lock, conn:
+            return conn.execute("DELETE FROM favorites WHERE id = ?", (favorite_id,)).rowcount > 0
+
+    # --- Reading ---
+
+    def get(self, favorite_id):
+        row = self._conn().execute(_SELECT + " WHERE id = ?", (favorite_id,)).fetchone()
+        return _row_to_dict(row) if row else None
+
+    def list(self, limit=None, before=None):
+        """
+        Favorites newest first. Pass the last favorite's (timestamp, id) as
+        before= to fetch the next page.
+        """
+        sql, params = _SELECT, []
+        if before is not None:
+            sql += " WHERE (timestamp, id) < (?, ?)"
+            params.extend(before)
+        sql += " ORDER BY timestamp DESC, id DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [_row_to_dict(row) for row in self._conn().execute(sql, params)]
+
+    def count(self):
+        return self._conn().execute("SELECT COUNT(*) FROM favorites").fetchone()[0]
+
+    def data_version(self):
+        """PRAGMA data_version of this thread's connection: it moves only when another connection commits."""
+        return self._conn().execute("PRAGMA data_version").fetchone()[0]
+
+    def existing_hashes(self, hashes):
+        """The subset of content hashes that some favorite already has."""
+        hashes = list(hashes)
+        found = set()
+        conn = self._conn()
+        for start in range(0, len(hashes), 500):
+            chunk = hashes[start:start + 500]
+            found.update(row[0] for row in conn.execute(
+                f"SELECT content_hash FROM favorites WHERE content_hash IN ({', '.join('?' * len(chunk))})", chunk))
+        return found
+
+    def audio_filenames(self):
+        return [row[0] for row in self._conn().execute(
+            "SELECT audio_filename FROM favorites WHERE audio_filename IS NOT NULL AND audio_filename != ''")]
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
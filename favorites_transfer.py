@@ -0,0 +1,236 @@
+"""
+VoiceMaster Pro - Favorites import/export
+
+Moves favorites, optionally with their audio, between streaming PCs as one
+streaming archive. The archive is JSON Lines: a header line, then one line
+per favorite. With audio, each favorite's line is preceded by an audio
+line ({"type": "audio", "name", "size", "sha256"}) followed directly by
+that many raw MP3 bytes. Without audio the file is plain JSONL.
+
+Both directions stream: favorites are read from the database a page at a
+time and imported in batches, so memory stays flat with 100k favorites.
+Imports skip favorites whose content (text, voice and settings) already
+exists, using the store's content-hash index, and audio files that are
+already present.
+
+Examples:
+    python favorites_transfer.py export favorites.vmfav
+    python favorites_transfer.py export favorites.jsonl --no-audio
+    python favorites_transfer.py import favorites.vmfav
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+
+from favorites_store import FavoritesStore, content_hash
+
+FORMAT = "voicemaster-favorites"
+VERSION = 1
+CHUNK_SIZE = 64 * 1024
+_FIELDS = ("text", "voice_id", "voice_name", "settings", "timestamp", "created_at")
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _safe_audio_name(name):
+    """Audio names come from the archive; only plain file names are accepted."""
+    name = os.path.basename(name or "")
+    if not name or name.startswith(".") or name.endswith(".part"):
+        return None
+    return name
+
+
+def iter_favorites(store, page_size=1000):
+    """Every favorite, newest first, one page in memory at a time."""
+    before = None
+    while True:
+        page = store.list(limit=page_size, before=before)
+        yield from page
+        if len(page) < page_size:
+            return
+        before = (page[-1]['timestamp'], page[-1]['id'])
+
+
+def export_favorites(store, path, audio_dir=None, progress=None):
+    """
+    Write all favorites to path. With audio_dir, each favorite's audio file
+    is embedded too. progress(done, total) is called as the export runs.
+    Returns stats.
+    """
+    total = store.count()
+    stats = {'favorites': 0, 'audio_files': 0, 'audio_bytes': 0}
+    temp_path = path + ".part"
+    with open(temp_path, 'wb') as out:
+        header = {'type': FORMAT, 'version': VERSION, 'count': total, 'audio': audio_dir is not None,
+                  'exported_at': time.strftime("%Y-%m-%d %H:%M:%S")}
+        out.write(json.dumps(header).encode('utf-8') + b"\n")
+        for favorite in iter_favorites(store):
+            record = {field: favorite.get(field) for field in _FIELDS}
+            audio_path = (os.path.join(audio_dir, favorite['audio_filename'])
+                          if audio_dir and favorite.get('audio_filename') else None)
+            if audio_path and os.path.isfile(audio_path):
+                size = os.path.getsize(audio_path)
+                blob = {'type': 'audio', 'name': favorite['audio_filename'], 'size': size,
+                        'sha256': _file_sha256(audio_path)}
+                out.write(json.dumps(blob).encode('utf-8') + b"\n")
+                with open(audio_path, 'rb') as f:
+                    remaining = size
+                    while remaining:
+                        chunk = f.read(min(CHUNK_SIZE, remaining))
+                        if not chunk:
+                            raise IOError(f"{audio_path} shrank while exporting")
+                        out.write(chunk)
+                        remaining -= len(chunk)
+                record['audio'] = favorite['audio_filename']
+                stats['audio_files'] += 1
+                stats['audio_bytes'] += size
+            out.write(json.dumps(record, ensure_ascii=False).encode('utf-8') + b"\n")
+            stats['favorites'] += 1
+            if progress and stats['favorites'] % 1000 == 0:
+                progress(stats['favorites'], total)
+    os.replace(temp_path, path)
+    if progress:
+        progress(stats['favorites'], total)
+    return stats
+
+
+def _receive_audio(source, blob, audio_dir, stats):
+    """Copy an audio blob from the archive into audio_dir unless that exact file is there already."""
+    size = int(blob['size'])
+    name = _safe_audio_name(blob.get('name'))
+    target = os.path.join(audio_dir, name) if (audio_dir and name) else None
+    if target and os.path.exists(target) and os.path.getsize(target) == size:
+        if not blob.get('sha256') or _file_sha256(target) == blob['sha256']:
+            stats['audio_existing'] += 1
+            source.seek(size, os.SEEK_CUR)
+            return name
+    out = open(target + ".part", 'wb') if target else None
+    digest = hashlib.sha256()
+    remaining = size
+    try:
+        while remaining:
+            chunk = source.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                raise ValueError("archive ends inside an audio file")
+            digest.update(chunk)
+            if out:
+                out.write(chunk)
+            remaining -= len(chunk)
+    finally:
+        if out:
+            out.close()
+    if not target:
+        return None
+    if blob.get('sha256') and digest.hexdigest() != blob['sha256']:
+        os.remove(target + ".part")
+        stats['audio_corrupt'] += 1
+        print(f"Skipping corrupt audio {name} in favorites archive")
+        return None
+    os.replace(target + ".part", target)
+    stats['audio_files'] += 1
+    return name
+
+
+def import_favorites(store, path, audio_dir=None, progress=None, batch_size=500):
+    """
+    Add the favorites from an archive (or a plain JSONL file) to store,
+    skipping ones whose text, voice and settings already exist. Audio goes
+    into audio_dir. progress(done, total) is called as the import runs
+    (total is None if the file has no header). Returns stats.
+    """
+    stats = {'imported': 0, 'duplicates': 0, 'invalid': 0, 'audio_files': 0,
+             'audio_existing': 0, 'audio_corrupt': 0}
+    total = None
+    done = 0
+    batch = []
+
+    def flush():
+        existing = store.existing_hashes({h for h, _ in batch})
+        fresh = {}
+        for digest, favorite in batch:
+            if digest in existing or digest in fresh:
+                stats['duplicates'] += 1
+            else:
+                fresh[digest] = favorite
+        if fresh:
+            stats['imported'] += store.add_many(fresh.values())
+        batch.clear()
+
+    with open(path, 'rb') as source:
+        pending_audio = None
+        for line_number, line in enumerate(iter(source.readline, b""), 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                raise ValueError(f"{path}: line {line_number} is not JSON")
+            kind = record.get('type') if isinstance(record, dict) else None
+            if kind == FORMAT:
+                if record.get('version', VERSION) > VERSION:
+                    raise ValueError(f"{path} was written by a newer VoiceMaster (version {record['version']})")
+                total = record.get('count')
+                continue
+            if kind == 'audio':
+                pending_audio = _receive_audio(source, record, audio_dir, stats)
+                continue
+
+            done += 1
+            audio, pending_audio = pending_audio, None
+            if not isinstance(record, dict) or not isinstance(record.get('text'), str) or not record['text'].strip():
+                stats['invalid'] += 1
+                continue
+            favorite = {field: record.get(field) for field in _FIELDS}
+            if not isinstance(favorite['settings'], dict):
+                favorite['settings'] = None
+            if audio and audio == _safe_audio_name(record.get('audio')):
+                favorite['audio_filename'] = audio
+            favorite['content_hash'] = content_hash(favorite['text'], favorite['voice_id'], favorite['settings'])
+            batch.append((favorite['content_hash'], favorite))
+            if len(batch) >= batch_size:
+                flush()
+                if progress:
+                    progress(done, total)
+    if batch:
+        flush()
+    if progress:
+        progress(done, total)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import or export VoiceMaster favorites")
+    parser.add_argument("action", choices=("export", "import"))
+    parser.add_argument("path", help="Archive file (.vmfav) or plain .jsonl")
+    parser.add_argument("--no-audio", action="store_true", help="Export without audio files")
+    parser.add_argument("--audio-dir", default="tts_favorites", help="Favorite audio folder (default: tts_favorites)")
+    args = parser.parse_args()
+
+    def report(done, total):
+        print(f"\r{done:,}" + (f" / {total:,}" if total else "") + " favorites", end="", flush=True)
+
+    store = FavoritesStore()
+    if args.action == "export":
+        stats = export_favorites(store, args.path, None if args.no_audio else args.audio_dir, report)
+        print(f"\nExported {stats['favorites']:,} favorites and {stats['audio_files']:,} audio files "
+              f"({stats['audio_bytes'] / 1024 / 1024:.1f} MB) to {args.path}")
+    else:
+        os.makedirs(args.audio_dir, exist_ok=True)
+        stats = import_favorites(store, args.path, args.audio_dir, report)
+        print(f"\nImported {stats['imported']:,} favorites ({stats['duplicates']:,} duplicates skipped), "
+              f"{stats['audio_files']:,} new audio files")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+"""
+Watch a few files for changes made by other processes.
+
+On Linux this uses inotify (through ctypes, no extra dependency) on the
+files' directories, so a change is noticed within milliseconds without
+polling. Elsewhere, or if inotify is unavailable, the files' mtime and size
+are polled instead. Bursts of events are debounced into one callback.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+
+FILE_WATCH_POLL_SECONDS = float(os.getenv("FILE_WATCH_POLL_SECONDS", "1.0"))
+DEBOUNCE_SECONDS = 0.05
+
+# inotify event masks
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+def _load_inotify():
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+def file_signature(paths):
+    """(mtime_ns, size) of every path, None for missing files."""
+    signature = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            signature.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            signature.append(None)
+    return tuple(signature)
+
+
+class FileWatcher:
+    """Calls callback() from a background thread whenever one of the paths changes."""
+
+    def __init__(self, paths, callback, poll_interval=FILE_WATCH_POLL_SECONDS, use_inotify=True):
+        self.paths = [os.path.abspath(p) for p in paths]
+        self.callback = callback
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify
+        self.mode = None
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._fd = None
+        self._signature = None
+
+    def start(self):
+        fd = self._open_inotify() if self.use_inotify else None
+        if fd is not None:
+            self._fd = fd
+            self.mode = "inotify"
+            target = self._inotify_loop
+        else:
+            self.mode = "poll"
+            self._signature = file_signature(self.paths)
+            target = self._poll_loop
+        self._thread = threading.Thread(target=target, name="file-watch", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def _fire(self):
+        try:
+            self.callback()
+        except Exception as e:
+            print(f"File watch callback failed: {e}")
+
+    # --- inotify ---
+
+    def _open_inotify(self):
+        libc = _load_inotify()
+        if libc is None:
+            return None
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            return None
+        for directory in {os.path.dirname(p) for p in self.paths}:
+            if libc.inotify_add_watch(fd, directory.encode(), _WATCH_MASK) < 0:
+                os.close(fd)
+                return None
+        return fd
+
+    def _inotify_loop(self):
+        names = {os.path.basename(p).encode() for p in self.paths}
+        while not self._stop_event.is_set():
+            ready, _, _ = select.select([self._fd], [], [], 0.5)
+            if not ready or not self._read_matches(names):
+                continue
+            # Debounce: swallow the rest of the burst, then report once
+            while select.select([self._fd], [], [], DEBOUNCE_SECONDS)[0]:
+                self._read_matches(names)
+            self._fire()
+
+    def _read_matches(self, names):
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return False
+        matched, offset = False, 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            _, _, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            name = data[offset + _EVENT_HEADER.size:offset + _EVENT_HEADER.size + length].rstrip(b'\0')
+            matched = matched or name in names
+            offset += _EVENT_HEADER.size + length
+        return matched
+
+    # --- Polling fallback ---
+
+    def _poll_loop(self):
+        while not self._stop_event.wait(self.poll_interval):
+            current = file_signature(self.paths)
+            if current != self._signature:
+                self._signature = current
+                self._fire()
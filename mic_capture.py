@@ -0,0 +1,480 @@
+"""
+Always-open microphone capture with energy-based voice activity detection.
+
+Opening a microphone, calibrating for ambient noise and then waiting in a
+blocking listen() cost about a second before every dictation. Instead the
+microphone stays open (a stream on the shared PortAudio instance from
+audio_devices, reopened by device name when devices are re-scanned): the
+stream callback copies each buffer into a ring
+buffer (a single writer and reader share it through a monotonically
+increasing sample counter, no locks), and a worker thread cuts the stream
+into utterances as it arrives.
+
+Segmentation works on 20 ms frames. Frame energies for each new block are
+computed at once with numpy. The noise floor is the quietest frame of the
+last 1.5 seconds (a rolling minimum, so it follows a fan spinning up but
+not the speaker), speech starts when frames rise START_DB above it and
+ends after MIC_END_SILENCE_MS below END_DB. Every utterance includes
+MIC_PREROLL_MS of audio from before speech was detected, so the first
+syllable is never clipped, and it is handed out as soon as the trailing
+silence is over.
+"""
+
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+FRAME_MS = 20
+FRAME_SAMPLES = SAMPLE_RATE * FRAME_MS // 1000
+RING_SECONDS = 60
+MIC_PREROLL_MS = int(os.getenv("MIC_PREROLL_MS", "300"))
+MIC_END_SILENCE_MS = int(os.getenv("MIC_END_SILENCE_MS", "600"))
+MIC_MAX_UTTERANCE_SECONDS = float(os.getenv("MIC_MAX_UTTERANCE_SECONDS", "30"))
+START_DB = 12.0          # Above the noise floor to start speech
+END_DB = 6.0             # Above the noise floor to count as still speaking
+START_FRAMES = 2         # Consecutive loud frames before speech starts
+MIN_SPEECH_MS = 150      # Shorter bursts (clicks, bumps) are dropped
+FLOOR_WINDOW_MS = 1500   # The noise floor is the quietest frame in this window...
+FLOOR_BIAS_DB = 2.0      # ...plus this, since the minimum sits below the average noise
+FLOOR_MIN_DB = -90.0
+
+
+def frame_energies(samples):
+    """Energy in dBFS of each whole 20 ms frame of int16 samples."""
+    frames = len(samples) // FRAME_SAMPLES
+    if not frames:
+        return np.empty(0)
+    block = samples[:frames * FRAME_SAMPLES].astype(np.float32).reshape(frames, FRAME_SAMPLES) / 32768.0
+    return 10.0 * np.log10(np.einsum('ij,ij->i', block, block) / FRAME_SAMPLES + 1e-10)
+
+
+class RingBuffer:
+    """
+    Fixed-size sample buffer shared by one writer (the audio callback) and
+    one reader. Positions are absolute sample counts; the writer publishes
+    new samples by advancing `written` after copying them.
+    """
+
+    def __init__(self, seconds=RING_SECONDS, rate=SAMPLE_RATE):
+        self.capacity = int(seconds * rate)
+        self._data = np.zeros(self.capacity, dtype=np.int16)
+        self.written = 0
+
+    def write(self, samples):
+        n = len(samples)
+        if n > self.capacity:
+            samples = samples[-self.capacity:]
+            self.written += n - self.capacity
+            n = self.capacity
+        start = self.written % self.capacity
+        first = min(n, self.capacity - start)
+        self._data[start:start + first] = samples[:first]
+        self._data[:n - first] = samples[first:]
+        self.written += n
+
+    def read(self, start, end):
+        """Copy samples [start, end). Raises ValueError if they have been overwritten."""
+        end = min(end, self.written)
+        if start < self.written - self.capacity:
+            raise ValueError("audio is no longer in the ring buffer")
+        if end <= start:
+            return np.empty(0, dtype=np.int16)
+        a, b = start % self.capacity, end % self.capacity
+        out = self._data[a:b].copy() if a < b else np.concatenate((self._data[a:], self._data[:b]))
+        if start < self.written - self.capacity:  # Overwritten while copying
+            raise ValueError("audio is no longer in the ring buffer")
+        return out
+
+
+class Utterance:
+    """One stretch of speech: PCM samples plus where it sits in the stream."""
+
+    __slots__ = ('samples', 'start', 'end', 'speech_start', 'speech_end', 'detected_at', 'speech_ended_at')
+
+    def __init__(self, samples, start, end, speech_start, speech_end, detected_at, speech_ended_at=None):
+        self.samples = samples
+        self.start = start                  # Sample positions, including pre-roll and tail
+        self.end = end
+        self.speech_start = speech_start    # Where speech was detected
+        self.speech_end = speech_end
+        self.detected_at = detected_at      # time.monotonic() when the utterance was complete
+        # time.monotonic() when the last voiced frame was heard
+        self.speech_ended_at = detected_at if speech_ended_at is None else speech_ended_at
+
+    @property
+    def duration(self):
+        return (self.end - self.start) / SAMPLE_RATE
+
+    @property
+    def speech_started_at(self):
+        """time.monotonic() when speech was detected."""
+        return self.speech_ended_at - (self.speech_end - self.speech_start) / SAMPLE_RATE
+
+    def pcm_bytes(self):
+        return self.samples.tobytes()
+
+
+class Segmenter:
+    """Turns a stream of frame energies into (start, end) speech segments with a rolling noise floor."""
+
+    def __init__(self, preroll_ms=MIC_PREROLL_MS, end_silence_ms=MIC_END_SILENCE_MS,
+                 max_seconds=MIC_MAX_UTTERANCE_SECONDS, min_speech_ms=MIN_SPEECH_MS):
+        self.preroll = preroll_ms // FRAME_MS
+        self.min_speech = max(1, min_speech_ms // FRAME_MS)
+        self.max_frames = int(max_seconds * 1000 / FRAME_MS)
+        self.set_end_silence(end_silence_ms / 1000.0)
+        self.floor_window = FLOOR_WINDOW_MS // FRAME_MS
+        self.floor = None
+        self.frame = 0            # Index of the next frame
+        self._minima = deque()    # (frame, energy), increasing energy: the rolling minimum is first
+        self._loud_run = 0
+        self._speech_start = None
+        self._last_voiced = None
+
+    def set_end_silence(self, seconds):
+        self.end_silence = max(1, int(seconds * 1000 / FRAME_MS))
+
+    @property
+    def in_speech(self):
+        return self._speech_start is not None
+
+    def current(self):
+        """(first frame including pre-roll, last voiced frame + 1) of the speech in progress, or None."""
+        speech_start, last_voiced = self._speech_start, self._last_voiced
+        if speech_start is None:
+            return None
+        return max(0, speech_start - self.preroll), last_voiced + 1
+
+    def cut(self):
+        """
+        End the speech in progress without emitting it (the caller took the audio);
+        if the speaker keeps talking, that starts a new segment. Returns the speech
+        start frame, or None.
+        """
+        speech_start = self._speech_start
+        self._speech_start = None
+        self._loud_run = 0
+        return speech_start
+
+    def feed(self, energies):
+        """
+        Process consecutive frame energies. Returns finished segments as
+        (first frame, end frame, speech start frame, last voiced frame + 1).
+        """
+        segments = []
+        minima = self._minima
+        floor = self.floor
+        for energy in energies.tolist():
+            frame = self.frame
+            self.frame += 1
+            while minima and minima[-1][1] >= energy:
+                minima.pop()
+            minima.append((frame, energy))
+            if minima[0][0] <= frame - self.floor_window:
+                minima.popleft()
+            floor = max(minima[0][1] + FLOOR_BIAS_DB, FLOOR_MIN_DB)
+
+            if self._speech_start is None:
+                if energy > floor + START_DB:
+                    self._loud_run += 1
+                    if self._loud_run >= START_FRAMES:
+                        self._speech_start = frame - self._loud_run + 1
+                        self._last_voiced = frame
+                else:
+                    self._loud_run = 0
+                continue
+
+            if energy > floor + END_DB:
+                self._last_voiced = frame
+            too_long = frame + 1 - self._speech_start >= self.max_frames
+            if frame - self._last_voiced >= self.end_silence or too_long:
+                voiced_end = self._last_voiced + 1
+                if voiced_end - self._speech_start >= self.min_speech:
+                    start = max(0, self._speech_start - self.preroll)
+                    end = min(frame + 1, voiced_end + self.preroll)
+                    segments.append((start, end, self._speech_start, voiced_end))
+                self._speech_start = None
+                self._loud_run = 0
+        self.floor = floor
+        return segments
+
+
+class MicCapture:
+    """
+    Keeps one input stream open and queues utterances as they end.
+    listen() returns the next utterance; nothing is opened per dictation.
+    """
+
+    def __init__(self, device_index=None, rate=SAMPLE_RATE, ring_seconds=RING_SECONDS, registry=None,
+                 **segmenter_options):
+        self.device_index = device_index
+        self.device_name = None
+        self.registry = registry
+        self.rate = rate
+        self.ring = RingBuffer(ring_seconds, rate)
+        self.segmenter = Segmenter(**segmenter_options)
+        self.utterances = queue.Queue()
+        self.dropped = 0
+        self._processed = 0
+        self._frame_base = 0      # Sample position of segmenter frame 0
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._segmenting = threading.Lock()   # Held while a finished segment is on its way to the queue
+        self._worker = None
+        self._stream = None
+        self._registered = False
+        self._live = False        # A microphone was asked for (not just start_processing)
+        self._lock = threading.RLock()
+
+    @property
+    def running(self):
+        return self._worker is not None and self._worker.is_alive()
+
+    def start(self):
+        """Open the microphone (once) and start segmenting in the background."""
+        with self._lock:
+            if self._stream is None and (self._live or not self.running):
+                self._open_stream()  # Also retries a microphone lost in a device refresh
+                self._live = True
+            if not self.running:
+                self._stop.clear()
+                self._worker = threading.Thread(target=self._segment_loop, name="mic-capture", daemon=True)
+                self._worker.start()
+        return self
+
+    def _open_stream(self):
+        if self.registry is None:
+            from audio_devices import DeviceRegistry
+            self.registry = DeviceRegistry()
+        if not self._registered:
+            self.registry.add_listener(self._release_stream, self._restore_stream)
+            self._registered = True
+        device = self.registry.get(self.device_index) if self.device_index is not None else None
+        self.device_name = device.name if device else None
+        self._stream = self.registry.open_input(self._on_audio, self.rate, 1, FRAME_SAMPLES, self.device_index)
+
+    def _close_stream(self):
+        stream, self._stream = self._stream, None
+        if stream is not None:
+            self.registry.close(stream)
+
+    def _release_stream(self):
+        with self._lock:
+            self._close_stream()
+
+    def _restore_stream(self):
+        """Reopen after the registry re-scanned devices; the index may have changed."""
+        with self._lock:
+            if not self._live:
+                return
+            self._close_stream()  # A stream opened while the refresh ran belongs to the old instance
+            if self.device_name:
+                device = self.registry.find(self.device_name)
+                if device is None:
+                    print(f"Microphone '{self.device_name}' is gone; using the default microphone")
+                self.device_index = device.index if device else None
+            self._open_stream()
+
+    def set_device(self, device_index):
+        """Switch microphones, keeping the buffered audio and noise floor."""
+        with self._lock:
+            if device_index == self.device_index:
+                return
+            self.device_index = device_index
+            if self._stream is not None:
+                self._close_stream()
+                self._open_stream()
+
+    def _on_audio(self, in_data, frame_count, time_info, status):
+        # Runs on PortAudio's thread: copy into the ring and wake the worker, nothing else
+        self.feed(np.frombuffer(in_data, dtype=np.int16))
+        return None, 0  # paContinue
+
+    def feed(self, samples):
+        """Add captured samples (also how tests and other sources push audio)."""
+        self.ring.write(samples)
+        self._wake.set()
+
+    def stop(self):
+        with self._lock:
+            self._stop.set()
+            self._wake.set()
+            self._live = False
+            self._close_stream()
+            worker, self._worker = self._worker, None
+        if worker is not None:
+            worker.join(timeout=2)
+
+    def start_processing(self):
+        """Segment audio pushed with feed() without opening a microphone."""
+        with self._lock:
+            if not self.running:
+                self._stop.clear()
+                self._worker = threading.Thread(target=self._segment_loop, name="mic-capture", daemon=True)
+                self._worker.start()
+        return self
+
+    def _segment_loop(self):
+        while not self._stop.is_set():
+            self._wake.wait(0.5)
+            self._wake.clear()
+            try:
+                self.process()
+            except Exception as e:
+                print(f"Error segmenting microphone audio: {e}")
+
+    def process(self):
+        """Segment everything written since the last call. Returns the number of utterances found."""
+        with self._segmenting:
+            return self._process()
+
+    def _process(self):
+        written = self.ring.written
+        if written - self._processed > self.ring.capacity:
+            # Fell behind by more than the ring holds; skip ahead
+            self.dropped += written - self._processed - self.ring.capacity
+            self._processed = written - self.ring.capacity + FRAME_SAMPLES
+            self._processed -= self._processed % FRAME_SAMPLES
+        frames = (written - self._processed) // FRAME_SAMPLES
+        if not frames:
+            return 0
+        end = self._processed + frames * FRAME_SAMPLES
+        energies = frame_energies(self.ring.read(self._processed, end))
+        first_frame = self.segmenter.frame
+        base = self._frame_base = self._processed - first_frame * FRAME_SAMPLES
+        self._processed = end
+        found = 0
+        now = time.monotonic()
+        for start, stop, speech_start, speech_end in self.segmenter.feed(energies):
+            start_sample = max(base + start * FRAME_SAMPLES, written - self.ring.capacity, 0)
+            try:
+                samples = self.ring.read(start_sample, base + stop * FRAME_SAMPLES)
+            except ValueError:
+                continue
+            self.utterances.put(Utterance(samples, start_sample, base + stop * FRAME_SAMPLES,
+                                          base + speech_start * FRAME_SAMPLES,
+                                          base + speech_end * FRAME_SAMPLES, time.monotonic(),
+                                          now - (written - base - speech_end * FRAME_SAMPLES) / self.rate))
+            found += 1
+        return found
+
+    def current_speech(self):
+        """(start sample including pre-roll, end of the last voiced frame) of speech in progress, or None."""
+        base, current = self._frame_base, self.segmenter.current()
+        if current is None:
+            return None
+        return base + current[0] * FRAME_SAMPLES, base + current[1] * FRAME_SAMPLES
+
+    def _cut_speech(self, max_samples):
+        """End the speech in progress once max_samples of it are segmented; returns that Utterance, or None."""
+        with self._segmenting:
+            current = self.segmenter.current()
+            if current is None:
+                return None
+            base = self._frame_base
+            start = base + current[0] * FRAME_SAMPLES
+            end = start + max_samples
+            if self._processed < end:
+                return None
+            speech_start = base + self.segmenter.cut() * FRAME_SAMPLES
+            written = self.ring.written
+            try:
+                samples = self.ring.read(max(start, written - self.ring.capacity), end)
+            except ValueError:
+                return None
+            now = time.monotonic()
+            return Utterance(samples, start, end, speech_start, end, now, now - (written - end) / self.rate)
+
+    def pending_speech_start(self):
+        """
+        time.monotonic() when the earliest speech not yet taken from the
+        queue started (queued utterances and speech in progress), or None.
+        """
+        with self._segmenting:
+            with self.utterances.mutex:
+                starts = [utterance.speech_started_at for utterance in self.utterances.queue]
+            current = self.current_speech()
+            if current is not None:
+                starts.append(time.monotonic() - (self.ring.written - current[0]) / self.rate)
+        return min(starts) if starts else None
+
+    def override_segmenting(self, end_silence, max_seconds):
+        """
+        Segment with end_silence seconds of pause and at most max_seconds of
+        speech per utterance. Applied under the segmenting lock, so the worker
+        never sees one setting changed without the other. Returns the previous
+        settings for restore_segmenting().
+        """
+        with self._segmenting:
+            saved = self.segmenter.end_silence, self.segmenter.max_frames
+            self.segmenter.set_end_silence(end_silence)
+            self.segmenter.max_frames = int(max_seconds * 1000 / FRAME_MS)
+        return saved
+
+    def restore_segmenting(self, saved):
+        """Put back settings returned by override_segmenting()."""
+        with self._segmenting:
+            self.segmenter.end_silence, self.segmenter.max_frames = saved
+
+    @property
+    def tail_samples(self):
+        """Audio kept after the last voiced frame of every utterance."""
+        return self.segmenter.preroll * FRAME_SAMPLES
+
+    def drain(self):
+        """Forget utterances that ended before now."""
+        while True:
+            try:
+                self.utterances.get_nowait()
+            except queue.Empty:
+                return
+
+    def listen(self, timeout=None, max_duration=None, end_silence=None):
+        """
+        Wait for the next utterance that ends after this call.
+
+        Args:
+            timeout: Give up (return None) if nobody starts speaking within this many seconds
+            max_duration: Cut the utterance after this many seconds of speech
+            end_silence: Seconds of silence that end the utterance (default MIC_END_SILENCE_MS)
+        """
+        called_at = time.monotonic()
+        self.start()
+        if end_silence is None:
+            return self._next_utterance(called_at, timeout, max_duration)
+        configured = self.segmenter.end_silence
+        self.segmenter.set_end_silence(end_silence)
+        try:
+            return self._next_utterance(called_at, timeout, max_duration)
+        finally:
+            self.segmenter.end_silence = configured
+
+    def _next_utterance(self, called_at, timeout, max_duration):
+        self.drain()  # Speech that ended before the call
+        deadline = None if timeout is None else called_at + timeout
+        while True:
+            if deadline is not None and not self.segmenter.in_speech:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+            else:
+                remaining = 0.1
+            try:
+                utterance = self.utterances.get(timeout=min(remaining, 0.1))
+            except queue.Empty:
+                if max_duration is not None:
+                    # Continuous speech: stop at the limit instead of waiting for a pause
+                    utterance = self._cut_speech(int(max_duration * self.rate))
+                    if utterance is not None:
+                        return utterance
+                continue
+            if max_duration is not None and utterance.duration > max_duration:
+                keep = int(max_duration * self.rate)
+                utterance.samples = utterance.samples[:keep]
+                utterance.end = utterance.start + keep
+            return utterance
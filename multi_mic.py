@@ -0,0 +1,223 @@
+"""
+Several microphones at once, for co-hosts: one transcript with who said what.
+
+Each microphone is a channel with its own always-open capture (mic_capture:
+ring buffer and voice activity detection with its own noise floor) and its
+own recognizer thread, so nothing is shared between channels except the
+merger and the cost of N microphones is N times that of one.
+
+Recognition takes longer for long utterances, so a short remark from one
+mic can be recognized before a long sentence another mic started earlier.
+The merger emits transcript entries in the order the speech started: an
+entry is held until no channel can still produce one that started before
+it (no queued utterance, recognition in progress or speech in progress
+that began earlier). That holds an entry for at most as long as the
+earlier speech takes to finish and be recognized.
+
+MULTI_MIC_DEVICES assigns speakers to microphones by device name:
+
+    MULTI_MIC_DEVICES=Host=Blue Yeti; Guest=Realtek
+"""
+
+import heapq
+import itertools
+import os
+import threading
+import time
+
+MULTI_MIC_DEVICES = os.getenv("MULTI_MIC_DEVICES", "")
+MERGE_INTERVAL = 0.05
+
+
+def parse_mic_assignments(text):
+    """[(speaker, device name)] from "Speaker=device; Speaker=device"."""
+    assignments = []
+    for item in text.replace("\n", ";").split(";"):
+        speaker, sep, device = item.partition("=")
+        if sep and speaker.strip() and device.strip():
+            assignments.append((speaker.strip(), device.strip()))
+    return assignments
+
+
+class TranscriptEntry:
+    """One utterance of the merged transcript."""
+
+    __slots__ = ('speaker', 'text', 'started_at', 'ended_at', 'recognized_at', 'emitted_at')
+
+    def __init__(self, speaker, text, started_at, ended_at, recognized_at):
+        self.speaker = speaker
+        self.text = text
+        self.started_at = started_at      # time.monotonic() when the speech started and ended
+        self.ended_at = ended_at
+        self.recognized_at = recognized_at
+        self.emitted_at = None
+
+    def as_dict(self, since=0.0):
+        return {
+            'speaker': self.speaker,
+            'text': self.text,
+            'start': round(self.started_at - since, 2),
+            'end': round(self.ended_at - since, 2),
+        }
+
+
+class MicChannel:
+    """One microphone: its capture and the thread that recognizes its utterances in order."""
+
+    def __init__(self, speaker, capture, recognize):
+        """
+        Args:
+            speaker: Name shown in the transcript
+            capture: A started MicCapture for this microphone
+            recognize: recognize(int16 samples at 16 kHz) -> text
+        """
+        self.speaker = speaker
+        self.capture = capture
+        self.recognize = recognize
+        self.utterances = 0
+        self.audio_seconds = 0.0
+        self.recognize_seconds = 0.0
+        self._in_flight = None            # Start of the utterance being recognized
+        self._thread = None
+
+    def start(self, transcriber):
+        self.capture.drain()
+        self._thread = threading.Thread(target=self._run, args=(transcriber,),
+                                        name=f"mic-channel-{self.speaker}", daemon=True)
+        self._thread.start()
+
+    def join(self):
+        if self._thread is not None:
+            self._thread.join()
+
+    def watermark(self, now):
+        """Nothing this channel emits from now on started before this time."""
+        # The queue is read before _in_flight: _next() sets _in_flight before taking from the queue
+        pending = self.capture.pending_speech_start()
+        in_flight = self._in_flight
+        return min(t for t in (pending, in_flight, now) if t is not None)
+
+    def _next(self, stop):
+        queue = self.capture.utterances
+        with queue.not_empty:
+            if not queue.queue and not stop.is_set():
+                queue.not_empty.wait(0.1)
+            if not queue.queue:
+                return None
+            self._in_flight = queue.queue[0].speech_started_at
+        return queue.get_nowait()
+
+    def _run(self, transcriber):
+        while True:
+            utterance = self._next(transcriber._stop)
+            if utterance is None:
+                if transcriber._stop.is_set():
+                    return
+                continue
+            transcriber._utterance(self, utterance)
+            started = time.monotonic()
+            try:
+                text = (self.recognize(utterance.samples) or "").strip()
+            except Exception as e:
+                print(f"Error recognizing {self.speaker}: {e}")
+                text = ""
+            self.utterances += 1
+            self.audio_seconds += utterance.duration
+            self.recognize_seconds += time.monotonic() - started
+            if text:
+                transcriber._add(TranscriptEntry(self.speaker, text, utterance.speech_started_at,
+                                                 utterance.speech_ended_at, time.monotonic()))
+            self._in_flight = None
+
+    def stats(self):
+        return {
+            'speaker': self.speaker,
+            'device': self.capture.device_name,
+            'utterances': self.utterances,
+            'audio_seconds': round(self.audio_seconds, 1),
+            'recognize_seconds': round(self.recognize_seconds, 2),
+        }
+
+
+class MultiMicTranscriber:
+    """Runs the channels and merges their transcripts in speaking order."""
+
+    def __init__(self, channels, on_entry=None, on_utterance=None):
+        """
+        Args:
+            channels: MicChannel per microphone
+            on_entry: on_entry(entry) for each transcript entry, in the order spoken
+            on_utterance: on_utterance(speaker, utterance) as each utterance is cut,
+                          before recognition (e.g. per-speaker voice conversion)
+        """
+        self.channels = channels
+        self.on_entry = on_entry
+        self.on_utterance = on_utterance
+        self.transcript = []
+        self.started_at = None
+        self._heap = []
+        self._order = itertools.count()   # Tie-breaker for entries that started at the same time
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._merger = None
+
+    def start(self):
+        self.started_at = time.monotonic()
+        self._stop.clear()
+        for channel in self.channels:
+            channel.start(self)
+        self._merger = threading.Thread(target=self._merge_loop, name="mic-merge", daemon=True)
+        self._merger.start()
+        return self
+
+    def stop(self):
+        """Stop; utterances already cut are recognized and emitted before this returns."""
+        self._stop.set()
+        for channel in self.channels:
+            channel.join()
+        self._wake.set()
+        if self._merger is not None:
+            self._merger.join()
+            self._merger = None
+        return self.transcript
+
+    def stats(self):
+        return [channel.stats() for channel in self.channels]
+
+    def _utterance(self, channel, utterance):
+        if self.on_utterance is not None:
+            try:
+                self.on_utterance(channel.speaker, utterance)
+            except Exception as e:
+                print(f"Multi-mic utterance callback failed: {e}")
+
+    def _add(self, entry):
+        with self._lock:
+            heapq.heappush(self._heap, (entry.started_at, next(self._order), entry))
+        self._wake.set()
+
+    def _merge_loop(self):
+        while True:
+            self._wake.wait(MERGE_INTERVAL)
+            self._wake.clear()
+            done = self._stop.is_set() and not any(c._thread.is_alive() for c in self.channels)
+            now = time.monotonic()
+            watermark = float('inf') if done else min((c.watermark(now) for c in self.channels), default=now)
+            self._release(watermark)
+            if done:
+                return
+
+    def _release(self, watermark):
+        while True:
+            with self._lock:
+                if not self._heap or self._heap[0][0] > watermark:
+                    return
+                entry = heapq.heappop(self._heap)[2]
+            entry.emitted_at = time.monotonic()
+            self.transcript.append(entry)
+            if self.on_entry is not None:
+                try:
+                    self.on_entry(entry)
+                except Exception as e:
+                    print(f"Multi-mic transcript callback failed: {e}")
@@ -0,0 +1,230 @@
+"""
+Local stand-in for OBS's obs-websocket v5 server.
+
+Speaks the protocol subset VoiceMaster uses (Hello / Identify with
+authentication, Request, RequestBatch) and keeps a tiny in-memory model of
+inputs and scene items, so the OBS integration can be tested and
+benchmarked without OBS running.
+
+    python obs_standin.py --port 4455 --password secret
+"""
+
+import argparse
+import base64
+import json
+import os
+import socket
+import socketserver
+import threading
+
+from obs_websocket import (OP_HELLO, OP_IDENTIFY, OP_IDENTIFIED, OP_REQUEST, OP_REQUEST_RESPONSE,
+                           OP_REQUEST_BATCH, OP_REQUEST_BATCH_RESPONSE, WS_TEXT, WS_CLOSE, WS_PING, WS_PONG,
+                           obs_auth_string, ws_accept_key, ws_encode_frame, ws_read_message)
+
+# obs-websocket request status codes
+STATUS_SUCCESS = 100
+STATUS_UNKNOWN_REQUEST = 204
+STATUS_RESOURCE_NOT_FOUND = 600
+CLOSE_AUTHENTICATION_FAILED = 4009
+
+
+class ObsStandIn:
+    """Threaded obs-websocket stand-in with inputs, scenes and scene items."""
+
+    def __init__(self, host="127.0.0.1", port=4455, password=""):
+        self.host = host
+        self.port = port
+        self.password = password
+        self.inputs = {}   # input name -> settings dict
+        self.scenes = {}   # scene name -> {scene item id: [source name, enabled]}
+        self.media_actions = []
+        self.requests_handled = 0
+        self.messages_received = 0
+        self._connections = set()
+        self._lock = threading.Lock()
+        self._server = None
+
+    def add_scene_item(self, scene, source, enabled=False):
+        with self._lock:
+            items = self.scenes.setdefault(scene, {})
+            item_id = len(items) + 1
+            items[item_id] = [source, enabled]
+            return item_id
+
+    def scene_item_enabled(self, scene, source):
+        with self._lock:
+            for name, enabled in self.scenes.get(scene, {}).values():
+                if name == source:
+                    return enabled
+        return None
+
+    # --- Requests ---
+
+    def handle_request(self, request_type, data):
+        """Returns (status code, response data or None, comment)."""
+        with self._lock:
+            self.requests_handled += 1
+            if request_type == 'GetVersion':
+                return STATUS_SUCCESS, {'obsWebSocketVersion': '5.0.0-standin', 'rpcVersion': 1}, None
+            if request_type == 'SetInputSettings':
+                self.inputs.setdefault(data['inputName'], {}).update(data.get('inputSettings', {}))
+                return STATUS_SUCCESS, None, None
+            if request_type == 'GetInputSettings':
+                if data['inputName'] not in self.inputs:
+                    return STATUS_RESOURCE_NOT_FOUND, None, "No input was found"
+                return STATUS_SUCCESS, {'inputSettings': dict(self.inputs[data['inputName']])}, None
+            if request_type == 'GetSceneItemId':
+                for item_id, (source, _) in self.scenes.get(data['sceneName'], {}).items():
+                    if source == data['sourceName']:
+                        return STATUS_SUCCESS, {'sceneItemId': item_id}, None
+                return STATUS_RESOURCE_NOT_FOUND, None, "No scene items were found"
+            if request_type == 'SetSceneItemEnabled':
+                item = self.scenes.get(data['sceneName'], {}).get(data['sceneItemId'])
+                if item is None:
+                    return STATUS_RESOURCE_NOT_FOUND, None, "No scene item was found"
+                item[1] = bool(data['sceneItemEnabled'])
+                return STATUS_SUCCESS, None, None
+            if request_type == 'TriggerMediaInputAction':
+                self.media_actions.append((data['inputName'], data['mediaAction']))
+                return STATUS_SUCCESS, None, None
+            if request_type == 'SetCurrentProgramScene':
+                self.current_scene = data['sceneName']
+                return STATUS_SUCCESS, None, None
+            return STATUS_UNKNOWN_REQUEST, None, f"Unknown request type {request_type}"
+
+    def _result(self, request):
+        code, response, comment = self.handle_request(request.get('requestType'), request.get('requestData') or {})
+        result = {'requestType': request.get('requestType'),
+                  'requestStatus': {'result': code == STATUS_SUCCESS, 'code': code}}
+        if comment:
+            result['requestStatus']['comment'] = comment
+        if response is not None:
+            result['responseData'] = response
+        return result
+
+    # --- Connections ---
+
+    def _serve_connection(self, sock):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        stream = sock.makefile('rb')
+        headers = {}
+        stream.readline()
+        while True:
+            line = stream.readline().decode('latin-1').strip()
+            if not line:
+                break
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+        sock.sendall((
+            "HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {ws_accept_key(headers.get('sec-websocket-key', ''))}\r\n"
+            "Sec-WebSocket-Protocol: obswebsocket.json\r\n\r\n").encode())
+
+        def send(message):
+            sock.sendall(ws_encode_frame(WS_TEXT, json.dumps(message).encode('utf-8'), mask=False))
+
+        hello = {'obsWebSocketVersion': '5.0.0-standin', 'rpcVersion': 1}
+        salt = challenge = None
+        if self.password:
+            salt = base64.b64encode(os.urandom(32)).decode()
+            challenge = base64.b64encode(os.urandom(32)).decode()
+            hello['authentication'] = {'salt': salt, 'challenge': challenge}
+        send({'op': OP_HELLO, 'd': hello})
+
+        identified = False
+        while True:
+            opcode, payload = ws_read_message(stream)
+            if opcode == WS_CLOSE:
+                return
+            if opcode == WS_PING:
+                sock.sendall(ws_encode_frame(WS_PONG, payload, mask=False))
+                continue
+            if opcode != WS_TEXT:
+                continue
+            message = json.loads(payload)
+            self.messages_received += 1
+            op, data = message.get('op'), message.get('d', {})
+            if not identified:
+                expected = obs_auth_string(self.password, salt, challenge) if self.password else None
+                if op != OP_IDENTIFY or data.get('authentication') != expected:
+                    sock.sendall(ws_encode_frame(
+                        WS_CLOSE, CLOSE_AUTHENTICATION_FAILED.to_bytes(2, 'big') + b"Authentication failed.",
+                        mask=False))
+                    return
+                identified = True
+                send({'op': OP_IDENTIFIED, 'd': {'negotiatedRpcVersion': 1}})
+            elif op == OP_REQUEST:
+                result = self._result(data)
+                result['requestId'] = data.get('requestId')
+                send({'op': OP_REQUEST_RESPONSE, 'd': result})
+            elif op == OP_REQUEST_BATCH:
+                results = []
+                for request in data.get('requests', []):
+                    results.append(self._result(request))
+                    if data.get('haltOnFailure') and not results[-1]['requestStatus']['result']:
+                        break
+                send({'op': OP_REQUEST_BATCH_RESPONSE, 'd': {'requestId': data.get('requestId'),
+                                                             'results': results}})
+
+    def start(self):
+        standin = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                with standin._lock:
+                    standin._connections.add(self.request)
+                try:
+                    standin._serve_connection(self.request)
+                except (OSError, ConnectionError, ValueError):
+                    pass
+                finally:
+                    with standin._lock:
+                        standin._connections.discard(self.request)
+
+        self._server = socketserver.ThreadingTCPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, name="obs-standin", daemon=True).start()
+        return self
+
+    def drop_connections(self):
+        """Close every client connection, as if OBS had restarted."""
+        with self._lock:
+            connections = list(self._connections)
+        for sock in connections:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def client_count(self):
+        with self._lock:
+            return len(self._connections)
+
+    def stop(self):
+        if self._server is not None:
+            self.drop_connections()
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline stand-in for OBS's obs-websocket v5 server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4455)
+    parser.add_argument("--password", default="")
+    args = parser.parse_args()
+
+    standin = ObsStandIn(args.host, args.port, args.password).start()
+    standin.add_scene_item("Live", "On Air")
+    print(f"obs-websocket stand-in listening on ws://{args.host}:{standin.port} "
+          f"(scene 'Live' with source 'On Air'). Ctrl+C to stop.")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        standin.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,408 @@
+"""
+Minimal obs-websocket v5 client.
+
+Keeps one authenticated WebSocket connection to OBS open in a background
+thread and reconnects automatically (with backoff) when OBS restarts.
+Requests can be sent one at a time (call) or several in a single
+RequestBatch message (batch / submit), so an event that updates a text
+source, toggles a scene item and restarts a media source costs one round
+trip. Only the standard library is used: the WebSocket framing needed for
+the protocol subset is implemented here and shared with the local stand-in
+server in obs_standin.py.
+"""
+
+import base64
+import hashlib
+import itertools
+import json
+import os
+import socket
+import struct
+import threading
+from collections import deque
+
+OBS_WEBSOCKET_ENABLED = os.getenv("OBS_WEBSOCKET", "false").lower() == "true"
+OBS_WEBSOCKET_HOST = os.getenv("OBS_WEBSOCKET_HOST", "127.0.0.1")
+OBS_WEBSOCKET_PORT = int(os.getenv("OBS_WEBSOCKET_PORT", "4455"))
+OBS_WEBSOCKET_PASSWORD = os.getenv("OBS_WEBSOCKET_PASSWORD", "")
+OBS_TEXT_SOURCE = os.getenv("OBS_TEXT_SOURCE", "")
+OBS_ON_AIR_SCENE = os.getenv("OBS_ON_AIR_SCENE", "")
+OBS_ON_AIR_SOURCE = os.getenv("OBS_ON_AIR_SOURCE", "")
+OBS_MEDIA_SOURCE = os.getenv("OBS_MEDIA_SOURCE", "")
+
+RECONNECT_MIN_SECONDS = 0.5
+RECONNECT_MAX_SECONDS = 10.0
+OUTBOX_LIMIT = 100
+RPC_VERSION = 1
+
+# obs-websocket op codes
+OP_HELLO = 0
+OP_IDENTIFY = 1
+OP_IDENTIFIED = 2
+OP_EVENT = 5
+OP_REQUEST = 6
+OP_REQUEST_RESPONSE = 7
+OP_REQUEST_BATCH = 8
+OP_REQUEST_BATCH_RESPONSE = 9
+
+MEDIA_RESTART = "OBS_WEBSOCKET_MEDIA_INPUT_ACTION_RESTART"
+
+
+class ObsError(Exception):
+    """Raised when OBS rejects a request or the connection is unavailable."""
+
+
+# --- WebSocket framing (RFC 6455 subset) ---
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+WS_TEXT = 0x1
+WS_CLOSE = 0x8
+WS_PING = 0x9
+WS_PONG = 0xA
+
+
+def ws_accept_key(key):
+    return base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+
+
+def _apply_mask(payload, key):
+    if not payload:
+        return payload
+    n = len(payload)
+    repeated = (key * (n // 4 + 1))[:n]
+    return (int.from_bytes(payload, 'big') ^ int.from_bytes(repeated, 'big')).to_bytes(n, 'big')
+
+
+def ws_encode_frame(opcode, payload, mask):
+    header = bytearray([0x80 | opcode])
+    length = len(payload)
+    mask_bit = 0x80 if mask else 0
+    if length < 126:
+        header.append(mask_bit | length)
+    elif length < 65536:
+        header.append(mask_bit | 126)
+        header += struct.pack('>H', length)
+    else:
+        header.append(mask_bit | 127)
+        header += struct.pack('>Q', length)
+    if mask:
+        key = os.urandom(4)
+        return bytes(header) + key + _apply_mask(payload, key)
+    return bytes(header) + payload
+
+
+def _read_exact(stream, n):
+    data = stream.read(n)
+    if data is None or len(data) < n:
+        raise ConnectionError("WebSocket connection closed")
+    return data
+
+
+def ws_read_message(stream):
+    """Read one complete message. Returns (opcode, payload bytes)."""
+    message_opcode, parts = None, []
+    while True:
+        first, second = _read_exact(stream, 2)
+        opcode = first & 0x0F
+        length = second & 0x7F
+        if length == 126:
+            length = struct.unpack('>H', _read_exact(stream, 2))[0]
+        elif length == 127:
+            length = struct.unpack('>Q', _read_exact(stream, 8))[0]
+        key = _read_exact(stream, 4) if second & 0x80 else None
+        payload = _read_exact(stream, length) if length else b''
+        if key:
+            payload = _apply_mask(payload, key)
+        if opcode >= 0x8:
+            return opcode, payload  # Control frames are never fragmented
+        if opcode:
+            message_opcode = opcode
+        parts.append(payload)
+        if first & 0x80:
+            return message_opcode, b''.join(parts)
+
+
+def obs_auth_string(password, salt, challenge):
+    """Authentication string for Identify, as specified by obs-websocket v5."""
+    secret = base64.b64encode(hashlib.sha256((password + salt).encode()).digest()).decode()
+    return base64.b64encode(hashlib.sha256((secret + challenge).encode()).digest()).decode()
+
+
+# --- Client ---
+
+class ObsClient:
+    """Persistent, auto-reconnecting obs-websocket v5 connection."""
+
+    def __init__(self, host=OBS_WEBSOCKET_HOST, port=OBS_WEBSOCKET_PORT, password=OBS_WEBSOCKET_PASSWORD,
+                 on_connect=None, connect_timeout=3.0):
+        self.host = host
+        self.port = port
+        self.password = password
+        self.on_connect = on_connect
+        self.connect_timeout = connect_timeout
+        self._sock = None
+        self._send_lock = threading.Lock()
+        self._pending = {}  # requestId -> [Event, response]
+        self._pending_lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._outbox = deque(maxlen=OUTBOX_LIMIT)
+        self._connected = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.connections = 0
+        self.last_error = None
+
+    # --- Lifecycle ---
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name="obs-websocket", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+        self._close_socket()
+        if self._thread:
+            self._thread.join(timeout=2)
+
+    @property
+    def connected(self):
+        return self._connected.is_set()
+
+    def wait_connected(self, timeout=None):
+        return self._connected.wait(timeout)
+
+    def _run(self):
+        delay = RECONNECT_MIN_SECONDS
+        while not self._stop_event.is_set():
+            try:
+                stream = self._connect()
+                delay = RECONNECT_MIN_SECONDS
+                self.connections += 1
+                self._connected.set()
+                threading.Thread(target=self._after_connect, name="obs-websocket-setup", daemon=True).start()
+                self._read_loop(stream)
+            except (OSError, ConnectionError, ValueError, ObsError) as e:
+                if not self._stop_event.is_set() and str(e) != self.last_error:
+                    print(f"OBS websocket: {e}")
+                self.last_error = str(e)
+            finally:
+                self._connected.clear()
+                self._close_socket()
+                self._fail_pending("connection to OBS lost")
+            self._stop_event.wait(delay)
+            delay = min(delay * 2, RECONNECT_MAX_SECONDS)
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.connect_timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._sock = sock
+        key = base64.b64encode(os.urandom(16)).decode()
+        sock.sendall((
+            f"GET / HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n"
+            "Upgrade: websocket\r\nConnection: Upgrade\r\n"
+            f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n"
+            "Sec-WebSocket-Protocol: obswebsocket.json\r\n\r\n").encode())
+        stream = sock.makefile('rb')
+        status = stream.readline().decode('latin-1')
+        headers = {}
+        while True:
+            line = stream.readline().decode('latin-1').strip()
+            if not line:
+                break
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+        if ' 101 ' not in status or headers.get('sec-websocket-accept') != ws_accept_key(key):
+            raise ConnectionError(f"WebSocket handshake rejected: {status.strip()}")
+
+        hello = self._read_json(stream)
+        if hello.get('op') != OP_HELLO:
+            raise ConnectionError("expected Hello from OBS")
+        identify = {'rpcVersion': RPC_VERSION, 'eventSubscriptions': 0}
+        auth = hello['d'].get('authentication')
+        if auth:
+            if not self.password:
+                raise ObsError("OBS requires a password (OBS_WEBSOCKET_PASSWORD)")
+            identify['authentication'] = obs_auth_string(self.password, auth['salt'], auth['challenge'])
+        self._send_json({'op': OP_IDENTIFY, 'd': identify})
+        identified = self._read_json(stream)
+        if identified.get('op') != OP_IDENTIFIED:
+            raise ObsError("OBS did not accept the identification (wrong password?)")
+        sock.settimeout(None)
+        return stream
+
+    def _after_connect(self):
+        self._flush_outbox()
+        if self.on_connect:
+            try:
+                self.on_connect(self)
+            except ObsError as e:
+                print(f"OBS websocket setup failed: {e}")
+
+    def _close_socket(self):
+        sock, self._sock = self._sock, None
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)  # Wakes the reader thread blocked in recv
+            except OSError:
+                pass
+            try:
+                sock.close()
+            except OSError:
+                pass
+
+    # --- Wire ---
+
+    def _read_json(self, stream):
+        while True:
+            opcode, payload = ws_read_message(stream)
+            if opcode == WS_TEXT:
+                return json.loads(payload)
+            if opcode == WS_PING:
+                self._send_frame(WS_PONG, payload)
+            elif opcode == WS_CLOSE:
+                raise ConnectionError("OBS closed the connection" + (
+                    f" ({payload[2:].decode('utf-8', 'replace')})" if len(payload) > 2 else ""))
+
+    def _send_frame(self, opcode, payload):
+        sock = self._sock
+        if sock is None:
+            raise ConnectionError("not connected to OBS")
+        with self._send_lock:
+            sock.sendall(ws_encode_frame(opcode, payload, mask=True))
+
+    def _send_json(self, message):
+        self._send_frame(WS_TEXT, json.dumps(message).encode('utf-8'))
+
+    def _read_loop(self, stream):
+        while not self._stop_event.is_set():
+            message = self._read_json(stream)
+            op = message.get('op')
+            if op in (OP_REQUEST_RESPONSE, OP_REQUEST_BATCH_RESPONSE):
+                with self._pending_lock:
+                    waiter = self._pending.pop(message['d'].get('requestId'), None)
+                if waiter is not None:
+                    waiter[1] = message['d']
+                    waiter[0].set()
+
+    def _fail_pending(self, reason):
+        with self._pending_lock:
+            waiters, self._pending = self._pending, {}
+        for waiter in waiters.values():
+            waiter[1] = ObsError(reason)
+            waiter[0].set()
+
+    def _roundtrip(self, op, data, timeout):
+        if not self._connected.wait(timeout):
+            raise ObsError("not connected to OBS")
+        request_id = str(next(self._ids))
+        data['requestId'] = request_id
+        waiter = [threading.Event(), None]
+        with self._pending_lock:
+            self._pending[request_id] = waiter
+        try:
+            self._send_json({'op': op, 'd': data})
+        except (OSError, ConnectionError) as e:
+            with self._pending_lock:
+                self._pending.pop(request_id, None)
+            raise ObsError(str(e))
+        if not waiter[0].wait(timeout):
+            with self._pending_lock:
+                self._pending.pop(request_id, None)
+            raise ObsError(f"OBS did not answer within {timeout}s")
+        if isinstance(waiter[1], Exception):
+            raise waiter[1]
+        return waiter[1]
+
+    # --- Requests ---
+
+    def call(self, request_type, request_data=None, timeout=5.0):
+        """Send one request and return its responseData. Raises ObsError on failure."""
+        response = self._roundtrip(OP_REQUEST, {'requestType': request_type,
+                                                'requestData': request_data or {}}, timeout)
+        status = response.get('requestStatus', {})
+        if not status.get('result'):
+            raise ObsError(f"{request_type} failed: {status.get('comment') or status.get('code')}")
+        return response.get('responseData') or {}
+
+    def batch(self, requests, timeout=5.0, halt_on_failure=False):
+        """Send [(request_type, request_data), ...] as one RequestBatch and return the results."""
+        response = self._roundtrip(OP_REQUEST_BATCH, {
+            'haltOnFailure': halt_on_failure,
+            'executionType': 0,
+            'requests': [{'requestType': t, 'requestData': d or {}} for t, d in requests],
+        }, timeout)
+        return response.get('results', [])
+
+    def submit(self, requests):
+        """
+        Fire-and-forget: send the requests as one batch without waiting.
+        While OBS is unreachable they are queued (bounded) and sent on reconnect.
+        """
+        self._outbox.append(list(requests))
+        if self._connected.is_set():
+            self._flush_outbox()
+
+    def _flush_outbox(self):
+        requests = []
+        while self._outbox:
+            try:
+                requests.extend(self._outbox.popleft())
+            except IndexError:
+                break
+        if not requests:
+            return
+        try:
+            self._send_json({'op': OP_REQUEST_BATCH, 'd': {
+                'requestId': f"submit-{next(self._ids)}",
+                'haltOnFailure': False,
+                'executionType': 0,
+                'requests': [{'requestType': t, 'requestData': d or {}} for t, d in requests],
+            }})
+        except (OSError, ConnectionError):
+            self._outbox.appendleft(requests)  # Retried after reconnect
+
+
+class ObsIntegration:
+    """Maps VoiceMaster generation and playback events onto OBS requests."""
+
+    def __init__(self, client, text_source=OBS_TEXT_SOURCE, on_air_scene=OBS_ON_AIR_SCENE,
+                 on_air_source=OBS_ON_AIR_SOURCE, media_source=OBS_MEDIA_SOURCE):
+        self.client = client
+        self.text_source = text_source
+        self.on_air_scene = on_air_scene
+        self.on_air_source = on_air_source
+        self.media_source = media_source
+        self._on_air_item_id = None
+        client.on_connect = self._resolve_items
+
+    def _resolve_items(self, client):
+        # Scene item ids can change when the scene is edited, so look them up on every connect
+        self._on_air_item_id = None
+        if self.on_air_scene and self.on_air_source:
+            data = client.call('GetSceneItemId', {'sceneName': self.on_air_scene,
+                                                  'sourceName': self.on_air_source})
+            self._on_air_item_id = data.get('sceneItemId')
+
+    def _on_air_request(self, enabled):
+        if self._on_air_item_id is None:
+            return []
+        return [('SetSceneItemEnabled', {'sceneName': self.on_air_scene, 'sceneItemId': self._on_air_item_id,
+                                         'sceneItemEnabled': enabled})]
+
+    def on_generation(self, text, voice_name=None):
+        """A clip was generated: show its text in the text source."""
+        if self.text_source:
+            self.client.submit([('SetInputSettings', {'inputName': self.text_source,
+                                                      'inputSettings': {'text': text}})])
+
+    def on_playback(self, playing):
+        """Playback started or stopped: toggle the on-air source, restart the media source on start."""
+        requests = self._on_air_request(playing)
+        if playing and self.media_source:
+            requests.append(('TriggerMediaInputAction', {'inputName': self.media_source,
+                                                         'mediaAction': MEDIA_RESTART}))
+        if requests:
+            self.client.submit(requests)
@@ -0,0 +1,356 @@
+"""
+Append-only archive of overlay states.
+
+Every overlay update is one fixed-size event record (timestamp plus the
+hash of the state). The state itself (main text, sub text and the template
+it was rendered with) is stored once, zlib-compressed, no matter how many
+times it is shown. Overlay HTML is only rendered when an old state is
+restored, so the archive grows by a few dozen bytes per update and by two
+files in total.
+
+Because events are fixed-size and appended in time order, the event file is
+its own index: the newest page is a read at the tail and time ranges are a
+binary search, whatever the size of the archive.
+"""
+
+import hashlib
+import html
+import json
+import os
+import re
+import struct
+import threading
+import time
+import zlib
+
+from overlay_output import OverlayTemplate, overlay_slots
+
+EVENTS_FILENAME = "events.bin"
+STATES_FILENAME = "states.bin"
+
+_HEADER = struct.Struct('<4sI8x')
+_EVENTS_MAGIC = b'VMOE'
+_STATES_MAGIC = b'VMOS'
+_VERSION = 1
+# timestamp, state hash
+_EVENT = struct.Struct('<d20s')
+# kind, content hash, compressed length
+_BLOB = struct.Struct('<c20sI')
+_KIND_STATE = b'S'
+_KIND_TEMPLATE = b'T'
+_READ_BATCH = 256
+
+_LEGACY_PATTERN = re.compile(r"^overlay_(\d+)\.html$")
+_LEGACY_MAIN = re.compile(r'<div class="main-text">(.*?)</div>', re.S)
+_LEGACY_SUB = re.compile(r'<div class="sub-text">(.*?)</div>', re.S)
+
+
+def _digest(data):
+    return hashlib.sha1(data).digest()
+
+
+class ArchiveEntry:
+    """One archived overlay update. Text and display fields are loaded on first access."""
+
+    __slots__ = ('seq', 'timestamp', '_digest', '_archive', '_state')
+
+    # Keys for dict-style access. The old listing's 'filename' and 'path' are gone:
+    # overlays are no longer separate files (restore one by seq instead)
+    KEYS = ('seq', 'timestamp', 'created', 'main_text', 'sub_text')
+
+    def __init__(self, archive, seq, timestamp, digest):
+        self.seq = seq
+        self.timestamp = timestamp
+        self._digest = digest
+        self._archive = archive
+        self._state = None
+
+    def _get_state(self):
+        if self._state is None:
+            self._state = self._archive._state_for(self._digest)
+        return self._state
+
+    @property
+    def main_text(self):
+        return self._get_state()['main_text']
+
+    @property
+    def sub_text(self):
+        return self._get_state()['sub_text']
+
+    @property
+    def created(self):
+        return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.timestamp))
+
+    def __getitem__(self, key):
+        if key not in self.KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __repr__(self):
+        return f"<ArchiveEntry #{self.seq} {self.created}>"
+
+
+class OverlayArchive:
+    """Event log of overlay updates with content-addressed, compressed states."""
+
+    def __init__(self, archive_dir):
+        self.archive_dir = archive_dir
+        os.makedirs(archive_dir, exist_ok=True)
+        self.events_path = os.path.join(archive_dir, EVENTS_FILENAME)
+        self.states_path = os.path.join(archive_dir, STATES_FILENAME)
+
+        self._blobs = {}            # hash -> (offset, length)
+        self._template_hashes = {}  # template source -> hash
+        self._templates = {}        # hash -> compiled OverlayTemplate
+        self._state_cache = {}      # hash -> decoded state (small, bounded)
+        self._lock = threading.Lock()
+        self._event_count = 0
+        self._last_timestamp = 0.0
+        self._legacy = None         # (directory, template source) of a deferred legacy import
+        self._import_lock = threading.Lock()
+
+        self._events_file = self._open_log(self.events_path, _EVENTS_MAGIC)
+        self._states_file = self._open_log(self.states_path, _STATES_MAGIC)
+        self._load()
+
+    # --- Files ---
+
+    @staticmethod
+    def _open_log(path, magic):
+        if not os.path.exists(path):
+            with open(path, 'wb') as f:
+                f.write(_HEADER.pack(magic, _VERSION))
+        f = open(path, 'r+b')
+        found, version = _HEADER.unpack(f.read(_HEADER.size))
+        if found != magic or version != _VERSION:
+            f.close()
+            raise ValueError(f"{path} is not a VoiceMaster overlay archive file")
+        return f
+
+    def _load(self):
+        # States: walk the blob headers only, payloads are read on demand
+        end = os.fstat(self._states_file.fileno()).st_size
+        offset = _HEADER.size
+        while offset + _BLOB.size <= end:
+            self._states_file.seek(offset)
+            kind, digest, length = _BLOB.unpack(self._states_file.read(_BLOB.size))
+            if offset + _BLOB.size + length > end:
+                break  # Torn write at the tail
+            self._blobs[digest] = (offset + _BLOB.size, length)
+            offset += _BLOB.size + length
+        if offset != end:
+            self._states_file.truncate(offset)
+
+        # Events: fixed-size records, drop a partial record left by a crash
+        size = os.fstat(self._events_file.fileno()).st_size
+        self._event_count = (size - _HEADER.size) // _EVENT.size
+        valid = _HEADER.size + self._event_count * _EVENT.size
+        if valid != size:
+            self._events_file.truncate(valid)
+        if self._event_count:
+            self._last_timestamp = self._read_event(self._event_count - 1)[0]
+
+    def _append_blob(self, kind, digest, payload):
+        data = zlib.compress(payload, 9)
+        self._states_file.seek(0, os.SEEK_END)
+        offset = self._states_file.tell()
+        self._states_file.write(_BLOB.pack(kind, digest, len(data)) + data)
+        self._states_file.flush()
+        self._blobs[digest] = (offset + _BLOB.size, len(data))
+
+    def _read_blob(self, digest):
+        offset, length = self._blobs[digest]
+        self._states_file.seek(offset)
+        return zlib.decompress(self._states_file.read(length))
+
+    def _read_event(self, seq):
+        self._events_file.seek(_HEADER.size + seq * _EVENT.size)
+        return _EVENT.unpack(self._events_file.read(_EVENT.size))
+
+    def _read_events(self, start, stop):
+        self._events_file.seek(_HEADER.size + start * _EVENT.size)
+        return list(_EVENT.iter_unpack(self._events_file.read((stop - start) * _EVENT.size)))
+
+    def _bisect(self, timestamp):
+        """Sequence number of the first event at or after timestamp (lock held)."""
+        lo, hi = 0, self._event_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._read_event(mid)[0] < timestamp:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _state_for(self, digest):
+        with self._lock:
+            state = self._state_cache.get(digest)
+            if state is None:
+                state = json.loads(self._read_blob(digest))
+                if len(self._state_cache) >= 1024:
+                    self._state_cache.clear()
+                self._state_cache[digest] = state
+            return state
+
+    # --- Writing ---
+
+    def _template_hash(self, template_source):
+        digest = self._template_hashes.get(template_source)
+        if digest is None:
+            payload = template_source.encode('utf-8')
+            digest = _digest(payload)
+            if digest not in self._blobs:
+                self._append_blob(_KIND_TEMPLATE, digest, payload)
+            self._template_hashes[template_source] = digest
+        return digest
+
+    def defer_legacy_import(self, directory, template_source):
+        """
+        Import older overlay_<timestamp>.html archives later: when import_pending()
+        is called (e.g. from a background thread) or before the next record(),
+        whichever comes first, so new updates always come after the old ones.
+        """
+        self._legacy = (directory, template_source)
+
+    def import_pending(self):
+        """Run a deferred legacy import (once). Returns how many overlays were imported."""
+        with self._import_lock:
+            if self._legacy is None:
+                return 0
+            imported = self.import_legacy_html(*self._legacy)
+            self._legacy = None
+            return imported
+
+    def record(self, main_text, sub_text, template_source, timestamp):
+        """Append one overlay update. Returns its sequence number."""
+        if self._legacy is not None:
+            self.import_pending()  # Waits for a background import that is still running
+        with self._lock:
+            return self._record(main_text, sub_text, template_source, timestamp)
+
+    def _record(self, main_text, sub_text, template_source, timestamp):
+        # Caller holds self._lock
+        template = self._template_hash(template_source).hex()
+        payload = json.dumps({'main_text': main_text, 'sub_text': sub_text, 'template': template},
+                             ensure_ascii=False, sort_keys=True).encode('utf-8')
+        digest = _digest(payload)
+        if digest not in self._blobs:
+            self._append_blob(_KIND_STATE, digest, payload)
+
+        # Keep the log ordered even if the wall clock steps backwards
+        timestamp = max(timestamp, self._last_timestamp)
+        self._events_file.seek(0, os.SEEK_END)
+        self._events_file.write(_EVENT.pack(timestamp, digest))
+        self._events_file.flush()
+        self._last_timestamp = timestamp
+        self._event_count += 1
+        return self._event_count - 1
+
+    def import_legacy_html(self, directory, template_source):
+        """
+        Import overlay_<timestamp>.html files written by older versions. The
+        files are read without the archive lock and left in place; returns how
+        many were imported.
+        """
+        legacy = []
+        for entry in os.scandir(directory):
+            match = _LEGACY_PATTERN.match(entry.name)
+            if match:
+                legacy.append((int(match.group(1)), entry.path))
+        legacy.sort()
+        states = []
+        for timestamp, path in legacy:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    content = f.read()
+            except (IOError, UnicodeDecodeError):
+                continue
+            main = _LEGACY_MAIN.search(content)
+            sub = _LEGACY_SUB.search(content)
+            states.append((html.unescape(main.group(1)) if main else "",
+                           html.unescape(sub.group(1)) if sub else "", float(timestamp)))
+        with self._lock:
+            for main_text, sub_text, timestamp in states:
+                self._record(main_text, sub_text, template_source, timestamp)
+        return len(legacy)
+
+    # --- Reading ---
+
+    def __len__(self):
+        return self._event_count
+
+    def event(self, seq):
+        """Return (timestamp, state_hash) for an event."""
+        with self._lock:
+            if not 0 <= seq < self._event_count:
+                raise IndexError(seq)
+            return self._read_event(seq)
+
+    def state(self, seq):
+        """Return the overlay state of an event: main_text, sub_text, template hash and timestamp."""
+        timestamp, digest = self.event(seq)
+        return dict(self._state_for(digest), timestamp=timestamp, seq=seq)
+
+    def entries(self, since=None, until=None, before=None, newest_first=True):
+        """
+        Iterate archived updates as lazy ArchiveEntry objects.
+        since/until bound the timestamp (until is exclusive); before is a
+        sequence number to continue paging from. Only the events actually
+        consumed are read.
+        """
+        with self._lock:
+            lo = self._bisect(since) if since is not None else 0
+            hi = self._bisect(until) if until is not None else self._event_count
+        if before is not None:
+            hi = min(hi, before)
+        if newest_first:
+            while hi > lo:
+                start = max(lo, hi - _READ_BATCH)
+                with self._lock:
+                    batch = self._read_events(start, hi)
+                for offset in range(len(batch) - 1, -1, -1):
+                    yield ArchiveEntry(self, start + offset, *batch[offset])
+                hi = start
+        else:
+            while lo < hi:
+                stop = min(hi, lo + _READ_BATCH)
+                with self._lock:
+                    batch = self._read_events(lo, stop)
+                for offset, event in enumerate(batch):
+                    yield ArchiveEntry(self, lo + offset, *event)
+                lo = stop
+
+    def page(self, limit=20, before=None, since=None, until=None):
+        """Return up to limit entries, newest first."""
+        entries = []
+        for entry in self.entries(since=since, until=until, before=before):
+            if len(entries) >= limit:
+                break
+            entries.append(entry)
+        return entries
+
+    def render(self, seq):
+        """Render the HTML of an archived overlay with the template it was shown with."""
+        state = self.state(seq)
+        digest = bytes.fromhex(state['template'])
+        with self._lock:
+            template = self._templates.get(digest)
+            if template is None:
+                template = OverlayTemplate(self._read_blob(digest).decode('utf-8'))
+                self._templates[digest] = template
+        return template.render(**overlay_slots(state['main_text'], state['sub_text']))
+
+    def stats(self):
+        with self._lock:
+            return {
+                'events': self._event_count,
+                'unique_blobs': len(self._blobs),
+                'bytes': (os.fstat(self._events_file.fileno()).st_size
+                          + os.fstat(self._states_file.fileno()).st_size),
+            }
+
+    def close(self):
+        with self._lock:
+            self._events_file.close()
+            self._states_file.close()
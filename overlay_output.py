@@ -0,0 +1,371 @@
+"""
+Overlay rendering and file output for OBS.
+
+Templates are parsed once into static chunks and ``${slot}`` positions, so
+an update only joins the text slots into the precomputed markup. Writes go
+through a background writer that coalesces bursts (only the newest content
+per file is written once the window closes) and replaces files atomically,
+so OBS never reads a half-written overlay.
+
+Several named outputs (e.g. a caption, a "now speaking" badge and a ticker,
+each its own OBS browser source) can share one overlay state: every update
+escapes the state once, re-renders only the outputs whose slots changed and
+writes only the files whose content actually differs.
+"""
+
+import html
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+
+OVERLAY_COALESCE_MS = float(os.getenv("OVERLAY_COALESCE_MS", "50"))
+OVERLAY_OUTPUTS_CONFIG = os.getenv("OVERLAY_OUTPUTS_CONFIG", "overlay_outputs.json")
+
+_SLOT_PATTERN = re.compile(r"\$\{(\w+)\}")
+
+# Derived slots and the state keys they are built from
+SLOT_DEPENDENCIES = {'sub_block': ('sub_text',)}
+
+DEFAULT_OVERLAY_TEMPLATE = """
+<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>VoiceMaster Overlay</title>
+    <style>
+        body {
+            margin: 0;
+            padding: 0;
+            overflow: hidden; /* Hide scrollbars if content overflows */
+            background-color: rgba(0, 0, 0, 0); /* Transparent background */
+            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
+            color: #ffffff;
+            text-shadow: 2px 2px 4px rgba(0, 0, 0, 0.7); /* Subtle shadow for readability */
+        }
+        .overlay-container {
+            position: absolute;
+            bottom: 20px; /* Adjust as needed */
+            left: 20px; /* Adjust as needed */
+            background-color: rgba(44, 62, 80, 0.7); /* Semi-transparent dark blue */
+            padding: 10px 20px;
+            border-radius: 8px;
+            display: flex;
+            flex-direction: column;
+            gap: 5px;
+            align-items: flex-start;
+            box-shadow: 0 4px 8px rgba(0, 0, 0, 0.3);
+        }
+        .main-text {
+            font-size: 2em; /* Larger for main title */
+            font-weight: bold;
+            line-height: 1.2;
+        }
+        .sub-text {
+            font-size: 1.2em; /* Smaller for additional info */
+            opacity: 0.8;
+        }
+    </style>
+</head>
+<body>
+    <div class="overlay-container">
+        <div class="main-text">${main_text}</div>
+        ${sub_block}
+    </div>
+</body>
+</html>
+    """
+
+# Small single-purpose overlays. data-slot marks elements the live overlay
+# server updates in place.
+BADGE_OVERLAY_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <title>VoiceMaster Now Speaking</title>
+    <style>
+        body { margin: 0; background-color: rgba(0, 0, 0, 0); font-family: 'Segoe UI', Tahoma, sans-serif; }
+        .badge { display: inline-block; padding: 6px 14px; border-radius: 16px; color: #ffffff;
+                 background-color: rgba(231, 76, 60, 0.85); font-size: 1.4em; font-weight: bold; }
+        .badge:empty { display: none; }
+    </style>
+</head>
+<body>
+    <div class="badge" data-slot="voice_name">${voice_name}</div>
+</body>
+</html>
+"""
+
+TICKER_OVERLAY_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <title>VoiceMaster Ticker</title>
+    <style>
+        body { margin: 0; overflow: hidden; background-color: rgba(0, 0, 0, 0);
+               font-family: 'Segoe UI', Tahoma, sans-serif; color: #ffffff; }
+        .ticker { white-space: nowrap; font-size: 1.3em; padding: 4px 0;
+                  background-color: rgba(44, 62, 80, 0.7); animation: scroll 20s linear infinite; }
+        @keyframes scroll { from { transform: translateX(100vw); } to { transform: translateX(-100%); } }
+    </style>
+</head>
+<body>
+    <div class="ticker" data-slot="spoken_text">${spoken_text}</div>
+</body>
+</html>
+"""
+
+BUILTIN_TEMPLATES = {
+    'default': DEFAULT_OVERLAY_TEMPLATE,
+    'badge': BADGE_OVERLAY_TEMPLATE,
+    'ticker': TICKER_OVERLAY_TEMPLATE,
+}
+
+
+class OverlayTemplate:
+    """A template compiled once into static chunks and named slots."""
+
+    def __init__(self, source):
+        self.source = source
+        self._chunks = []
+        self._slots = []
+        pos = 0
+        for match in _SLOT_PATTERN.finditer(source):
+            self._chunks.append(source[pos:match.start()])
+            self._slots.append(match.group(1))
+            pos = match.end()
+        self._chunks.append(source[pos:])
+        self.slot_names = frozenset(self._slots)
+        # State keys this template reads, with derived slots resolved
+        self.state_keys = frozenset(key for slot in self._slots
+                                    for key in SLOT_DEPENDENCIES.get(slot, (slot,)))
+
+    def render(self, **values):
+        """Fill the slots (missing ones render empty) and return the page."""
+        parts = [self._chunks[0]]
+        for slot, chunk in zip(self._slots, self._chunks[1:]):
+            parts.append(values.get(slot, ""))
+            parts.append(chunk)
+        return "".join(parts)
+
+
+def state_slots(state):
+    """Escape every text value of an overlay state and add the derived slots."""
+    slots = {key: html.escape(value, quote=False) for key, value in state.items() if isinstance(value, str)}
+    sub_text = slots.get('sub_text', '')
+    slots['sub_block'] = f'<div class="sub-text">{sub_text}</div>' if sub_text else ''
+    return slots
+
+
+def overlay_slots(main_text, sub_text=""):
+    """Escape overlay text and build the slot values for the default template."""
+    return state_slots({'main_text': main_text, 'sub_text': sub_text})
+
+
+def atomic_write_text(path, content, retries=5):
+    """Write a file via a temp file and rename, so readers see the old or new file, never half."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".overlay-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(content)
+        for attempt in range(retries):
+            try:
+                os.replace(tmp_path, path)
+                return
+            except PermissionError:
+                # Windows refuses the rename while a reader (OBS) has the file open
+                if attempt == retries - 1:
+                    raise
+                time.sleep(0.01 * (attempt + 1))
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+class CoalescingWriter:
+    """
+    Background file writer. Updates to the same path within the coalescing
+    window collapse into a single write of the newest content.
+    """
+
+    def __init__(self, window_ms=OVERLAY_COALESCE_MS):
+        self.window = window_ms / 1000.0
+        self._pending = {}   # path -> content
+        self._deadline = None
+        self._in_flight = 0
+        self._condition = threading.Condition()
+        self._thread = None
+        self.writes = 0
+        self.submitted = 0
+
+    def submit(self, path, content):
+        """Queue content for path and return immediately."""
+        with self._condition:
+            self._pending[path] = content
+            self.submitted += 1
+            if self._deadline is None:
+                self._deadline = time.monotonic() + self.window
+            self._condition.notify_all()
+        self._ensure_thread()
+
+    def _ensure_thread(self):
+        if self._thread and self._thread.is_alive():
+            return
+        with self._condition:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="overlay-writer", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending:
+                    self._condition.wait()
+                remaining = self._deadline - time.monotonic()
+                while remaining > 0:
+                    self._condition.wait(remaining)
+                    remaining = self._deadline - time.monotonic()
+                batch = self._pending
+                self._pending = {}
+                self._deadline = None
+                self._in_flight = len(batch)
+            for path, content in batch.items():
+                try:
+                    atomic_write_text(path, content)
+                    self.writes += 1
+                except OSError as e:
+                    print(f"Error writing overlay file {path}: {e}")
+            with self._condition:
+                self._in_flight = 0
+                self._condition.notify_all()
+
+    def flush(self, timeout=5.0):
+        """Wait until every submitted update has been written."""
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            if self._pending:
+                self._deadline = time.monotonic()  # Skip the rest of the window
+                self._condition.notify_all()
+            while self._pending or self._in_flight:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+
+class OverlayOutput:
+    """A named overlay target: a compiled template and the file it is written to."""
+
+    def __init__(self, name, template, path=None):
+        self.name = name
+        self.template = template if isinstance(template, OverlayTemplate) else OverlayTemplate(template)
+        self.path = path
+        self.last_content = None
+        self.renders = 0
+        self.writes = 0
+
+
+class OverlayRenderer:
+    """
+    Renders every named output from one shared overlay state in a single pass.
+    Outputs whose slots did not change are not rendered; outputs whose
+    rendered content is unchanged are not written.
+    """
+
+    def __init__(self, outputs, writer):
+        self.outputs = list(outputs)
+        self.writer = writer
+        self.state = {}
+        self.updates = 0
+        self.render_seconds = 0.0
+        self.last_render_ms = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        for output in self.outputs:
+            if output.name == name:
+                return output
+        return None
+
+    def invalidate(self, name):
+        """Force the output to be rewritten on the next update (e.g. after its file was replaced)."""
+        with self._lock:
+            output = self.get(name)
+            if output is not None:
+                output.last_content = None
+
+    def update(self, **values):
+        """Merge values into the state and write changed outputs. Returns the names written."""
+        with self._lock:
+            started = time.perf_counter()
+            changed = {key for key, value in values.items() if self.state.get(key) != value}
+            self.state.update(values)
+            written = []
+            slots = None
+            for output in self.outputs:
+                if output.last_content is not None and not (output.template.state_keys & changed):
+                    continue
+                if slots is None:
+                    slots = state_slots(self.state)  # Escaped once, shared by every output
+                content = output.template.render(**slots)
+                output.renders += 1
+                if content == output.last_content:
+                    continue
+                output.last_content = content
+                if output.path:
+                    self.writer.submit(output.path, content)
+                    output.writes += 1
+                written.append(output.name)
+            self.updates += 1
+            self.last_render_ms = (time.perf_counter() - started) * 1000
+            self.render_seconds += self.last_render_ms / 1000
+            return written
+
+    def stats(self):
+        with self._lock:
+            return {
+                'updates': self.updates,
+                'last_render_ms': self.last_render_ms,
+                'avg_render_ms': self.render_seconds * 1000 / self.updates if self.updates else 0.0,
+                'outputs': {o.name: {'renders': o.renders, 'writes': o.writes, 'path': o.path}
+                            for o in self.outputs},
+            }
+
+
+def load_overlay_outputs(config_path=OVERLAY_OUTPUTS_CONFIG, default_path="overlay.html"):
+    """
+    Build the named outputs from a JSON config such as
+
+        {"outputs": {"main": {"template": "default", "path": "overlay.html"},
+                     "badge": {"template": "badge", "path": "overlay_badge.html"},
+                     "ticker": {"template": "my_ticker.html", "path": "overlay_ticker.html"}}}
+
+    "template" is a built-in name or a template file using ${slot} markers.
+    Without a config there is one output, "main", written to default_path.
+    """
+    outputs = []
+    if config_path and os.path.exists(config_path):
+        try:
+            with open(config_path, 'r', encoding='utf-8') as f:
+                config = json.load(f)
+            base_dir = os.path.dirname(os.path.abspath(config_path))
+            for name, spec in config.get('outputs', {}).items():
+                template = spec.get('template', 'default')
+                if template not in BUILTIN_TEMPLATES:
+                    with open(os.path.join(base_dir, template), 'r', encoding='utf-8') as f:
+                        template = f.read()
+                else:
+                    template = BUILTIN_TEMPLATES[template]
+                outputs.append(OverlayOutput(name, template, spec.get('path')))
+        except (IOError, ValueError, AttributeError) as e:
+            print(f"Error loading overlay outputs from {config_path}: {e}")
+            outputs = []
+    if not outputs:
+        outputs.append(OverlayOutput('main', DEFAULT_OVERLAY_TEMPLATE, default_path))
+    return outputs
@@ -0,0 +1,291 @@
+"""
+Local overlay server for OBS browser sources.
+
+Serves one static overlay page and pushes state changes to it over
+Server-Sent Events, so OBS shows updates without re-reading a file or
+reloading the page. Only keys that actually changed are sent; a client
+that (re)connects first receives the full state.
+
+Point the OBS browser source at http://127.0.0.1:<port>/ instead of
+overlay.html. Named overlay outputs are served at /o/<name>; their pages
+only receive the state keys their template uses.
+"""
+
+import json
+import os
+import queue
+import socket
+import threading
+from urllib.parse import parse_qs, urlsplit
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from overlay_output import DEFAULT_OVERLAY_TEMPLATE, OverlayTemplate, state_slots
+
+OVERLAY_SERVER_HOST = os.getenv("OVERLAY_SERVER_HOST", "127.0.0.1")
+OVERLAY_SERVER_PORT = int(os.getenv("OVERLAY_SERVER_PORT", "8765"))
+KEEPALIVE_SECONDS = 15
+CLIENT_QUEUE_SIZE = 256
+
+LIVE_OVERLAY_SCRIPT = """
+    <style>
+        .caption { font-size: 1.6em; font-weight: bold; max-width: 60vw; }
+        .caption:empty { display: none; }
+        .caption span { opacity: 0.45; transition: opacity 60ms linear; }
+        .caption span.spoken { opacity: 1; }
+        .caption span.current { opacity: 1; color: #ffd54f; }
+    </style>
+    <script>
+        function captionElement() {
+            let el = document.querySelector('.caption');
+            if (!el) {
+                el = document.createElement('div');
+                el.className = 'caption';
+                document.querySelector('.overlay-container').appendChild(el);
+            }
+            return el;
+        }
+        const handlers = {
+            main_text(value) {
+                document.querySelector('.main-text').textContent = value;
+            },
+            sub_text(value) {
+                const el = document.querySelector('.sub-text');
+                el.textContent = value;
+                el.style.display = value ? '' : 'none';
+            },
+            caption_words(words) {
+                const el = captionElement();
+                el.replaceChildren(...words.map(w => {
+                    const span = document.createElement('span');
+                    span.textContent = w + ' ';
+                    return span;
+                }));
+            },
+            caption_index(index) {
+                // Karaoke highlight: words before index are spoken, index is current
+                const spans = captionElement().children;
+                for (let i = 0; i < spans.length; i++) {
+                    spans[i].className = i < index ? 'spoken' : (i === index ? 'current' : '');
+                }
+            }
+        };
+        function applyState(state) {
+            for (const [key, value] of Object.entries(state)) {
+                if (handlers[key]) {
+                    handlers[key](value);
+                } else {
+                    document.querySelectorAll(`[data-slot="${key}"]`).forEach(el => { el.textContent = value; });
+                }
+            }
+        }
+        const source = new EventSource('/events');
+        source.addEventListener('state', e => applyState(JSON.parse(e.data)));
+        source.addEventListener('delta', e => applyState(JSON.parse(e.data)));
+    </script>
+"""
+
+
+def render_live_page(template, state, script=LIVE_OVERLAY_SCRIPT, events_url='/events'):
+    """Render the overlay page with the current state and the live-update script."""
+    slots = state_slots(state)
+    if not slots['sub_block']:
+        slots['sub_block'] = '<div class="sub-text" style="display:none"></div>'
+    script = script.replace("'/events'", f"'{events_url}'", 1)
+    return template.render(**slots).replace("</body>", script + "</body>", 1)
+
+
+class _Client:
+    def __init__(self, keys=None):
+        self.events = queue.Queue(maxsize=CLIENT_QUEUE_SIZE)
+        self.needs_resync = False
+        self.keys = keys  # None = every state key
+
+    def view(self, values):
+        if self.keys is None:
+            return values
+        return {k: v for k, v in values.items() if k in self.keys}
+
+
+class OverlayServer:
+    """Embedded HTTP server that pushes overlay state deltas over SSE."""
+
+    def __init__(self, host=OVERLAY_SERVER_HOST, port=OVERLAY_SERVER_PORT,
+                 template=None, script=LIVE_OVERLAY_SCRIPT, outputs=()):
+        self.host = host
+        self.port = port
+        self.template = template or OverlayTemplate(DEFAULT_OVERLAY_TEMPLATE)
+        self.script = script
+        self.pages = {output.name: output.template for output in outputs}
+        self._state = {}
+        self._version = 0
+        self._clients = set()
+        self._lock = threading.Lock()
+        self._httpd = None
+        self._thread = None
+        self.events_published = 0
+        self.events_delivered = 0
+
+    # --- State ---
+
+    def publish(self, **values):
+        """Merge values into the overlay state and push the changed keys to every client."""
+        with self._lock:
+            delta = {k: v for k, v in values.items() if self._state.get(k) != v}
+            if not delta:
+                return False
+            self._state.update(delta)
+            self._version += 1
+            for client in self._clients:
+                payload = client.view(delta)
+                if not payload:
+                    continue  # Nothing this page displays changed
+                try:
+                    client.events.put_nowait(('delta', payload, self._version))
+                    self.events_delivered += 1
+                except queue.Full:
+                    client.needs_resync = True  # Slow client: send full state when it catches up
+            self.events_published += 1
+        return True
+
+    def send_event(self, event_type, payload):
+        """Push a one-off event (not part of the persistent state) to every client."""
+        with self._lock:
+            event = (event_type, payload, self._version)
+            for client in self._clients:
+                try:
+                    client.events.put_nowait(event)
+                except queue.Full:
+                    client.needs_resync = True
+
+    def state(self):
+        with self._lock:
+            return dict(self._state)
+
+    def client_count(self):
+        with self._lock:
+            return len(self._clients)
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}/"
+
+    # --- Server lifecycle ---
+
+    def start(self):
+        """Start serving in a background thread. Returns False if the port is unavailable."""
+        if self._httpd is not None:
+            return True
+        try:
+            self._httpd = ThreadingHTTPServer((self.host, self.port), self._make_handler())
+        except OSError as e:
+            print(f"Could not start overlay server on {self.host}:{self.port}: {e}")
+            return False
+        self._httpd.daemon_threads = True
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="overlay-server", daemon=True)
+        self._thread.start()
+        print(f"Overlay server running at {self.url}")
+        return True
+
+    def stop(self):
+        if self._httpd is None:
+            return
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        self._httpd = None
+        with self._lock:
+            for client in self._clients:
+                try:
+                    client.events.put_nowait(None)
+                except queue.Full:
+                    pass
+            self._clients.clear()
+
+    # --- Request handling ---
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def setup(self):
+                super().setup()
+                # Small SSE frames must not wait on Nagle's algorithm
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+            def log_message(self, format, *args):
+                pass  # Keep the console quiet; OBS polls a lot
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                path = url.path
+                if path in ('/', '/overlay.html'):
+                    self._send_body(render_live_page(server.template, server.state(), server.script),
+                                    'text/html; charset=utf-8')
+                elif path.startswith('/o/') and path[3:].rsplit('.html', 1)[0] in server.pages:
+                    name = path[3:].rsplit('.html', 1)[0]
+                    self._send_body(render_live_page(server.pages[name], server.state(), server.script,
+                                                     events_url=f'/events?output={name}'),
+                                    'text/html; charset=utf-8')
+                elif path == '/state':
+                    self._send_body(json.dumps(server.state()), 'application/json')
+                elif path == '/events':
+                    output = parse_qs(url.query).get('output', [None])[0]
+                    if output is not None and output not in server.pages:
+                        self.send_error(404)
+                        return
+                    keys = server.pages[output].state_keys if output is not None else None
+                    server._stream_events(self, keys)
+                else:
+                    self.send_error(404)
+
+            def _send_body(self, body, content_type):
+                data = body.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(data)))
+                self.send_header('Cache-Control', 'no-store')
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+    def _stream_events(self, handler, keys=None):
+        client = _Client(keys)
+        with self._lock:
+            self._clients.add(client)
+            snapshot = client.view(self._state)
+        try:
+            handler.send_response(200)
+            handler.send_header('Content-Type', 'text/event-stream')
+            handler.send_header('Cache-Control', 'no-cache')
+            handler.send_header('Connection', 'keep-alive')
+            handler.end_headers()
+            self._write_event(handler, 'state', snapshot)
+            while True:
+                try:
+                    event = client.events.get(timeout=KEEPALIVE_SECONDS)
+                except queue.Empty:
+                    handler.wfile.write(b": keepalive\n\n")
+                    handler.wfile.flush()
+                    continue
+                if event is None:
+                    break
+                if client.needs_resync:
+                    client.needs_resync = False
+                    while not client.events.empty():
+                        client.events.get_nowait()
+                    self._write_event(handler, 'state', client.view(self.state()))
+                    continue
+                event_type, payload, _ = event
+                self._write_event(handler, event_type, payload)
+        except (BrokenPipeError, ConnectionResetError, ConnectionAbortedError, OSError):
+            pass  # Browser source closed or reloaded
+        finally:
+            with self._lock:
+                self._clients.discard(client)
+
+    @staticmethod
+    def _write_event(handler, event_type, payload):
+        data = json.dumps(payload, ensure_ascii=False)
+        handler.wfile.write(f"event: {event_type}\ndata: {data}\n\n".encode('utf-8'))
+        handler.wfile.flush()
@@ -0,0 +1,221 @@
+"""
+Frequency x recency ranking of spoken phrases for the quick phrase bar.
+
+Every use of a phrase adds 1 to its score and scores halve every
+PHRASE_RANK_HALF_LIFE_HOURS, so a line used ten times last month ranks
+below one used three times today. Decaying every score as the clock moves
+would mean touching every phrase; instead each use is stored scaled to a
+fixed epoch (e^(rate * t), kept as a logarithm), which keeps the relative
+order of phrases unchanged while time passes. A phrase's rank can then
+only change when that phrase is used, and scores only ever go up, so the
+top of the ranking is maintained incrementally: a use updates one entry
+and moves it within a short sorted top list, O(log k) work no matter how
+many phrases have ever been spoken.
+
+With PHRASE_RANK_SEGMENTS set (minutes into the stream, e.g. "15,90"),
+uses are also counted per part of the stream (opening, middle, late), and
+the ranking for the current part adds those counts on top of the overall
+score. A stream starts with the first phrase after a break of
+STREAM_GAP_MINUTES.
+"""
+
+import bisect
+import math
+import os
+import threading
+import time
+
+from phrase_search import normalize
+
+PHRASE_RANK_HALF_LIFE_HOURS = float(os.getenv("PHRASE_RANK_HALF_LIFE_HOURS", "72"))
+PHRASE_RANK_SEGMENTS = tuple(float(m) * 60 for m in os.getenv("PHRASE_RANK_SEGMENTS", "").split(",") if m.strip())
+PHRASE_RANK_SEGMENT_WEIGHT = float(os.getenv("PHRASE_RANK_SEGMENT_WEIGHT", "1.0"))
+STREAM_GAP_MINUTES = float(os.getenv("STREAM_GAP_MINUTES", "120"))
+TOP_SIZE = 16
+
+
+def _log_add(a, b):
+    """log(e^a + e^b) without overflow."""
+    if a < b:
+        a, b = b, a
+    if b == -math.inf:
+        return a
+    return a + math.log1p(math.exp(b - a))
+
+
+class RankedPhrase:
+    """A phrase with the voice, settings and clip of its most recent use."""
+
+    __slots__ = ('text', 'key', 'voice_id', 'voice_name', 'settings', 'model_id', 'clip_path',
+                 'last_used', 'uses', 'log_score', 'segment_scores')
+
+    def __init__(self, text, key, segments):
+        self.text = text
+        self.key = key
+        self.voice_id = None
+        self.voice_name = None
+        self.settings = None
+        self.model_id = None
+        self.clip_path = None
+        self.last_used = 0.0
+        self.uses = 0
+        self.log_score = -math.inf
+        self.segment_scores = [-math.inf] * segments
+
+
+class PhraseRanking:
+    """Incrementally maintained top phrases by decayed use count."""
+
+    def __init__(self, half_life_hours=PHRASE_RANK_HALF_LIFE_HOURS, segments=PHRASE_RANK_SEGMENTS,
+                 segment_weight=PHRASE_RANK_SEGMENT_WEIGHT, stream_gap_minutes=STREAM_GAP_MINUTES,
+                 top_size=TOP_SIZE):
+        """
+        Args:
+            half_life_hours: How long until a use counts half as much
+            segments: Boundaries between parts of a stream, in seconds since it started
+            segment_weight: How much uses in the current part count on top of all uses
+            stream_gap_minutes: A break this long ends a stream
+            top_size: Phrases kept ranked per view (the bar shows fewer)
+        """
+        self.rate = math.log(2) / (half_life_hours * 3600)
+        self.segments = tuple(sorted(segments))
+        self.log_segment_weight = math.log(segment_weight) if segment_weight > 0 else -math.inf
+        self.stream_gap = stream_gap_minutes * 60
+        self.top_size = top_size
+        self.version = 0
+        self._entries = {}    # normalized text -> RankedPhrase
+        # One view for all uses, then one per stream segment: sorted (score, key) ascending
+        views = 1 + (len(self.segments) + 1 if self.segments else 0)
+        self._tops = [[] for _ in range(views)]
+        self._members = [{} for _ in range(views)]
+        self._cached = {}     # view -> best-first tuple, until the next change
+        self._stream_start = None
+        self._last_use = None
+        self._listeners = []
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add_listener(self, callback):
+        """callback() runs after a use changes the top phrases."""
+        self._listeners.append(callback)
+
+    # --- Recording uses ---
+
+    def load(self, uses):
+        """Replay past uses: (text, voice_id, voice_name, settings, timestamp, model_id, clip_path), oldest first."""
+        with self._lock:
+            for text, voice_id, voice_name, settings, timestamp, model_id, clip_path in uses:
+                self._record(text, voice_id, voice_name, settings, timestamp, model_id, clip_path)
+        self._changed()
+
+    def record(self, text, voice_id=None, voice_name=None, settings=None, timestamp=None,
+               model_id=None, clip_path=None):
+        """Count one use of a phrase. Returns True if the top phrases changed."""
+        with self._lock:
+            changed = self._record(text, voice_id, voice_name, settings,
+                                   time.time() if timestamp is None else timestamp, model_id, clip_path)
+        if changed:
+            self._changed()
+        return changed
+
+    def _record(self, text, voice_id, voice_name, settings, timestamp, model_id, clip_path):
+        key = normalize(text)
+        if not key:
+            return False
+        if self._last_use is None or timestamp - self._last_use > self.stream_gap:
+            self._stream_start = timestamp
+        self._last_use = max(self._last_use or timestamp, timestamp)
+
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = RankedPhrase(text, key, len(self.segments) + 1 if self.segments else 0)
+        weight = self.rate * timestamp
+        entry.log_score = _log_add(entry.log_score, weight)
+        if self.segments:
+            segment = bisect.bisect_right(self.segments, timestamp - self._stream_start)
+            entry.segment_scores[segment] = _log_add(entry.segment_scores[segment], weight)
+        entry.uses += 1
+        if timestamp >= entry.last_used:
+            entry.text = text
+            entry.voice_id, entry.voice_name, entry.settings = voice_id, voice_name, settings
+            entry.model_id, entry.clip_path = model_id, clip_path
+            entry.last_used = timestamp
+
+        changed = False
+        for view in range(len(self._tops)):
+            changed |= self._place(view, entry)
+        return changed
+
+    def _score(self, view, entry):
+        if view == 0:
+            return entry.log_score
+        return _log_add(entry.log_score, self.log_segment_weight + entry.segment_scores[view - 1])
+
+    def _place(self, view, entry):
+        """Move entry to its new position in a view's top list. Returns True if it is in it."""
+        score = self._score(view, entry)
+        top, members = self._tops[view], self._members[view]
+        old = members.get(entry.key)
+        if old is not None:
+            del top[bisect.bisect_left(top, (old, entry.key))]
+        elif len(top) >= self.top_size and (score, entry.key) <= top[0]:
+            return False
+        bisect.insort(top, (score, entry.key))
+        members[entry.key] = score
+        if len(top) > self.top_size:
+            del members[top.pop(0)[1]]
+        return True
+
+    def _changed(self):
+        self.version += 1
+        self._cached = {}
+        for callback in list(self._listeners):
+            try:
+                callback()
+            except Exception as e:
+                print(f"Phrase ranking listener failed: {e}")
+
+    # --- Reading ---
+
+    def current_segment(self, timestamp=None):
+        """Index of the part of the stream we are in (0 = opening), or None without segments."""
+        if not self.segments:
+            return None
+        now = time.time() if timestamp is None else timestamp
+        if self._last_use is None or now - self._last_use > self.stream_gap:
+            return 0  # The next phrase starts a new stream
+        return bisect.bisect_right(self.segments, now - self._stream_start)
+
+    def top(self, limit=None, segment=None, timestamp=None):
+        """
+        Best phrases first, for the given stream segment (default: the current
+        one). The tuple is shared until the next use; treat it as read-only.
+        """
+        if segment is None:
+            segment = self.current_segment(timestamp)
+        view = 0 if segment is None else segment + 1
+        ranked = self._cached.get(view)
+        if ranked is None:
+            with self._lock:
+                ranked = self._cached[view] = tuple(self._entries[key] for _, key in reversed(self._tops[view]))
+        return ranked if limit is None else ranked[:limit]
+
+    def candidates(self, limit):
+        """The top phrases of every stream segment, best first - everything the bar may show soon."""
+        if not self.segments:
+            return self.top(limit)
+        seen = {}
+        for segment in range(len(self.segments) + 1):
+            for entry in self.top(limit, segment=segment):
+                seen.setdefault(entry.key, entry)
+        return tuple(seen.values())
+
+    def score(self, text, timestamp=None):
+        """A phrase's decayed use count at a point in time (1.0 = one use just now)."""
+        entry = self._entries.get(normalize(text))
+        if entry is None:
+            return 0.0
+        now = time.time() if timestamp is None else timestamp
+        return math.exp(entry.log_score - self.rate * now)
@@ -0,0 +1,338 @@
+"""
+Type-ahead phrase search over favorites and past generations.
+
+Every distinct phrase is indexed in memory by its words. The vocabulary is
+kept as a sorted list, which works like a flattened trie: all words starting
+with a prefix are one contiguous bisect range. Each query word matches as a
+prefix, so results update on every keystroke; when that finds too little,
+query words of 4+ letters are also matched with one typo (an insertion,
+deletion, substitution or swap) against word prefixes.
+
+Each phrase occupies a slot, and a phrase gets a new, higher slot every
+time it is used again, so slot order is recency order. Postings are slot
+sets for rare words and integer bitsets for common words and for all one-
+and two-letter prefixes. A query ANDs one bitset per word and reads the
+highest bits, which are the most recent matches, so even a one-letter query
+over 50k phrases never sorts or scans the whole index.
+
+The index is updated incrementally as clips are generated and favorites
+change, so nothing is rebuilt while typing.
+"""
+
+import bisect
+import re
+import threading
+
+SEARCH_LIMIT = 500
+FUZZY_MIN_LENGTH = 4
+CACHED_PREFIX_LENGTH = 2
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def normalize(text):
+    return " ".join(text.casefold().split())
+
+
+def tokenize(text):
+    return _WORD_RE.findall(text.casefold())
+
+
+def fuzzy_variants(term, alphabet):
+    """Every string one edit away from term (insert, delete, substitute, swap)."""
+    variants = set()
+    for i in range(len(term) + 1):
+        head, tail = term[:i], term[i:]
+        if tail:
+            variants.add(head + tail[1:])
+            if len(tail) > 1:
+                variants.add(head + tail[1] + tail[0] + tail[2:])
+        for c in alphabet:
+            variants.add(head + c + tail)
+            if tail:
+                variants.add(head + c + tail[1:])
+    variants.discard(term)
+    return variants
+
+
+def _slots_to_bits(slots, size):
+    bits = bytearray((size >> 3) + 1)
+    for slot in slots:
+        bits[slot >> 3] |= 1 << (slot & 7)
+    return int.from_bytes(bits, 'little')
+
+
+class PhraseEntry:
+    __slots__ = ('text', 'key', 'words', 'prefixes', 'slot', 'favorite_id',
+                 'voice_id', 'voice_name', 'last_used', 'uses')
+
+    def __init__(self, text, key, words):
+        self.text = text
+        self.key = key
+        self.words = words
+        self.prefixes = {w[:n] for w in words for n in range(1, CACHED_PREFIX_LENGTH + 1)}
+        self.slot = None
+        self.favorite_id = None
+        self.voice_id = None
+        self.voice_name = None
+        self.last_used = 0.0
+        self.uses = 0
+
+    @property
+    def is_favorite(self):
+        return self.favorite_id is not None
+
+
+class PhraseIndex:
+    """Incrementally maintained prefix / fuzzy index of phrases."""
+
+    def __init__(self):
+        self._entries = {}       # normalized text -> PhraseEntry
+        self._slots = []         # slot -> PhraseEntry, None once the phrase moved on
+        self._postings = {}      # word -> set of slots, or a bitset for common words
+        self._vocabulary = []    # sorted words
+        self._prefix_bits = {}   # one- and two-letter prefix -> bitset
+        self._favorite_bits = 0
+        self._favorites = {}     # favorite id -> normalized text
+        self._alphabet = set()
+        self._bulk = False
+        self._lock = threading.RLock()
+        self.ready = threading.Event()
+
+    def __len__(self):
+        return len(self._entries)
+
+    # --- Building ---
+
+    def load(self, generations=(), favorites=()):
+        """
+        Bulk-load phrases. generations yields (text, voice_id, voice_name,
+        last_used, uses) oldest first; favorites are favorite dicts.
+        """
+        with self._lock:
+            self._bulk = True
+            try:
+                for text, voice_id, voice_name, last_used, uses in generations:
+                    self.add_generation(text, voice_id, voice_name, last_used, uses)
+                self.sync_favorites(favorites)
+            finally:
+                self._bulk = False
+                self._rebuild()
+        self.ready.set()
+
+    def add_generation(self, text, voice_id=None, voice_name=None, timestamp=0.0, uses=1):
+        """Index (or move to the front) a generated phrase."""
+        with self._lock:
+            entry = self._entry(text)
+            if entry is None:
+                return
+            entry.uses += uses
+            if timestamp >= entry.last_used or entry.slot is None:
+                entry.text = text
+                entry.voice_id, entry.voice_name = voice_id, voice_name
+                entry.last_used = max(entry.last_used, timestamp)
+                self._move_to_front(entry)
+
+    def sync_favorites(self, favorites):
+        """Bring favorites in line with the current favorites list (added and removed ones)."""
+        with self._lock:
+            current = {fav['id']: fav for fav in favorites}
+            for fav_id in [i for i in self._favorites if i not in current]:
+                entry = self._entries.get(self._favorites.pop(fav_id))
+                if entry is None or entry.favorite_id != fav_id:
+                    continue
+                entry.favorite_id = None
+                if not entry.uses:
+                    self._remove(entry)
+                elif entry.slot is not None and not self._bulk:
+                    self._favorite_bits &= ~(1 << entry.slot)
+            for fav_id, fav in sorted(current.items(), key=lambda item: item[1].get('timestamp') or 0):
+                if fav_id in self._favorites:
+                    continue
+                entry = self._entry(fav['text'])
+                if entry is None:
+                    continue
+                self._favorites[fav_id] = entry.key
+                entry.favorite_id = fav_id
+                entry.voice_id, entry.voice_name = fav.get('voice_id'), fav.get('voice_name')
+                entry.last_used = max(entry.last_used, fav.get('timestamp') or 0.0)
+                if entry.slot is None:
+                    self._move_to_front(entry)
+                elif not self._bulk:
+                    self._favorite_bits |= 1 << entry.slot
+
+    def _entry(self, text):
+        key = normalize(text)
+        if not key:
+            return None
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = PhraseEntry(text, key, tuple(dict.fromkeys(tokenize(key))))
+        return entry
+
+    def _move_to_front(self, entry):
+        if entry.slot is not None:
+            self._slots[entry.slot] = None
+            if not self._bulk:
+                self._clear_bits(entry)
+        entry.slot = len(self._slots)
+        self._slots.append(entry)
+        if self._bulk:
+            return
+        if len(self._slots) > 2 * len(self._entries) + 4096:
+            self._rebuild()
+        else:
+            self._set_bits(entry)
+
+    def _remove(self, entry):
+        del self._entries[entry.key]
+        if entry.slot is not None:
+            self._slots[entry.slot] = None
+            if not self._bulk:
+                self._clear_bits(entry)
+            entry.slot = None
+
+    def _bitset_threshold(self):
+        # A slot set costs ~50 bytes per member, a bitset one bit per slot
+        return max(64, len(self._slots) >> 8)
+
+    def _set_bits(self, entry):
+        slot = entry.slot
+        bit = 1 << slot
+        for word in entry.words:
+            posting = self._postings.get(word)
+            if posting is None:
+                self._postings[word] = {slot}
+                bisect.insort(self._vocabulary, word)
+                self._alphabet.update(word)
+            elif isinstance(posting, set):
+                posting.add(slot)
+                if len(posting) > self._bitset_threshold():
+                    self._postings[word] = _slots_to_bits(posting, len(self._slots))
+            else:
+                self._postings[word] = posting | bit
+        for prefix in entry.prefixes:
+            self._prefix_bits[prefix] = self._prefix_bits.get(prefix, 0) | bit
+        if entry.favorite_id is not None:
+            self._favorite_bits |= bit
+
+    def _clear_bits(self, entry):
+        mask = ~(1 << entry.slot)
+        for word in entry.words:
+            posting = self._postings[word]
+            if isinstance(posting, set):
+                posting.discard(entry.slot)
+            else:
+                posting &= mask
+                self._postings[word] = posting
+            if not posting:
+                del self._postings[word]
+                del self._vocabulary[bisect.bisect_left(self._vocabulary, word)]
+        for prefix in entry.prefixes:
+            bits = self._prefix_bits[prefix] & mask
+            if bits:
+                self._prefix_bits[prefix] = bits
+            else:
+                del self._prefix_bits[prefix]
+        self._favorite_bits &= mask
+
+    def _rebuild(self):
+        """Renumber live phrases into consecutive slots (keeping their order) and rebuild all postings."""
+        live = [entry for entry in self._slots if entry is not None]
+        self._slots = live
+        size = len(live)
+        word_slots, prefix_slots, favorite_slots = {}, {}, []
+        for slot, entry in enumerate(live):
+            entry.slot = slot
+            for word in entry.words:
+                word_slots.setdefault(word, []).append(slot)
+            for prefix in entry.prefixes:
+                prefix_slots.setdefault(prefix, []).append(slot)
+            if entry.favorite_id is not None:
+                favorite_slots.append(slot)
+        threshold = self._bitset_threshold()
+        self._postings = {word: _slots_to_bits(slots, size) if len(slots) > threshold else set(slots)
+                          for word, slots in word_slots.items()}
+        self._vocabulary = sorted(self._postings)
+        self._alphabet = set(''.join(self._vocabulary))
+        self._prefix_bits = {prefix: _slots_to_bits(slots, size) for prefix, slots in prefix_slots.items()}
+        self._favorite_bits = _slots_to_bits(favorite_slots, size)
+
+    # --- Searching ---
+
+    def _bits_for(self, prefixes):
+        """Bitset of phrases with a word starting with any of prefixes."""
+        bits = 0
+        sparse = []
+        for prefix in prefixes:
+            if len(prefix) <= CACHED_PREFIX_LENGTH:
+                bits |= self._prefix_bits.get(prefix, 0)
+                continue
+            lo = bisect.bisect_left(self._vocabulary, prefix)
+            hi = bisect.bisect_left(self._vocabulary, prefix + '\U0010ffff', lo)
+            for word in self._vocabulary[lo:hi]:
+                posting = self._postings[word]
+                if isinstance(posting, set):
+                    sparse.extend(posting)
+                else:
+                    bits |= posting
+        if sparse:
+            bits |= _slots_to_bits(sparse, len(self._slots))
+        return bits
+
+    def _has_prefix(self, prefix):
+        if len(prefix) <= CACHED_PREFIX_LENGTH:
+            return prefix in self._prefix_bits
+        i = bisect.bisect_left(self._vocabulary, prefix)
+        return i < len(self._vocabulary) and self._vocabulary[i].startswith(prefix)
+
+    def _match(self, term_prefixes):
+        bits = -1
+        for prefixes in term_prefixes:
+            bits &= self._bits_for(prefixes)
+            if not bits:
+                return 0
+        return bits
+
+    def _take(self, bits, limit):
+        """Favorites among bits (most recent first), then the newest other phrases."""
+        results = []
+        favorites = bits & self._favorite_bits
+        while favorites:
+            slot = favorites.bit_length() - 1
+            favorites ^= 1 << slot
+            results.append(self._slots[slot])
+        results.sort(key=lambda entry: entry.last_used, reverse=True)
+        del results[limit:]
+        others = bits & ~self._favorite_bits
+        while others and len(results) < limit:
+            slot = others.bit_length() - 1
+            others ^= 1 << slot
+            entry = self._slots[slot]
+            if entry is not None:
+                results.append(entry)
+        return results
+
+    def search(self, query, limit=SEARCH_LIMIT, fuzzy=True):
+        """
+        Phrases matching query, best first: favorites, then most recently
+        used. Typo matches come after all exact prefix matches.
+        """
+        with self._lock:
+            terms = list(dict.fromkeys(tokenize(query)))
+            if not terms:
+                return self._take((1 << len(self._slots)) - 1, limit)
+            exact = self._match([[term] for term in terms])
+            results = self._take(exact, limit) if exact else []
+            if fuzzy and len(results) < limit and any(len(t) >= FUZZY_MIN_LENGTH for t in terms):
+                alphabet = ''.join(sorted(self._alphabet))
+                term_prefixes = []
+                for term in terms:
+                    prefixes = [term]
+                    if len(term) >= FUZZY_MIN_LENGTH:
+                        prefixes.extend(v for v in fuzzy_variants(term, alphabet) if self._has_prefix(v))
+                    term_prefixes.append(prefixes)
+                typo = self._match(term_prefixes) & ~exact
+                if typo:
+                    results.extend(self._take(typo, limit - len(results)))
+            return results
@@ -0,0 +1,168 @@
+"""
+Pre-synthesized audio for the phrases most likely to be used next.
+
+The warmer is handed the top-ranked phrases (see phrase_ranking) and keeps
+an MP3 for each in tts_favorites/warm/, named like favorite audio after the
+text, voice, settings and TTS model, plus a decoded copy in memory. The
+audio comes from the phrase's last clip or a matching favorite when those
+still exist (no API call); otherwise it is rendered once in a background
+thread that waits for live generation to go idle. Phrases that fall out of
+the top are deleted, so the warm set stays small.
+
+Generating a warm phrase with the same voice and settings copies the file
+instead of calling the API, and the quick phrase bar plays it from memory.
+"""
+
+import os
+import shutil
+import threading
+
+from background_io import live_activity
+from favorite_audio import audio_key, read_bytes
+
+PHRASE_WARM_COUNT = int(os.getenv("PHRASE_WARM_COUNT", "8"))
+PHRASE_WARM_RENDER = os.getenv("PHRASE_WARM_RENDER", "true").lower() == "true"
+FILE_PREFIX = "warm_"
+
+
+class PhraseWarmer:
+    """Keeps audio for a changing set of phrases rendered on disk and decoded in memory."""
+
+    def __init__(self, directory, render, model_id=None, find_audio=None, decode=read_bytes,
+                 render_missing=PHRASE_WARM_RENDER, gate=live_activity):
+        """
+        Args:
+            directory: Where warm audio lives (tts_favorites/warm/)
+            render: render(phrase, path) synthesizes a phrase to path, returns truthy on success
+            model_id: The TTS model renders use
+            find_audio: find_audio(phrase) returns an existing file with exactly this audio, or None
+            decode: Turn a file into something playable
+            render_missing: Spend API calls on phrases with no existing audio
+            gate: Renders wait until live generation has been idle for a moment
+        """
+        self.directory = directory
+        self.render = render
+        self.model_id = model_id
+        self.find_audio = find_audio
+        self.decode = decode
+        self.render_missing = render_missing
+        self.gate = gate
+        self.renders = 0
+        self.adopted = 0
+        self.render_failures = 0
+        self._wanted = {}     # file name -> phrase
+        self._decoded = {}    # file name -> decoded audio
+        self._failed = set()  # Not retried until restart
+        self._lock = threading.Lock()
+        self._event = threading.Event()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._worker = None
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, filename):
+        return os.path.join(self.directory, filename)
+
+    def filename_for(self, text, voice_id, settings):
+        return f"{FILE_PREFIX}{audio_key(text, voice_id, settings, self.model_id)}.mp3"
+
+    def warm(self, phrases):
+        """Make phrases (with text, voice_id and settings) the warm set; the work happens in the background."""
+        wanted = {self.filename_for(p.text, p.voice_id, p.settings): p for p in phrases if p.voice_id}
+        with self._lock:
+            if wanted.keys() == self._wanted.keys():
+                return
+            self._wanted = wanted
+            self._idle.clear()
+            self._event.set()
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._warm_loop, name="phrase-warmer", daemon=True)
+                self._worker.start()
+
+    def lookup(self, text, voice_id, settings):
+        """Path of warm audio for exactly this text, voice and settings, or None."""
+        path = self.path(self.filename_for(text, voice_id, settings))
+        return path if os.path.exists(path) else None
+
+    def get(self, text, voice_id, settings):
+        """Decoded warm audio, or None if the phrase is not warm (yet)."""
+        return self._decoded.get(self.filename_for(text, voice_id, settings))
+
+    def source_clips(self):
+        """Generated clips the warm set's audio can be copied from (kept, so re-warming needs no API call)."""
+        with self._lock:
+            return [p.clip_path for p in self._wanted.values() if getattr(p, 'clip_path', None)]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'wanted': len(self._wanted),
+                'decoded_in_memory': len(self._decoded),
+                'renders': self.renders,
+                'adopted_clips': self.adopted,
+                'render_failures': self.render_failures,
+            }
+
+    def wait(self, timeout=None):
+        """Block until the current warm set is ready."""
+        return self._idle.wait(timeout)
+
+    # --- Background work ---
+
+    def _warm_loop(self):
+        while True:
+            self._event.wait()
+            self._event.clear()
+            with self._lock:
+                wanted = dict(self._wanted)
+            for name, phrase in wanted.items():
+                if self._event.is_set():
+                    break  # A newer warm set arrived; start over with that one
+                try:
+                    self._warm_one(name, phrase)
+                except Exception as e:
+                    print(f"Error warming '{phrase.text[:30]}': {e}")
+            self._drop_unwanted()
+            with self._lock:
+                if not self._event.is_set():
+                    self._idle.set()
+
+    def _warm_one(self, name, phrase):
+        path = self.path(name)
+        if not os.path.exists(path):
+            if name in self._failed:
+                return
+            temp_path = path + ".part"
+            source = self.find_audio(phrase) if self.find_audio else None
+            if source:
+                shutil.copyfile(source, temp_path)
+                self.adopted += 1
+            elif self.render_missing:
+                if self.gate is not None:
+                    self.gate.wait_idle()
+                if not self.render(phrase, temp_path) or not os.path.exists(temp_path):
+                    self.render_failures += 1
+                    self._failed.add(name)
+                    if os.path.exists(temp_path):
+                        os.remove(temp_path)
+                    return
+                self.renders += 1
+            else:
+                return
+            os.replace(temp_path, path)
+        if name not in self._decoded:
+            decoded = self.decode(path)
+            with self._lock:
+                self._decoded[name] = decoded
+
+    def _drop_unwanted(self):
+        with self._lock:
+            wanted = set(self._wanted)
+            for name in [n for n in self._decoded if n not in wanted]:
+                del self._decoded[name]
+        for name in os.listdir(self.directory):
+            if name.startswith(FILE_PREFIX) and name not in wanted and not name.endswith(".part"):
+                try:
+                    os.remove(self.path(name))
+                except OSError:
+                    pass
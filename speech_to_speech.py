@@ -0,0 +1,239 @@
+"""
+Voice changer: speech converted straight into the selected voice with
+ElevenLabs speech-to-speech, keeping your own timing and intonation.
+
+Re-voicing through speech-to-text and text-to-speech throws the prosody
+away and pays for two round trips. Here each chunk of speech the always-
+open capture cuts (a pause of STS_PAUSE_MS, or STS_MAX_CHUNK_SECONDS of
+continuous speech) is uploaded as raw 16 kHz PCM to the streaming
+endpoint, and the converted PCM is played as it arrives, before the rest
+of the chunk has been converted. Up to STS_WORKERS chunks are converted at
+once; playback is always in the order spoken.
+
+Latency is bounded: a chunk whose audio would start more than
+STS_MAX_DELAY_SECONDS after it was spoken (slow network, a backlog of long
+chunks) is skipped rather than played late, so the voice catches up with
+the speaker instead of drifting further behind.
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+STS_MODEL_ID = os.getenv("STS_MODEL_ID", "eleven_multilingual_sts_v2")
+STS_OUTPUT_RATE = int(os.getenv("STS_OUTPUT_RATE", "24000"))    # 16000, 22050, 24000 or 44100
+STS_PAUSE_MS = int(os.getenv("STS_PAUSE_MS", "250"))
+STS_MAX_CHUNK_SECONDS = float(os.getenv("STS_MAX_CHUNK_SECONDS", "3"))
+STS_MAX_DELAY_SECONDS = float(os.getenv("STS_MAX_DELAY_SECONDS", "3"))
+STS_WORKERS = int(os.getenv("STS_WORKERS", "2"))
+STS_IDLE_SECONDS = float(os.getenv("STS_IDLE_SECONDS", "10"))
+READ_BYTES = 4096
+EDGE_SAMPLES = 1600   # 100 ms kept around the voiced part of a chunk (16 kHz)
+
+
+def multipart_body(fields, files):
+    """Encode form fields {name: str} and files {name: (filename, bytes, type)}; returns (content type, body)."""
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n'.encode()
+                     + str(value).encode() + b'\r\n')
+    for name, (filename, data, content_type) in files.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+                     f'Content-Type: {content_type}\r\n\r\n'.encode() + data + b'\r\n')
+    parts.append(f'--{boundary}--\r\n'.encode())
+    return f'multipart/form-data; boundary={boundary}', b''.join(parts)
+
+
+def convert_stream(api_base, api_key, voice_id, samples, output_rate=STS_OUTPUT_RATE, model_id=STS_MODEL_ID,
+                   voice_settings=None, timeout=30):
+    """
+    Convert 16 kHz int16 speech to the voice and yield the converted 16-bit
+    mono PCM (at output_rate) as it streams back. Raises RuntimeError if the
+    request fails.
+    """
+    fields = {'model_id': model_id, 'file_format': 'pcm_s16le_16'}
+    if voice_settings:
+        fields['voice_settings'] = json.dumps(voice_settings)
+    content_type, body = multipart_body(fields, {'audio': ('speech.pcm', samples.tobytes(),
+                                                           'application/octet-stream')})
+    request = urllib.request.Request(
+        f"{api_base}/v1/speech-to-speech/{voice_id}/stream?output_format=pcm_{output_rate}",
+        data=body, method='POST', headers={'xi-api-key': api_key, 'Content-Type': content_type})
+    try:
+        response = urllib.request.urlopen(request, timeout=timeout)
+    except urllib.error.HTTPError as e:
+        raise RuntimeError(f"speech-to-speech failed: {e.code} {e.read()[:200]!r}")
+    except (urllib.error.URLError, OSError) as e:
+        raise RuntimeError(f"speech-to-speech failed: {e}")
+    with response:
+        odd = b''
+        while True:
+            data = response.read1(READ_BYTES)
+            if not data:
+                return
+            data = odd + data
+            cut = len(data) // 2 * 2  # Never split a sample between pieces
+            odd = data[cut:]
+            if cut:
+                yield data[:cut]
+
+
+class Chunk:
+    """One chunk of speech on its way through conversion to the speaker."""
+
+    __slots__ = ('seq', 'seconds', 'spoken_at', 'pieces', 'first_audio_at', 'bytes_played', 'skipped', 'error')
+
+    def __init__(self, seq, seconds, spoken_at):
+        self.seq = seq
+        self.seconds = seconds            # Length of the speech
+        self.spoken_at = spoken_at        # time.monotonic() when the chunk's speech ended
+        self.pieces = queue.Queue()       # Converted PCM as it arrives, then None
+        self.first_audio_at = None
+        self.bytes_played = 0
+        self.skipped = False
+        self.error = None
+
+    @property
+    def latency(self):
+        """Mouth to speaker: end of speech to its first converted audio (None if not played)."""
+        return None if self.first_audio_at is None else self.first_audio_at - self.spoken_at
+
+
+class VoiceChanger:
+    """Runs one voice-changer session over a started MicCapture."""
+
+    def __init__(self, capture, convert, write, on_chunk=None, pause_ms=STS_PAUSE_MS,
+                 max_chunk_seconds=STS_MAX_CHUNK_SECONDS, max_delay=STS_MAX_DELAY_SECONDS, workers=STS_WORKERS,
+                 idle_seconds=STS_IDLE_SECONDS):
+        """
+        Args:
+            capture: A started MicCapture
+            convert: convert(int16 samples at 16 kHz) -> iterable of converted PCM bytes as they arrive
+            write: write(pcm bytes) plays audio, blocking while the output buffer is full
+            on_chunk: on_chunk(chunk, stage) when a chunk starts "playing", is "skipped" or "failed"
+        """
+        self.capture = capture
+        self.convert = convert
+        self.write = write
+        self.on_chunk = on_chunk
+        self.pause = pause_ms / 1000.0
+        self.max_chunk_seconds = max_chunk_seconds
+        self.max_delay = max_delay
+        self.workers = workers
+        self.idle_seconds = idle_seconds
+        self.chunks = []
+        self._sent_until = 0              # Stream position up to which audio has been sent
+        self._playback = queue.Queue()    # Chunks in spoken order, then None
+        self._stop = threading.Event()
+
+    def stop(self):
+        """Stop listening; chunks already spoken are still played (within the delay bound)."""
+        self._stop.set()
+
+    def run(self):
+        """Run the session (blocking). Returns the chunks in the order spoken."""
+        saved = self.capture.override_segmenting(self.pause, self.max_chunk_seconds)
+        pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="sts-convert")
+        player = threading.Thread(target=self._play_loop, name="sts-play", daemon=True)
+        player.start()
+        try:
+            self._capture_loop(pool)
+        finally:
+            self.capture.restore_segmenting(saved)
+            self._playback.put(None)
+        player.join()
+        pool.shutdown(wait=True)
+        return self.chunks
+
+    def latencies(self):
+        return [c.latency for c in self.chunks if c.latency is not None]
+
+    # --- Stages ---
+
+    def _capture_loop(self, pool):
+        self.capture.drain()
+        last_speech = time.monotonic()
+        while not self._stop.is_set():
+            try:
+                utterance = self.capture.utterances.get(timeout=0.1)
+            except queue.Empty:
+                if self.capture.current_speech() is not None:
+                    last_speech = time.monotonic()
+                elif time.monotonic() - last_speech > self.idle_seconds:
+                    break
+                continue
+            last_speech = time.monotonic()
+            samples = self._trim(utterance)
+            if not len(samples):
+                continue
+            chunk = Chunk(len(self.chunks), len(samples) / self.capture.rate, utterance.speech_ended_at)
+            self.chunks.append(chunk)
+            pool.submit(self._convert, chunk, samples)
+            self._playback.put(chunk)
+
+    def _trim(self, utterance):
+        """
+        The voiced part of an utterance with a short edge. The capture's full
+        pre-roll and tail would make the converted audio longer than the
+        speech, so playback would drift behind; chunks cut in the middle of
+        speech would also repeat each other's edges.
+        """
+        first = max(utterance.speech_start - EDGE_SAMPLES, utterance.start, self._sent_until)
+        last = min(utterance.speech_end + EDGE_SAMPLES, utterance.end)
+        self._sent_until = max(self._sent_until, last)
+        return utterance.samples[max(0, first - utterance.start):max(0, last - utterance.start)]
+
+    def _convert(self, chunk, samples):
+        try:
+            for piece in self.convert(samples):
+                if chunk.skipped:
+                    break  # Too late to be played: stop downloading it
+                chunk.pieces.put(piece)
+        except Exception as e:
+            chunk.error = str(e)
+            print(f"Error converting speech chunk {chunk.seq}: {e}")
+        chunk.pieces.put(None)
+
+    def _play_loop(self):
+        while True:
+            chunk = self._playback.get()
+            if chunk is None:
+                return
+            self._play(chunk)
+
+    def _play(self, chunk):
+        # Wait for the first converted audio only as long as the delay bound allows
+        try:
+            piece = chunk.pieces.get(timeout=max(0.0, chunk.spoken_at + self.max_delay - time.monotonic()))
+        except queue.Empty:
+            piece = b''
+        if piece == b'' or (piece is not None and time.monotonic() - chunk.spoken_at > self.max_delay):
+            chunk.skipped = True  # Would start too late; the next chunk catches up
+            self._notify(chunk, "skipped")
+            return
+        if piece is not None:
+            chunk.first_audio_at = time.monotonic()
+            self._notify(chunk, "playing")
+        while piece is not None:
+            try:
+                self.write(piece)
+            except Exception as e:
+                print(f"Error playing converted speech: {e}")
+            chunk.bytes_played += len(piece)
+            piece = chunk.pieces.get()
+        if chunk.error:
+            self._notify(chunk, "failed")
+
+    def _notify(self, chunk, stage):
+        if self.on_chunk is not None:
+            try:
+                self.on_chunk(chunk, stage)
+            except Exception as e:
+                print(f"Voice changer callback failed: {e}")
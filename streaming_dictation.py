@@ -0,0 +1,175 @@
+"""
+Streaming dictation: partial transcripts while the speaker is still talking.
+
+A dictation session reads the speech in progress straight from the always-
+open capture's ring buffer (mic_capture) and re-recognizes it every
+DICTATION_PARTIAL_MS with the local recognizer. Words that two consecutive
+hypotheses agree on are committed and later partials never take them
+back; the rest is shown as a tentative tail. Each utterance the capture
+cuts (voice activity end) is a segment: it is recognized once more as a
+whole and that text is final.
+
+So that the final text does not wait for that last recognition, it is
+started speculatively as soon as the speaker has been quiet for the
+utterance's tail (the audio an utterance keeps after its last voiced
+frame). If the capture then closes the utterance with exactly that audio,
+the result is already there; if the speaker carries on, it is discarded.
+
+A session ends when stop() is called, when nobody starts speaking within
+DICTATION_START_TIMEOUT seconds, or after DICTATION_IDLE_SECONDS of
+silence following a segment.
+"""
+
+import os
+import queue
+import threading
+import time
+
+DICTATION_PARTIAL_MS = int(os.getenv("DICTATION_PARTIAL_MS", "300"))
+DICTATION_IDLE_SECONDS = float(os.getenv("DICTATION_IDLE_SECONDS", "4"))
+DICTATION_START_TIMEOUT = float(os.getenv("DICTATION_START_TIMEOUT", "10"))
+
+
+def agreed_prefix(a, b):
+    """Number of leading words two hypotheses share (case and punctuation aside)."""
+    n = 0
+    for x, y in zip(a, b):
+        if x.strip(".,!?;:").lower() != y.strip(".,!?;:").lower():
+            break
+        n += 1
+    return n
+
+
+class StreamingDictation:
+    """One dictation session over a running MicCapture."""
+
+    def __init__(self, capture, recognize, on_update=None, partial_ms=DICTATION_PARTIAL_MS,
+                 idle_seconds=DICTATION_IDLE_SECONDS, start_timeout=DICTATION_START_TIMEOUT):
+        """
+        Args:
+            capture: A started MicCapture
+            recognize: recognize(int16 samples at 16 kHz) -> text
+            on_update: on_update(committed, tentative, done) after every change
+        """
+        self.capture = capture
+        self.recognize = recognize
+        self.on_update = on_update
+        self.interval = partial_ms / 1000.0
+        self.idle_seconds = idle_seconds
+        self.start_timeout = start_timeout
+        self.segments = []          # Final text per utterance
+        self.recognitions = 0
+        self.speculative_hits = 0
+        self.final_delays = []      # Seconds from the capture closing an utterance to its final text
+        self._stop = threading.Event()
+        self._reset_utterance()
+
+    def _reset_utterance(self):
+        self._previous = []         # Words of the last partial hypothesis
+        self._committed = []        # Words agreed on so far in this utterance
+        self._tentative = []
+        self._speculative = None    # ((start, end), text)
+
+    def stop(self):
+        """End the session; speech in progress is finalized with what has been heard."""
+        self._stop.set()
+
+    @property
+    def text(self):
+        return " ".join(self.segments)
+
+    def run(self):
+        """Run the session (blocking) and return the final text."""
+        self.capture.drain()
+        started = last_segment = time.monotonic()
+        self._wait = self.interval
+        while not self._stop.is_set():
+            try:
+                utterance = self.capture.utterances.get(timeout=self._wait)
+            except queue.Empty:
+                utterance = None
+            if utterance is not None:
+                self._finish_utterance(utterance)
+                last_segment = time.monotonic()
+                continue
+            speech = self.capture.current_speech()
+            if speech is None:
+                limit = self.idle_seconds if self.segments else self.start_timeout
+                if time.monotonic() - (last_segment if self.segments else started) > limit:
+                    break
+                continue
+            self._wait = self._partial(speech)
+
+        speech = self.capture.current_speech()
+        if speech is not None:  # Stopped mid-sentence
+            self._commit_segment(self._recognize(speech[0], self.capture.ring.written))
+        self._update(done=True)
+        return self.text
+
+    def _recognize(self, start, end):
+        try:
+            samples = self.capture.ring.read(start, end)
+        except ValueError:
+            return ""
+        self.recognitions += 1
+        try:
+            return (self.recognize(samples) or "").strip()
+        except Exception as e:
+            print(f"Error recognizing dictation: {e}")
+            return ""
+
+    def _partial(self, speech):
+        """Update the hypothesis for the speech in progress; returns how long to wait before the next one."""
+        start, voiced_end = speech
+        written = self.capture.ring.written
+        end = voiced_end + self.capture.tail_samples
+        if written >= end:
+            # Quiet for the whole tail: this is what the utterance will be if nobody speaks again
+            if self._speculative is None or self._speculative[0] != (start, end):
+                text = self._recognize(start, end)
+                self._speculative = ((start, end), text)
+                words = text.split()
+                if agreed_prefix(self._committed, words) == len(self._committed):
+                    self._tentative = words[len(self._committed):]
+                    self._update()
+            return self.interval
+        words = self._recognize(start, written).split()
+        agreed = agreed_prefix(self._previous, words)
+        if agreed > len(self._committed):
+            self._committed = words[:agreed]
+        self._previous = words
+        self._tentative = words[len(self._committed):] if agreed_prefix(self._committed, words) == \
+            len(self._committed) else []
+        self._update()
+        # Wake up early if the speaker may be done by then, so the speculative recognition starts at once
+        until_tail = (end - self.capture.ring.written) / self.capture.rate
+        return min(self.interval, max(0.01, until_tail))
+
+    def _finish_utterance(self, utterance):
+        if self._speculative is not None and self._speculative[0] == (utterance.start, utterance.end):
+            text = self._speculative[1]
+            self.speculative_hits += 1
+        else:
+            self.recognitions += 1
+            try:
+                text = (self.recognize(utterance.samples) or "").strip()
+            except Exception as e:
+                print(f"Error recognizing dictation: {e}")
+                text = " ".join(self._committed + self._tentative)
+        self.final_delays.append(time.monotonic() - utterance.detected_at)
+        self._commit_segment(text)
+        self._update()
+
+    def _commit_segment(self, text):
+        if text:
+            self.segments.append(text)
+        self._reset_utterance()
+
+    def _update(self, done=False):
+        if self.on_update is None:
+            return
+        committed = " ".join(self.segments + ([" ".join(self._committed)] if self._committed else []))
+        try:
+            self.on_update(committed, " ".join(self._tentative), done)
+        except Exception as e:
+            print(f"Dictation update failed: {e}")
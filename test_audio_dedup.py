@@ -0,0 +1,82 @@
+"""
+Test script for content-hash deduplication of generated audio
+Runs against a temporary directory, no API calls
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from audio_dedup import DedupStore
+
+
+def chunks(data, size=1024):
+    return (data[i:i + size] for i in range(0, len(data), size))
+
+
+def test_duplicates_share_one_blob():
+    """Identical clips become links to one blob and savings are reported"""
+    print("Testing duplicate writes...")
+    with tempfile.TemporaryDirectory() as d:
+        store = DedupStore(d)
+        phrase = os.urandom(30_000)
+        results = [store.write_clip(os.path.join(d, f"quick_{i}.mp3"), chunks(phrase)) for i in range(3)]
+        store.write_clip(os.path.join(d, "other.mp3"), chunks(os.urandom(10_000)))
+
+        assert [dup for _, dup in results] == [False, True, True]
+        assert os.stat(os.path.join(d, "quick_0.mp3")).st_ino == os.stat(os.path.join(d, "quick_2.mp3")).st_ino
+        stats = store.stats()
+        print(f"   {stats}")
+        assert stats['blobs'] == 2 and stats['bytes_saved'] == 60_000
+        assert store.shared_names() == {"quick_0.mp3", "quick_1.mp3", "quick_2.mp3"}
+    print("   ✅ Duplicates hard-linked to a single blob")
+    return True
+
+
+def test_blob_deleted_only_after_last_reference():
+    """Removing clips keeps the blob until nothing references it, across restarts"""
+    print("Testing reference counting...")
+    with tempfile.TemporaryDirectory() as d:
+        store = DedupStore(d)
+        phrase = os.urandom(20_000)
+        for i in range(2):
+            store.write_clip(os.path.join(d, f"dup_{i}.mp3"), chunks(phrase))
+        blob_files = [os.path.join(r, n) for r, _, ns in os.walk(store.blobs_dir) for n in ns
+                      if not n.endswith('.jsonl')]
+        assert len(blob_files) == 1
+
+        store.remove("dup_0.mp3")
+        assert os.path.exists(blob_files[0])
+
+        reopened = DedupStore(d)
+        assert reopened.stats()['clips'] == 1
+        reopened.remove("dup_1.mp3")
+        assert not os.path.exists(blob_files[0])
+        assert reopened.stats()['blobs'] == 0
+    print("   ✅ Blob removed with its last reference")
+    return True
+
+
+def main():
+    print("🧬 VoiceMaster Pro - Audio Dedup Test")
+    print("=" * 50)
+
+    tests = [test_duplicates_share_one_blob, test_blob_deleted_only_after_last_reference]
+
+    all_passed = True
+    for test in tests:
+        try:
+            all_passed &= test()
+        except Exception as e:
+            print(f"❌ Test failed: {e}")
+            all_passed = False
+
+    print("\n🎉 All dedup tests passed!" if all_passed else "\n⚠️  Some dedup tests failed.")
+    return all_passed
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,303 @@
+"""
+Test script for the shared audio device registry
+Uses a small in-memory PortAudio (device scans cost time like the real one), no sound card needed
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import audio_devices
+from audio_devices import DeviceRegistry
+from mic_capture import MicCapture
+
+SCAN_SECONDS_PER_DEVICE = 0.002   # PortAudio probes every device on every host API when initialized
+
+
+def device(name, inputs=0, outputs=0, rate=48000.0):
+    return {'name': name, 'hostApi': 0, 'maxInputChannels': inputs, 'maxOutputChannels': outputs,
+            'defaultSampleRate': rate, 'defaultLowInputLatency': 0.01, 'defaultLowOutputLatency': 0.02}
+
+
+class FakePortAudio:
+    """Stands in for the pyaudio module: devices can be plugged and unplugged between scans."""
+
+    paInt16 = 8
+
+    def __init__(self, devices):
+        self.devices = list(devices)
+        self.instances = 0
+        self.live = 0
+        self.PyAudio = self._make_class()
+
+    def _make_class(self):
+        backend = self
+
+        class Stream:
+            def __init__(self, audio, kwargs):
+                self.audio, self.kwargs, self.open = audio, kwargs, True
+
+            def start_stream(self):
+                pass
+
+            def stop_stream(self):
+                pass
+
+            def write(self, data):
+                if not self.open:
+                    raise OSError("Stream closed")
+                self.audio.written += len(data)
+
+            def close(self):
+                self.open = False
+                self.audio.streams.remove(self)
+
+        class PyAudio:
+            def __init__(self):
+                backend.instances += 1
+                backend.live += 1
+                time.sleep(SCAN_SECONDS_PER_DEVICE * len(backend.devices))
+                self.devices = [dict(d, index=i) for i, d in enumerate(backend.devices)]
+                self.streams = []
+                self.written = 0
+
+            def get_device_count(self):
+                return len(self.devices)
+
+            def get_device_info_by_index(self, i):
+                return self.devices[i]
+
+            def get_default_input_device_info(self):
+                return next(d for d in self.devices if d['maxInputChannels'])
+
+            def get_default_output_device_info(self):
+                return next(d for d in self.devices if d['maxOutputChannels'])
+
+            def open(self, **kwargs):
+                stream = Stream(self, kwargs)
+                self.streams.append(stream)
+                return stream
+
+            def terminate(self):
+                assert not self.streams, "terminate() with streams still open"
+                backend.live -= 1
+
+        return PyAudio
+
+
+DEVICES = [device("Microsoft Sound Mapper - Input", inputs=2), device("Microphone (Realtek Audio)", inputs=2),
+           device("Blue Yeti Stereo Microphone", inputs=2, rate=44100.0),
+           device("Speakers (Realtek Audio)", outputs=2), device("Headphones (Realtek Audio)", outputs=2)]
+
+
+def legacy_microphone_list(backend):
+    """get_microphone_list before the registry: a new PyAudio for the count and for every device"""
+    mics = []
+    for i in range(backend.PyAudio().get_device_count()):
+        device_info = backend.PyAudio().get_device_info_by_index(i)
+        if device_info['maxInputChannels'] > 0:
+            mics.append({'index': i, 'name': device_info['name'], 'channels': device_info['maxInputChannels']})
+    return mics
+
+
+def test_cached_enumeration():
+    """One PortAudio instance and one scan serve every device query"""
+    print("Testing cached device lists...")
+    backend = FakePortAudio(DEVICES)
+    registry = DeviceRegistry(backend)
+    mics = [d.as_dict() for d in registry.inputs()]
+    assert [m['name'] for m in mics] == [d['name'] for d in DEVICES[:3]]
+    assert mics[2]['default_sample_rate'] == 44100.0 and mics[2]['channels'] == 2
+    assert [d.name for d in registry.outputs()] == ["Speakers (Realtek Audio)", "Headphones (Realtek Audio)"]
+    assert registry.default_input().index == 0 and registry.default_output().index == 3
+    assert registry.find("blue yeti").index == 2 and registry.find("Headphones", kind="output").index == 4
+    assert registry.find("Headphones") is None and registry.find("") is None
+    for _ in range(100):
+        registry.inputs(), registry.outputs()
+    assert backend.instances == 1 and registry.scans == 1
+
+    legacy_microphone_list(backend)
+    leaked = backend.live - 1
+    registry.terminate()
+    assert backend.live == leaked
+    print(f"   ✅ 1 instance for 200 queries (the old listing created and leaked {leaked})")
+    return True
+
+
+def test_hotplug_refresh():
+    """A refresh re-scans, and the open microphone follows its device to a new index or the default"""
+    print("Testing hotplug refresh...")
+    with tempfile.TemporaryDirectory() as d:
+        backend = FakePortAudio(DEVICES)
+        registry = DeviceRegistry(backend)
+        capture = MicCapture(device_index=2, registry=registry).start()
+        assert capture.device_name == "Blue Yeti Stereo Microphone"
+
+        # A USB headset is plugged in ahead of the Yeti, shifting its index
+        backend.devices.insert(1, device("Headset Microphone (USB)", inputs=1))
+        sound_device_dir, audio_devices.SOUND_DEVICE_DIR = audio_devices.SOUND_DEVICE_DIR, d
+        registry.watch()
+        audio_devices.SOUND_DEVICE_DIR = sound_device_dir
+        with open(os.path.join(d, "controlC1"), 'w'):
+            pass
+        deadline = time.time() + 5
+        while registry.scans < 2 and time.time() < deadline:
+            time.sleep(0.01)
+        assert registry.scans == 2, "creating a sound card node should trigger a refresh"
+        time.sleep(0.1)
+        assert registry.find("Headset").index == 1
+        assert capture.device_index == 3 and capture._stream.kwargs['input_device_index'] == 3
+        assert backend.live == 1
+
+        # The Yeti is unplugged: capture falls back to the default microphone
+        del backend.devices[3]
+        registry.refresh()
+        assert capture.device_index is None and capture._stream is not None
+        assert backend.live == 1 and backend.instances == 3
+
+        capture.stop()
+        registry.terminate()
+        assert backend.live == 0
+    print("   ✅ Microphone reopened on its new index, then on the default after unplugging")
+    return True
+
+
+def test_set_device():
+    """Switching microphones reuses the capture and the shared instance"""
+    print("Testing microphone switching...")
+    backend = FakePortAudio(DEVICES)
+    registry = DeviceRegistry(backend)
+    capture = MicCapture(registry=registry).start()
+    capture.set_device(1)
+    assert capture._stream.kwargs['input_device_index'] == 1 and capture.device_name == "Microphone (Realtek Audio)"
+    assert len(registry._audio.streams) == 1 and backend.instances == 1
+    capture.stop()
+    assert not registry._audio.streams
+    registry.terminate()
+    print("   ✅ One stream, one instance")
+    return True
+
+
+def test_refresh_during_start():
+    """A hotplug refresh while a dictation opens the microphone finishes instead of deadlocking"""
+    print("Testing a refresh racing a microphone start...")
+    backend = FakePortAudio(DEVICES)
+    registry = DeviceRegistry(backend)
+    capture = MicCapture(device_index=2, registry=registry).start()
+    capture.stop()
+    holding = threading.Event()
+
+    def dictation_start():
+        # start() holds the capture's lock while it opens the stream through the registry
+        with capture._lock:
+            holding.set()
+            time.sleep(0.2)
+            capture.start()
+
+    starter = threading.Thread(target=dictation_start, daemon=True)
+    refresher = threading.Thread(target=registry.refresh, daemon=True)
+    starter.start()
+    holding.wait()
+    refresher.start()
+    starter.join(5)
+    refresher.join(5)
+    assert not starter.is_alive() and not refresher.is_alive(), "refresh and start deadlocked"
+    assert capture._stream in registry._streams and capture.device_index == 2
+    assert len(registry._audio.streams) == 1
+    capture.stop()
+    registry.terminate()
+    assert backend.live == 0
+    print("   ✅ Both finished; the microphone is open on the new instance")
+    return True
+
+
+def test_output_follows_refresh():
+    """A playback stream opened by name keeps playing across a refresh and on the new index"""
+    print("Testing output stream across a refresh...")
+    backend = FakePortAudio(DEVICES)
+    registry = DeviceRegistry(backend)
+    output = audio_devices.DeviceOutput(registry, 24000, device_name="Headphones (Realtek Audio)").open()
+    assert output._stream.kwargs['output_device_index'] == 4
+    output.write(b"\0" * 960)
+
+    backend.devices.insert(0, device("Headset Earphone (USB)", outputs=2))
+    registry.refresh()
+    output.write(b"\0" * 960)
+    assert output._stream.kwargs['output_device_index'] == 5 and registry._audio.written == 960
+
+    del backend.devices[5]  # Headphones unplugged: the default output takes over
+    registry.refresh()
+    output.write(b"\0" * 960)
+    assert output._stream.kwargs['output_device_index'] is None and registry._audio.written == 960
+
+    output.close()
+    output.write(b"\0" * 960)   # Dropped after close, no error
+    registry.refresh()
+    assert not registry._audio.streams and not registry._listeners
+    registry.terminate()
+    assert backend.live == 0
+    print("   ✅ Reopened by name, then on the default output; closed cleanly")
+    return True
+
+
+def test_enumeration_benchmark(device_count=12, calls=20):
+    """Listing microphones before and after the registry"""
+    print(f"Benchmarking device enumeration with {device_count} devices "
+          f"({SCAN_SECONDS_PER_DEVICE * 1000:.0f} ms simulated probe per device)...")
+    devices = [device(f"Device {i}", inputs=2 if i % 2 else 0, outputs=0 if i % 2 else 2) for i in range(device_count)]
+
+    backend = FakePortAudio(devices)
+    started = time.perf_counter()
+    for _ in range(3):
+        legacy = legacy_microphone_list(backend)
+    legacy_ms = (time.perf_counter() - started) / 3 * 1000
+    legacy_instances = backend.instances // 3
+
+    backend = FakePortAudio(devices)
+    registry = DeviceRegistry(backend)
+    started = time.perf_counter()
+    first = [d.as_dict() for d in registry.inputs()]
+    first_ms = (time.perf_counter() - started) * 1000
+    started = time.perf_counter()
+    for _ in range(calls):
+        cached = [d.as_dict() for d in registry.inputs()]
+    cached_us = (time.perf_counter() - started) / calls * 1e6
+    started = time.perf_counter()
+    registry.refresh()
+    refresh_ms = (time.perf_counter() - started) * 1000
+
+    assert [m['name'] for m in cached] == [m['name'] for m in legacy] == [m['name'] for m in first]
+    print(f"   Before: {legacy_ms:.0f} ms and {legacy_instances} PortAudio instances per listing")
+    print(f"   After: first listing {first_ms:.0f} ms, cached {cached_us:.1f} µs, refresh {refresh_ms:.0f} ms")
+    assert cached_us / 1000 < legacy_ms / 100
+    registry.terminate()
+    print("   ✅ Enumeration cost measured")
+    return True
+
+
+def main():
+    print("🔌 VoiceMaster Pro - Audio Device Registry Test")
+    print("=" * 50)
+
+    tests = [test_cached_enumeration, test_hotplug_refresh, test_set_device, test_refresh_during_start,
+             test_output_follows_refresh, test_enumeration_benchmark]
+
+    all_passed = True
+    for test in tests:
+        try:
+            all_passed &= test()
+        except Exception as e:
+            print(f"❌ Test failed: {e}")
+            all_passed = False
+
+    print("\n🎉 All audio device tests passed!" if all_passed else "\n⚠️  Some audio device tests failed.")
+    return all_passed
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
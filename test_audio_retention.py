@@ -0,0 +1,165 @@
+"""
+Test script for generated audio retention (size, age and count caps, pinning)
+Runs against a temporary directory, no API calls
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from audio_retention import RetentionManager
+
+
+def make_clip(directory, name, size=1000):
+    path = os.path.join(directory, name)
+    with open(path, 'wb') as f:
+        f.write(b'\0' * size)
+    return path
+
+
+def test_count_cap_evicts_oldest_and_keeps_pins():
+    """Oldest unpinned clips go first once the count cap is exceeded"""
+    print("Testing count cap and pinning...")
+    with tempfile.TemporaryDirectory() as d:
+        manager = RetentionManager(d, max_bytes=0, max_age_seconds=0, max_files=3)
+        for i in range(6):
+            manager.track(make_clip(d, f"stream_tts_{i}.mp3"), created=1000 + i)
+        manager.pin("stream_tts_0.mp3")
+
+        evicted = manager.sweep_once()
+        remaining = sorted(n for n in os.listdir(d) if n.endswith('.mp3'))
+        print(f"   Evicted {evicted}, remaining: {remaining}")
+        assert evicted == 2
+        assert remaining == ["stream_tts_0.mp3", "stream_tts_3.mp3", "stream_tts_4.mp3", "stream_tts_5.mp3"]
+
+        manager.add_pin_source(lambda: [os.path.join(d, "stream_tts_5.mp3"), "gone.mp3"])
+        assert manager.stats()['pinned'] == 2, "pin sources count, untracked names do not"
+    print("   ✅ Count cap respected, pinned clip kept")
+    return True
+
+
+def test_size_and_age_caps():
+    """Byte cap and age cap both trigger eviction"""
+    print("Testing size and age caps...")
+    with tempfile.TemporaryDirectory() as d:
+        manager = RetentionManager(d, max_bytes=2500, max_age_seconds=0, max_files=0)
+        for i in range(4):
+            manager.track(make_clip(d, f"a_{i}.mp3", size=1000), created=1000 + i)
+        manager.sweep_once()
+        assert manager.stats()['bytes'] <= 2500
+
+        manager = RetentionManager(d, max_bytes=0, max_age_seconds=60, max_files=0)
+        manager.track(make_clip(d, "fresh.mp3"), created=time.time())
+        manager.sweep_once()
+        names = set(os.listdir(d))
+        assert "fresh.mp3" in names and "a_2.mp3" not in names
+    print("   ✅ Size and age caps respected")
+    return True
+
+
+def test_index_survives_restart_and_batches():
+    """The index is reloaded without a directory scan and sweeps are incremental"""
+    print("Testing index persistence and incremental sweeps...")
+    with tempfile.TemporaryDirectory() as d:
+        manager = RetentionManager(d, max_bytes=0, max_age_seconds=0, max_files=5)
+        for i in range(20):
+            manager.track(make_clip(d, f"clip_{i:02d}.mp3"), created=1000 + i)
+
+        reloaded = RetentionManager(d, max_bytes=0, max_age_seconds=0, max_files=5, sweep_batch=10)
+        assert reloaded.stats()['files'] == 20
+        assert reloaded.sweep_once() == 10
+        assert reloaded.sweep_once() == 5
+        assert reloaded.sweep_once() == 0
+        assert RetentionManager(d).stats()['files'] == 5
+    print("   ✅ Index reloaded and sweeps bounded per pass")
+    return True
+
+
+def test_caps_off_by_default():
+    """Without configured caps nothing is ever evicted"""
+    print("Testing default caps...")
+    with tempfile.TemporaryDirectory() as d:
+        manager = RetentionManager(d)
+        for i in range(5):
+            manager.track(make_clip(d, f"old_{i}.mp3"), created=1000 + i)
+        assert manager.sweep_once() == 0 and manager.stats()['files'] == 5
+    print("   ✅ All caps off unless configured")
+    return True
+
+
+def test_transcoded_clip_keeps_its_age():
+    """A clip renamed after transcoding (untrack + track with the original time) still ages out"""
+    print("Testing age eviction of transcoded clips...")
+    with tempfile.TemporaryDirectory() as d:
+        manager = RetentionManager(d, max_bytes=0, max_age_seconds=86400, max_files=0)
+        now = time.time()
+        manager.track(make_clip(d, "c0.mp3"), created=now - 120000)
+        for i in range(1, 4):
+            manager.track(make_clip(d, f"c{i}.mp3"), created=now - 60 * i)
+        os.remove(os.path.join(d, "c0.mp3"))
+        manager.untrack("c0.mp3")
+        manager.track(make_clip(d, "c0.opus", size=300), created=now - 120000)
+
+        assert [name for name, _, _ in manager.snapshot()][0] == "c0.opus"
+        assert RetentionManager(d).snapshot()[0][0] == "c0.opus", "order should survive a reload"
+        assert manager.sweep_once() == 1
+        assert sorted(os.listdir(d)) == sorted(
+            [".retention_index.jsonl", "c1.mp3", "c2.mp3", "c3.mp3"]), os.listdir(d)
+    print("   ✅ Transcoded clip evicted by the age cap")
+    return True
+
+
+def test_hard_linked_clips_counted_once():
+    """Deduplicated clips (hard links to one blob) count their bytes once toward the size cap"""
+    print("Testing size cap with hard-linked clips...")
+    with tempfile.TemporaryDirectory() as d:
+        manager = RetentionManager(d, max_bytes=2500, max_age_seconds=0, max_files=0)
+        manager.track(make_clip(d, "e.mp3"), created=1000)
+        manager.track(make_clip(d, "d0.mp3"), created=1001)
+        for i in (1, 2):
+            os.link(os.path.join(d, "d0.mp3"), os.path.join(d, f"d{i}.mp3"))
+            manager.track(os.path.join(d, f"d{i}.mp3"), created=1001 + i)
+        manager.track(make_clip(d, "f.mp3"), created=1004)
+        assert manager.stats()['bytes'] == 3000
+        assert RetentionManager(d).stats()['bytes'] == 3000, "links should still count once after a reload"
+
+        assert manager.sweep_once() == 1, "evicting the oldest clip already frees enough"
+        assert sorted(n for n in os.listdir(d) if n.endswith('.mp3')) == ["d0.mp3", "d1.mp3", "d2.mp3", "f.mp3"]
+        manager.max_bytes = 1500
+        assert manager.sweep_once() == 3 and manager.evicted_bytes == 2000
+        assert manager.stats()['bytes'] == 1000
+    print("   ✅ Shared blob counted once; evicting one link frees nothing until the last goes")
+    return True
+
+
+def main():
+    print("🗂️  VoiceMaster Pro - Audio Retention Test")
+    print("=" * 50)
+
+    tests = [
+        test_count_cap_evicts_oldest_and_keeps_pins,
+        test_size_and_age_caps,
+        test_index_survives_restart_and_batches,
+        test_caps_off_by_default,
+        test_transcoded_clip_keeps_its_age,
+        test_hard_linked_clips_counted_once,
+    ]
+
+    all_passed = True
+    for test in tests:
+        try:
+            all_passed &= test()
+        except Exception as e:
+            print(f"❌ Test failed: {e}")
+            all_passed = False
+
+    print("\n🎉 All retention tests passed!" if all_passed else "\n⚠️  Some retention tests failed.")
+    return all_passed
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,196 @@
+"""
+Test script for word-timed overlay captions
+Uses the local ElevenLabs stand-in, no API key or credits needed
+"""
+
+import base64
+import json
+import os
+import sys
+import time
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from captions import CaptionPlayer, CaptionTrack, MixerClock, PlaybackClock, FRAME_BUDGET_MS
+from elevenlabs_standin import StandInServer, FRAME_SECONDS
+from overlay_server import OverlayServer
+from test_overlay_server import SSEClient, wait_for_clients
+
+SCRIPT = ("Hello everyone and welcome back to the stream! Today we are testing karaoke captions, "
+          "word by word, in lockstep with the voice. Thanks for following, and don't forget to "
+          "like and subscribe. See you in the chat.")
+
+
+MIXER_BUFFER_SECONDS = 1024 / 44100   # pygame's default mixer buffer
+
+
+class SimulatedMixer:
+    """
+    pygame.mixer.music as the captions see it: get_pos() advances in whole
+    audio buffers, counted from when the device actually starts playing,
+    and stops advancing while playback stalls
+    """
+
+    def __init__(self, start_delay=0.08, stall_at=None, stall_seconds=0.0, buffer_seconds=MIXER_BUFFER_SECONDS):
+        self.start_delay = start_delay
+        self.stall_at = stall_at
+        self.stall_seconds = stall_seconds
+        self.buffer_seconds = buffer_seconds
+        self.started = time.perf_counter()
+
+    def position(self, now=None):
+        """Exact position of the audio coming out of the speakers"""
+        t = (time.perf_counter() if now is None else now) - self.started - self.start_delay
+        if self.stall_at is not None and t > self.stall_at:
+            t = max(self.stall_at, t - self.stall_seconds)
+        return max(0.0, t)
+
+    def get_pos(self):
+        return int(self.position() // self.buffer_seconds * self.buffer_seconds * 1000)
+
+
+def follow(track, clock, mixer):
+    """Play captions on clock; returns the player and the drift of each push from the mixer's audio (ms)"""
+    drift = []
+    player = CaptionPlayer(track, clock, lambda i: drift.append((mixer.position() - track.starts[i]) * 1000),
+                           hold_seconds=0)
+    player.start().join(timeout=track.duration + 5)
+    return player, sorted(abs(d) for d in drift)
+
+
+def fetch_with_timestamps(base_url, text, speed=1.0):
+    request = urllib.request.Request(
+        f"{base_url}/v1/text-to-speech/standin-voice-1/with-timestamps",
+        data=json.dumps({'text': text, 'voice_settings': {'speed': speed}}).encode(),
+        headers={'xi-api-key': 'test', 'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+
+def test_alignment_to_words():
+    """Character timings from the with-timestamps endpoint group into timed words"""
+    print("Testing alignment parsing...")
+    server = StandInServer(port=0).start()
+    try:
+        result = fetch_with_timestamps(server.base_url, "Hi  there, chat!")
+    finally:
+        server.stop()
+    track = CaptionTrack.from_alignment(result['alignment'])
+    assert [w for w, _, _ in track.words] == ["Hi", "there,", "chat!"]
+    assert all(start < end for _, start, end in track.words)
+    audio = base64.b64decode(result['audio_base64'])
+    assert len(audio) // 417 * FRAME_SECONDS >= track.duration  # Audio covers the captions
+    assert track.index_at(-0.1) == -1 and track.index_at(track.starts[1]) == 1
+    print("   ✅ Words and timings extracted")
+    return True
+
+
+def test_stall_skips_to_current_word():
+    """If playback jumps ahead, the player highlights the word actually playing"""
+    print("Testing catch-up after a stall...")
+    track = CaptionTrack([(f"w{i}", i * 0.1, i * 0.1 + 0.09) for i in range(10)])
+    times = iter([0.0, 0.0, 0.55, 0.55] + [2.0] * 100)
+    published = []
+    player = CaptionPlayer(track, lambda: next(times, None), published.append, hold_seconds=0)
+    player.start().join(timeout=2)
+    assert published[:2] == [0, 5] and published[-1] == 9
+    assert player.skipped == 4 + 3
+    print(f"   Published {published}, skipped {player.skipped}")
+    print("   ✅ Jumped to the current word")
+    return True
+
+
+def test_caption_drift_benchmark():
+    """Drift of highlight pushes against the playback clock, at the player and at an SSE client"""
+    print("Benchmarking caption drift (60 fps budget = 16.7 ms)...")
+    standin = StandInServer(port=0).start()
+    try:
+        result = fetch_with_timestamps(standin.base_url, SCRIPT, speed=4.0)
+    finally:
+        standin.stop()
+    track = CaptionTrack.from_alignment(result['alignment'])
+
+    overlay = OverlayServer(port=0)
+    overlay.start()
+    client = SSEClient(overlay.port)
+    try:
+        wait_for_clients(overlay, 1)
+        client.wait_for(1)
+        overlay.publish(caption_words=[w for w, _, _ in track.words], caption_index=-1)
+        client.wait_for(2)
+
+        mixer = SimulatedMixer()
+        player = CaptionPlayer(track, MixerClock(mixer.get_pos), lambda i: overlay.publish(caption_index=i),
+                               hold_seconds=0)
+        player.start().join(timeout=track.duration + 5)
+        client.wait_for(2 + len(track))
+
+        stats = player.drift_stats()
+        print(f"   Player:  {stats['words']} words over {track.duration:.1f}s, "
+              f"p50 {stats['p50_ms']:.3f} ms, p99 {stats['p99_ms']:.3f} ms, max {stats['max_ms']:.3f} ms")
+
+        # Measured against the audio itself: the mixer's exact position when the push arrived
+        received = [(t, d['caption_index']) for t, kind, d in client.events[2:] if 'caption_index' in d]
+        client_drift = sorted(abs(mixer.position(t) - track.starts[i]) * 1000 for t, i in received)
+        print(f"   Overlay: {len(received)} pushes received, p50 {client_drift[len(client_drift) // 2]:.3f} ms, "
+              f"max {client_drift[-1]:.3f} ms")
+        assert len(received) == len(track) and player.skipped == 0
+        assert stats['max_ms'] < FRAME_BUDGET_MS and client_drift[-1] < FRAME_BUDGET_MS
+    finally:
+        client.close()
+        overlay.stop()
+    print("   ✅ Captions within one 60 fps frame of playback")
+    return True
+
+
+def test_mixer_clock_follows_audio():
+    """Against the mixer's real position, wall time drifts after a late start and a stall; the mixer clock does not"""
+    print("Benchmarking wall clock vs mixer clock (80 ms late start, 250 ms stall)...")
+    standin = StandInServer(port=0).start()
+    try:
+        result = fetch_with_timestamps(standin.base_url, SCRIPT, speed=4.0)
+    finally:
+        standin.stop()
+    track = CaptionTrack.from_alignment(result['alignment'])
+    stall = {'start_delay': 0.08, 'stall_at': track.duration / 3, 'stall_seconds': 0.25}
+
+    mixer = SimulatedMixer(**stall)
+    _, wall = follow(track, PlaybackClock(), mixer)
+    mixer = SimulatedMixer(**stall)
+    player, mixed = follow(track, MixerClock(mixer.get_pos), mixer)
+
+    for label, drift in (("Wall clock ", wall), ("Mixer clock", mixed)):
+        print(f"   {label}: p50 {drift[len(drift) // 2]:.1f} ms, "
+              f"p99 {drift[min(len(drift) - 1, int(len(drift) * 0.99))]:.1f} ms, max {drift[-1]:.1f} ms")
+    assert len(mixed) == len(track) and player.skipped == 0
+    assert wall[len(wall) // 2] > 60, "wall time should run ahead of the stalled audio"
+    assert mixed[len(mixed) // 2] < FRAME_BUDGET_MS
+    # Only a word starting in the buffer that stalls can be shown early, by at most that buffer
+    assert mixed[-1] < MIXER_BUFFER_SECONDS * 1000 + FRAME_BUDGET_MS
+    print("   ✅ Captions follow the audio through a late start and a stall")
+    return True
+
+
+def main():
+    print("🎤 VoiceMaster Pro - Karaoke Captions Test")
+    print("=" * 50)
+
+    tests = [test_alignment_to_words, test_stall_skips_to_current_word, test_caption_drift_benchmark,
+             test_mixer_clock_follows_audio]
+
+    all_passed = True
+    for test in tests:
+        try:
+            all_passed &= test()
+        except Exception as e:
+            print(f"❌ Test failed: {e}")
+            all_passed = False
+
+    print("\n🎉 All caption tests passed!" if all_passed else "\n⚠️  Some caption tests failed.")
+    return all_passed
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
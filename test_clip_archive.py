@@ -0,0 +1,226 @@
+"""
+Test and benchmark for the segment-file clip archive
+Compares random read latency and disk footprint against one file per clip
+"""
+
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from clip_archive import ClipArchive
+
+CLIP_COUNT = 5000
+CLIP_SIZE_RANGE = (8_000, 60_000)  # Typical short TTS lines at 128 kbps
+
+
+def disk_usage(directory):
+    """Allocated bytes and inode count for every file under a directory."""
+    allocated = 0
+    files = 0
+    for root, _, names in os.walk(directory):
+        for name in names:
+            st = os.stat(os.path.join(root, name))
+            allocated += getattr(st, 'st_blocks', 0) * 512 or st.st_size
+            files += 1
+    return allocated, files
+
+
+def test_add_read_delete_and_reopen():
+    """Clips round-trip through the archive and survive a reopen"""
+    print("Testing add / read / delete / reopen...")
+    with tempfile.TemporaryDirectory() as d:
+        archive = ClipArchive(d, segment_max_bytes=50_000)
+        payloads = {f"clip_{i}.mp3": os.urandom(7_000 + i) for i in range(20)}
+        for name, data in payloads.items():
+            archive.add(name, data)
+        assert archive.delete("clip_3.mp3")
+        assert bytes(archive.read("clip_7.mp3")) == payloads["clip_7.mp3"]
+        assert archive.open("clip_8.mp3").read() == payloads["clip_8.mp3"]
+
+        reopened = ClipArchive(d, segment_max_bytes=50_000)
+        assert "clip_3.mp3" not in reopened and len(reopened) == 19
+        assert bytes(reopened.read("clip_19.mp3")) == payloads["clip_19.mp3"]
+    print("   ✅ Round trip and reopen work")
+    return True
+
+
+def test_compaction_reclaims_dead_segments():
+    """Mostly-deleted sealed segments are rewritten and removed"""
+    print("Testing compaction...")
+    with tempfile.TemporaryDirectory() as d:
+        archive = ClipArchive(d, segment_max_bytes=40_000)
+        payloads = {f"clip_{i}.mp3": os.urandom(9_000) for i in range(16)}
+        for name, data in payloads.items():
+            archive.add(name, data)
+        for i in range(12):
+            archive.delete(f"clip_{i}.mp3")
+
+        before = archive.stats()
+        removed = archive.compact()
+        after = archive.stats()
+        print(f"   Segments {before['segments']} -> {after['segments']}, removed {removed}")
+        assert removed > 0
+        for i in range(12, 16):
+            assert bytes(archive.read(f"clip_{i}.mp3")) == payloads[f"clip_{i}.mp3"]
+        assert len(ClipArchive(d, segment_max_bytes=40_000)) == 4
+    print("   ✅ Dead segments reclaimed, live clips intact")
+    return True
+
+
+def test_loose_clips_from_earlier_sessions():
+    """Clips already on disk when the archive starts are packed once old enough"""
+    print("Testing packing of existing loose clips...")
+    with tempfile.TemporaryDirectory() as d:
+        now = time.time()
+        for i, age in enumerate((7200, 3600, 60)):
+            path = os.path.join(d, f"stream_tts_{i}.mp3")
+            with open(path, 'wb') as f:
+                f.write(os.urandom(5_000))
+            os.utime(path, (now - age, now - age))
+        archive = ClipArchive(os.path.join(d, "segments"), archive_after_seconds=600, source_dir=d)
+        archive.queue_clip(os.path.join(d, "stream_tts_new.mp3"))
+
+        assert archive.queue_existing() == 3
+        assert archive.queue_existing() == 0, "clips are queued once"
+        assert archive.pack_ready(now=now) == 2
+        assert "stream_tts_0.mp3" in archive and "stream_tts_1.mp3" in archive
+        assert sorted(n for n in os.listdir(d) if n.endswith(".mp3")) == ["stream_tts_2.mp3"]
+        assert archive.stats()['pending_pack'] == 2
+    print("   ✅ Older loose clips packed, recent ones left for later")
+    return True
+
+
+def test_reads_during_compaction():
+    """Clips stay readable while compaction copies, and a clip deleted meanwhile stays deleted"""
+    print("Testing reads during compaction...")
+    with tempfile.TemporaryDirectory() as d:
+        archive = ClipArchive(d, segment_max_bytes=40_000)
+        payloads = {f"clip_{i}.mp3": os.urandom(9_000) for i in range(16)}
+        for name, data in payloads.items():
+            archive.add(name, data)
+        for i in range(0, 16, 4):
+            for j in range(i, i + 3):
+                archive.delete(f"clip_{j}.mp3")
+
+        survivors = [f"clip_{i}.mp3" for i in range(3, 16, 4)]
+        done = threading.Event()
+        reads = []
+
+        def reader():
+            while not done.is_set():
+                for name in survivors[1:]:
+                    started = time.perf_counter()
+                    assert bytes(archive.read(name)) == payloads[name]
+                    reads.append(time.perf_counter() - started)
+
+        class DeletingMap:
+            """Segment mapping whose first copy races a deletion by retention"""
+
+            def __init__(self, segment_map):
+                self.segment_map = segment_map
+
+            def __getitem__(self, key):
+                if not deleted:
+                    deleted.append(archive.delete(survivors[0]))
+                return self.segment_map[key]
+
+        thread = threading.Thread(target=reader)
+        thread.start()
+        segment_map = archive._segment_map
+        deleted = []
+        compactor = threading.current_thread()
+        archive._segment_map = lambda segment_id, end: (
+            DeletingMap(segment_map(segment_id, end)) if threading.current_thread() is compactor
+            else segment_map(segment_id, end))
+        removed = archive.compact()
+        done.set()
+        thread.join()
+        del archive._segment_map
+        assert removed > 0 and survivors[0] not in archive
+        for name in survivors[1:]:
+            assert bytes(archive.read(name)) == payloads[name]
+        print(f"   {len(reads)} reads during compaction, slowest {max(reads) * 1000:.2f} ms")
+    print("   ✅ Reads served during compaction")
+    return True
+
+
+def benchmark_against_loose_files():
+    """Random read latency and disk footprint vs one file per clip"""
+    print(f"Benchmarking {CLIP_COUNT} clips...")
+    rng = random.Random(42)
+    payloads = [os.urandom(rng.randint(*CLIP_SIZE_RANGE)) for _ in range(CLIP_COUNT)]
+    names = [f"stream_tts_{1700000000 + i}.mp3" for i in range(CLIP_COUNT)]
+
+    with tempfile.TemporaryDirectory() as loose_dir, tempfile.TemporaryDirectory() as archive_dir:
+        for name, data in zip(names, payloads):
+            with open(os.path.join(loose_dir, name), 'wb') as f:
+                f.write(data)
+        archive = ClipArchive(archive_dir)
+        for name, data in zip(names, payloads):
+            archive.add(name, data)
+
+        sample = [rng.choice(names) for _ in range(2000)]
+
+        start = time.perf_counter()
+        for name in sample:
+            with open(os.path.join(loose_dir, name), 'rb') as f:
+                f.read()
+        loose_us = (time.perf_counter() - start) * 1e6 / len(sample)
+
+        start = time.perf_counter()
+        for name in sample:
+            archive.open(name).read()
+        archive_us = (time.perf_counter() - start) * 1e6 / len(sample)
+
+        start = time.perf_counter()
+        for name in sample:
+            archive.read(name)
+        view_us = (time.perf_counter() - start) * 1e6 / len(sample)
+
+        start = time.perf_counter()
+        reopened = ClipArchive(archive_dir)
+        reopen_ms = (time.perf_counter() - start) * 1000
+
+        loose_bytes, loose_files = disk_usage(loose_dir)
+        archive_bytes, archive_files = disk_usage(archive_dir)
+
+        print(f"   Random read  - files: {loose_us:7.1f} µs   archive: {archive_us:7.1f} µs"
+              f"   (zero-copy view: {view_us:.1f} µs)")
+        print(f"   Disk usage   - files: {loose_bytes / 1e6:7.1f} MB   archive: {archive_bytes / 1e6:7.1f} MB")
+        print(f"   Inodes       - files: {loose_files:7d}      archive: {archive_files:7d}")
+        print(f"   Archive cold open with {len(reopened)} clips: {reopen_ms:.1f} ms")
+    return True
+
+
+def main():
+    print("📦 VoiceMaster Pro - Clip Archive Test")
+    print("=" * 50)
+
+    tests = [
+        test_add_read_delete_and_reopen,
+        test_compaction_reclaims_dead_segments,
+        test_loose_clips_from_earlier_sessions,
+        test_reads_during_compaction,
+        benchmark_against_loose_files,
+    ]
+
+    all_passed = True
+    for test in tests:
+        try:
+            all_passed &= test()
+        except Exception as e:
+            print(f"❌ Test failed: {e}")
+            all_passed = False
+
+    print("\n🎉 All clip archive tests passed!" if all_passed else "\n⚠️  Some clip archive tests failed.")
+    return all_passed
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
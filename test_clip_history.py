@@ -0,0 +1,87 @@
+"""
+Test script for the SQLite clip history (recording, search, pagination)
+Uses a temporary database, no API calls
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from clip_history import ClipHistory, estimate_mp3_duration
+
+
+def test_record_and_search():
+    """Recorded clips are searchable by text prefix, voice and time"""
+    print("Testing record and search...")
+    with tempfile.TemporaryDirectory() as d:
+        history = ClipHistory(os.path.join(d, "history.db"))
+        history.record("Thanks for the follow!", voice_id="v1", voice_name="Rachel",
+                       settings={'stability': 0.5}, byte_size=16000, created_at=1000)
+        history.record("Welcome to the stream everyone", voice_id="v2", voice_name="Adam",
+                       byte_size=32000, created_at=2000)
+        history.flush()
+
+        assert [c['voice_name'] for c in history.search("foll")] == ["Rachel"]
+        assert [c['voice_name'] for c in history.search(voice_id="v2")] == ["Adam"]
+        assert [c['voice_name'] for c in history.search(since=1500)] == ["Adam"]
+        clip = history.search("thanks")[0]
+        assert clip['settings'] == {'stability': 0.5}
+        assert abs(clip['duration'] - estimate_mp3_duration(16000)) < 1e-9
+        history.close()
+    print("   ✅ Text, voice and time filters work")
+    return True
+
+
+def test_pagination_with_many_rows():
+    """Keyset pages stay fast with 100k rows"""
+    print("Testing pagination with 100k rows...")
+    with tempfile.TemporaryDirectory() as d:
+        history = ClipHistory(os.path.join(d, "history.db"))
+        start = time.perf_counter()
+        for i in range(100_000):
+            history.record(f"Generated line number {i} for voice test", voice_id=f"v{i % 5}",
+                           byte_size=20000, created_at=i)
+        history.flush()
+        print(f"   Recorded 100k clips in {time.perf_counter() - start:.2f}s")
+
+        start = time.perf_counter()
+        first = history.search(limit=200)
+        second = history.search(limit=200, before_id=first[-1]['id'])
+        page_ms = (time.perf_counter() - start) * 1000 / 2
+        assert first[0]['id'] == 100_000 and second[0]['id'] == first[-1]['id'] - 1
+
+        start = time.perf_counter()
+        hits = history.search("number 4242", limit=50)
+        search_ms = (time.perf_counter() - start) * 1000
+        assert any(c['text'].startswith("Generated line number 4242 ") for c in hits)
+
+        print(f"   Page of 200: {page_ms:.1f} ms, text search: {search_ms:.1f} ms")
+        history.close()
+    print("   ✅ Pagination and search stay fast")
+    return True
+
+
+def main():
+    print("📜 VoiceMaster Pro - Clip History Test")
+    print("=" * 50)
+
+    tests = [test_record_and_search, test_pagination_with_many_rows]
+
+    all_passed = True
+    for test in tests:
+        try:
+            all_passed &= test()
+        except Exception as e:
+            print(f"❌ Test failed: {e}")
+            all_passed = False
+
+    print("\n🎉 All clip history tests passed!" if all_passed else "\n⚠️  Some clip history tests failed.")
+    return all_passed
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,135 @@
+"""
+Test script for background clip transcoding
+Uses a stand-in encoder so it runs without ffmpeg
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from background_io import LiveActivityGate
+from clip_transcoder import ClipTranscoder
+
+
+def fake_transcode(src_path, dst_path, fmt, codec=None, bitrate=None):
+    """Pretend Opus is a quarter of the size; decoding restores a full-size copy."""
+    with open(src_path, 'rb') as f:
+        data = f.read()
+    if fmt == "opus":
+        data = data[:len(data) // 4]
+    else:
+        data = data * 4
+    with open(dst_path, 'wb') as f:
+        f.write(data)
+
+
+def make_clips(directory, count, size=40_000):
+    clips = []
+    for i in range(count):
+        name = f"stream_tts_{i}.mp3"
+        with open(os.path.join(directory, name), 'wb') as f:
+            f.write(os.urandom(size))
+        clips.append((name, size, 1000 + i))
+    return clips
+
+
+def test_old_clips_transcoded_and_bytes_saved():
+    """Only clips past the age threshold are transcoded; pinned clips are skipped"""
+    print("Testing transcoding of old clips...")
+    with tempfile.TemporaryDirectory() as d:
+        clips = make_clips(d, 4)
+        moved = []
+        transcoder = ClipTranscoder(
+            d, min_age_seconds=100, transcode=fake_transcode,
+            candidates=lambda: clips, skip=lambda: {"stream_tts_0.mp3"},
+            on_transcoded=lambda old, new, size, created: moved.append((old, new)),
+            gate=LiveActivityGate(settle_seconds=0))
+
+        done = transcoder.run_once(now=1102.5)  # clips 0-2 are old enough
+        names = sorted(os.listdir(d))
+        print(f"   Transcoded {done}: {moved}")
+        assert done == 2
+        assert "stream_tts_0.mp3" in names and "stream_tts_1.opus" in names and "stream_tts_3.mp3" in names
+        stats = transcoder.stats()
+        assert stats['bytes_saved'] == 2 * (40_000 - 10_000)
+        print(f"   Bytes saved: {stats['bytes_saved']}")
+    print("   ✅ Age threshold, pins and savings tracked")
+    return True
+
+
+def test_hot_playback_copies_are_bounded():
+    """Transcoded clips get a lazily decoded playback copy, bounded by the cache size"""
+    print("Testing hot playback copies...")
+    with tempfile.TemporaryDirectory() as d:
+        clips = make_clips(d, 3)
+        transcoder = ClipTranscoder(d, min_age_seconds=0, transcode=fake_transcode,
+                                    candidates=lambda: clips, playback_cache_clips=2,
+                                    gate=LiveActivityGate(settle_seconds=0))
+        transcoder.run_once(now=5000)
+        paths = [transcoder.playback_path(name) for name, _, _ in clips]
+        assert all(p and os.path.exists(p) for p in paths[1:])
+        assert not os.path.exists(paths[0])  # Evicted as least recently played
+        assert transcoder.stats()['hot_copies'] == 2
+    print("   ✅ Playback copies regenerate on demand and stay bounded")
+    return True
+
+
+def test_worker_yields_to_live_generation():
+    """Nothing is transcoded while live generation is running"""
+    print("Testing yield to live generation...")
+    with tempfile.TemporaryDirectory() as d:
+        clips = make_clips(d, 2)
+        gate = LiveActivityGate(settle_seconds=0.2)
+        transcoder = ClipTranscoder(d, min_age_seconds=0, transcode=fake_transcode,
+                                    candidates=lambda: clips, gate=gate)
+        release = threading.Event()
+
+        def live_generation():
+            with gate:
+                release.wait()
+
+        worker = threading.Thread(target=live_generation)
+        worker.start()
+        time.sleep(0.05)
+        result = {}
+        runner = threading.Thread(target=lambda: result.setdefault('done', transcoder.run_once(now=5000)))
+        runner.start()
+        time.sleep(0.3)
+        assert 'done' not in result and transcoder.stats()['clips_transcoded'] == 0
+        release.set()
+        worker.join()
+        runner.join(timeout=5)
+        assert result.get('done') == 2
+    print("   ✅ Worker waited for live generation to finish")
+    return True
+
+
+def main():
+    print("🗜️  VoiceMaster Pro - Clip Transcoder Test")
+    print("=" * 50)
+
+    tests = [
+        test_old_clips_transcoded_and_bytes_saved,
+        test_hot_playback_copies_are_bounded,
+        test_worker_yields_to_live_generation,
+    ]
+
+    all_passed = True
+    for test in tests:
+        try:
+            all_passed &= test()
+        except Exception as e:
+            print(f"❌ Test failed: {e}")
+            all_passed = False
+
+    print("\n🎉 All transcoder tests passed!" if all_passed else "\n⚠️  Some transcoder tests failed.")
+    return all_passed
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,182 @@
+"""
+Test script for favorite audio (adopted clips, background renders, in-memory playback)
+Renders are counted by a local render function, no API calls
+"""
+
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from favorites_store import FavoritesStore
+from favorites_cache import FavoritesCache
+from favorite_audio import FavoriteAudio
+from elevenlabs_standin import silent_mp3
+
+
+class Renderer:
+    """Writes fake MP3 bytes describing what was rendered and counts the calls"""
+
+    def __init__(self, delay=0.0):
+        self.calls = 0
+        self.delay = delay
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, favorite, path):
+        self.release.wait(5)
+        time.sleep(self.delay)
+        self.calls += 1
+        with open(path, 'wb') as f:
+            f.write(f"{favorite['text']}|{favorite.get('settings')}".encode() * 1000)
+        return path
+
+
+def setup(directory, renderer, **options):
+    cache = FavoritesCache(FavoritesStore(os.path.join(directory, "favorites.db")), watch=False).start()
+    audio = FavoriteAudio(cache, os.path.join(directory, "tts_favorites"), renderer, model_id="model_v1",
+                          gate=None, **options)
+    return cache, audio
+
+
+def test_adopted_clip_plays_without_api_calls():
+    """Saving right after generating reuses the clip; plays come from memory"""
+    print("Testing adopted clips and memory playback...")
+    with tempfile.TemporaryDirectory() as d:
+        renderer = Renderer()
+        decodes = []
+        cache, audio = setup(d, renderer, decode=lambda path: decodes.append(path) or open(path, 'rb').read())
+        clip = os.path.join(d, "stream_tts_1.mp3")
+        with open(clip, 'wb') as f:
+            f.write(b"generated clip")
+
+        favorite = cache.add("Thanks for the raid!", "v1", "Rachel", settings={'stability': 0.5})
+        favorite = audio.adopt(favorite, clip)
+        assert audio.is_current(favorite)
+        for _ in range(100):
+            assert audio.get(favorite['id']) == b"generated clip"
+        assert renderer.calls == 0 and len(decodes) == 1
+        assert audio.stats()['memory_hits'] == 99
+    print("   ✅ 100 plays, 0 renders, 1 decode")
+    return True
+
+
+def test_render_and_settings_change():
+    """Missing audio is rendered once; a settings change re-renders in the background"""
+    print("Testing background renders...")
+    with tempfile.TemporaryDirectory() as d:
+        renderer = Renderer()
+        cache, audio = setup(d, renderer)
+        favorite = cache.add("Welcome in!", "v1", "Rachel", settings={'stability': 0.5})
+
+        ready = threading.Event()
+        assert audio.get(favorite['id']) is None
+        audio.ensure(favorite, lambda f: ready.set())
+        assert ready.wait(5) and renderer.calls == 1
+        first = audio.get(favorite['id'])
+        assert b"0.5" in first
+
+        # While the new settings render, the previous audio keeps playing
+        renderer.release.clear()
+        audio.set_settings(favorite['id'], {'stability': 0.9})
+        assert audio.get(favorite['id']) == first
+        renderer.release.set()
+        audio.wait()
+        assert renderer.calls == 2 and b"0.9" in audio.get(favorite['id'])
+        files = [n for n in os.listdir(audio.directory) if n.startswith("fav_")]
+        assert files == [cache.get(favorite['id'])['audio_filename']], "old audio should be removed"
+
+        # A new TTS model makes existing audio stale; sync re-renders it and drops orphans
+        with open(os.path.join(audio.directory, "fav_orphan.mp3"), 'wb') as f:
+            f.write(b"x")
+        never_rendered = cache.add("No audio yet", "v1", "Rachel")
+        audio.model_id = "model_v2"
+        assert audio.sync() == (1, 1)
+        audio.wait()
+        assert renderer.calls == 3 and audio.is_current(cache.get(favorite['id']))
+        assert not cache.get(never_rendered['id'])['audio_filename']
+
+        audio.discard(cache.get(favorite['id']))
+        cache.delete(favorite['id'])
+    print("   ✅ Rendered once, re-rendered on settings and model changes")
+    return True
+
+
+def test_memory_budget():
+    """Decoded audio is evicted least recently played first"""
+    print("Testing decoded audio budget...")
+    with tempfile.TemporaryDirectory() as d:
+        cache, audio = setup(d, Renderer(), cache_bytes=40_000)
+        ids = []
+        for i in range(5):
+            favorite = cache.add(f"Phrase {i}", "v1", "Rachel")
+            audio.ensure(favorite)
+            ids.append(favorite['id'])
+        audio.wait()
+        for favorite_id in ids:
+            audio.get(favorite_id)
+        stats = audio.stats()
+        assert stats['decoded_bytes'] <= 40_000 and stats['decoded_in_memory'] < 5
+        audio.get(ids[-1])
+        assert audio.stats()['memory_hits'] == 1
+    print(f"   ✅ {stats['decoded_in_memory']} of 5 kept within the budget")
+    return True
+
+
+def test_playback_latency_benchmark(plays=1000):
+    """Time to get playable audio: from memory against decoding the file"""
+    print("Benchmarking favorite playback start...")
+    with tempfile.TemporaryDirectory() as d:
+        renderer = Renderer()
+        cache, audio = setup(d, renderer)
+        clip = os.path.join(d, "clip.mp3")
+        with open(clip, 'wb') as f:
+            f.write(silent_mp3(5.0))
+        favorite = audio.adopt(cache.add("Let's go!", "v1", "Rachel"), clip)
+
+        samples = []
+        for _ in range(plays):
+            started = time.perf_counter()
+            audio.get(favorite['id'])
+            samples.append((time.perf_counter() - started) * 1000)
+        memory_ms = statistics.median(samples)
+
+        samples = []
+        for _ in range(100):
+            started = time.perf_counter()
+            audio.decode(audio.path(cache.get(favorite['id'])['audio_filename']))
+            samples.append((time.perf_counter() - started) * 1000)
+        disk_ms = statistics.median(samples)
+        print(f"   5 s clip: {memory_ms:.4f} ms from memory, {disk_ms:.4f} ms to read the file "
+              f"(before any MP3 decoding)")
+        assert renderer.calls == 0
+    print("   ✅ Playback latency measured (0 API calls)")
+    return True
+
+
+def main():
+    print("⭐ VoiceMaster Pro - Favorite Audio Test")
+    print("=" * 50)
+
+    tests = [test_adopted_clip_plays_without_api_calls, test_render_and_settings_change,
+             test_memory_budget, test_playback_latency_benchmark]
+
+    all_passed = True
+    for test in tests:
+        try:
+            all_passed &= test()
+        except Exception as e:
+            print(f"❌ Test failed: {e}")
+            all_passed = False
+
+    print("\n🎉 All favorite audio tests passed!" if all_passed else "\n⚠️  Some favorite audio tests failed.")
+    return all_passed
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,177 @@
+"""
+Test script for the in-memory favorites cache
+Runs against a temporary database; a second store stands in for another VoiceMaster instance
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from favorites_store import FavoritesStore
+from favorites_cache import FavoritesCache
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_snapshots_and_own_writes():
+    """Repeated reads share one snapshot; our own writes patch it without reloading"""
+    print("Testing snapshots and own writes...")
+    with tempfile.TemporaryDirectory() as d:
+        store = FavoritesStore(os.path.join(d, "favorites.db"))
+        for i in range(10):
+            store.add(f"Phrase {i}", "v1", "Rachel", timestamp=1000.0 + i)
+        cache = FavoritesCache(store, watch=False).start()
+
+        first = cache.snapshot(4)
+        assert cache.snapshot(4) is first and cache.snapshot() is cache.snapshot()
+        assert [f['text'] for f in first] == ["Phrase 9", "Phrase 8", "Phrase 7", "Phrase 6"]
+
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        for _ in range(1000):
+            cache.snapshot(4)
+            cache.snapshot()
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        only_cache = [tracemalloc.Filter(True, FavoritesCache.snapshot.__code__.co_filename)]
+        allocated = sum(stat.size_diff for stat in after.filter_traces(only_cache).compare_to(
+            before.filter_traces(only_cache), 'filename'))
+        assert allocated == 0, f"snapshot reads allocated {allocated} bytes"
+
+        added = cache.add("Newest", "v2", "Adam", "clip.mp3")
+        assert cache.snapshot(4) is not first and cache.snapshot(1)[0]['id'] == added['id']
+        assert cache.audio_filenames() == ("clip.mp3",)
+        cache.add("Back-dated", "v1", "Rachel", timestamp=1000.5)
+        assert [f['text'] for f in cache.snapshot()][-2:] == ["Back-dated", "Phrase 0"]
+        assert cache.delete(added['id']) and not cache.delete(added['id'])
+        assert [f['id'] for f in cache.snapshot()] == [f['id'] for f in store.list()]
+        assert not cache.refresh() and cache.reloads == 1
+
+        # Another connection commits right before ours, with no refresh in between: the
+        # write must not mark that commit as seen (data_version moves by one for both)
+        other = sqlite3.connect(store.db_path)
+        original_add = store.add
+
+        def add_after_external_commit(*args, **kwargs):
+            with other:
+                other.execute("INSERT INTO favorites (text, timestamp) VALUES ('External', 2000.0)")
+            return original_add(*args, **kwargs)
+
+        store.add = add_after_external_commit
+        cache.add("Ours", "v1", "Rachel", timestamp=3000.0)
+        del store.add
+        other.close()
+        assert [f['text'] for f in cache.snapshot(2)] == ["Ours", "External"] and cache.reloads == 2
+        assert not cache.refresh()
+        cache.stop()
+    print("   ✅ Shared snapshots, no allocations, no reloads for own writes")
+    return True
+
+
+def check_external_edits(use_inotify):
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "favorites.db")
+        store = FavoritesStore(path)
+        store.add("Existing", "v1", "Rachel")
+        cache = FavoritesCache(store, use_inotify=use_inotify, poll_interval=0.05).start()
+        changes = []
+        cache.add_listener(lambda: changes.append(cache.version))
+        try:
+            other = FavoritesStore(path)  # Another instance writing the same database
+            started = time.perf_counter()
+            added = other.add("From another instance", "v2", "Adam")
+            assert wait_until(lambda: cache.snapshot(1)[0]['id'] == added['id'])
+            noticed_ms = (time.perf_counter() - started) * 1000
+            other.delete(added['id'])
+            assert wait_until(lambda: len(cache.snapshot()) == 1)
+            other.close()
+
+            reloads = cache.reloads
+            for _ in range(20):
+                cache.snapshot(4)
+            store.count()  # Reads do not trigger reloads either
+            time.sleep(0.3)
+            assert cache.reloads == reloads
+            assert changes
+            return cache.watch_mode, noticed_ms
+        finally:
+            cache.stop()
+
+
+def test_external_edits_inotify():
+    """Edits from another instance show up through the file watcher"""
+    print("Testing external edits (inotify)...")
+    mode, noticed_ms = check_external_edits(use_inotify=True)
+    if sys.platform.startswith('linux'):
+        assert mode == "inotify"
+    print(f"   ✅ Noticed via {mode} in {noticed_ms:.1f} ms")
+    return True
+
+
+def test_external_edits_polling():
+    """The mtime-poll fallback notices the same edits"""
+    print("Testing external edits (mtime polling)...")
+    mode, noticed_ms = check_external_edits(use_inotify=False)
+    assert mode == "poll"
+    print(f"   ✅ Noticed via {mode} in {noticed_ms:.1f} ms")
+    return True
+
+
+def test_read_benchmark(size=10_000, repeat=10_000):
+    """Quick-phrase reads from the cache against reading the store"""
+    print(f"Benchmarking reads at {size:,} favorites...")
+    with tempfile.TemporaryDirectory() as d:
+        store = FavoritesStore(os.path.join(d, "favorites.db"))
+        conn = store._conn()
+        with conn:
+            conn.executemany("INSERT INTO favorites (text, voice_id, voice_name, timestamp) VALUES (?, ?, ?, ?)",
+                             [(f"Favorite {i}", "voice", "Rachel", float(i)) for i in range(size)])
+        cache = FavoritesCache(store, watch=False).start()
+
+        started = time.perf_counter()
+        for _ in range(repeat):
+            cache.snapshot(4)
+        cached_us = (time.perf_counter() - started) / repeat * 1e6
+        started = time.perf_counter()
+        for _ in range(repeat // 10):
+            store.list(limit=4)
+        store_us = (time.perf_counter() - started) / (repeat // 10) * 1e6
+        print(f"   Newest 4: {cached_us:.2f} µs from cache, {store_us:.2f} µs from SQLite")
+        assert cached_us < store_us
+        cache.stop()
+    print("   ✅ Cached reads measured")
+    return True
+
+
+def main():
+    print("⭐ VoiceMaster Pro - Favorites Cache Test")
+    print("=" * 50)
+
+    tests = [test_snapshots_and_own_writes, test_external_edits_inotify,
+             test_external_edits_polling, test_read_benchmark]
+
+    all_passed = True
+    for test in tests:
+        try:
+            all_passed &= test()
+        except Exception as e:
+            print(f"❌ Test failed: {e}")
+            all_passed = False
+
+    print("\n🎉 All favorites cache tests passed!" if all_passed else "\n⚠️  Some favorites cache tests failed.")
+    return all_passed
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
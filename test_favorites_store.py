@@ -0,0 +1,120 @@
+"""
+Test script for the SQLite favorites store
+Runs against a temporary database
+"""
+
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from favorites_store import FavoritesStore
+
+
+def test_json_migration():
+    """Favorites from the old JSON file are imported once, colliding ids are renumbered"""
+    print("Testing JSON migration...")
+    with tempfile.TemporaryDirectory() as d:
+        json_path = os.path.join(d, "tts_favorites.json")
+        old = [
+            {"id": 1700000000, "text": "Welcome!", "voice_id": "v1", "voice_name": "Rachel",
+             "audio_filename": None, "created_at": "2023-11-14 22:13:20", "timestamp": 1700000000},
+            {"id": 1700000000, "text": "Same second", "voice_id": "v2", "voice_name": "Adam",
+             "audio_filename": "clip.mp3", "created_at": "2023-11-14 22:13:20", "timestamp": 1700000000},
+            {"id": 1700000100, "text": "Later", "voice_id": "v1", "voice_name": "Rachel",
+             "created_at": "2023-11-14 22:15:00", "timestamp": 1700000100},
+        ]
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(old, f)
+
+        store = FavoritesStore(os.path.join(d, "favorites.db"))
+        assert store.migrate_json(json_path) == 3
+        assert not os.path.exists(json_path) and os.path.exists(json_path + ".migrated")
+        favorites = store.list()
+        assert [f['text'] for f in favorites][0] == "Later"
+        assert len({f['id'] for f in favorites}) == 3
+        assert store.get(1700000000)['text'] == "Welcome!"
+        assert store.audio_filenames() == ["clip.mp3"]
+        assert store.migrate_json(json_path) == 0  # Nothing left to import
+    print("   ✅ Migrated once with unique ids")
+    return True
+
+
+def test_add_delete_and_pages():
+    """Adds get unique ids even within one second; pages continue from the last entry"""
+    print("Testing add, delete and paging...")
+    with tempfile.TemporaryDirectory() as d:
+        store = FavoritesStore(os.path.join(d, "favorites.db"))
+        ids = [store.add(f"Phrase {i}", "v1", "Rachel", timestamp=1000.0)['id'] for i in range(5)]
+        assert len(set(ids)) == 5
+        assert store.delete(ids[2]) and not store.delete(ids[2])
+        first = store.list(limit=2)
+        second = store.list(limit=2, before=(first[-1]['timestamp'], first[-1]['id']))
+        assert [f['text'] for f in first + second] == ["Phrase 4", "Phrase 3", "Phrase 1", "Phrase 0"]
+    print("   ✅ Unique ids, deletes and keyset pages")
+    return True
+
+
+def benchmark(store, size):
+    rows = [(f"Favorite phrase number {i}", "voice", "Rachel", None, "2024-01-01 00:00:00", float(i))
+            for i in range(size)]
+    conn = store._conn()
+    with conn:
+        conn.executemany("INSERT INTO favorites (text, voice_id, voice_name, audio_filename, created_at, "
+                         "timestamp) VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+    def timed(fn, repeat=200):
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fn()
+            samples.append((time.perf_counter() - started) * 1000)
+        return statistics.median(samples)
+
+    added = []
+    insert_ms = timed(lambda: added.append(store.add("New favorite", "voice", "Rachel")['id']))
+    delete_ms = timed(lambda: store.delete(added.pop()))
+    list_ms = timed(lambda: store.list(limit=4))
+    print(f"   {size:>7,} favorites: insert {insert_ms:.3f} ms, delete {delete_ms:.3f} ms, "
+          f"newest 4 {list_ms:.3f} ms")
+    return insert_ms, delete_ms, list_ms
+
+
+def test_latency_benchmark():
+    """Insert, delete and list latency at 10k and 100k favorites"""
+    print("Benchmarking favorites store...")
+    results = {}
+    with tempfile.TemporaryDirectory() as d:
+        for size in (10_000, 100_000):
+            results[size] = benchmark(FavoritesStore(os.path.join(d, f"favorites_{size}.db")), size)
+    for small, large in zip(results[10_000], results[100_000]):
+        assert large < small * 5 + 1.0, "Operations should not scale with the number of favorites"
+    print("   ✅ Latency independent of store size")
+    return True
+
+
+def main():
+    print("⭐ VoiceMaster Pro - Favorites Store Test")
+    print("=" * 50)
+
+    tests = [test_json_migration, test_add_delete_and_pages, test_latency_benchmark]
+
+    all_passed = True
+    for test in tests:
+        try:
+            all_passed &= test()
+        except Exception as e:
+            print(f"❌ Test failed: {e}")
+            all_passed = False
+
+    print("\n🎉 All favorites store tests passed!" if all_passed else "\n⚠️  Some favorites store tests failed.")
+    return all_passed
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,175 @@
+"""
+Test script for streaming favorites import/export
+Uses temporary databases and audio folders, no API calls
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from favorites_store import FavoritesStore
+from favorites_transfer import export_favorites, import_favorites
+
+
+def make_pc(directory, name):
+    """A favorites database and audio folder, like one streaming PC"""
+    audio_dir = os.path.join(directory, name, "tts_favorites")
+    os.makedirs(audio_dir)
+    return FavoritesStore(os.path.join(directory, name, "tts_favorites.db")), audio_dir
+
+
+def test_round_trip_with_audio():
+    """Favorites and their audio arrive intact; importing twice adds nothing"""
+    print("Testing export and import with audio...")
+    with tempfile.TemporaryDirectory() as d:
+        source, source_audio = make_pc(d, "streaming_pc")
+        for i in range(20):
+            audio = None
+            if i % 2 == 0:
+                audio = f"fav_{i:020x}.mp3"
+                with open(os.path.join(source_audio, audio), 'wb') as f:
+                    f.write(os.urandom(5000 + i))
+            source.add(f"Phrase {i} — ünïcode", "v1", "Rachel", audio, timestamp=1000.0 + i,
+                       settings={'stability': 0.5, 'similarity_boost': 0.75})
+        source.add("Missing audio file", "v2", "Adam", "fav_gone.mp3", timestamp=2000.0)
+
+        archive = os.path.join(d, "favorites.vmfav")
+        calls = []
+        stats = export_favorites(source, archive, source_audio, progress=lambda done, total: calls.append(done))
+        assert stats['favorites'] == 21 and stats['audio_files'] == 10 and calls[-1] == 21
+
+        target, target_audio = make_pc(d, "laptop")
+        target.add("Phrase 3 — ünïcode", "v1", "Rachel", settings={'stability': 0.5, 'similarity_boost': 0.75})
+        stats = import_favorites(target, archive, target_audio)
+        assert stats['imported'] == 20 and stats['duplicates'] == 1 and stats['audio_files'] == 10
+
+        by_text = {f['text']: f for f in target.list()}
+        original = source.list()[-1]
+        copy = by_text[original['text']]
+        assert (copy['voice_id'], copy['settings'], copy['timestamp']) == \
+            (original['voice_id'], original['settings'], original['timestamp'])
+        with open(os.path.join(source_audio, original['audio_filename']), 'rb') as a, \
+                open(os.path.join(target_audio, copy['audio_filename']), 'rb') as b:
+            assert a.read() == b.read()
+        assert by_text["Missing audio file"]['audio_filename'] is None
+
+        stats = import_favorites(target, archive, target_audio)
+        assert stats['imported'] == 0 and stats['duplicates'] == 21
+        assert stats['audio_files'] == 0 and stats['audio_existing'] == 10
+        assert target.count() == 21
+    print("   ✅ 21 favorites and 10 audio files copied, re-import skipped everything")
+    return True
+
+
+def test_plain_jsonl_and_bad_input():
+    """Text-only exports are plain JSONL; bad lines, corrupt audio and unsafe names are skipped"""
+    print("Testing plain JSONL and damaged archives...")
+    with tempfile.TemporaryDirectory() as d:
+        store, audio_dir = make_pc(d, "pc")
+        store.add("Hello chat", "v1", "Rachel", "fav_a.mp3")
+        with open(os.path.join(audio_dir, "fav_a.mp3"), 'wb') as f:
+            f.write(b"audio")
+        plain = os.path.join(d, "favorites.jsonl")
+        export_favorites(store, plain)
+        with open(plain, encoding='utf-8') as f:
+            lines = [json.loads(line) for line in f]
+        assert lines[0]['count'] == 1 and lines[1]['text'] == "Hello chat" and 'audio' not in lines[1]
+
+        # Hand-written file: no header, a broken entry, a corrupt blob and a path in a blob name
+        damaged = os.path.join(d, "damaged.vmfav")
+        with open(damaged, 'wb') as f:
+            f.write(json.dumps({'text': "Hand written", 'voice_id': "v9"}).encode() + b"\n")
+            f.write(json.dumps({'text': "   "}).encode() + b"\n")
+            f.write(json.dumps({'type': 'audio', 'name': "fav_b.mp3", 'size': 3, 'sha256': "0" * 64}).encode() + b"\n")
+            f.write(b"xyz")
+            f.write(json.dumps({'text': "Corrupt audio", 'audio': "fav_b.mp3"}).encode() + b"\n")
+            f.write(json.dumps({'type': 'audio', 'name': "../../evil.mp3", 'size': 2}).encode() + b"\n")
+            f.write(b"ok")
+            f.write(json.dumps({'text': "Escaping audio", 'audio': "../../evil.mp3"}).encode() + b"\n")
+        target, target_audio = make_pc(d, "other")
+        seen = []
+        stats = import_favorites(target, damaged, target_audio, progress=lambda done, total: seen.append(total))
+        assert stats['imported'] == 3 and stats['invalid'] == 1 and stats['audio_corrupt'] == 1
+        assert seen[-1] is None
+        assert sorted(os.listdir(target_audio)) == ["evil.mp3"]
+        assert not os.path.exists(os.path.join(d, "evil.mp3"))
+        by_text = {f['text']: f for f in target.list()}
+        assert by_text["Corrupt audio"]['audio_filename'] is None
+        assert by_text["Escaping audio"]['audio_filename'] == "evil.mp3"
+    print("   ✅ Plain JSONL written; damaged input handled")
+    return True
+
+
+def test_constant_memory_benchmark(count=100_000, with_audio=2_000):
+    """Export and import 100k favorites with flat memory use, reporting progress"""
+    print(f"Benchmarking transfer of {count:,} favorites...")
+    with tempfile.TemporaryDirectory() as d:
+        source, source_audio = make_pc(d, "source")
+        audio_blob = os.urandom(16_000)  # ~1 s of 128 kbps MP3
+        rows = []
+        for i in range(count):
+            audio = None
+            if i < with_audio:
+                audio = f"fav_{i:020x}.mp3"
+                with open(os.path.join(source_audio, audio), 'wb') as f:
+                    f.write(audio_blob)
+            rows.append({'text': f"Favorite line number {i} for the stream", 'voice_id': f"v{i % 7}",
+                         'voice_name': "Rachel", 'audio_filename': audio, 'timestamp': float(i),
+                         'settings': {'stability': 0.5, 'similarity_boost': 0.75}})
+            if len(rows) == 5000:
+                source.add_many(rows)
+                rows = []
+        archive = os.path.join(d, "favorites.vmfav")
+        target, target_audio = make_pc(d, "target")
+        source.count(), target.count()  # Open connections before measuring
+
+        progress = []
+        tracemalloc.start()
+        started = time.perf_counter()
+        export_favorites(source, archive, source_audio, progress=lambda done, total: progress.append(done))
+        export_s = time.perf_counter() - started
+        _, export_peak = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        started = time.perf_counter()
+        stats = import_favorites(target, archive, target_audio)
+        import_s = time.perf_counter() - started
+        _, import_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        size_mb = os.path.getsize(archive) / 1024 / 1024
+        assert stats['imported'] == count and target.count() == count
+        assert len(os.listdir(target_audio)) == with_audio
+        assert len(progress) >= count // 1000
+        print(f"   Archive {size_mb:.1f} MB, timed with memory tracing on; export {export_s:.1f}s (peak {export_peak / 1024 / 1024:.1f} MB), "
+              f"import {import_s:.1f}s (peak {import_peak / 1024 / 1024:.1f} MB)")
+        assert export_peak < 8 * 1024 * 1024 and import_peak < 8 * 1024 * 1024, "Memory should stay flat"
+    print("   ✅ 100k favorites transferred in constant memory")
+    return True
+
+
+def main():
+    print("📦 VoiceMaster Pro - Favorites Import/Export Test")
+    print("=" * 50)
+
+    tests = [test_round_trip_with_audio, test_plain_jsonl_and_bad_input, test_constant_memory_benchmark]
+
+    all_passed = True
+    for test in tests:
+        try:
+            all_passed &= test()
+        except Exception as e:
+            print(f"❌ Test failed: {e}")
+            all_passed = False
+
+    print("\n🎉 All favorites transfer tests passed!" if all_passed else "\n⚠️  Some favorites transfer tests failed.")
+    return all_passed
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
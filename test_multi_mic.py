@@ -0,0 +1,169 @@
+"""
+Test script for multi-microphone capture and the merged co-host transcript
+Each mic hears one speaker (a tone per speaker) fed in real time; recognition is simulated
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mic_capture import FRAME_SAMPLES, SAMPLE_RATE, MicCapture
+from multi_mic import MicChannel, MultiMicTranscriber, parse_mic_assignments
+
+SPEAKERS = {"Host": 300.0, "Guest": 500.0, "Cohost": 700.0}
+RECOGNIZE_OVERHEAD = 0.05
+RECOGNIZE_PER_SECOND = 0.3      # Slow enough that a long sentence is recognized after a later short one
+
+
+def speech(seconds, frequency):
+    """Syllables of a tone with short gaps, like speech as far as voice activity detection is concerned"""
+    syllable = np.sin(2 * np.pi * frequency * np.arange(int(0.2 * SAMPLE_RATE)) / SAMPLE_RATE) * 0.1 * 32768
+    gap = np.zeros(int(0.06 * SAMPLE_RATE))
+    count = max(1, int(seconds / 0.26))
+    return np.concatenate([np.concatenate([syllable, gap]) for _ in range(count)])[:-len(gap)]
+
+
+def track(lines, total, frequency):
+    """One mic's audio: (start, seconds) lines of speech, silence elsewhere"""
+    signal = np.zeros(int(total * SAMPLE_RATE))
+    for start, seconds in lines:
+        audio = speech(seconds, frequency)
+        offset = int(start * SAMPLE_RATE)
+        signal[offset:offset + len(audio)] = audio
+    rng = np.random.default_rng(int(frequency))
+    return np.clip(signal + rng.normal(0, 30, len(signal)), -32768, 32767).astype(np.int16)
+
+
+def feed_all(captures, tracks, started):
+    """Feed every mic 20 ms at a time, in real time, like simultaneous microphones"""
+    for i in range(0, len(tracks[0]), FRAME_SAMPLES):
+        delay = started + i / SAMPLE_RATE - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        for capture, signal in zip(captures, tracks):
+            capture.feed(signal[i:i + FRAME_SAMPLES])
+
+
+def make_recognizer(speaker, work=None):
+    said = []
+
+    def recognize(samples):
+        seconds = len(samples) / SAMPLE_RATE
+        if work is not None:
+            work(seconds)
+        else:
+            time.sleep(RECOGNIZE_OVERHEAD + RECOGNIZE_PER_SECOND * seconds)
+        said.append(seconds)
+        return f"{speaker} line {len(said)}"
+
+    return recognize
+
+
+def run_session(script, total, recognizer=make_recognizer):
+    """script: {speaker: [(start, seconds)]}; returns the transcriber after the audio has been fed"""
+    speakers = list(script)
+    captures = [MicCapture().start_processing() for _ in speakers]
+    channels = [MicChannel(s, c, recognizer(s)) for s, c in zip(speakers, captures)]
+    utterances = []
+    transcriber = MultiMicTranscriber(channels, on_utterance=lambda s, u: utterances.append(s)).start()
+    started = time.perf_counter() + 0.05
+    feed_all(captures, [track(script[s], total, SPEAKERS[s]) for s in speakers], started)
+    transcriber.stop()
+    for capture in captures:
+        capture.stop()
+    return transcriber, utterances, time.monotonic() - (time.perf_counter() - started)
+
+
+def test_merged_transcript_order():
+    """Entries come out in speaking order even when a later, shorter line is recognized first"""
+    print("Testing the merged transcript...")
+    script = {
+        "Host": [(0.5, 3.5), (6.5, 1.0)],
+        "Guest": [(1.5, 0.8), (5.0, 1.0)],     # Interrupts the host's long line
+        "Cohost": [(2.8, 0.5)],
+    }
+    transcriber, utterances, started = run_session(script, total=9.0)
+    entries = transcriber.transcript
+
+    assert [e.speaker for e in entries] == ["Host", "Guest", "Cohost", "Guest", "Host"], \
+        [(e.speaker, e.text) for e in entries]
+    assert [e.text for e in entries if e.speaker == "Host"] == ["Host line 1", "Host line 2"]
+    assert all(a.started_at <= b.started_at for a, b in zip(entries, entries[1:]))
+    host, guest = entries[0], entries[1]
+    assert guest.recognized_at < host.recognized_at, "the guest's short line should be recognized first"
+    assert guest.emitted_at >= host.emitted_at
+    assert all(any(abs(entry.started_at - started - s) < 0.3 for s, _ in script[entry.speaker])
+               for entry in entries), "entry times should match when each line was said"
+    assert sorted(utterances) == sorted(s for s, lines in script.items() for _ in lines)
+    held = max(e.emitted_at - e.recognized_at for e in entries)
+    print(f"   ✅ {len(entries)} entries from 3 mics in speaking order; the guest's interruption was held "
+          f"{(guest.emitted_at - guest.recognized_at) * 1000:.0f} ms for the host's line (longest hold "
+          f"{held * 1000:.0f} ms)")
+    for entry in entries:
+        d = entry.as_dict(started)
+        print(f"      [{d['start']:5.2f}s] {d['speaker']}: {d['text']}")
+    return True
+
+
+def test_assignments():
+    """MULTI_MIC_DEVICES parsing"""
+    print("Testing mic assignments...")
+    assert parse_mic_assignments("Host=Blue Yeti; Guest = Realtek ;;bad; =x") == \
+        [("Host", "Blue Yeti"), ("Guest", "Realtek")]
+    assert parse_mic_assignments("") == []
+    print("   ✅ Speakers assigned to microphones by name")
+    return True
+
+
+def test_cpu_scales_linearly():
+    """CPU time per mic stays the same with 1, 2 and 3 mics"""
+    print("Benchmarking CPU per microphone...")
+
+    def work(seconds):
+        # CPU-bound stand-in for a recognizer: cost proportional to the audio
+        block = np.random.default_rng(0).normal(size=4096)
+        for _ in range(int(1500 * seconds)):
+            np.fft.rfft(block)
+
+    per_mic = []
+    for count in (1, 2, 3):
+        speakers = list(SPEAKERS)[:count]
+        script = {s: [(0.3 + 0.3 * i, 1.0), (1.9 + 0.3 * i, 1.0)] for i, s in enumerate(speakers)}
+        cpu = time.process_time()
+        transcriber, _, _ = run_session(script, total=4.5,
+                                        recognizer=lambda s: make_recognizer(s, work=work))
+        cpu = time.process_time() - cpu
+        assert len(transcriber.transcript) == 2 * count, [(e.speaker, e.text) for e in transcriber.transcript]
+        per_mic.append(cpu / count)
+        print(f"   {count} mic{'s' if count > 1 else ' '}: {cpu * 1000:.0f} ms CPU for 4.5 s of audio "
+              f"({cpu / count * 1000:.0f} ms per mic)")
+    assert per_mic[-1] < per_mic[0] * 1.5, "CPU per mic should not grow with the number of mics"
+    print("   ✅ CPU grows linearly with the number of microphones")
+    return True
+
+
+def main():
+    print("🎙️ VoiceMaster Pro - Multi-Mic Transcript Test")
+    print("=" * 50)
+
+    tests = [test_merged_transcript_order, test_assignments, test_cpu_scales_linearly]
+
+    all_passed = True
+    for test in tests:
+        try:
+            all_passed &= test()
+        except Exception as e:
+            print(f"❌ Test failed: {e}")
+            all_passed = False
+
+    print("\n🎉 All multi-mic tests passed!" if all_passed else "\n⚠️  Some multi-mic tests failed.")
+    return all_passed
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,146 @@
+"""
+Test script for the obs-websocket integration
+Runs against the local stand-in server, OBS does not need to be running
+"""
+
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from obs_standin import ObsStandIn
+from obs_websocket import ObsClient, ObsError, ObsIntegration, MEDIA_RESTART
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_authenticated_requests():
+    """Identify with a password, then single and batched requests"""
+    print("Testing authentication and requests...")
+    standin = ObsStandIn(port=0, password="hunter2").start()
+    client = ObsClient(port=standin.port, password="hunter2").start()
+    try:
+        assert client.wait_connected(5)
+        assert client.call('GetVersion')['rpcVersion'] == 1
+        results = client.batch([
+            ('SetInputSettings', {'inputName': 'Caption', 'inputSettings': {'text': 'Hello'}}),
+            ('GetInputSettings', {'inputName': 'Caption'}),
+            ('GetInputSettings', {'inputName': 'Missing'}),
+        ])
+        assert results[1]['responseData']['inputSettings'] == {'text': 'Hello'}
+        assert not results[2]['requestStatus']['result']
+        try:
+            client.call('GetInputSettings', {'inputName': 'Missing'})
+            assert False, "expected ObsError"
+        except ObsError:
+            pass
+    finally:
+        client.stop()
+
+    wrong = ObsClient(port=standin.port, password="wrong").start()
+    try:
+        assert not wrong.wait_connected(1)
+        assert "identification" in (wrong.last_error or "") or "Authentication" in (wrong.last_error or "")
+    finally:
+        wrong.stop()
+        standin.stop()
+    print("   ✅ Authenticated, wrong password refused")
+    return True
+
+
+def test_reconnect_and_queued_events():
+    """Events sent while OBS is gone are delivered after the automatic reconnect"""
+    print("Testing automatic reconnect...")
+    standin = ObsStandIn(port=0).start()
+    standin.add_scene_item("Live", "On Air")
+    client = ObsClient(port=standin.port)
+    obs = ObsIntegration(client, text_source="Caption", on_air_scene="Live",
+                         on_air_source="On Air", media_source="Chime")
+    client.start()
+    try:
+        assert client.wait_connected(5)
+        assert wait_until(lambda: obs._on_air_item_id is not None)
+        obs.on_generation("First line")
+        obs.on_playback(True)
+        assert wait_until(lambda: standin.scene_item_enabled("Live", "On Air"))
+        assert standin.inputs['Caption']['text'] == "First line"
+        assert standin.media_actions == [("Chime", MEDIA_RESTART)]
+
+        standin.drop_connections()
+        assert wait_until(lambda: not client.connected, 2)
+        obs.on_generation("Sent while disconnected")
+        obs.on_playback(False)
+        assert wait_until(lambda: client.connected and client.connections == 2, 5)
+        assert wait_until(lambda: standin.scene_item_enabled("Live", "On Air") is False)
+        assert standin.inputs['Caption']['text'] == "Sent while disconnected"
+    finally:
+        client.stop()
+        standin.stop()
+    print("   ✅ Reconnected and flushed queued requests")
+    return True
+
+
+def test_round_trip_latency_benchmark(rounds=500):
+    """Round-trip latency of single requests, and a batch of 10 against 10 single calls"""
+    print(f"Benchmarking round trips ({rounds} requests)...")
+    standin = ObsStandIn(port=0, password="pw").start()
+    client = ObsClient(port=standin.port, password="pw").start()
+    try:
+        client.wait_connected(5)
+        latencies = []
+        for i in range(rounds):
+            started = time.perf_counter()
+            client.call('SetInputSettings', {'inputName': 'Caption', 'inputSettings': {'text': f"line {i}"}})
+            latencies.append((time.perf_counter() - started) * 1000)
+        latencies.sort()
+        print(f"   Single request: p50 {statistics.median(latencies):.3f} ms, "
+              f"p99 {latencies[int(len(latencies) * 0.99) - 1]:.3f} ms")
+
+        requests = [('SetInputSettings', {'inputName': f'Text {i}', 'inputSettings': {'text': 'x'}})
+                    for i in range(10)]
+        started = time.perf_counter()
+        for _ in range(100):
+            for request in requests:
+                client.call(*request)
+        sequential = (time.perf_counter() - started) * 10
+        started = time.perf_counter()
+        for _ in range(100):
+            client.batch(requests)
+        batched = (time.perf_counter() - started) * 10
+        print(f"   10 requests: {sequential:.3f} ms one by one, {batched:.3f} ms as one batch")
+        assert batched < sequential
+    finally:
+        client.stop()
+        standin.stop()
+    print("   ✅ Round-trip latency measured")
+    return True
+
+
+def main():
+    print("🎬 VoiceMaster Pro - OBS WebSocket Test")
+    print("=" * 50)
+
+    tests = [test_authenticated_requests, test_reconnect_and_queued_events, test_round_trip_latency_benchmark]
+
+    all_passed = True
+    for test in tests:
+        try:
+            all_passed &= test()
+        except Exception as e:
+            print(f"❌ Test failed: {e}")
+            all_passed = False
+
+    print("\n🎉 All OBS websocket tests passed!" if all_passed else "\n⚠️  Some OBS websocket tests failed.")
+    return all_passed
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,189 @@
+"""
+Test script for the append-only overlay archive
+Runs against a temporary directory
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from overlay_archive import OverlayArchive
+from overlay_output import DEFAULT_OVERLAY_TEMPLATE, OverlayTemplate, overlay_slots
+
+
+def test_repeated_states_stored_once():
+    """Thousands of updates with a few distinct texts add fixed-size events, not copies"""
+    print("Testing state deduplication...")
+    with tempfile.TemporaryDirectory() as d:
+        archive = OverlayArchive(d)
+        for i in range(3000):
+            archive.record(f"🎤 Voice {i % 3}", "TTS Active", DEFAULT_OVERLAY_TEMPLATE, 1000.0 + i / 10)
+        stats = archive.stats()
+        print(f"   {stats}, files: {sorted(os.listdir(d))}")
+        assert stats['events'] == 3000
+        assert stats['unique_blobs'] == 4  # Three states plus the template
+        assert stats['bytes'] < 3000 * 40
+        assert sorted(os.listdir(d)) == ["events.bin", "states.bin"]
+    print("   ✅ Disk use grows by one small record per update")
+    return True
+
+
+def test_restore_renders_original_html():
+    """Rendering an event reproduces the HTML that was shown, with its original template"""
+    print("Testing restore rendering...")
+    with tempfile.TemporaryDirectory() as d:
+        archive = OverlayArchive(d)
+        archive.record("Old <voice>", "", "<p>${main_text}</p>${sub_block}", 10.0)
+        archive.record("New", "Sub & more", DEFAULT_OVERLAY_TEMPLATE, 10.0)  # Same second
+        archive.close()
+
+        reopened = OverlayArchive(d)
+        assert len(reopened) == 2
+        assert reopened.render(0) == "<p>Old &lt;voice&gt;</p>"
+        expected = OverlayTemplate(DEFAULT_OVERLAY_TEMPLATE).render(**overlay_slots("New", "Sub & more"))
+        assert reopened.render(1) == expected
+        assert reopened.state(1)['timestamp'] == 10.0
+    print("   ✅ Old states restored, same-second updates both kept")
+    return True
+
+
+def test_torn_tail_and_legacy_import():
+    """A partial trailing record is dropped; old HTML archives are imported in order"""
+    print("Testing recovery and legacy import...")
+    with tempfile.TemporaryDirectory() as d:
+        for ts, text in ((200, "Second"), (100, "First &amp; best")):
+            html = OverlayTemplate(DEFAULT_OVERLAY_TEMPLATE).render(main_text=text)
+            with open(os.path.join(d, f"overlay_{ts:010d}.html"), 'w', encoding='utf-8') as f:
+                f.write(html)
+        archive = OverlayArchive(d)
+        assert archive.import_legacy_html(d, DEFAULT_OVERLAY_TEMPLATE) == 2
+        assert [archive.state(i)['main_text'] for i in range(2)] == ["First & best", "Second"]
+        archive.close()
+
+        with open(os.path.join(d, "events.bin"), 'ab') as f:
+            f.write(b"\x01\x02\x03")
+        reopened = OverlayArchive(d)
+        assert len(reopened) == 2
+        reopened.record("Third", "", DEFAULT_OVERLAY_TEMPLATE, 300.0)
+        assert reopened.state(2)['main_text'] == "Third"
+    print("   ✅ Torn write repaired and legacy files imported")
+    return True
+
+
+def test_deferred_legacy_import():
+    """A deferred legacy import runs before the first update is recorded, keeping both in order"""
+    print("Testing deferred legacy import...")
+    with tempfile.TemporaryDirectory() as d:
+        for ts in (100, 200):
+            html = OverlayTemplate(DEFAULT_OVERLAY_TEMPLATE).render(main_text=f"Old {ts}")
+            with open(os.path.join(d, f"overlay_{ts:010d}.html"), 'w', encoding='utf-8') as f:
+                f.write(html)
+        archive = OverlayArchive(d)
+        archive.defer_legacy_import(d, DEFAULT_OVERLAY_TEMPLATE)
+        assert len(archive) == 0
+        assert archive.record("Live", "", DEFAULT_OVERLAY_TEMPLATE, 1000.0) == 2  # Written right away
+        assert archive.import_pending() == 0, "the import runs once"
+        assert [(archive.state(i)['main_text'], archive.state(i)['timestamp']) for i in range(3)] == \
+            [("Old 100", 100.0), ("Old 200", 200.0), ("Live", 1000.0)]
+        archive.close()
+        assert len(OverlayArchive(d)) == 3
+
+        with tempfile.TemporaryDirectory() as empty:
+            archive = OverlayArchive(empty)
+            archive.defer_legacy_import(empty, DEFAULT_OVERLAY_TEMPLATE)
+            assert archive.record("Hello", "world", DEFAULT_OVERLAY_TEMPLATE, 5.0) == 0
+            archive.close()
+            assert len(OverlayArchive(empty)) == 1
+    print("   ✅ Legacy timestamps kept, new updates recorded after them without being held")
+    return True
+
+
+def test_paging_and_time_ranges():
+    """Pages continue from the last seq; time ranges select by timestamp"""
+    print("Testing paging and time ranges...")
+    with tempfile.TemporaryDirectory() as d:
+        archive = OverlayArchive(d)
+        for i in range(1000):
+            archive.record(f"Update {i}", "", DEFAULT_OVERLAY_TEMPLATE, 5000.0 + i)
+
+        first = archive.page(limit=20)
+        assert [e.seq for e in first] == list(range(999, 979, -1))
+        second = archive.page(limit=20, before=first[-1].seq)
+        assert second[0].seq == 979 and second[0].main_text == "Update 979"
+
+        in_range = list(archive.entries(since=5100.0, until=5110.0))
+        assert [e.seq for e in in_range] == list(range(109, 99, -1))
+        oldest = list(archive.entries(since=5990.0, newest_first=False))
+        assert [e.seq for e in oldest] == list(range(990, 1000))
+        assert first[0]['created'] == time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(5999.0))
+        assert first[0]['main_text'] == "Update 999"
+        for key in ('filename', 'path', '_digest'):
+            try:
+                first[0][key]
+                assert False, f"{key} should not be a key"
+            except KeyError:
+                pass
+    print("   ✅ Pagination and time-range queries correct")
+    return True
+
+
+def test_newest_page_constant_time_benchmark():
+    """Listing the newest 20 costs the same at 1k and 100k archived overlays"""
+    print("Benchmarking newest-page listing...")
+    timings = {}
+    with tempfile.TemporaryDirectory() as d:
+        archive = OverlayArchive(d)
+        count = 0
+        for target in (1_000, 100_000):
+            while count < target:
+                archive.record(f"🎤 Voice {count % 50}", "TTS Active", DEFAULT_OVERLAY_TEMPLATE, float(count))
+                count += 1
+            archive.page(limit=20)  # Warm the state cache
+            start = time.perf_counter()
+            for _ in range(200):
+                page = archive.page(limit=20)
+                [(e.main_text, e.created) for e in page]
+            timings[target] = (time.perf_counter() - start) / 200 * 1000
+            print(f"   {target:>7,} entries: newest 20 in {timings[target]:.3f} ms")
+
+            start = time.perf_counter()
+            window = list(archive.entries(since=target / 2, until=target / 2 + 20))
+            print(f"   {target:>7,} entries: 20-entry time range in {(time.perf_counter() - start) * 1000:.3f} ms")
+            assert len(window) == 20
+        print(f"   Archive size at 100k: {archive.stats()['bytes'] / 1024:.0f} KB")
+    assert timings[100_000] < timings[1_000] * 3 + 0.5
+    print("   ✅ Newest page does not grow with archive size")
+    return True
+
+
+def main():
+    print("🗂️  VoiceMaster Pro - Overlay Archive Test")
+    print("=" * 50)
+
+    tests = [
+        test_repeated_states_stored_once,
+        test_restore_renders_original_html,
+        test_torn_tail_and_legacy_import,
+        test_deferred_legacy_import,
+        test_paging_and_time_ranges,
+        test_newest_page_constant_time_benchmark,
+    ]
+
+    all_passed = True
+    for test in tests:
+        try:
+            all_passed &= test()
+        except Exception as e:
+            print(f"❌ Test failed: {e}")
+            all_passed = False
+
+    print("\n🎉 All overlay archive tests passed!" if all_passed else "\n⚠️  Some overlay archive tests failed.")
+    return all_passed
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,174 @@
+"""
+Test script for the precompiled overlay template and coalesced atomic writes
+Runs against a temporary directory
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import json
+
+from overlay_output import (DEFAULT_OVERLAY_TEMPLATE, OverlayTemplate, CoalescingWriter, overlay_slots,
+                            OverlayRenderer, load_overlay_outputs)
+
+
+def test_template_renders_slots():
+    """Only the text slots change between renders"""
+    print("Testing template rendering...")
+    template = OverlayTemplate(DEFAULT_OVERLAY_TEMPLATE)
+    page = template.render(**overlay_slots("🎤 Rachel", "TTS Active"))
+    assert '<div class="main-text">🎤 Rachel</div>' in page
+    assert '<div class="sub-text">TTS Active</div>' in page
+    assert "${" not in page and ".overlay-container {" in page
+    assert '<div class="sub-text">' not in template.render(**overlay_slots("Only main"))
+    assert "&lt;script&gt;" in template.render(**overlay_slots("<script>"))
+
+    start = time.perf_counter()
+    for i in range(10_000):
+        template.render(**overlay_slots(f"Line {i}", "sub"))
+    per_render_us = (time.perf_counter() - start) * 1e6 / 10_000
+    print(f"   Render: {per_render_us:.1f} µs per update")
+    print("   ✅ Slots substituted, static markup reused")
+    return True
+
+
+def test_bursts_coalesce_into_one_write():
+    """A burst of updates inside the window produces a single write of the newest content"""
+    print("Testing coalescing...")
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "overlay.html")
+        writer = CoalescingWriter(window_ms=100)
+        start = time.perf_counter()
+        for i in range(200):
+            writer.submit(path, f"update {i}")
+        submit_ms = (time.perf_counter() - start) * 1000
+        assert writer.flush()
+        with open(path, encoding='utf-8') as f:
+            assert f.read() == "update 199"
+        print(f"   200 submits in {submit_ms:.2f} ms -> {writer.writes} write(s)")
+        assert writer.writes == 1
+    print("   ✅ Burst collapsed, caller never blocked on disk")
+    return True
+
+
+def test_readers_never_see_partial_files():
+    """A concurrent reader only ever sees complete pages"""
+    print("Testing atomic replacement...")
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "overlay.html")
+        writer = CoalescingWriter(window_ms=0)
+        pages = [("<html>" + str(i) * 20_000 + "</html>") for i in range(10)]
+        writer.submit(path, pages[0])
+        writer.flush()
+        stop = threading.Event()
+        torn = []
+
+        def reader():
+            while not stop.is_set():
+                with open(path, encoding='utf-8') as f:
+                    content = f.read()
+                if content not in pages:
+                    torn.append(len(content))
+
+        t = threading.Thread(target=reader)
+        t.start()
+        for i in range(300):
+            writer.submit(path, pages[i % len(pages)])
+            writer.flush()
+        stop.set()
+        t.join()
+        assert not torn, f"reader saw {len(torn)} partial files"
+    print("   ✅ No partial files observed")
+    return True
+
+
+def make_outputs(directory):
+    config = {'outputs': {
+        'main': {'template': 'default', 'path': os.path.join(directory, 'overlay.html')},
+        'badge': {'template': 'badge', 'path': os.path.join(directory, 'overlay_badge.html')},
+        'ticker': {'template': 'ticker', 'path': os.path.join(directory, 'overlay_ticker.html')},
+    }}
+    config_path = os.path.join(directory, 'overlay_outputs.json')
+    with open(config_path, 'w', encoding='utf-8') as f:
+        json.dump(config, f)
+    return load_overlay_outputs(config_path)
+
+
+def test_only_changed_outputs_are_written():
+    """One state update renders all outputs in a pass but writes only those that changed"""
+    print("Testing multi-output rendering...")
+    with tempfile.TemporaryDirectory() as d:
+        writer = CoalescingWriter(window_ms=0)
+        renderer = OverlayRenderer(make_outputs(d), writer)
+
+        first = renderer.update(main_text="🎤 Rachel", sub_text="TTS Active", voice_name="Rachel", spoken_text="Hi!")
+        assert first == ['main', 'badge', 'ticker']
+        # Same voice, new line: badge untouched
+        assert renderer.update(main_text="🎤 Rachel", spoken_text="Thanks for following!") == ['ticker']
+        # Only the voice changes: main and ticker are not even rendered
+        assert renderer.update(voice_name="Adam") == ['badge']
+        assert renderer.update(voice_name="Adam", spoken_text="Thanks for following!") == []
+        # A key no output uses: nothing rendered at all
+        assert renderer.update(unused="x") == []
+        writer.flush()
+
+        stats = renderer.stats()
+        print(f"   {stats['outputs']}")
+        assert {n: o['writes'] for n, o in stats['outputs'].items()} == {'main': 1, 'badge': 2, 'ticker': 2}
+        assert writer.submitted == 5
+        with open(os.path.join(d, 'overlay_badge.html'), encoding='utf-8') as f:
+            assert 'data-slot="voice_name">Adam<' in f.read()
+    print("   ✅ Unchanged outputs neither re-rendered nor rewritten")
+    return True
+
+
+def test_multi_output_render_benchmark():
+    """Render time per update for three outputs"""
+    print("Benchmarking multi-output rendering...")
+    with tempfile.TemporaryDirectory() as d:
+        writer = CoalescingWriter(window_ms=0)
+        renderer = OverlayRenderer(make_outputs(d), writer)
+        renderer.update(main_text="start", sub_text="TTS Active", voice_name="Rachel", spoken_text="")
+        for i in range(2000):
+            renderer.update(main_text=f"🎤 Voice {i % 4}", voice_name=f"Voice {i % 4}", spoken_text=f"Line {i}")
+        writer.flush()
+        stats = renderer.stats()
+        print(f"   {stats['updates']} updates, avg {stats['avg_render_ms'] * 1000:.1f} µs per update, "
+              f"{sum(o['writes'] for o in stats['outputs'].values())} writes queued, {writer.writes} written")
+        assert stats['avg_render_ms'] < 1.0
+    print("   ✅ Render time instrumented")
+    return True
+
+
+def main():
+    print("🖼️  VoiceMaster Pro - Overlay Output Test")
+    print("=" * 50)
+
+    tests = [
+        test_template_renders_slots,
+        test_bursts_coalesce_into_one_write,
+        test_readers_never_see_partial_files,
+        test_only_changed_outputs_are_written,
+        test_multi_output_render_benchmark,
+    ]
+
+    all_passed = True
+    for test in tests:
+        try:
+            all_passed &= test()
+        except Exception as e:
+            print(f"❌ Test failed: {e}")
+            all_passed = False
+
+    print("\n🎉 All overlay output tests passed!" if all_passed else "\n⚠️  Some overlay output tests failed.")
+    return all_passed
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,197 @@
+"""
+Test script for the local overlay server
+Starts the server on a free port and connects SSE clients over loopback
+"""
+
+import http.client
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from overlay_output import BADGE_OVERLAY_TEMPLATE, OverlayOutput
+from overlay_server import OverlayServer
+
+
+class SSEClient:
+    """Minimal EventSource reader that records when each event arrived."""
+
+    def __init__(self, port, path="/events"):
+        self.conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+        self.conn.request("GET", path)
+        self.response = self.conn.getresponse()
+        self.events = []
+        self.received = threading.Condition()
+        self.thread = threading.Thread(target=self._read, daemon=True)
+        self.thread.start()
+
+    def _read(self):
+        event_type, data = None, None
+        try:
+            for raw in self.response:
+                line = raw.decode('utf-8').rstrip("\n")
+                if line.startswith("event: "):
+                    event_type = line[7:]
+                elif line.startswith("data: "):
+                    data = json.loads(line[6:])
+                elif not line and event_type:
+                    with self.received:
+                        self.events.append((time.perf_counter(), event_type, data))
+                        self.received.notify_all()
+                    event_type, data = None, None
+        except (OSError, ValueError):
+            pass
+
+    def wait_for(self, count, timeout=5):
+        with self.received:
+            return self.received.wait_for(lambda: len(self.events) >= count, timeout)
+
+    def close(self):
+        self.conn.close()
+
+
+def wait_for_clients(server, count, timeout=5):
+    deadline = time.monotonic() + timeout
+    while server.client_count() < count and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return server.client_count() == count
+
+
+def test_page_and_initial_state():
+    """The page embeds the current text and new clients get the full state first"""
+    print("Testing page and initial state...")
+    server = OverlayServer(port=0)
+    assert server.start()
+    try:
+        server.publish(main_text="Hello <chat>", sub_text="")
+        conn = http.client.HTTPConnection("127.0.0.1", server.port, timeout=5)
+        conn.request("GET", "/")
+        page = conn.getresponse().read().decode('utf-8')
+        conn.close()
+        assert "Hello &lt;chat&gt;" in page and "new EventSource('/events')" in page
+
+        client = SSEClient(server.port)
+        assert client.wait_for(1)
+        _, event_type, data = client.events[0]
+        assert event_type == "state" and data == {'main_text': "Hello <chat>", 'sub_text': ""}
+        client.close()
+    finally:
+        server.stop()
+    print("   ✅ Page rendered and state sent on connect")
+    return True
+
+
+def test_only_changed_keys_are_pushed():
+    """Publishing sends a delta of changed keys; unchanged publishes send nothing"""
+    print("Testing deltas...")
+    server = OverlayServer(port=0)
+    server.start()
+    try:
+        server.publish(main_text="Voice A", sub_text="Model X")
+        client = SSEClient(server.port)
+        client.wait_for(1)
+        assert server.publish(main_text="Voice B", sub_text="Model X")
+        assert not server.publish(main_text="Voice B")
+        assert client.wait_for(2)
+        time.sleep(0.1)
+        assert [(t, d) for _, t, d in client.events[1:]] == [("delta", {'main_text': "Voice B"})]
+        client.close()
+    finally:
+        server.stop()
+    print("   ✅ Only changed keys pushed")
+    return True
+
+
+def test_named_output_receives_only_its_keys():
+    """A named output page only gets pushes for the state keys its template uses"""
+    print("Testing named output pages...")
+    server = OverlayServer(port=0, outputs=[OverlayOutput('badge', BADGE_OVERLAY_TEMPLATE)])
+    server.start()
+    try:
+        server.publish(main_text="🎤 Rachel", voice_name="Rachel")
+        conn = http.client.HTTPConnection("127.0.0.1", server.port, timeout=5)
+        conn.request("GET", "/o/badge")
+        page = conn.getresponse().read().decode('utf-8')
+        conn.close()
+        assert 'data-slot="voice_name">Rachel<' in page and "'/events?output=badge'" in page
+
+        client = SSEClient(server.port, "/events?output=badge")
+        client.wait_for(1)
+        assert client.events[0][2] == {'voice_name': "Rachel"}
+
+        server.publish(main_text="Something else")
+        server.publish(voice_name="Adam")
+        assert client.wait_for(2)
+        time.sleep(0.1)
+        assert [d for _, _, d in client.events[1:]] == [{'voice_name': "Adam"}]
+        client.close()
+    finally:
+        server.stop()
+    print("   ✅ Unrelated changes not pushed to the badge")
+    return True
+
+
+def test_push_latency_benchmark(client_total=20, updates=200):
+    """Measure publish-to-receive latency with several connected clients"""
+    print(f"Benchmarking push latency ({client_total} clients, {updates} updates)...")
+    server = OverlayServer(port=0)
+    server.start()
+    clients = []
+    try:
+        clients = [SSEClient(server.port) for _ in range(client_total)]
+        assert wait_for_clients(server, client_total)
+        for client in clients:
+            client.wait_for(1)
+        print(f"   Connected clients: {server.client_count()}")
+
+        latencies = []
+        for i in range(updates):
+            sent = time.perf_counter()
+            server.publish(main_text=f"Update {i}")
+            for client in clients:
+                assert client.wait_for(i + 2)
+                latencies.append((client.events[i + 1][0] - sent) * 1000)
+
+        latencies.sort()
+        p50 = statistics.median(latencies)
+        p99 = latencies[int(len(latencies) * 0.99) - 1]
+        print(f"   Push latency: p50 {p50:.2f} ms, p99 {p99:.2f} ms, max {latencies[-1]:.2f} ms")
+        assert p99 < 50, "Pushes should reach every client well within a frame budget"
+    finally:
+        for client in clients:
+            client.close()
+        server.stop()
+    print("   ✅ Push latency measured")
+    return True
+
+
+def main():
+    print("📡 VoiceMaster Pro - Overlay Server Test")
+    print("=" * 50)
+
+    tests = [
+        test_page_and_initial_state,
+        test_only_changed_keys_are_pushed,
+        test_named_output_receives_only_its_keys,
+        test_push_latency_benchmark,
+    ]
+
+    all_passed = True
+    for test in tests:
+        try:
+            all_passed &= test()
+        except Exception as e:
+            print(f"❌ Test failed: {e}")
+            all_passed = False
+
+    print("\n🎉 All overlay server tests passed!" if all_passed else "\n⚠️  Some overlay server tests failed.")
+    return all_passed
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,200 @@
+"""
+Test script for the quick phrase ranking (decayed frequency x recency) and the pre-synthesis warmer
+Renders are counted by a local render function, no API calls
+"""
+
+import math
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from phrase_ranking import PhraseRanking
+from phrase_warmer import PhraseWarmer
+
+HOUR = 3600.0
+DAY = 24 * HOUR
+
+
+def texts(ranked):
+    return [entry.text for entry in ranked]
+
+
+def test_frequency_and_recency():
+    """Scores add up per use and halve every half-life"""
+    print("Testing decayed ranking...")
+    ranking = PhraseRanking(half_life_hours=24, stream_gap_minutes=120)
+    now = 100 * DAY
+    for i in range(8):
+        ranking.record("Old favourite line", "v1", timestamp=now - 5 * DAY + i)   # 8 uses, 5 days ago
+    for i in range(2):
+        ranking.record("Thanks for the raid", "v1", timestamp=now - HOUR + i)    # 2 uses, an hour ago
+    ranking.record("Welcome in", "v1", timestamp=now - DAY)
+
+    assert abs(ranking.score("Old favourite line", now) - 8 / 32) < 0.01
+    assert abs(ranking.score("thanks  FOR the raid", now) - 2 * 0.5 ** (1 / 24)) < 0.01
+    assert texts(ranking.top()) == ["Thanks for the raid", "Welcome in", "Old favourite line"]
+    assert texts(ranking.top(2)) == ["Thanks for the raid", "Welcome in"]
+
+    # Order is the same whenever we look, because time decays every score alike
+    assert ranking.top() is ranking.top()
+    assert sorted(ranking._entries, key=lambda k: -ranking.score(k, now + 30 * DAY)) == \
+        [e.key for e in ranking.top()]
+
+    # The last use decides voice and settings
+    ranking.record("Welcome in", "v2", "Adam", {'stability': 0.9}, timestamp=now)
+    entry = next(e for e in ranking.top() if e.key == "welcome in")
+    assert entry.text == "Welcome in" and entry.voice_id == "v2" and entry.settings == {'stability': 0.9}
+    print("   ✅ Frequency and recency combine as expected")
+    return True
+
+
+def test_incremental_top_matches_full_sort():
+    """The incrementally kept top equals sorting every phrase by score"""
+    print("Testing incremental top against a full sort...")
+    rng = random.Random(7)
+    ranking = PhraseRanking(half_life_hours=6, top_size=10, stream_gap_minutes=10 ** 6)
+    phrases = [f"phrase {i}" for i in range(300)]
+    timestamp = 0.0
+    for _ in range(20_000):
+        timestamp += rng.expovariate(1 / 30)
+        # A few phrases are popular, with the popular ones drifting over time
+        shift = int(timestamp / (12 * HOUR)) * 20
+        ranking.record(phrases[(shift + int(rng.paretovariate(1.2))) % len(phrases)], "v1", timestamp=timestamp)
+        if rng.random() < 0.01:
+            expected = sorted(ranking._entries, key=lambda k: ranking.score(k, timestamp), reverse=True)[:10]
+            assert [e.key for e in ranking.top(10)] == expected
+    print("   ✅ Top 10 correct throughout 20,000 uses")
+    return True
+
+
+def test_stream_segments():
+    """Each part of the stream gets phrases used in that part"""
+    print("Testing per-segment ranking...")
+    ranking = PhraseRanking(half_life_hours=24 * 7, segments=(15 * 60, 90 * 60), stream_gap_minutes=120)
+    start = 10 * DAY
+    for day in range(3):
+        stream = start + day * DAY
+        for i in range(5):
+            ranking.record("Welcome everyone!", "v1", timestamp=stream + i * 60)
+        for i in range(6):
+            ranking.record("Thanks for the follow", "v1", timestamp=stream + 20 * 60 + i * 60)
+        for i in range(4):
+            ranking.record("Good night, see you tomorrow", "v1", timestamp=stream + 100 * 60 + i * 60)
+
+    last = start + 2 * DAY + 103 * 60
+    assert ranking.current_segment(last) == 2
+    assert ranking.top(1, timestamp=last)[0].text == "Good night, see you tomorrow"
+    assert ranking.current_segment(last + 5 * HOUR) == 0     # After a break a new stream starts
+    assert ranking.top(1, timestamp=last + 5 * HOUR)[0].text == "Welcome everyone!"
+    assert ranking.top(1, segment=1)[0].text == "Thanks for the follow"
+    assert len(ranking.candidates(1)) == 3
+    print("   ✅ Opening, middle and late phrases ranked per segment")
+    return True
+
+
+class Renderer:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, phrase, path):
+        self.calls += 1
+        with open(path, 'wb') as f:
+            f.write(f"rendered {phrase.text}".encode())
+        return path
+
+
+def test_warmer():
+    """Top phrases are adopted from existing clips or rendered; dropped ones are deleted"""
+    print("Testing pre-synthesis warmer...")
+    with tempfile.TemporaryDirectory() as d:
+        clip = os.path.join(d, "stream_tts_1.mp3")
+        with open(clip, 'wb') as f:
+            f.write(b"clip audio")
+        renderer = Renderer()
+        ranking = PhraseRanking()
+        warmer = PhraseWarmer(os.path.join(d, "warm"), renderer, model_id="m1", gate=None,
+                              find_audio=lambda p: p.clip_path if p.clip_path and os.path.exists(p.clip_path) else None)
+        ranking.add_listener(lambda: warmer.warm(ranking.candidates(2)))
+
+        settings = {'stability': 0.5, 'similarity_boost': 0.75}
+        ranking.record("Thanks for the raid", "v1", "Rachel", settings, clip_path=clip)
+        ranking.record("Welcome in", "v1", "Rachel", settings)
+        assert warmer.wait(5)
+        assert warmer.get("Thanks for the raid", "v1", settings) == b"clip audio"
+        assert warmer.get("Welcome in", "v1", settings) == b"rendered Welcome in"
+        assert warmer.lookup("Welcome in", "v1", {'stability': 0.9}) is None
+        assert renderer.calls == 1 and warmer.adopted == 1
+        assert warmer.source_clips() == [clip], "the adopted clip is pinned against retention"
+
+        # A third phrase used more often pushes the older one out of the top 2
+        for _ in range(3):
+            ranking.record("Let's go!", "v1", "Rachel", settings)
+        assert warmer.wait(5)
+        assert warmer.get("Let's go!", "v1", settings) is not None
+        assert warmer.get("Thanks for the raid", "v1", settings) is None
+        assert warmer.lookup("Thanks for the raid", "v1", settings) is None
+        assert len(os.listdir(warmer.directory)) == 2 and renderer.calls == 2
+        assert warmer.source_clips() == []
+    print("   ✅ Warm set follows the ranking with one render per new phrase")
+    return True
+
+
+def test_update_benchmark(phrases=100_000, uses=200_000):
+    """Cost of one use with 100k phrases, against re-sorting every phrase"""
+    print(f"Benchmarking ranking updates with {phrases:,} phrases...")
+    rng = random.Random(1)
+    ranking = PhraseRanking(segments=(15 * 60, 90 * 60))
+    texts_ = [f"phrase number {i}" for i in range(phrases)]
+    timestamp = 1.7e9
+    started = time.perf_counter()
+    for i in range(uses):
+        timestamp += rng.expovariate(1 / 5)
+        ranking.record(texts_[i % phrases if i < phrases else int(rng.paretovariate(1.1)) % phrases],
+                       "v1", timestamp=timestamp)
+    per_use_us = (time.perf_counter() - started) / uses * 1e6
+
+    samples = []
+    for _ in range(5):
+        started = time.perf_counter()
+        sorted(ranking._entries.values(), key=lambda e: e.log_score - ranking.rate * timestamp, reverse=True)[:8]
+        samples.append((time.perf_counter() - started) * 1000)
+    full_ms = statistics.median(samples)
+
+    started = time.perf_counter()
+    for _ in range(10_000):
+        ranking.top(8)
+    top_us = (time.perf_counter() - started) / 10_000 * 1e6
+    print(f"   Per use: {per_use_us:.1f} µs incremental vs {full_ms:.1f} ms to re-rank everything; "
+          f"reading the bar: {top_us:.2f} µs")
+    assert per_use_us < 200 and not math.isnan(per_use_us)
+    print("   ✅ Ranking update cost measured")
+    return True
+
+
+def main():
+    print("📈 VoiceMaster Pro - Phrase Ranking Test")
+    print("=" * 50)
+
+    tests = [test_frequency_and_recency, test_incremental_top_matches_full_sort, test_stream_segments,
+             test_warmer, test_update_benchmark]
+
+    all_passed = True
+    for test in tests:
+        try:
+            all_passed &= test()
+        except Exception as e:
+            print(f"❌ Test failed: {e}")
+            all_passed = False
+
+    print("\n🎉 All phrase ranking tests passed!" if all_passed else "\n⚠️  Some phrase ranking tests failed.")
+    return all_passed
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,143 @@
+"""
+Test script for type-ahead phrase search over favorites and clip history
+Uses a temporary history database, no API calls
+"""
+
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from clip_history import ClipHistory
+from phrase_search import PhraseIndex
+
+
+def texts(results):
+    return [entry.text for entry in results]
+
+
+def test_prefix_fuzzy_and_ranking():
+    """Word prefixes match, favorites rank first, typos match after exact hits"""
+    print("Testing prefix, fuzzy matching and ranking...")
+    index = PhraseIndex()
+    index.load(
+        generations=[
+            ("Thanks for the follow!", "v1", "Rachel", 1000.0, 3),
+            ("Welcome to the stream everyone", "v2", "Adam", 2000.0, 1),
+            ("Thank you for the raid", "v1", "Rachel", 3000.0, 1),
+        ],
+        favorites=[{'id': 7, 'text': "Welcome back, chat!", 'voice_id': "v3", 'voice_name': "Bella",
+                    'timestamp': 500.0}])
+
+    assert texts(index.search("than")) == ["Thank you for the raid", "Thanks for the follow!"]
+    assert texts(index.search("for fol")) == ["Thanks for the follow!"]
+    assert texts(index.search("wel")) == ["Welcome back, chat!", "Welcome to the stream everyone"]
+    assert index.search("wel")[0].is_favorite and index.search("wel")[0].voice_name == "Bella"
+    assert texts(index.search("strem")) == ["Welcome to the stream everyone"]      # deletion
+    assert texts(index.search("thnak")) == ["Thank you for the raid", "Thanks for the follow!"]  # swap
+    assert texts(index.search("strem", fuzzy=False)) == []
+    assert texts(index.search("raid thnk")) == ["Thank you for the raid"]
+
+    # Exact prefix hits come before typo hits
+    index.add_generation("Streamer mode on", "v1", "Rachel", 4000.0)
+    assert texts(index.search("strea")) == ["Streamer mode on", "Welcome to the stream everyone"]
+    assert texts(index.search("stre", limit=1)) == ["Streamer mode on"]
+    print("   ✅ Prefix, typo and ranking behave")
+    return True
+
+
+def test_incremental_updates():
+    """New generations move to the front; favorites can be added and removed"""
+    print("Testing incremental updates...")
+    index = PhraseIndex()
+    index.load([("First phrase", "v1", "Rachel", 1.0, 1), ("Second phrase", "v1", "Rachel", 2.0, 1)])
+    assert texts(index.search("phr")) == ["Second phrase", "First phrase"]
+
+    index.add_generation("first  PHRASE", "v2", "Adam", 3.0)  # Same phrase, used again
+    assert texts(index.search("phr")) == ["first  PHRASE", "Second phrase"]
+    assert index.search("first")[0].voice_name == "Adam" and len(index) == 2
+
+    index.sync_favorites([{'id': 1, 'text': "Only a favorite", 'timestamp': 0.0}])
+    assert texts(index.search("only")) == ["Only a favorite"]
+    index.sync_favorites([{'id': 2, 'text': "Second phrase", 'timestamp': 0.0}])
+    assert index.search("only", fuzzy=False) == [] and len(index) == 2
+    assert texts(index.search("phr")) == ["Second phrase", "first  PHRASE"]
+
+    # Reusing phrases many times compacts the slots without changing results
+    for i in range(10_000):
+        index.add_generation("Repeated line", timestamp=10.0 + i)
+    assert len(index._slots) < 2 * len(index) + 4096 + 1
+    assert texts(index.search("")) == ["Second phrase", "Repeated line", "first  PHRASE"]
+    assert texts(index.search("phr")) == ["Second phrase", "first  PHRASE"]
+    print("   ✅ Index follows new clips and favorites")
+    return True
+
+
+def test_keystroke_benchmark(size=50_000):
+    """Every keystroke of several queries stays under 5 ms with 50k phrases"""
+    print(f"Benchmarking search with {size:,} phrases...")
+    rng = random.Random(42)
+    vocabulary = [''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(3, 9)))
+                  for _ in range(5000)]
+    common = "thanks for the follow welcome to stream everyone hello game chat let's go".split()
+    with tempfile.TemporaryDirectory() as d:
+        history = ClipHistory(os.path.join(d, "history.db"))
+        for i in range(size):
+            words = [rng.choice(common) if rng.random() < 0.4 else rng.choice(vocabulary)
+                     for _ in range(rng.randint(3, 10))]
+            history.record(" ".join(words), voice_id="v1", voice_name="Rachel", created_at=float(i))
+        history.flush()
+
+        index = PhraseIndex()
+        started = time.perf_counter()
+        index.load(history.phrases())
+        print(f"   Indexed {len(index):,} phrases in {time.perf_counter() - started:.2f}s")
+        history.close()
+
+    queries = ["thanks for the follow", "welcome everyone", "wlecome", "game chat hello",
+               vocabulary[7], vocabulary[7][:3] + "q", "a b c", "zzzz"]
+    samples = []
+    for query in queries:
+        for end in range(1, len(query) + 1):
+            started = time.perf_counter()
+            index.search(query[:end])
+            samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    p99 = samples[int(len(samples) * 0.99) - 1]
+    print(f"   {len(samples)} keystrokes: median {statistics.median(samples):.2f} ms, "
+          f"p99 {p99:.2f} ms, max {samples[-1]:.2f} ms")
+
+    started = time.perf_counter()
+    for i in range(1000):
+        index.add_generation(f"Freshly generated line {i}", "v1", "Rachel", size + i)
+    print(f"   Incremental add: {(time.perf_counter() - started) * 1000 / 1000:.3f} ms per phrase")
+    assert p99 < 5.0, "Search should answer each keystroke in under 5 ms"
+    print("   ✅ Type-ahead latency measured")
+    return True
+
+
+def main():
+    print("🔍 VoiceMaster Pro - Phrase Search Test")
+    print("=" * 50)
+
+    tests = [test_prefix_fuzzy_and_ranking, test_incremental_updates, test_keystroke_benchmark]
+
+    all_passed = True
+    for test in tests:
+        try:
+            all_passed &= test()
+        except Exception as e:
+            print(f"❌ Test failed: {e}")
+            all_passed = False
+
+    print("\n🎉 All phrase search tests passed!" if all_passed else "\n⚠️  Some phrase search tests failed.")
+    return all_passed
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,203 @@
+"""
+Test script for the speech-to-speech voice changer
+Runs against the local ElevenLabs stand-in, whose fake conversion returns the input at half volume
+"""
+
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from elevenlabs_standin import StandInServer, fake_conversion, STS_GAIN
+from mic_capture import FRAME_SAMPLES, SAMPLE_RATE, MicCapture
+from speech_to_speech import VoiceChanger, convert_stream
+
+OUTPUT_RATE = 24000
+RNG = np.random.default_rng(9)
+
+
+def speech(seconds, frequency=300.0):
+    """Syllables of a tone with short gaps, like speech as far as voice activity detection is concerned"""
+    syllable = np.sin(2 * np.pi * frequency * np.arange(int(0.2 * SAMPLE_RATE)) / SAMPLE_RATE) * 0.1 * 32768
+    gap = np.zeros(int(0.06 * SAMPLE_RATE))
+    count = max(1, int(seconds / 0.26))
+    return np.concatenate([np.concatenate([syllable, gap]) for _ in range(count)])[:-len(gap)]
+
+
+def monologue(phrases, pause=0.5):
+    """Phrases of the given lengths separated by pauses; returns audio and when the speech ends"""
+    parts = [np.zeros(int(0.5 * SAMPLE_RATE))]
+    for i, seconds in enumerate(phrases):
+        parts += [speech(seconds, 300.0 + 60 * i), np.zeros(int(pause * SAMPLE_RATE))]
+    signal = np.concatenate(parts[:-1] + [np.zeros(int(1.0 * SAMPLE_RATE))])
+    return signal, (len(signal) - SAMPLE_RATE) / SAMPLE_RATE
+
+
+def speak(capture, signal, started):
+    """Feed audio like a microphone: 20 ms at a time, in real time"""
+    signal = np.clip(signal + RNG.normal(0, 30, len(signal)), -32768, 32767).astype(np.int16)
+    for i in range(0, len(signal), FRAME_SAMPLES):
+        delay = started + i / SAMPLE_RATE - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        capture.feed(signal[i:i + FRAME_SAMPLES])
+
+
+class Speaker:
+    """Simulated output stream: write() blocks for as long as the audio takes to play"""
+
+    def __init__(self):
+        self.audio = bytearray()
+        self.busy_until = 0.0
+
+    def write(self, pcm):
+        self.audio += pcm
+        now = time.monotonic()
+        self.busy_until = max(self.busy_until, now) + len(pcm) / (OUTPUT_RATE * 2)
+        time.sleep(max(0.0, self.busy_until - now - 0.05))  # Keep 50 ms buffered, like PortAudio
+
+
+def session(server, signal, idle_seconds=0.6, **options):
+    capture = MicCapture().start_processing()
+    speaker = Speaker()
+    convert = lambda samples: convert_stream(server.base_url, "test-key", "standin-voice-1", samples,
+                                             output_rate=OUTPUT_RATE)
+    changer = VoiceChanger(capture, convert, speaker.write, idle_seconds=idle_seconds, **options)
+    started_monotonic = time.monotonic() + 0.05
+    feeder = threading.Thread(target=speak, args=(capture, signal, time.perf_counter() + 0.05))
+    feeder.start()
+    chunks = changer.run()
+    feeder.join()
+    capture.stop()
+    return changer, chunks, speaker, started_monotonic
+
+
+def test_streaming_conversion():
+    """Converted PCM streams back in pieces, before the whole chunk is converted"""
+    print("Testing streaming conversion against the stand-in...")
+    server = StandInServer(port=0).start()
+    try:
+        samples = (speech(2.0) * 0.5).astype(np.int16)
+        started = time.monotonic()
+        arrivals, audio = [], bytearray()
+        for piece in convert_stream(server.base_url, "test-key", "standin-voice-1", samples,
+                                    output_rate=OUTPUT_RATE):
+            arrivals.append(time.monotonic() - started)
+            audio += piece
+        expected = fake_conversion(samples.tolist(), SAMPLE_RATE, OUTPUT_RATE).tobytes()
+        assert bytes(audio) == expected, "converted audio differs from the stand-in's conversion"
+        assert len(arrivals) > 5 and arrivals[0] < arrivals[-1] / 2, "audio should stream in pieces"
+
+        try:
+            list(convert_stream(server.base_url, "", "standin-voice-1", samples))
+            assert False, "a request without an API key should fail"
+        except RuntimeError as e:
+            assert "401" in str(e)
+        print(f"   ✅ First audio after {arrivals[0] * 1000:.0f} ms, all of it after {arrivals[-1] * 1000:.0f} ms "
+              f"({len(arrivals)} pieces)")
+        return True
+    finally:
+        server.stop()
+
+
+def test_voice_changer_session():
+    """Chunks are converted and played in order while the speaker keeps talking"""
+    print("Testing a voice changer session...")
+    server = StandInServer(port=0).start()
+    try:
+        signal, speech_end = monologue([1.0, 2.0, 5.0, 1.0])
+        changer, chunks, speaker, started = session(server, signal, max_chunk_seconds=2.0)
+    finally:
+        server.stop()
+
+    assert len(chunks) >= 6, f"the 5 s phrase should have been cut into chunks, got {len(chunks)}"
+    assert not any(c.skipped or c.error for c in chunks)
+    assert chunks[0].first_audio_at < started + speech_end, "converted speech should play while speaking"
+    played = np.frombuffer(bytes(speaker.audio), dtype=np.int16)
+    converted = sum(c.bytes_played for c in chunks) // 2
+    assert len(played) == converted
+    heard = len(played) / OUTPUT_RATE
+    assert abs(heard - sum(c.seconds for c in chunks)) < 0.1, "every chunk should be heard in full"
+    # Chunks play in spoken order: the pitch of each phrase rises
+    starts = np.cumsum([0] + [c.bytes_played // 2 for c in chunks])
+    pitches = []
+    for a, b in zip(starts, starts[1:]):
+        spectrum = np.abs(np.fft.rfft(played[a:b].astype(np.float32)))
+        pitches.append(spectrum.argmax() * OUTPUT_RATE / (b - a))
+    assert all(later >= earlier - 5 for earlier, later in zip(pitches, pitches[1:])), pitches
+    assert np.abs(played).max() <= 0.1 * 32768 * STS_GAIN + 100
+    print(f"   ✅ {len(chunks)} chunks, {heard:.1f}s converted and played in order; first audio "
+          f"{started + speech_end - chunks[0].first_audio_at:.1f}s before the speaker finished")
+    return True
+
+
+def test_latency_is_bounded():
+    """A slow conversion falls behind; late chunks are skipped instead of growing the delay"""
+    print("Testing the delay bound with a conversion slower than real time...")
+    server = StandInServer(port=0).start()
+    server.sts_first_byte_seconds = 0.3
+    server.sts_realtime_factor = 1.6
+    try:
+        signal, _ = monologue([2.0] * 6, pause=0.4)
+        changer, chunks, speaker, _ = session(server, signal, max_delay=1.5, workers=3)
+    finally:
+        server.stop()
+
+    latencies = changer.latencies()
+    skipped = [c for c in chunks if c.skipped]
+    assert skipped, "a backlog should have been dropped"
+    assert max(latencies) <= 1.5 + 0.05, latencies
+    print(f"   ✅ {len(skipped)} of {len(chunks)} late chunks skipped; worst delay {max(latencies) * 1000:.0f} ms "
+          f"(bound 1500 ms)")
+    return True
+
+
+def test_latency_benchmark():
+    """Mouth-to-speaker latency with the stand-in's default conversion speed"""
+    print("Benchmarking mouth-to-speaker latency (stand-in: 250 ms to first audio, 4x real time)...")
+    server = StandInServer(port=0).start()
+    try:
+        results = []
+        for phrases in ([1.5] * 2, [1.5] * 8):
+            signal, _ = monologue(phrases)
+            changer, chunks, _, _ = session(server, signal)
+            latencies = np.array(changer.latencies()) * 1000
+            assert len(latencies) == len(phrases)
+            results.append(latencies)
+            print(f"   {len(phrases)} phrases: median {np.median(latencies):.0f} ms, "
+                  f"worst {latencies.max():.0f} ms after each phrase ended")
+    finally:
+        server.stop()
+    short, long = results
+    assert abs(np.median(long) - np.median(short)) < 100 and long.max() < np.median(short) + 150
+    print("   (speech-to-text then text-to-speech waits for a recognition and a full TTS request per phrase)")
+    print("   ✅ Latency measured")
+    return True
+
+
+def main():
+    print("🎛️ VoiceMaster Pro - Voice Changer (Speech-to-Speech) Test")
+    print("=" * 50)
+
+    tests = [test_streaming_conversion, test_voice_changer_session, test_latency_is_bounded,
+             test_latency_benchmark]
+
+    all_passed = True
+    for test in tests:
+        try:
+            all_passed &= test()
+        except Exception as e:
+            print(f"❌ Test failed: {e}")
+            all_passed = False
+
+    print("\n🎉 All voice changer tests passed!" if all_passed else "\n⚠️  Some voice changer tests failed.")
+    return all_passed
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
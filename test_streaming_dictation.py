@@ -0,0 +1,199 @@
+"""
+Test script for streaming dictation (partial transcripts while speaking)
+Speech is synthesized as one tone per word and "recognized" by a tone decoder, fed in real time
+"""
+
+import os
+import random
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mic_capture import FRAME_SAMPLES, SAMPLE_RATE, MicCapture
+from streaming_dictation import StreamingDictation, agreed_prefix
+
+WORDS = ["hello", "chat", "welcome", "to", "the", "stream", "tonight", "we", "play", "some", "new", "games"]
+WORD_SECONDS = 0.24
+GAP_SECONDS = 0.08
+RECOGNIZE_OVERHEAD = 0.02       # Simulated recognizer cost: fixed part...
+RECOGNIZE_PER_SECOND = 0.05     # ...plus this per second of audio (about base.en int8 on a laptop CPU)
+RNG = np.random.default_rng(11)
+
+
+def frequency(word):
+    return 400.0 + 150.0 * WORDS.index(word)
+
+
+def sentence(words):
+    """Audio for the words and (start, end) seconds of each word"""
+    parts, spans, t = [], [], 0.0
+    for word in words:
+        n = int(WORD_SECONDS * SAMPLE_RATE)
+        parts.append(0.1 * 32768 * np.sin(2 * np.pi * frequency(word) * np.arange(n) / SAMPLE_RATE))
+        spans.append((t, t + WORD_SECONDS))
+        parts.append(np.zeros(int(GAP_SECONDS * SAMPLE_RATE)))
+        t += WORD_SECONDS + GAP_SECONDS
+    return np.concatenate(parts), spans
+
+
+def decode(samples):
+    """Tone decoder standing in for Whisper: a word is a tone lasting at least 100 ms"""
+    time.sleep(RECOGNIZE_OVERHEAD + RECOGNIZE_PER_SECOND * len(samples) / SAMPLE_RATE)
+    frames = len(samples) // FRAME_SAMPLES
+    if not frames:
+        return ""
+    block = samples[:frames * FRAME_SAMPLES].reshape(frames, FRAME_SAMPLES).astype(np.float32)
+    spectrum = np.abs(np.fft.rfft(block, axis=1))
+    peaks = spectrum.argmax(axis=1) * SAMPLE_RATE / FRAME_SAMPLES
+    loud = (block ** 2).mean(axis=1) > (0.01 * 32768) ** 2
+    words, run_word, run = [], None, 0
+    for peak, is_loud in zip(peaks, loud):
+        word = WORDS[int(np.argmin([abs(peak - frequency(w)) for w in WORDS]))] if is_loud else None
+        run = run + 1 if word == run_word else 1
+        run_word = word
+        if word and run == 5:
+            words.append(word)
+    return " ".join(words)
+
+
+def speak(capture, signal, started):
+    """Feed audio like a microphone: 20 ms at a time, in real time"""
+    signal = np.clip(signal + RNG.normal(0, 30, len(signal)), -32768, 32767).astype(np.int16)
+    for i in range(0, len(signal), FRAME_SAMPLES):
+        delay = started + i / SAMPLE_RATE - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        capture.feed(signal[i:i + FRAME_SAMPLES])
+
+
+def dictate(capture, signal, recognize=decode, **options):
+    updates = []
+    session = StreamingDictation(capture, recognize,
+                                 lambda c, t, d: updates.append((time.perf_counter(), c, t, d)), **options)
+    started = time.perf_counter() + 0.05
+    speaker = threading.Thread(target=speak, args=(capture, signal, started))
+    speaker.start()
+    text = session.run()
+    speaker.join()
+    return session, text, updates, started
+
+
+def test_partials_and_final():
+    """Partials grow while speaking; each sentence is committed as one segment"""
+    print("Testing streaming dictation...")
+    first, second = WORDS[:6], WORDS[6:]
+    a, spans_a = sentence(first)
+    b, spans_b = sentence(second)
+    pause = np.zeros(int(1.5 * SAMPLE_RATE))
+    lead = np.zeros(int(0.5 * SAMPLE_RATE))
+    signal = np.concatenate([lead, a, pause, b, np.zeros(int(1.5 * SAMPLE_RATE))])
+    offset_b = (len(lead) + len(a) + len(pause)) / SAMPLE_RATE
+    spans = [(s + 0.5, e + 0.5) for s, e in spans_a] + [(s + offset_b, e + offset_b) for s, e in spans_b]
+
+    capture = MicCapture().start_processing()
+    session, text, updates, started = dictate(capture, signal, idle_seconds=1.0)
+    capture.stop()
+
+    assert text == " ".join(WORDS), text
+    assert session.segments == [" ".join(first), " ".join(second)]
+    assert updates[-1][3] and updates[-1][1] == text and not updates[-1][2]
+    committed_seen = [u[1] for u in updates]
+    assert all(later.startswith(earlier) for earlier, later in zip(committed_seen, committed_seen[1:])), \
+        "committed text must only grow"
+    assert len(updates) > 6, "partials should arrive while speaking"
+    first_seen = [next(at for at, c, t, _ in updates if agreed_prefix(WORDS, (c + " " + t).split()) > i)
+                  for i in range(len(WORDS))]
+    assert all(at < started + end + 1.0 for at, (_, end) in zip(first_seen, spans))
+    print(f"   ✅ {len(updates)} updates; both sentences committed as segments "
+          f"({session.speculative_hits} final texts were ready before the segment closed)")
+    return True
+
+
+def test_flaky_recognizer_and_stop():
+    """Words a hypothesis changes its mind about are never committed; stop() finalizes mid-sentence"""
+    print("Testing stabilization and stop()...")
+    rng = random.Random(5)
+    garbage = []
+
+    def flaky(samples):
+        words = decode(samples).split()
+        if words and rng.random() < 0.5:
+            garbage.append(f"x{len(garbage)}")
+            words[-1] = garbage[-1]
+        return " ".join(words)
+
+    a, _ = sentence(WORDS)
+    capture = MicCapture().start_processing()
+    updates = []
+    session = StreamingDictation(capture, flaky, lambda c, t, d: updates.append((c, t, d)))
+    threading.Timer(2.6, session.stop).start()   # Partway through the sentence
+    started = time.perf_counter() + 0.05
+    speaker = threading.Thread(target=speak, args=(capture, np.concatenate([np.zeros(8000), a]), started))
+    speaker.start()
+    text = session.run()
+    speaker.join()
+    capture.stop()
+
+    assert garbage, "the recognizer should have changed its mind"
+    # The final recognition at stop() may be unlucky too; partials never commit a changed word
+    assert not any(word.startswith("x") for committed, _, _ in updates[:-1] for word in committed.split())
+    assert updates[-1][2] and 3 <= len(text.split()) < len(WORDS)
+    print(f"   ✅ {len(garbage)} unstable words never committed; stopped with '{text}'")
+    return True
+
+
+def test_latency_benchmark():
+    """Partial and final latency for a 12-word sentence"""
+    print(f"Benchmarking latency (simulated recognizer: {RECOGNIZE_OVERHEAD * 1000:.0f} ms + "
+          f"{RECOGNIZE_PER_SECOND:.2f} s per audio second)...")
+    a, spans = sentence(WORDS)
+    signal = np.concatenate([np.zeros(8000), a, np.zeros(int(1.5 * SAMPLE_RATE))])
+    capture = MicCapture().start_processing()
+    session, text, updates, started = dictate(capture, signal, idle_seconds=0.5)
+    capture.stop()
+
+    latencies = []
+    for i, (_, end) in enumerate(spans):
+        for at, committed, tentative, _ in updates:
+            if agreed_prefix(WORDS, (committed + " " + tentative).split()) > i:
+                latencies.append((at - (started + 0.5 + end)) * 1000)
+                break
+    speech_end = started + 0.5 + spans[-1][1]
+    complete = next(at for at, c, t, _ in updates if (c + " " + t).split() == WORDS)
+    final = next(at for at, c, t, _ in updates if c == text and not t)
+    print(f"   Words on screen {np.median(latencies):.0f} ms after being said (median, "
+          f"p90 {np.percentile(latencies, 90):.0f} ms)")
+    print(f"   Whole sentence on screen {(complete - speech_end) * 1000:.0f} ms after speech ended, "
+          f"committed at {(final - speech_end) * 1000:.0f} ms (600 ms end-of-speech silence); "
+          f"final recognition waited {max(session.final_delays) * 1000:.0f} ms")
+    print(f"   Before: nothing on screen until recognition finished after the whole recording")
+    assert text == " ".join(WORDS) and np.median(latencies) < 800
+    print("   ✅ Partial latency measured")
+    return True
+
+
+def main():
+    print("📝 VoiceMaster Pro - Streaming Dictation Test")
+    print("=" * 50)
+
+    tests = [test_partials_and_final, test_flaky_recognizer_and_stop, test_latency_benchmark]
+
+    all_passed = True
+    for test in tests:
+        try:
+            all_passed &= test()
+        except Exception as e:
+            print(f"❌ Test failed: {e}")
+            all_passed = False
+
+    print("\n🎉 All streaming dictation tests passed!" if all_passed else "\n⚠️  Some streaming dictation tests failed.")
+    return all_passed
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
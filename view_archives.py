@@ -1,31 +1,89 @@
-import os
+"""
+VoiceMaster Pro - Overlay Archive Viewer
+
+Examples:
+    python view_archives.py                          # browse newest first, page by page
+    python view_archives.py --search "TTS" --since 2024-05-01
+    python view_archives.py --all --oldest-first > overlays.txt
+    python view_archives.py --restore 1234           # put overlay #1234 back into overlay.html
+"""
+
+import argparse
+import sys
 import time
-from app_logic import get_overlay_archive_list
+from app_logic import import_legacy_overlays, iter_overlay_archives, restore_overlay_archive
+
+
+def parse_time(value):
+    """Accept 'YYYY-MM-DD', 'YYYY-MM-DD HH:MM' or a Unix timestamp."""
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            return time.mktime(time.strptime(value, fmt))
+        except ValueError:
+            continue
+    try:
+        return float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date/time: {value!r}")
+
+
+def print_entry(entry):
+    print(f"#{entry.seq:<7d} {entry.created}  {entry.main_text}")
+    if entry.sub_text:
+        print(f"{'':25s}{entry.sub_text}")
+
+
+def ask_next(shown):
+    """Prompt after a page. Returns False to stop listing."""
+    choice = input(f"\n-- {shown} shown. Enter = more, number = restore, q = quit: ").strip().lower()
+    if choice.isdigit():
+        restore_overlay_archive(int(choice))
+        return False
+    print()
+    return choice != 'q'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Browse and restore archived OBS overlays.")
+    parser.add_argument("-n", "--limit", type=int, default=20, help="entries per page (default 20)")
+    parser.add_argument("--all", action="store_true", help="stream every matching entry without paging")
+    parser.add_argument("--since", type=parse_time, help="only overlays shown at or after this time")
+    parser.add_argument("--until", type=parse_time, help="only overlays shown before this time")
+    parser.add_argument("-s", "--search", help="only overlays whose text contains this (case-insensitive)")
+    parser.add_argument("--oldest-first", action="store_true", help="list in chronological order")
+    parser.add_argument("--restore", type=int, metavar="NUMBER", help="restore an overlay into overlay.html")
+    args = parser.parse_args(argv)
+    import_legacy_overlays()  # First run after upgrading: list the old overlay files too
+
+    if args.restore is not None:
+        return 0 if restore_overlay_archive(args.restore) else 1
 
-def main():
     print("=== VoiceMaster Pro - Overlay Archive Viewer ===\n")
-    
-    archives = get_overlay_archive_list()
-    
-    if not archives:
-        print("No archived overlays found.")
-        return
-    
-    print(f"Found {len(archives)} archived overlays:\n")
-    
-    for i, archive in enumerate(archives, 1):
-        print(f"{i:2d}. {archive['filename']}")
-        print(f"    Created: {archive['created']}")
-        print(f"    Path: {archive['path']}")
-        print()
-    
-    print("Overlay files are saved with timestamp numbers for easy identification.")
-    print("Higher numbers = newer overlays")
-    print("\nTo use an archived overlay in OBS:")
-    print("1. Copy the desired overlay file")
-    print("2. Rename it to 'overlay.html'")
-    print("3. OBS will automatically use the updated overlay")
+    interactive = sys.stdin.isatty() and sys.stdout.isatty() and not args.all
+
+    shown = 0
+    for entry in iter_overlay_archives(since=args.since, until=args.until, search=args.search,
+                                       newest_first=not args.oldest_first):
+        print_entry(entry)
+        shown += 1
+        if not args.all and shown % args.limit == 0:
+            if not interactive or not ask_next(shown):
+                break
+    else:
+        if not shown:
+            print("No archived overlays found.")
+        elif interactive:
+            print(f"\n-- End of archive ({shown} shown). Restore one with: python view_archives.py --restore NUMBER")
+    return 0
+
 
 if __name__ == "__main__":
-    main()
-    input("\nPress Enter to exit...")
\ No newline at end of file
+    try:
+        status = main()
+    except BrokenPipeError:
+        status = 0  # Output piped into head/more and closed early
+    except KeyboardInterrupt:
+        status = 130
+    if len(sys.argv) == 1 and sys.stdin.isatty():
+        input("\nPress Enter to exit...")
+    sys.exit(status)
@@ -1,14 +1,101 @@
 import tkinter as tk
-from tkinter import ttk, messagebox, scrolledtext
+from tkinter import ttk, messagebox, scrolledtext, filedialog
 import threading
 import os
 import pygame
 from app_logic import (get_available_voices, text_to_speech, generate_overlay_html, 
                       add_favorite, get_favorite_phrases, delete_favorite, 
                       get_overlay_archive_list, speech_to_cloned_voice,
-                      get_microphone_list, record_until_silence, speech_to_text)
+                      get_microphone_list, record_until_silence, speech_to_text,
+                      start_background_maintenance, search_clip_history,
+                      open_generated_clip, get_storage_stats, start_overlay_services,
+                      start_captions, stop_captions, get_overlay_stats, notify_playback,
+                      search_phrases, favorite_settings, get_favorite_audio,
+                      set_favorite_audio_decoder, update_favorite_settings, get_quick_phrases,
+                      get_quick_phrase_audio, watch_quick_phrases, export_favorites, import_favorites,
+                      get_speaker_list, refresh_audio_devices, get_output_device_name,
+                      get_speech_engine_stats, streaming_dictation_available, dictate, stop_dictation,
+                      live_clone, stop_live_clone, voice_changer, stop_voice_changer,
+                      start_multi_mic, stop_multi_mic)
+from captions import MixerClock
 import time
 
+
+class VirtualListbox(tk.Frame):
+    """
+    Listbox that only holds the rows currently visible. The scrollbar maps
+    over the full item list, so tens of thousands of results cost no more
+    to show than a screenful.
+    """
+
+    def __init__(self, parent, rows=6, format_item=str, **listbox_options):
+        super().__init__(parent, bg=listbox_options.get('bg'))
+        self.rows = rows
+        self.format_item = format_item
+        self.items = []
+        self.offset = 0
+        self.listbox = tk.Listbox(self, height=rows, activestyle='none', **listbox_options)
+        self.scrollbar = tk.Scrollbar(self, orient='vertical', command=self._on_scrollbar)
+        self.scrollbar.pack(side='right', fill='y')
+        self.listbox.pack(side='left', fill='both', expand=True)
+        self.listbox.bind('<MouseWheel>', lambda e: self._scroll_to(self.offset - (e.delta // 120) * 3) or 'break')
+        self.listbox.bind('<Button-4>', lambda e: self._scroll_to(self.offset - 3) or 'break')
+        self.listbox.bind('<Button-5>', lambda e: self._scroll_to(self.offset + 3) or 'break')
+        self.listbox.bind('<Up>', lambda e: self._move_selection(-1))
+        self.listbox.bind('<Down>', lambda e: self._move_selection(1))
+
+    def set_items(self, items):
+        self.items = items
+        self.offset = 0
+        self._render()
+
+    def selected(self):
+        selection = self.listbox.curselection()
+        if not selection or self.offset + selection[0] >= len(self.items):
+            return None
+        return self.items[self.offset + selection[0]]
+
+    def select_first(self):
+        if self.items:
+            self._render(selected_row=0)
+            self.listbox.focus_set()
+
+    def _scroll_to(self, offset):
+        offset = max(0, min(offset, len(self.items) - self.rows))
+        if offset != self.offset:
+            self.offset = offset
+            self._render()
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        if action == 'moveto':
+            self._scroll_to(int(float(amount) * len(self.items)))
+        elif action == 'scroll':
+            step = self.rows if unit == 'pages' else 1
+            self._scroll_to(self.offset + int(amount) * step)
+
+    def _move_selection(self, step):
+        selection = self.listbox.curselection()
+        row = (selection[0] if selection else -1) + step
+        if 0 <= row < self.rows:
+            return None  # Let the listbox move within the visible rows
+        index = self.offset + row
+        if 0 <= index < len(self.items):
+            self._scroll_to(self.offset + step)
+            self._render(selected_row=index - self.offset)
+        return 'break'
+
+    def _render(self, selected_row=None):
+        self.listbox.delete(0, tk.END)
+        visible = self.items[self.offset:self.offset + self.rows]
+        if visible:
+            self.listbox.insert(tk.END, *[self.format_item(item) for item in visible])
+        if selected_row is not None and selected_row < len(visible):
+            self.listbox.selection_set(selected_row)
+            self.listbox.activate(selected_row)
+        total = len(self.items) or 1
+        self.scrollbar.set(self.offset / total, min(1.0, (self.offset + self.rows) / total))
+
+
 class VoiceMasterGUI:
     def __init__(self, root):
         self.root = root
@@ -50,8 +137,27 @@ class VoiceMasterGUI:
         # Configure ttk styles for modern look
         self.setup_styles()
         
-        # Initialize pygame mixer for audio playback
+        # Initialize pygame mixer for audio playback (AUDIO_OUTPUT_DEVICE picks the speakers)
         pygame.mixer.init()
+        try:
+            from pygame._sdl2 import audio as sdl_audio
+            output_device = get_output_device_name(sdl_audio.get_audio_device_names(False))
+        except (ImportError, pygame.error) as e:
+            print(f"Could not list playback devices: {e}")
+            output_device = None
+        if output_device:
+            pygame.mixer.quit()
+            try:
+                pygame.mixer.init(devicename=output_device)
+            except pygame.error as e:
+                print(f"Could not open '{output_device}' for playback ({e}); using the default device")
+                pygame.mixer.init()
+        
+        # Favorite audio is decoded once into pygame Sounds and kept in memory
+        mixer_frequency, mixer_bits, mixer_channels = pygame.mixer.get_init()
+        bytes_per_second = mixer_frequency * mixer_channels * abs(mixer_bits) // 8
+        set_favorite_audio_decoder(pygame.mixer.Sound, lambda sound: int(sound.get_length() * bytes_per_second))
+        self.last_generation = None
         
         # Variables
         self.voices = []
@@ -59,6 +165,10 @@ class VoiceMasterGUI:
         self.selected_voice_name = None
         self.current_audio_file = None
         self.is_recording = False
+        self.is_streaming_dictation = False
+        self.is_live_cloning = False
+        self.is_voice_changing = False
+        self.multi_mic_speakers = []
         self.microphones = []
         
         # Voice parameter variables for advanced control
@@ -104,11 +214,31 @@ class VoiceMasterGUI:
         # Start periodic refresh
         self.start_periodic_refresh()
 
+        # Start background housekeeping (generated audio retention)
+        start_background_maintenance()
+        
+        # Start the live overlay server for OBS (if enabled in .env)
+        overlay_url = start_overlay_services()
+        if overlay_url:
+            self.update_status(f"Overlay server: {overlay_url}")
+
+        # Re-rank the quick phrase bar as phrases are used and favorites change
+        # (including favorites added or removed by another instance)
+        watch_quick_phrases(lambda: self.root.after(0, self.on_quick_phrases_changed))
+        self.root.after(60000, self.check_quick_phrases)
+
         # Bind keyboard shortcuts
         self.root.bind('<Control-Return>', lambda e: self.generate_speech())
         self.root.bind('<F1>', lambda e: self.play_audio())
         self.root.bind('<F2>', lambda e: self.stop_audio())
         self.root.bind('<F3>', lambda e: self.start_speech_to_text())  # CHANGED: Updated function name
+        self.root.bind('<F4>', lambda e: self.open_history_panel())
+        self.root.bind('<F5>', lambda e: self.phrase_search_entry.focus_set())
+        self.root.bind('<F6>', lambda e: self.toggle_live_clone())
+        self.root.bind('<F7>', lambda e: self.toggle_voice_changer())
+        self.root.bind('<F8>', lambda e: self.toggle_multi_mic())
+        for position in range(4):
+            self.root.bind(f'<Control-Key-{position + 1}>', lambda e, p=position: self.play_quick_phrase(p))
         
         # Bind window resize events for responsive design
         self.root.bind('<Configure>', self.on_window_resize)
@@ -272,6 +402,20 @@ class VoiceMasterGUI:
         file_menu.add_separator()
         file_menu.add_command(label="Exit", command=self.root.quit)
         
+        # Tools menu
+        tools_menu = tk.Menu(menubar, tearoff=0)
+        menubar.add_cascade(label="Tools", menu=tools_menu)
+        tools_menu.add_command(label="Clip History (F4)", command=self.open_history_panel)
+        tools_menu.add_command(label="Live Voice Clone (F6)", command=self.toggle_live_clone)
+        tools_menu.add_command(label="Voice Changer (F7)", command=self.toggle_voice_changer)
+        tools_menu.add_command(label="Co-host Transcript (F8)", command=self.toggle_multi_mic)
+        tools_menu.add_command(label="Storage Stats", command=self.show_storage_stats)
+        tools_menu.add_command(label="Overlay Stats", command=self.show_overlay_stats)
+        tools_menu.add_command(label="Audio Devices", command=self.show_audio_devices)
+        tools_menu.add_separator()
+        tools_menu.add_command(label="Export Favorites...", command=self.export_favorites_dialog)
+        tools_menu.add_command(label="Import Favorites...", command=self.import_favorites_dialog)
+        
         # Help menu
         help_menu = tk.Menu(menubar, tearoff=0)
         menubar.add_cascade(label="Help", menu=help_menu)
@@ -644,6 +788,8 @@ class VoiceMasterGUI:
             pady=self.scale_padding(8)    # BALANCED: good vertical padding
         )
         self.text_input.pack(fill='x')  # BALANCED: fill horizontally
+        # Streaming dictation shows words that may still change in gray
+        self.text_input.tag_configure('tentative', foreground=self.colors['text_secondary'])
         # Register for scaling
         self.register_scalable_element(self.text_input, 'text_widgets', base_font_size=11)
         
@@ -725,6 +871,20 @@ class VoiceMasterGUI:
         )
         fav_label.pack(side='left')
         
+        # Type-ahead search over all favorites and past generations
+        self.phrase_search_var = tk.StringVar()
+        self.phrase_search_entry = tk.Entry(
+            fav_header_frame,
+            textvariable=self.phrase_search_var,
+            font=('Segoe UI', 9),
+            width=28
+        )
+        self.phrase_search_entry.pack(side='left', padx=(10, 0))
+        self.phrase_search_var.trace_add('write', lambda *_: self.update_phrase_search())
+        self.phrase_search_entry.bind('<Down>', lambda e: self.phrase_results.select_first())
+        self.phrase_search_entry.bind('<Return>', lambda e: self.phrase_results.select_first())
+        self.phrase_search_entry.bind('<Escape>', lambda e: self.phrase_search_var.set(""))
+        
         # Favorites control buttons - smaller
         fav_controls = tk.Frame(fav_header_frame, bg=self.colors['bg_card'])
         fav_controls.pack(side='right')
@@ -770,6 +930,23 @@ class VoiceMasterGUI:
             self.phrase_canvas.configure(scrollregion=self.phrase_canvas.bbox("all"))
         self.quick_buttons_frame.bind("<Configure>", configure_scroll_region)
         
+        # Search results, shown while the search box has text
+        self.phrase_results = VirtualListbox(
+            favorites_inner,
+            rows=6,
+            format_item=lambda e: f"{'⭐' if e.is_favorite else '🕘'} {e.text.replace(chr(10), ' ')}"
+                                  f"   ({e.voice_name or 'unknown voice'})",
+            font=('Segoe UI', 9),
+            bg=self.colors['bg_secondary'],
+            fg=self.colors['text_primary'],
+            selectbackground=self.colors['info'],
+            highlightthickness=0,
+            borderwidth=0
+        )
+        self.phrase_results.listbox.bind('<Double-1>', lambda e: self.use_phrase_result())
+        self.phrase_results.listbox.bind('<Return>', lambda e: self.use_phrase_result())
+        self.phrase_results.listbox.bind('<Escape>', lambda e: self.phrase_search_var.set(""))
+        
         # Load initial quick phrases
         self.refresh_quick_phrases()
         
@@ -777,7 +954,7 @@ class VoiceMasterGUI:
         footer_frame = tk.Frame(main_container, bg=self.colors['bg_primary'])
         footer_frame.pack(fill='x', pady=(10, 0))  # Reduced spacing
         
-        info_text = "⌨️ Hotkeys: Ctrl+Enter = Generate | F1 = Play | F2 = Stop | F3 = Dictate"
+        info_text = "⌨️ Hotkeys: Ctrl+Enter = Generate | F1 = Play | F2 = Stop | F3 = Dictate | F5 = Search | F6 = Live Clone | F7 = Voice Changer | F8 = Co-hosts | Ctrl+1-4 = Play quick phrase"
         info_label = tk.Label(
             footer_frame,
             text=info_text,
@@ -877,18 +1054,28 @@ class VoiceMasterGUI:
                     stability=stability,
                     similarity_boost=similarity,
                     style=style,
-                    speed=speed
+                    speed=speed,
+                    voice_name=self.selected_voice_name
                 )
                 
                 if audio_file:
                     self.current_audio_file = audio_file
+                    # Saving this text as a favorite reuses the clip instead of rendering it again
+                    self.last_generation = {
+                        'text': text,
+                        'voice_id': self.selected_voice_id,
+                        'settings': favorite_settings(stability, similarity, style),
+                        'path': audio_file
+                    }
                     print(f"DEBUG: Audio file generated: {audio_file}")  # Debug
                     
                     # Update overlay with archive
                     generate_overlay_html(
                         main_text=f"🎤 {self.selected_voice_name}",
                         sub_text="TTS Active",
-                        save_archive=True
+                        save_archive=True,
+                        voice_name=self.selected_voice_name,
+                        spoken_text=text
                     )
                     
                     # Update UI in main thread
@@ -924,24 +1111,44 @@ class VoiceMasterGUI:
     def play_audio(self):
         """Play the generated audio"""
         print(f"DEBUG: play_audio called, current_audio_file: {self.current_audio_file}")  # Debug
-        if not self.current_audio_file or not os.path.exists(self.current_audio_file):
+        # Archived clips are played straight from their segment file
+        audio_source = open_generated_clip(self.current_audio_file)
+        if audio_source is None:
             messagebox.showwarning("Warning", "No audio file to play!")
             return
         
         try:
             print(f"DEBUG: Loading audio file: {self.current_audio_file}")  # Debug
-            pygame.mixer.music.load(self.current_audio_file)
+            pygame.mixer.stop()  # Stop a favorite that is still playing
+            pygame.mixer.music.load(audio_source)
             pygame.mixer.music.play()
+            # Word-highlighted overlay captions follow the mixer's playback position
+            start_captions(self.current_audio_file, MixerClock(pygame.mixer.music.get_pos))
+            notify_playback(True)
+            self.root.after(200, self.watch_playback_end)
             self.update_status("Playing audio...")
             print("DEBUG: Audio playback started")  # Debug
         except Exception as e:
             print(f"DEBUG: Audio playback error: {e}")  # Debug
             messagebox.showerror("Error", f"Failed to play audio:\n{str(e)}")
     
+    def watch_playback_end(self):
+        """Poll until playback finishes, then tell OBS we are off air"""
+        try:
+            if pygame.mixer.music.get_busy() or pygame.mixer.get_busy():
+                self.root.after(200, self.watch_playback_end)
+                return
+        except pygame.error:
+            pass
+        notify_playback(False)
+    
     def stop_audio(self):
         """Stop audio playback"""
         try:
             pygame.mixer.music.stop()
+            pygame.mixer.stop()
+            stop_captions()
+            notify_playback(False)
             self.update_status("Audio stopped")
         except Exception as e:
             messagebox.showerror("Error", f"Failed to stop audio:\n{str(e)}")
@@ -967,60 +1174,34 @@ class VoiceMasterGUI:
         self.status_label.config(text=f"{icon} {message}", fg=color)
     
     def refresh_quick_phrases(self):
-        """Refresh the quick phrases section with default and favorite phrases"""
+        """Refresh the quick phrases section: most used phrases first, then favorites and defaults"""
         # Clear existing buttons
         for widget in self.quick_buttons_frame.winfo_children():
             widget.destroy()
         
-        # Default quick phrases
-        default_phrases = [
-            "Hello everyone, welcome to the stream!",
-            "Thanks for following!",
-            "Let's get started with today's content.",
-            "Don't forget to like and subscribe!"
-        ]
-        
-        # Add default phrase buttons with modern styling - smaller
-        for i, phrase in enumerate(default_phrases):
-            btn_text = phrase[:25] + "..." if len(phrase) > 25 else phrase  # Shorter text
+        phrases = get_quick_phrases()
+        self.shown_quick_phrases = phrases
+        for phrase in phrases:
+            is_favorite = phrase.get('id') is not None
+            icon = "⭐ " if is_favorite else ""
+            display_text = f"{icon}{phrase['text'][:22]}..." if len(phrase['text']) > 22 else f"{icon}{phrase['text']}"
+            if phrase['voice_id'] is None:
+                command = lambda p=phrase['text']: self.set_quick_text(p)
+            else:
+                command = lambda p=phrase: self.load_favorite(p)
             btn = self.create_modern_button(
                 self.quick_buttons_frame,
-                text=btn_text,
-                command=lambda p=phrase: self.set_quick_text(p),
-                bg_color=self.colors['bg_secondary'],
-                hover_color=self.colors['info']
+                text=display_text,
+                command=command,
+                bg_color=self.colors['accent_secondary'] if is_favorite else self.colors['bg_secondary'],
+                hover_color='#e67e22' if is_favorite else self.colors['info']
             )
             btn.configure(font=('Segoe UI', 8), padx=8, pady=6)  # Smaller buttons
             btn.pack(side='left', padx=2, pady=1)
-        
-        # Add favorites if any exist
-        favorites = get_favorite_phrases()[:4]  # Limit to 4 most recent to save space
-        if favorites:
-            # Add visual separator
-            separator = tk.Label(
-                self.quick_buttons_frame,
-                text="•",
-                font=('Segoe UI', 12, 'bold'),
-                fg=self.colors['text_secondary'],
-                bg=self.colors['bg_card']
-            )
-            separator.pack(side='left', padx=8)
             
-            # Add favorite phrase buttons - smaller
-            for fav in favorites:
-                display_text = f"⭐ {fav['text'][:20]}..." if len(fav['text']) > 20 else f"⭐ {fav['text']}"
-                btn = self.create_modern_button(
-                    self.quick_buttons_frame,
-                    text=display_text,
-                    command=lambda f=fav: self.load_favorite(f),
-                    bg_color=self.colors['accent_secondary'],
-                    hover_color='#e67e22'
-                )
-                btn.configure(font=('Segoe UI', 8), padx=8, pady=6)  # Smaller buttons
-                btn.pack(side='left', padx=2, pady=1)
-                
-                # Add right-click context menu for deletion
-                btn.bind("<Button-3>", lambda e, f_id=fav['id']: self.show_favorite_context_menu(e, f_id))
+            # Add right-click context menu for favorites
+            if is_favorite:
+                btn.bind("<Button-3>", lambda e, f_id=phrase['id']: self.show_favorite_context_menu(e, f_id))
     
     def set_quick_text(self, text):
         """Set quick phrase in text input"""
@@ -1039,13 +1220,54 @@ class VoiceMasterGUI:
             messagebox.showwarning("Warning", "Please select a voice first!")
             return
         
+        settings = favorite_settings(self.stability_var.get(), self.similarity_var.get(), self.style_var.get())
+        clip_path = None
+        last = self.last_generation
+        if last and (last['text'], last['voice_id'], last['settings']) == (text, self.selected_voice_id, settings):
+            clip_path = last['path']
+        
         try:
-            add_favorite(text, self.selected_voice_id, self.selected_voice_name)
+            add_favorite(text, self.selected_voice_id, self.selected_voice_name,
+                         settings=settings, clip_path=clip_path)
             self.refresh_quick_phrases()
-            self.update_status(f"Added '{text[:30]}...' to favorites")
+            if clip_path:
+                self.update_status(f"Added '{text[:30]}...' to favorites with its audio")
+            else:
+                self.update_status(f"Added '{text[:30]}...' to favorites, rendering its audio")
         except Exception as e:
             messagebox.showerror("Error", f"Failed to add favorite:\n{str(e)}")
     
+    def on_quick_phrases_changed(self):
+        """Redraw the quick phrases only if what they show changed"""
+        if get_quick_phrases() != getattr(self, 'shown_quick_phrases', None):
+            self.refresh_quick_phrases()
+
+    def check_quick_phrases(self):
+        """The ranking follows the part of the stream we are in, so look again every minute"""
+        self.on_quick_phrases_changed()
+        self.root.after(60000, self.check_quick_phrases)
+
+    def update_phrase_search(self):
+        """Show phrases matching the search box (runs on every keystroke)"""
+        query = self.phrase_search_var.get().strip()
+        if not query:
+            self.phrase_results.pack_forget()
+            self.phrase_results.set_items([])
+            return
+        self.phrase_results.set_items(search_phrases(query))
+        if not self.phrase_results.winfo_ismapped():
+            self.phrase_results.pack(fill='x', pady=(8, 0))
+
+    def use_phrase_result(self):
+        """Load the selected search result like a favorite"""
+        entry = self.phrase_results.selected()
+        if entry is None:
+            return
+        self.load_favorite({'text': entry.text, 'voice_id': entry.voice_id,
+                            'voice_name': entry.voice_name or 'unknown'})
+        self.phrase_search_var.set("")
+        self.text_input.focus_set()
+
     def load_favorite(self, favorite):
         """Load a favorite phrase and set voice"""
         # Set the text
@@ -1059,14 +1281,85 @@ class VoiceMasterGUI:
                 self.on_voice_selected(None)
                 break
         
+        # Same settings as its saved or pre-synthesized audio, so generating it needs no API call
+        settings = favorite.get('settings')
+        if settings:
+            self.stability_var.set(settings.get('stability', 0.5))
+            self.similarity_var.set(settings.get('similarity_boost', 0.75))
+            self.style_var.set(settings.get('style', 0.0))
+        
         self.update_status(f"Loaded favorite: '{favorite['voice_name']}' voice")
     
     def show_favorite_context_menu(self, event, favorite_id):
         """Show context menu for favorite deletion"""
         context_menu = tk.Menu(self.root, tearoff=0)
+        context_menu.add_command(label="▶ Play", command=lambda: self.play_favorite(favorite_id))
+        context_menu.add_command(label="Re-render with Current Settings",
+                                 command=lambda: self.rerender_favorite(favorite_id))
+        context_menu.add_separator()
         context_menu.add_command(label="Delete Favorite", command=lambda: self.delete_favorite_by_id(favorite_id))
         context_menu.tk_popup(event.x_root, event.y_root)
     
+    def play_favorite(self, favorite_id):
+        """Play a favorite's saved audio from memory - no API call"""
+        sound = get_favorite_audio(
+            favorite_id,
+            on_ready=lambda favorite: self.root.after(0, lambda: self.play_favorite(favorite['id'])))
+        if sound is None:
+            self.update_status("Rendering favorite audio, it will play when ready...")
+            return
+        favorite = next((f for f in get_favorite_phrases() if f['id'] == favorite_id), None)
+        if self.play_sound(sound, favorite) and favorite:
+            self.update_status(f"Playing favorite: '{favorite['text'][:30]}'")
+    
+    def play_sound(self, sound, phrase=None):
+        """Play decoded audio (a pygame Sound) and show its phrase on the overlay"""
+        try:
+            pygame.mixer.music.stop()
+            stop_captions()
+            pygame.mixer.stop()
+            sound.play()
+            notify_playback(True)
+            self.root.after(200, self.watch_playback_end)
+        except pygame.error as e:
+            messagebox.showerror("Error", f"Failed to play audio:\n{str(e)}")
+            return False
+        if phrase:
+            generate_overlay_html(
+                main_text=f"🎤 {phrase['voice_name']}",
+                sub_text="TTS Active",
+                save_archive=True,
+                voice_name=phrase['voice_name'],
+                spoken_text=phrase['text']
+            )
+        return True
+    
+    def play_quick_phrase(self, position):
+        """Play the phrase at a position on the quick phrase bar (Ctrl+1..4) from pre-synthesized audio"""
+        phrases = getattr(self, 'shown_quick_phrases', None) or get_quick_phrases()
+        if position >= len(phrases):
+            return
+        phrase = phrases[position]
+        if phrase.get('id') is not None:
+            self.play_favorite(phrase['id'])
+            return
+        sound = get_quick_phrase_audio(phrase) if phrase['voice_id'] else None
+        if sound is None:
+            # Not pre-synthesized (yet): load it so it can be generated
+            if phrase['voice_id']:
+                self.load_favorite(phrase)
+            else:
+                self.set_quick_text(phrase['text'])
+            self.update_status("Phrase loaded - not pre-synthesized yet, press Ctrl+Enter to generate")
+        elif self.play_sound(sound, phrase):
+            self.update_status(f"Playing: '{phrase['text'][:30]}'")
+    
+    def rerender_favorite(self, favorite_id):
+        """Save the current slider settings on a favorite and re-render its audio in the background"""
+        settings = favorite_settings(self.stability_var.get(), self.similarity_var.get(), self.style_var.get())
+        if update_favorite_settings(favorite_id, settings) is not None:
+            self.update_status("Re-rendering favorite with the current settings...")
+    
     def delete_favorite_by_id(self, favorite_id):
         """Delete a favorite by ID"""
         try:
@@ -1079,10 +1372,17 @@ class VoiceMasterGUI:
     def start_speech_to_text(self):
         """Start speech-to-text dictation (RENAMED from speech-to-clone)"""
         if self.is_recording:
-            messagebox.showinfo("Info", "Already recording! Please wait...")
+            if self.is_streaming_dictation:
+                stop_dictation()  # F3 again ends streaming dictation
+                self.update_status("Finishing dictation...")
+            else:
+                messagebox.showinfo("Info", "Already recording! Please wait...")
             return
         
         # No need to check voice selection for dictation
+        if streaming_dictation_available():
+            self.start_streaming_dictation()
+            return
         
         # Change button state
         self.mic_btn.config(
@@ -1097,10 +1397,11 @@ class VoiceMasterGUI:
         def record_thread():
             try:
                 # CHANGED: Only do speech-to-text, no voice cloning
-                transcribed_text = speech_to_text(
-                    duration=30,  # Max 30 seconds (increased from 10)
-                    mic_index=None  # Use default microphone
+                audio = record_until_silence(
+                    mic_index=None,  # Use default microphone
+                    max_duration=30  # Max 30 seconds (increased from 10)
                 )
+                transcribed_text = speech_to_text(audio)
                 
                 # Update UI in main thread
                 self.root.after(0, lambda: self.on_speech_to_text_complete(transcribed_text))
@@ -1110,6 +1411,43 @@ class VoiceMasterGUI:
         
         threading.Thread(target=record_thread, daemon=True).start()
     
+    def start_streaming_dictation(self):
+        """Dictate with partial text appearing in the text box while speaking"""
+        self.mic_btn.config(text="⏹️ Stop Dictation (F3)", bg='#c0392b', state='normal')
+        self.is_recording = True
+        self.is_streaming_dictation = True
+        self.dictation_shown = ""
+        self.text_input.delete(1.0, tk.END)
+        self.text_input.mark_set('dictation_tail', '1.0')
+        self.text_input.mark_gravity('dictation_tail', tk.LEFT)
+        self.update_status("Listening... text appears as you speak (F3 to stop)")
+        
+        def dictation_thread():
+            try:
+                text = dictate(lambda committed, tentative, done:
+                               self.root.after(0, lambda: self.show_dictation(committed, tentative)))
+                self.root.after(0, lambda: self.on_speech_to_text_complete(text))
+            except Exception as e:
+                msg = str(e)  # e is cleared when the except block ends, before the callback runs
+                self.root.after(0, lambda m=msg: self.on_speech_to_text_error(m))
+        
+        threading.Thread(target=dictation_thread, daemon=True).start()
+    
+    def show_dictation(self, committed, tentative):
+        """Show committed words normally and the still-changing tail in gray, rewriting only what changed"""
+        box = self.text_input
+        if committed.startswith(self.dictation_shown):
+            box.delete('dictation_tail', tk.END)
+            box.insert(tk.END, committed[len(self.dictation_shown):])
+        else:
+            box.delete(1.0, tk.END)
+            box.insert(tk.END, committed)
+        self.dictation_shown = committed
+        box.mark_set('dictation_tail', 'end-1c')
+        if tentative:
+            box.insert(tk.END, (" " if committed else "") + tentative, 'tentative')
+        box.see(tk.END)
+    
     def on_speech_to_text_complete(self, transcribed_text):
         """Handle completed speech-to-text dictation"""
         # Reset button state
@@ -1119,6 +1457,7 @@ class VoiceMasterGUI:
             state='normal'
         )
         self.is_recording = False
+        self.is_streaming_dictation = False
         
         if transcribed_text:
             # CHANGED: Only handle text, no audio file
@@ -1150,10 +1489,223 @@ class VoiceMasterGUI:
             state='normal'
         )
         self.is_recording = False
+        self.is_streaming_dictation = False
         
         self.update_status(f"Recording error: {error_msg}")
         messagebox.showerror("Recording Error", f"Failed to record speech:\n{error_msg}")
 
+    def toggle_live_clone(self):
+        """Speak and hear each phrase back in the selected voice while still talking (F6 again stops)"""
+        if self.is_live_cloning:
+            stop_live_clone()
+            self.update_status("Finishing live clone (spoken phrases still play)...")
+            return
+        if self.is_recording:
+            messagebox.showinfo("Info", "Already recording! Please wait...")
+            return
+        if not self.selected_voice_id:
+            messagebox.showwarning("Warning", "Please select a voice!")
+            return
+        
+        self.is_recording = True
+        self.is_live_cloning = True
+        self.mic_btn.config(state='disabled')
+        voice_id, voice_name = self.selected_voice_id, self.selected_voice_name
+        settings = {
+            'stability': self.stability_var.get(),
+            'similarity_boost': self.similarity_var.get(),
+            'style': self.style_var.get(),
+            'speed': self.speed_var.get()
+        }
+        pygame.mixer.music.stop()
+        pygame.mixer.stop()
+        notify_playback(True)
+        self.update_status(f"Live clone as {voice_name}: speak in phrases (F6 to stop, headphones recommended)")
+        
+        def on_phrase(phrase, stage):
+            if stage == 'playing':
+                self.root.after(0, lambda: self.show_live_clone_phrase(phrase, voice_name))
+        
+        def live_clone_thread():
+            try:
+                phrases = live_clone(self.play_clone_phrase, voice_id, voice_name, settings, on_phrase=on_phrase)
+            except Exception as e:
+                print(f"Live clone error: {e}")
+                phrases = []
+            self.root.after(0, lambda: self.on_live_clone_done(phrases))
+        
+        threading.Thread(target=live_clone_thread, daemon=True).start()
+    
+    def play_clone_phrase(self, path):
+        """Play one live clone phrase and return when it has finished (runs on the pipeline's player thread)"""
+        channel = pygame.mixer.Sound(path).play()
+        while channel is not None and channel.get_busy():
+            time.sleep(0.02)
+    
+    def show_live_clone_phrase(self, phrase, voice_name):
+        """Show the phrase being spoken in the cloned voice"""
+        self.current_audio_file = phrase.audio
+        generate_overlay_html(
+            main_text=f"🎤 {voice_name}",
+            sub_text="Live Clone",
+            save_archive=False,
+            voice_name=voice_name,
+            spoken_text=phrase.text
+        )
+        self.update_status(f"🗣️ '{phrase.text[:40]}' ({phrase.latency:.1f}s after you said it)")
+    
+    def on_live_clone_done(self, phrases):
+        """Reset after a live clone session and report its latency"""
+        self.is_recording = False
+        self.is_live_cloning = False
+        self.mic_btn.config(state='normal')
+        notify_playback(False)
+        latencies = [p.latency for p in phrases if p.latency is not None]
+        if latencies:
+            self.update_status(f"Live clone finished: {len(latencies)} phrases, "
+                               f"{sum(latencies) / len(latencies):.1f}s average mouth-to-speaker delay")
+        else:
+            self.update_status("Live clone finished: nothing was heard")
+
+    def toggle_voice_changer(self):
+        """Convert your speech straight into the selected voice as you talk (F7 again stops)"""
+        if self.is_voice_changing:
+            stop_voice_changer()
+            self.update_status("Stopping voice changer...")
+            return
+        if self.is_recording:
+            messagebox.showinfo("Info", "Already recording! Please wait...")
+            return
+        if not self.selected_voice_id:
+            messagebox.showwarning("Warning", "Please select a voice!")
+            return
+        
+        self.is_recording = True
+        self.is_voice_changing = True
+        self.mic_btn.config(state='disabled')
+        voice_id, voice_name = self.selected_voice_id, self.selected_voice_name
+        settings = {
+            'stability': self.stability_var.get(),
+            'similarity_boost': self.similarity_var.get(),
+            'style': self.style_var.get()
+        }
+        notify_playback(True)
+        generate_overlay_html(main_text=f"🎤 {voice_name}", sub_text="Voice Changer", save_archive=False)
+        self.update_status(f"Voice changer as {voice_name}: speak normally (F7 to stop, headphones recommended)")
+        
+        def on_chunk(chunk, stage):
+            if stage == 'playing':
+                self.root.after(0, lambda: self.update_status(
+                    f"🎛️ Voice changer: {chunk.latency:.1f}s behind your voice"))
+            elif stage == 'skipped':
+                self.root.after(0, lambda: self.update_status("🎛️ Voice changer: skipped a late chunk to catch up"))
+        
+        def voice_changer_thread():
+            try:
+                chunks = voice_changer(voice_id, settings, on_chunk=on_chunk)
+            except Exception as e:
+                print(f"Voice changer error: {e}")
+                chunks = []
+            self.root.after(0, lambda: self.on_voice_changer_done(chunks))
+        
+        threading.Thread(target=voice_changer_thread, daemon=True).start()
+    
+    def on_voice_changer_done(self, chunks):
+        """Reset after a voice changer session and report its latency"""
+        self.is_recording = False
+        self.is_voice_changing = False
+        self.mic_btn.config(state='normal')
+        notify_playback(False)
+        latencies = [c.latency for c in chunks if c.latency is not None]
+        if latencies:
+            self.update_status(f"Voice changer finished: {sum(latencies) / len(latencies):.1f}s average "
+                               f"mouth-to-speaker delay")
+        else:
+            self.update_status("Voice changer finished: nothing was converted")
+
+    def toggle_multi_mic(self):
+        """Transcribe every co-host microphone at once into one attributed transcript (F8 again stops)"""
+        if self.multi_mic_speakers:
+            self.multi_mic_speakers = []
+            self.update_status("Stopping co-host transcript...")
+            
+            def stop_thread():
+                transcript = stop_multi_mic()
+                self.root.after(0, lambda: self.update_status(
+                    f"Co-host transcript stopped: {len(transcript)} lines"))
+            
+            threading.Thread(target=stop_thread, daemon=True).start()
+            return
+        
+        self.open_transcript_window()
+        self.multi_mic_started = time.monotonic()
+        self.update_status("Opening co-host microphones...")
+        
+        def on_entry(entry):
+            self.root.after(0, lambda: self.show_transcript_entry(entry))
+        
+        def start_thread():
+            speakers = start_multi_mic(on_entry)
+            self.root.after(0, lambda: self.on_multi_mic_started(speakers))
+        
+        threading.Thread(target=start_thread, daemon=True).start()
+    
+    def on_multi_mic_started(self, speakers):
+        self.multi_mic_speakers = speakers
+        if not speakers:
+            messagebox.showwarning("Co-host Transcript",
+                                   "No co-host microphones found.\n\nAssign speakers to microphones in .env, e.g.\n"
+                                   "MULTI_MIC_DEVICES=Host=Blue Yeti; Guest=Realtek")
+            self.update_status("Co-host transcript: no microphones")
+            return
+        self.update_status(f"Co-host transcript: listening to {', '.join(speakers)} (F8 to stop)")
+    
+    def open_transcript_window(self):
+        """Window with the merged co-host transcript, one color per speaker"""
+        if getattr(self, 'transcript_window', None) and self.transcript_window.winfo_exists():
+            self.transcript_window.lift()
+            return
+        
+        window = tk.Toplevel(self.root)
+        window.title("Co-host Transcript")
+        window.geometry("640x400")
+        window.configure(bg=self.colors['bg_primary'])
+        self.transcript_window = window
+        self.transcript_box = tk.Text(
+            window,
+            font=('Segoe UI', 10),
+            bg=self.colors['bg_secondary'],
+            fg=self.colors['text_primary'],
+            wrap='word',
+            relief='flat'
+        )
+        self.transcript_box.pack(fill='both', expand=True, padx=10, pady=10)
+        self.transcript_speakers = {}
+    
+    def show_transcript_entry(self, entry):
+        """Append a transcript line and caption it on the overlay under the speaker's name"""
+        if getattr(self, 'transcript_window', None) and self.transcript_window.winfo_exists():
+            box = self.transcript_box
+            if entry.speaker not in self.transcript_speakers:
+                palette = [self.colors['success'], self.colors['accent_secondary'], self.colors['info'],
+                           self.colors['accent_primary']]
+                tag = f"speaker{len(self.transcript_speakers)}"
+                box.tag_configure(tag, foreground=palette[len(self.transcript_speakers) % len(palette)],
+                                  font=('Segoe UI', 10, 'bold'))
+                self.transcript_speakers[entry.speaker] = tag
+            seconds = max(0, int(entry.started_at - self.multi_mic_started))
+            box.insert(tk.END, f"[{seconds // 60:02d}:{seconds % 60:02d}] ")
+            box.insert(tk.END, f"{entry.speaker}: ", self.transcript_speakers[entry.speaker])
+            box.insert(tk.END, entry.text + "\n")
+            box.see(tk.END)
+        generate_overlay_html(
+            main_text=f"🎙️ {entry.speaker}",
+            sub_text=entry.text,
+            save_archive=False,
+            voice_name=entry.speaker,
+            spoken_text=entry.text
+        )
+
     def start_periodic_refresh(self):
         """Start periodic refresh of voices."""
         if self.enable_periodic_refresh:
@@ -1380,6 +1932,223 @@ class VoiceMasterGUI:
         except Exception as e:
             messagebox.showerror("Error", f"Failed to open credentials dialog: {str(e)}")
     
+    def open_history_panel(self):
+        """Open the searchable history of generated clips"""
+        if getattr(self, 'history_window', None) and self.history_window.winfo_exists():
+            self.history_window.lift()
+            return
+        
+        window = tk.Toplevel(self.root)
+        window.title("Clip History")
+        window.geometry("760x480")
+        window.configure(bg=self.colors['bg_primary'])
+        self.history_window = window
+        
+        search_frame = tk.Frame(window, bg=self.colors['bg_primary'])
+        search_frame.pack(fill='x', padx=10, pady=(10, 5))
+        tk.Label(
+            search_frame,
+            text="🔍 Search:",
+            font=('Segoe UI', 10, 'bold'),
+            fg=self.colors['text_primary'],
+            bg=self.colors['bg_primary']
+        ).pack(side='left')
+        search_var = tk.StringVar()
+        search_entry = tk.Entry(search_frame, textvariable=search_var, font=('Segoe UI', 10))
+        search_entry.pack(side='left', fill='x', expand=True, padx=(5, 0))
+        search_entry.focus_set()
+        
+        tree_frame = tk.Frame(window, bg=self.colors['bg_primary'])
+        tree_frame.pack(fill='both', expand=True, padx=10, pady=(0, 10))
+        columns = ('created', 'voice', 'duration', 'text')
+        tree = ttk.Treeview(tree_frame, columns=columns, show='headings')
+        for column, heading, width in (('created', 'Created', 140), ('voice', 'Voice', 120),
+                                       ('duration', 'Length', 60), ('text', 'Text', 400)):
+            tree.heading(column, text=heading)
+            tree.column(column, width=width, stretch=(column == 'text'))
+        
+        # Rows are fetched a page at a time as the user scrolls (keyset pagination),
+        # so the panel stays responsive no matter how large the history grows
+        page_size = 200
+        state = {'last_id': None, 'exhausted': False, 'query': '', 'paths': {}, 'pending': None}
+        
+        def load_page():
+            if state['exhausted']:
+                return
+            clips = search_clip_history(text=state['query'] or None, limit=page_size,
+                                        before_id=state['last_id'])
+            for clip in clips:
+                item = tree.insert('', 'end', values=(
+                    time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(clip['created_at'])),
+                    clip.get('voice_name') or (clip.get('voice_id') or '')[:8],
+                    f"{clip.get('duration') or 0:.1f}s",
+                    clip['text'].replace('\n', ' ')
+                ))
+                state['paths'][item] = clip.get('file_path')
+            if clips:
+                state['last_id'] = clips[-1]['id']
+            state['exhausted'] = len(clips) < page_size
+        
+        def reset_results():
+            state['pending'] = None
+            tree.delete(*tree.get_children())
+            state.update(last_id=None, exhausted=False, query=search_var.get().strip(), paths={})
+            load_page()
+        
+        def on_search_changed(*_):
+            # Debounce keystrokes so each one doesn't trigger a query
+            if state['pending']:
+                window.after_cancel(state['pending'])
+            state['pending'] = window.after(200, reset_results)
+        
+        def on_scroll(first, last):
+            scrollbar.set(first, last)
+            if float(last) > 0.9:
+                load_page()
+        
+        def play_selected(event=None):
+            selection = tree.selection()
+            path = state['paths'].get(selection[0]) if selection else None
+            if open_generated_clip(path) is None:
+                self.update_status("Clip audio is no longer available")
+                return
+            self.current_audio_file = path
+            self.play_btn.config(state='normal')
+            self.stop_btn.config(state='normal')
+            self.play_audio()
+        
+        scrollbar = tk.Scrollbar(tree_frame, orient='vertical', command=tree.yview)
+        tree.configure(yscrollcommand=on_scroll)
+        scrollbar.pack(side='right', fill='y')
+        tree.pack(side='left', fill='both', expand=True)
+        
+        search_var.trace_add('write', on_search_changed)
+        tree.bind('<Double-1>', play_selected)
+        tree.bind('<Return>', play_selected)
+        reset_results()
+    
+    def show_storage_stats(self):
+        """Show disk usage and savings for generated audio"""
+        def mb(value):
+            return f"{value / (1024 * 1024):.1f} MB"
+        
+        try:
+            stats = get_storage_stats()
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to read storage stats:\n{str(e)}")
+            return
+        
+        lines = [
+            f"Clips: {stats['files']} ({mb(stats['bytes'])})",
+            f"Removed by retention: {stats['evicted_files']} ({mb(stats['evicted_bytes'])})"
+        ]
+        if 'dedup' in stats:
+            dedup = stats['dedup']
+            lines.append(f"Deduplicated: {dedup['duplicates_written']} repeats, "
+                         f"{mb(dedup['bytes_saved'])} saved")
+        if 'transcoding' in stats:
+            transcoding = stats['transcoding']
+            lines.append(f"Transcoded: {transcoding['clips_transcoded']} clips, "
+                         f"{mb(transcoding['bytes_saved'])} saved")
+        if 'archive' in stats:
+            archive = stats['archive']
+            lines.append(f"Archived: {archive['clips']} clips in {archive['segments']} segments")
+        
+        messagebox.showinfo("Storage Stats", "\n".join(lines))
+    
+    def show_overlay_stats(self):
+        """Show render time and write counts per overlay output"""
+        stats = get_overlay_stats()
+        lines = [
+            f"Updates: {stats['updates']}",
+            f"Render time: {stats['last_render_ms']:.3f} ms last, {stats['avg_render_ms']:.3f} ms average",
+            f"Files written: {stats['file_writes']} of {stats['file_updates_submitted']} queued"
+        ]
+        for name, output in stats['outputs'].items():
+            lines.append(f"  {name}: {output['writes']} writes, {output['renders']} renders "
+                         f"→ {output['path'] or '(server only)'}")
+        if 'server' in stats:
+            server = stats['server']
+            lines.append(f"Live clients: {server['clients']}, pushes: {server['events_delivered']}")
+        messagebox.showinfo("Overlay Stats", "\n".join(lines))
+    
+    def show_audio_devices(self):
+        """Re-scan audio devices (after plugging one in) and list them"""
+        self.update_status("Scanning audio devices...")
+        
+        def scan_thread():
+            mics = refresh_audio_devices()
+            speakers = get_speaker_list()
+            self.root.after(0, lambda: self.on_audio_devices(mics, speakers))
+        
+        threading.Thread(target=scan_thread, daemon=True).start()
+    
+    def on_audio_devices(self, mics, speakers):
+        lines = ["Microphones:"]
+        lines += [f"  [{m['index']}] {m['name']} ({m['channels']} ch, {m['default_sample_rate']:.0f} Hz)" for m in mics]
+        lines.append("Speakers:")
+        lines += [f"  [{s['index']}] {s['name']} ({s['channels']} ch, "
+                  f"{s['output_latency'] * 1000:.0f} ms latency)" for s in speakers]
+        engine = get_speech_engine_stats()
+        if engine['load_seconds'] is not None:
+            lines.append(f"Local Whisper: loaded in {engine['load_seconds']:.1f}s, "
+                         f"{engine['transcriptions']} dictations")
+            if engine['average_rtf'] is not None:
+                lines[-1] += f" at {engine['average_rtf']:.2f}x real time"
+        elif engine['error']:
+            lines.append(f"Local Whisper unavailable: {engine['error']}")
+        self.update_status(f"Found {len(mics)} microphones and {len(speakers)} speakers")
+        messagebox.showinfo("Audio Devices", "\n".join(lines))
+    
+    def export_favorites_dialog(self):
+        """Export favorites with their audio to a file for another PC"""
+        path = filedialog.asksaveasfilename(
+            title="Export Favorites",
+            defaultextension=".vmfav",
+            filetypes=[("VoiceMaster favorites with audio", "*.vmfav"), ("Text only (JSON Lines)", "*.jsonl")])
+        if not path:
+            return
+        include_audio = not path.lower().endswith(".jsonl")
+        
+        def export_thread():
+            try:
+                stats = export_favorites(path, include_audio, progress=self.transfer_progress("Exporting"))
+                self.root.after(0, lambda: self.update_status(
+                    f"Exported {stats['favorites']:,} favorites ({stats['audio_files']:,} with audio)", 
+                    self.colors['success']))
+            except Exception as e:
+                msg = str(e)  # e is cleared when the except block ends, before the callback runs
+                self.root.after(0, lambda m=msg: messagebox.showerror("Error", f"Failed to export favorites:\n{m}"))
+        
+        threading.Thread(target=export_thread, daemon=True).start()
+    
+    def import_favorites_dialog(self):
+        """Import favorites (and audio) exported on another PC"""
+        path = filedialog.askopenfilename(
+            title="Import Favorites",
+            filetypes=[("VoiceMaster favorites", "*.vmfav *.jsonl"), ("All files", "*.*")])
+        if not path:
+            return
+        
+        def import_thread():
+            try:
+                stats = import_favorites(path, progress=self.transfer_progress("Importing"))
+                self.root.after(0, lambda: self.update_status(
+                    f"Imported {stats['imported']:,} favorites, skipped {stats['duplicates']:,} duplicates",
+                    self.colors['success']))
+            except Exception as e:
+                msg = str(e)
+                self.root.after(0, lambda m=msg: messagebox.showerror("Error", f"Failed to import favorites:\n{m}"))
+        
+        threading.Thread(target=import_thread, daemon=True).start()
+    
+    def transfer_progress(self, action):
+        """Progress callback for import/export that updates the status bar from the worker thread"""
+        def report(done, total):
+            text = f"{action} favorites: {done:,}" + (f" of {total:,}" if total else "")
+            self.root.after(0, lambda: self.update_status(text))
+        return report
+    
     def show_about(self):
         """Show about dialog"""
         about_text = """VoiceMaster Pro v1.0
@@ -0,0 +1,299 @@
+"""
+Local Whisper speech-to-text, preloaded once in a worker process.
+
+speech_recognition's recognize_whisper() loads the model on every call, and
+Google needs the network. Here a separate Python process loads a Whisper
+model once (faster-whisper / CTranslate2 with int8 weights on the CPU by
+default, or whisper.cpp through pywhispercpp), runs a warm-up pass and then
+waits for utterances. Audio is handed over through shared memory slots as
+16 kHz 16-bit PCM; only small JSON messages travel over the worker's
+stdin/stdout. Inference runs outside the GUI process, so it never holds
+the GUI's GIL.
+
+Every result reports its real-time factor (processing time divided by
+audio length): below 1.0 the text is ready sooner than the utterance took
+to say.
+
+Both backends are optional: pip install faster-whisper (or pywhispercpp).
+"""
+
+import importlib
+import itertools
+import json
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+WHISPER_BACKEND = os.getenv("WHISPER_BACKEND", "faster-whisper")
+WHISPER_MODEL = os.getenv("WHISPER_MODEL", "base.en")
+WHISPER_COMPUTE_TYPE = os.getenv("WHISPER_COMPUTE_TYPE", "int8")
+WHISPER_THREADS = int(os.getenv("WHISPER_THREADS", str(max(1, (os.cpu_count() or 2) // 2))))
+WHISPER_LANGUAGE = os.getenv("WHISPER_LANGUAGE", "")
+WHISPER_MAX_SECONDS = float(os.getenv("WHISPER_MAX_SECONDS", "30"))
+WORKER_SLOTS = 2  # One utterance can be copied in while another is transcribed
+
+
+def load_engine(backend, model, threads, compute_type, language):
+    """
+    Load a model and return transcribe(float32 audio at 16 kHz) -> text.
+    backend is "faster-whisper", "whispercpp" or "module:factory" for a
+    custom engine (factory gets the same arguments and returns the function).
+    """
+    if backend == "faster-whisper":
+        from faster_whisper import WhisperModel
+        whisper = WhisperModel(model, device="cpu", compute_type=compute_type, cpu_threads=threads)
+
+        def transcribe(audio):
+            segments, _ = whisper.transcribe(audio, beam_size=1, language=language or None,
+                                             condition_on_previous_text=False)
+            return " ".join(segment.text.strip() for segment in segments).strip()
+        return transcribe
+
+    if backend == "whispercpp":
+        from pywhispercpp.model import Model
+        options = {'language': language} if language else {}
+        whisper = Model(model, n_threads=threads, print_progress=False, print_realtime=False, **options)
+
+        def transcribe(audio):
+            return " ".join(segment.text.strip() for segment in whisper.transcribe(audio)).strip()
+        return transcribe
+
+    if ":" in backend:
+        module, factory = backend.split(":", 1)
+        return getattr(importlib.import_module(module), factory)(
+            model=model, threads=threads, compute_type=compute_type, language=language)
+
+    raise ValueError(f"Unknown Whisper backend '{backend}'")
+
+
+class WhisperWorker:
+    """Parent side: owns the worker process and the shared memory slots."""
+
+    def __init__(self, backend=WHISPER_BACKEND, model=WHISPER_MODEL, threads=WHISPER_THREADS,
+                 compute_type=WHISPER_COMPUTE_TYPE, language=WHISPER_LANGUAGE,
+                 max_seconds=WHISPER_MAX_SECONDS, slots=WORKER_SLOTS):
+        self.config = {'backend': backend, 'model': model, 'threads': threads,
+                       'compute_type': compute_type, 'language': language}
+        self.max_samples = int(max_seconds * SAMPLE_RATE)
+        self.slot_count = slots
+        self.error = None
+        self.load_seconds = None
+        self.transcriptions = 0
+        self.audio_seconds = 0.0
+        self.processing_seconds = 0.0
+        self.last_rtf = None
+        self._process = None
+        self._slots = []
+        self._free = None
+        self._pending = {}     # request id -> (future, slot, audio seconds)
+        self._ids = itertools.count(1)
+        self._ready = threading.Event()
+        self._load_failed = False
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self._process is not None and self._process.poll() is None
+
+    def start(self):
+        """Start the worker and begin loading the model in it (returns at once)."""
+        with self._lock:
+            if self.running or self._load_failed:
+                return self
+            self._ready.clear()
+            self.error = None
+            slots = [shared_memory.SharedMemory(create=True, size=self.max_samples * 2)
+                     for _ in range(self.slot_count)]
+            free = queue.Queue()
+            for i in range(len(slots)):
+                free.put(i)
+            process = subprocess.Popen(
+                [sys.executable, os.path.abspath(__file__), "--serve"],
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, encoding="utf-8", bufsize=1,
+                cwd=os.path.dirname(os.path.abspath(__file__)),
+                creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0))
+            process.stdin.write(json.dumps(dict(self.config, slots=[s.name for s in slots])) + "\n")
+            process.stdin.flush()
+            self._process, self._slots, self._free = process, slots, free
+            threading.Thread(target=self._read_loop, args=(process, slots, free),
+                             name="whisper-worker", daemon=True).start()
+        return self
+
+    def wait_ready(self, timeout=None):
+        """Wait for the model to load. Raises RuntimeError if it could not be loaded."""
+        self.start()
+        if not self._ready.wait(timeout):
+            return False
+        if self.error:
+            raise RuntimeError(self.error)
+        return True
+
+    def submit(self, pcm):
+        """
+        Queue 16 kHz 16-bit mono PCM (bytes or an int16 array) for transcription.
+        Returns a Future of {'text', 'audio_seconds', 'seconds', 'rtf'}.
+        """
+        samples = np.frombuffer(pcm, dtype=np.int16) if isinstance(pcm, (bytes, bytearray, memoryview)) \
+            else np.asarray(pcm, dtype=np.int16)
+        if len(samples) > self.max_samples:
+            print(f"Utterance longer than {self.max_samples / SAMPLE_RATE:.0f} s; transcribing the start only")
+            samples = samples[:self.max_samples]
+        self.start()
+        if self._load_failed:
+            raise RuntimeError(self.error)
+        with self._lock:
+            process, slots, free = self._process, self._slots, self._free
+        slot = free.get()  # Waits while every slot is being transcribed
+        future = Future()
+        request_id = next(self._ids)
+        try:
+            np.ndarray((len(samples),), dtype=np.int16, buffer=slots[slot].buf)[:] = samples
+            with self._lock:
+                self._pending[request_id] = (future, slot, len(samples) / SAMPLE_RATE)
+                process.stdin.write(json.dumps({'type': 'transcribe', 'id': request_id, 'slot': slot,
+                                                'samples': len(samples)}) + "\n")
+                process.stdin.flush()
+        except (OSError, ValueError, TypeError) as e:
+            with self._lock:
+                self._pending.pop(request_id, None)
+            free.put(slot)
+            future.set_exception(RuntimeError(f"speech worker unavailable: {e}"))
+        return future
+
+    def transcribe(self, pcm, timeout=None):
+        return self.submit(pcm).result(timeout)
+
+    def stats(self):
+        return {
+            'running': self.running,
+            'load_seconds': self.load_seconds,
+            'transcriptions': self.transcriptions,
+            'audio_seconds': self.audio_seconds,
+            'average_rtf': self.processing_seconds / self.audio_seconds if self.audio_seconds else None,
+            'last_rtf': self.last_rtf,
+            'error': self.error,
+        }
+
+    def stop(self):
+        with self._lock:
+            process = self._process
+            if process is None:
+                return
+            try:
+                process.stdin.write(json.dumps({'type': 'stop'}) + "\n")
+                process.stdin.close()
+            except (OSError, ValueError):
+                pass
+        try:
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+    def _read_loop(self, process, slots, free):
+        for line in process.stdout:
+            try:
+                message = json.loads(line)
+            except ValueError:
+                continue
+            kind = message.get('type')
+            if kind == 'ready':
+                self.load_seconds = message['load_seconds']
+                self._ready.set()
+            elif kind == 'error':
+                self.error = message['message']
+                self._load_failed = True
+                print(f"Local Whisper unavailable: {self.error}")
+            elif kind in ('result', 'failed'):
+                with self._lock:
+                    future, slot, audio_seconds = self._pending.pop(message['id'])
+                free.put(slot)
+                if kind == 'failed':
+                    future.set_exception(RuntimeError(message['message']))
+                    continue
+                rtf = message['seconds'] / audio_seconds if audio_seconds else 0.0
+                self.transcriptions += 1
+                self.audio_seconds += audio_seconds
+                self.processing_seconds += message['seconds']
+                self.last_rtf = rtf
+                future.set_result({'text': message['text'], 'audio_seconds': audio_seconds,
+                                   'seconds': message['seconds'], 'rtf': rtf})
+
+        # stdout closed: the worker exited
+        process.wait()
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            if self._process is process:
+                self._process = None
+        for future, slot, _ in pending.values():
+            future.set_exception(RuntimeError(f"speech worker exited (code {process.returncode})"))
+        for shm in slots:
+            shm.close()
+            shm.unlink()
+        for i in range(len(slots)):
+            free.put(i)  # Wake anyone waiting for a slot; their send fails and reports the exit
+        if not self._ready.is_set():
+            self.error = self.error or f"speech worker exited (code {process.returncode}) while loading"
+            self._ready.set()
+
+
+# --- Worker process ---
+
+def _attach(name):
+    shm = shared_memory.SharedMemory(name=name)
+    if os.name == "posix":
+        # The parent owns the segment; stop this process's tracker unlinking it on exit
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+def serve():
+    protocol = os.fdopen(os.dup(sys.stdout.fileno()), 'w', encoding="utf-8", buffering=1)
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())  # Model logging must not mix with replies
+    sys.stdout = sys.stderr
+
+    def send(**message):
+        protocol.write(json.dumps(message) + "\n")
+
+    config = json.loads(sys.stdin.readline())
+    try:
+        started = time.perf_counter()
+        engine = load_engine(config['backend'], config['model'], config['threads'],
+                             config['compute_type'], config['language'])
+        engine(np.zeros(SAMPLE_RATE, dtype=np.float32))  # Warm-up: first-call allocations happen now
+        slots = [_attach(name) for name in config['slots']]
+    except Exception as e:
+        send(type='error', message=f"{type(e).__name__}: {e}")
+        return 1
+    send(type='ready', load_seconds=time.perf_counter() - started)
+
+    for line in sys.stdin:
+        request = json.loads(line)
+        if request.get('type') == 'stop':
+            break
+        try:
+            view = np.ndarray((request['samples'],), dtype=np.int16, buffer=slots[request['slot']].buf)
+            audio = view.astype(np.float32) / 32768.0
+            del view
+            started = time.perf_counter()
+            text = engine(audio)
+            send(type='result', id=request['id'], text=text, seconds=time.perf_counter() - started)
+        except Exception as e:
+            send(type='failed', id=request['id'], message=f"{type(e).__name__}: {e}")
+    for shm in slots:
+        shm.close()
+    return 0
+
+
+if __name__ == "__main__":
+    if "--serve" in sys.argv:
+        sys.exit(serve())
+    print("Started by VoiceMaster as its speech-to-text worker; set STT_ENGINE=whisper to use it.")